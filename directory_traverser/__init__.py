@@ -7,8 +7,25 @@
 - initialization: 初始化和Chrome连接
 - discovery: 目录发现和元素查找
 - navigation: 导航、点击和权限检查
-- extraction: 页面信息提取和递归遍历
+- extraction: 页面信息提取和记录
+- traversal_engine: 迭代遍历引擎（深度优先/广度优先/优先级）
 - reporting: 数据存储和统计报告
+- selector_cache: 获胜选择器缓存
+- waits: 事件驱动等待
+- parallel: 多标签页并行遍历
+- rate_limiter: 全局自适应限速
+- record_sink: 缓冲式崩溃安全记录写入
+- state_store: SQLite遍历状态库
+- frontier: 可保存的遍历边界
+- network_tree: 网络目录树捕获
+- virtual_sidebar: 虚拟列表目录树分页收集
+- incremental: 按修改时间的增量遍历
+- run_diff: 两次运行输出的差异对比（JSON）
+- download_session: 长期复用的下载会话
+- download_tracker: 下载目录监视和落盘确认
+- download_queue: 专用下载标签页的持久化下载队列
+- export_batch: 批量发起导出、收集落盘文件
+- download_layout: 按运行暂存下载、镜像知识库路径归档
 """
 
 from .traverser_core import FeishuDirectoryTraverser
@@ -17,6 +34,21 @@ from .discovery import DiscoveryMixin
 from .navigation import NavigationMixin
 from .extraction import ExtractionMixin
 from .reporting import ReportingMixin
+from .selector_cache import SelectorCacheMixin
+from .waits import WaitMixin
+from .parallel import ParallelTraversalMixin
+from .traversal_engine import TraversalEngineMixin
+from .rate_limiter import AdaptiveRateLimiter
+from .record_sink import CsvRecordSink
+from .state_store import CrawlStateStore
+from .frontier import TraversalFrontier
+from .network_tree import NetworkTreeCapture
+from .virtual_sidebar import VirtualSidebarMixin
+from .incremental import IncrementalMixin
+from .download_session import DownloadSession
+from .download_tracker import DownloadTracker
+from .download_queue import DownloadQueue, DownloadQueueMixin
+from .export_batch import BatchExportMixin, ExportJobTable
 
 __version__ = "2.0.0"
 __all__ = [
@@ -25,5 +57,22 @@ __all__ = [
     "DiscoveryMixin", 
     "NavigationMixin",
     "ExtractionMixin",
-    "ReportingMixin"
+    "ReportingMixin",
+    "SelectorCacheMixin",
+    "WaitMixin",
+    "ParallelTraversalMixin",
+    "TraversalEngineMixin",
+    "VirtualSidebarMixin",
+    "IncrementalMixin",
+    "DownloadQueueMixin",
+    "BatchExportMixin",
+    "AdaptiveRateLimiter",
+    "CsvRecordSink",
+    "CrawlStateStore",
+    "TraversalFrontier",
+    "NetworkTreeCapture",
+    "DownloadSession",
+    "DownloadTracker",
+    "DownloadQueue",
+    "ExportJobTable"
 ]
\ No newline at end of file
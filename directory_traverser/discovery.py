@@ -4,106 +4,295 @@
 处理目录发现、元素查找、验证等功能
 """
 
+import time
 from selenium.webdriver.common.by import By
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from .node_index import NodeIndex, normalize_title, css_attr_selector
+from .network_tree import NetworkTreeCapture
+
+
+# 目录树公共函数：定位节点所在行、展开按钮，以及一次遍历DOM生成全部节点的纯数据快照
+SIDEBAR_TREE_FUNCTIONS_JS = r"""
+const KB_ROW_SELECTOR = '[role="treeitem"], .workspace-tree-view-node';
+
+function kbTreeRow(el) {
+    return el.closest(KB_ROW_SELECTOR) || el.parentElement || el;
+}
+
+// 行内属于该行自身的元素（嵌套渲染时跳过子节点行中的元素）
+function kbOwnElement(row, selector) {
+    return Array.from(row.querySelectorAll(selector)).find((el) => {
+        const owner = el.closest(KB_ROW_SELECTOR);
+        return !owner || owner === row;
+    }) || null;
+}
+
+function kbExpander(row) {
+    return kbOwnElement(row, '[aria-expanded], [class*="expand"], [class*="arrow"], [class*="toggle"]');
+}
+
+function kbSnapshotTree(selector) {
+    const nodes = document.querySelectorAll(selector);
+    const tokenAttrs = ['data-node-token', 'data-wiki-token', 'data-token', 'data-node-id', 'data-id'];
+    const pathStack = [];
+    const keyStack = [];
+    const rowKeys = new Map();
+    const seenKeys = {};
+    const result = [];
+    
+    nodes.forEach((el) => {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        const visible = rect.width > 0 && rect.height > 0 &&
+            style.visibility !== 'hidden' && style.display !== 'none';
+        const enabled = !el.closest('[disabled], [aria-disabled="true"]');
+        // 与Python端normalize_title保持一致：去除零宽/格式字符、NFKC、合并空白
+        const text = (el.innerText || el.textContent || '').replace(/\p{Cf}/gu, '')
+            .normalize('NFKC').replace(/\s+/g, ' ').trim();
+        const row = kbTreeRow(el);
+        const parentRow = row.parentElement ? row.parentElement.closest(KB_ROW_SELECTOR) : null;
+        
+        // 层级：优先aria-level，其次统计子节点容器嵌套层数
+        let depth = parseInt(row.getAttribute('aria-level') || '', 10);
+        if (isNaN(depth)) {
+            depth = 1;
+            let parent = row.parentElement;
+            while (parent) {
+                if (parent.matches('[role="group"], [class*="tree-view-node-children"]')) {
+                    depth += 1;
+                }
+                parent = parent.parentElement;
+            }
+        }
+        
+        // 展开状态与是否有子节点
+        const expander = kbExpander(row);
+        let expanded = null;
+        const ariaHost = row.hasAttribute('aria-expanded') ? row : (expander && expander.hasAttribute('aria-expanded') ? expander : null);
+        if (ariaHost) {
+            expanded = ariaHost.getAttribute('aria-expanded') === 'true';
+        } else if (expander) {
+            const cls = String(expander.className || '');
+            if (/collapsed|fold/i.test(cls)) { expanded = false; }
+            else if (/expanded|unfold|open/i.test(cls)) { expanded = true; }
+        }
+        let hasChildren = null;
+        if (ariaHost) {
+            hasChildren = true;
+        } else if (expander) {
+            const expanderRect = expander.getBoundingClientRect();
+            const expanderStyle = window.getComputedStyle(expander);
+            hasChildren = expanderRect.width > 0 && expanderStyle.visibility !== 'hidden';
+        }
+        // 同级节点总数（虚拟列表只渲染部分节点时用于核对覆盖率）
+        const setsize = parseInt(row.getAttribute('aria-setsize') || '', 10);
+        
+        // 子节点容器中已渲染出节点时一定有子节点
+        const childGroup = row.querySelector(':scope > [role="group"], :scope > [class*="tree-view-node-children"]');
+        if (childGroup && childGroup.querySelector(selector)) {
+            hasChildren = true;
+        }
+        
+        // 链接与稳定节点标识
+        const anchor = el.closest('a[href]') || kbOwnElement(row, 'a[href]');
+        const href = anchor ? anchor.href : null;
+        let token = null;
+        for (const attr of tokenAttrs) {
+            const value = row.getAttribute(attr) || el.getAttribute(attr);
+            if (value) { token = value; break; }
+        }
+        const match = href ? href.match(/\/wiki\/([A-Za-z0-9_-]+)/) : null;
+        if (match) { token = match[1]; }
+        
+        pathStack.length = Math.max(depth - 1, 0);
+        pathStack.push(text);
+        let key = token ? 'token:' + token : 'path:' + pathStack.join('/');
+        if (seenKeys[key]) {
+            seenKeys[key] += 1;
+            key = key + '#' + seenKeys[key];
+        } else {
+            seenKeys[key] = 1;
+        }
+        el.setAttribute('data-kb-key', key);
+        
+        // 父节点：DOM嵌套时取外层树节点，扁平渲染时按层级取最近的上层节点
+        let parentKey = parentRow && rowKeys.has(parentRow) ? rowKeys.get(parentRow) : null;
+        if (!parentRow) {
+            parentKey = depth > 1 ? (keyStack[depth - 2] || null) : null;
+        }
+        keyStack.length = Math.max(depth - 1, 0);
+        keyStack.push(key);
+        rowKeys.set(row, key);
+        
+        result.push({
+            key: key,
+            token: token,
+            name: text,
+            href: href,
+            visible: visible,
+            enabled: enabled,
+            rect: {x: rect.left, y: rect.top, width: rect.width, height: rect.height},
+            depth: depth,
+            expanded: expanded,
+            has_children: hasChildren,
+            parent: parentKey,
+            setsize: isNaN(setsize) ? null : setsize
+        });
+    });
+    return result;
+}
+"""
+
+# 目录树快照脚本：一次execute_script返回所有节点的纯数据，避免逐个元素的WebDriver往返
+SIDEBAR_SNAPSHOT_JS = SIDEBAR_TREE_FUNCTIONS_JS + r"""
+return kbSnapshotTree(arguments[0]);
+"""
+
+# 批量展开脚本：逐层点击折叠节点的展开按钮，用MutationObserver等待懒加载的子节点渲染完成，
+# 受最大层级、节点预算和总时长限制，最后一次性返回完整目录树快照
+BULK_EXPAND_JS = SIDEBAR_TREE_FUNCTIONS_JS + r"""
+const selector = arguments[0];
+const maxDepth = arguments[1];  // 0为不限制
+const maxNodes = arguments[2];
+const quietMs = arguments[3];
+const levelTimeoutMs = arguments[4];
+const totalTimeoutMs = arguments[5];
+const done = arguments[arguments.length - 1];
+const start = performance.now();
+const stats = {expanded: 0, skipped: 0, levels: 0, level_timeouts: 0, truncated: false, timed_out: false};
+
+// 等待目录树静默：观察到变化后连续quietMs无变化，或达到上限
+const waitTreeQuiet = (limitMs) => new Promise((resolve) => {
+    const root = document.querySelector('[class*="workspace-tree"], [role="tree"]') || document.body;
+    const begin = performance.now();
+    let last = begin;
+    const observer = new MutationObserver(() => { last = performance.now(); });
+    observer.observe(root, {childList: true, subtree: true, attributes: true, attributeFilter: ['aria-expanded']});
+    (function poll() {
+        const now = performance.now();
+        if (now - last >= quietMs || now - begin >= limitMs) {
+            observer.disconnect();
+            resolve();
+            return;
+        }
+        setTimeout(poll, 50);
+    })();
+});
+
+(async () => {
+    let nodes = kbSnapshotTree(selector);
+    for (let depth = 1; !maxDepth || depth < maxDepth; depth++) {
+        if (performance.now() - start >= totalTimeoutMs) { stats.timed_out = true; break; }
+        if (!nodes.some((node) => node.depth >= depth)) { break; }
+        
+        const collapsed = nodes.filter((node) => node.depth === depth && node.has_children && node.expanded === false);
+        const clicked = [];
+        for (const node of collapsed) {
+            if (nodes.length + clicked.length >= maxNodes) { stats.truncated = true; break; }
+            const el = document.querySelector('[data-kb-key="' + CSS.escape(node.key) + '"]');
+            const expander = el ? kbExpander(kbTreeRow(el)) : null;
+            if (!expander) { stats.skipped += 1; continue; }
+            expander.click();
+            clicked.push(node.key);
+        }
+        stats.expanded += clicked.length;
+        stats.levels = depth;
+        
+        // 懒加载：直到每个被展开的节点都渲染出子节点（或本层超时）
+        const levelStart = performance.now();
+        let pending = clicked;
+        while (pending.length) {
+            const remaining = Math.min(levelTimeoutMs - (performance.now() - levelStart),
+                                       totalTimeoutMs - (performance.now() - start));
+            if (remaining <= 0) { stats.level_timeouts += 1; break; }
+            await waitTreeQuiet(remaining);
+            nodes = kbSnapshotTree(selector);
+            const parents = new Set(nodes.map((node) => node.parent));
+            pending = pending.filter((key) => !parents.has(key));
+        }
+        if (stats.truncated) { break; }
+    }
+    done({nodes: kbSnapshotTree(selector), stats: stats, elapsed_ms: performance.now() - start});
+})().catch((error) => done({error: String(error)}));
+"""
 
 
 class DiscoveryMixin:
     """目录发现功能混入类"""
     
+    # 多种策略查找侧边栏目录项
+    SIDEBAR_SELECTORS = [
+        # 飞书目录树特定选择器（基于分析结果）
+        '.workspace-tree-view-node-content',
+        '[class*="workspace-tree"]',
+        '[class*="tree-view-node"]',
+        
+        # 树形结构选择器
+        '[class*="tree"] span[class*="content"]',
+        '[class*="tree"] [class*="node"]',
+        '[class*="folder"]',
+        
+        # 展开/折叠相关选择器
+        '[class*="expand"]',
+        '[class*="collapse"]',
+        
+        # 传统链接选择器（兜底）
+        '.sidebar a[href]',
+        '[class*="side"] a[href]',
+        '[class*="nav"] a[href]',
+        'nav a[href]',
+        'aside a[href]'
+    ]
+    
     def find_sidebar_items(self) -> List[Dict]:
-        """查找左侧目录的所有项目"""
+        """查找左侧目录的所有项目（优先使用缓存的获胜选择器）"""
         try:
             self.logger.info("🔍 开始搜索左侧目录项...")
             
-            # 多种策略查找侧边栏目录项
-            sidebar_selectors = [
-                # 飞书目录树特定选择器（基于分析结果）
-                '.workspace-tree-view-node-content',
-                '[class*="workspace-tree"]',
-                '[class*="tree-view-node"]',
-                
-                # 树形结构选择器
-                '[class*="tree"] span[class*="content"]',
-                '[class*="tree"] [class*="node"]',
-                '[class*="folder"]',
+            # 优先尝试上次产出目录项的选择器
+            cached_selector = self.get_cached_selector() if hasattr(self, 'get_cached_selector') else None
+            if cached_selector:
+                cached_items, element_count = self.collect_sidebar_items_by_selector(cached_selector)
+                unique_items = self.deduplicate_sidebar_items(cached_items)
+                if unique_items:
+                    self.record_selector_hit(cached_selector, len(unique_items))
+                    self.logger.info(f"📋 找到 {len(unique_items)} 个唯一的目录项（缓存选择器: {cached_selector}）")
+                    return unique_items
                 
-                # 展开/折叠相关选择器
-                '[class*="expand"]',
-                '[class*="collapse"]',
-                
-                # 传统链接选择器（兜底）
-                '.sidebar a[href]',
-                '[class*="side"] a[href]',
-                '[class*="nav"] a[href]',
-                'nav a[href]',
-                'aside a[href]'
-            ]
+                self.record_selector_miss(cached_selector)
+                self.logger.info(f"ℹ️ 缓存选择器 {cached_selector} 未找到目录项，回退到完整选择器列表")
             
             all_items = []
             found_selectors = []
+            contributions = {}
+            seen_hrefs = set()
             
-            for selector in sidebar_selectors:
-                try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if elements:
-                        found_selectors.append((selector, len(elements)))
-                        
-                        for element in elements:
-                            try:
-                                # 检查元素是否可见和可点击
-                                if not element.is_displayed() or not element.is_enabled():
-                                    continue
-                                
-                                text = element.text.strip()
-                                
-                                # 获取href（如果有的话）
-                                href = element.get_attribute('href')
-                                
-                                # 对于目录树节点，可能没有href，但有文本内容
-                                if not text:
-                                    continue
-                                
-                                # 检查是否在左侧区域
-                                location = element.location
-                                if location['x'] > 400:  # 左侧区域宽度限制
-                                    continue
-                                
-                                # 过滤明显不是目录项的文本
-                                if self.is_valid_directory_item(text, href):
-                                    # 对于没有href的可点击元素，使用文本作为标识
-                                    item_href = href if href else f"javascript:void(0)#{text}"
-                                    
-                                    item_info = {
-                                        'element': element,
-                                        'name': text,
-                                        'href': item_href,
-                                        'location': location,
-                                        'is_clickable_node': not bool(href)  # 标记是否为可点击节点
-                                    }
-                                    
-                                    all_items.append(item_info)
-                                
-                            except Exception as e:
-                                continue
-                                
-                except Exception as e:
-                    self.logger.debug(f"选择器 {selector} 查找失败: {e}")
-                    continue
+            for selector in self.SIDEBAR_SELECTORS:
+                selector_items, element_count = self.collect_sidebar_items_by_selector(selector)
+                if element_count:
+                    found_selectors.append((selector, element_count))
+                
+                # 统计每个选择器贡献的唯一目录项数量
+                for item in selector_items:
+                    if item['href'] not in seen_hrefs:
+                        seen_hrefs.add(item['href'])
+                        contributions[selector] = contributions.get(selector, 0) + 1
+                all_items.extend(selector_items)
             
             # 去重（基于href）
-            seen_hrefs = set()
-            unique_items = []
-            for item in all_items:
-                if item['href'] not in seen_hrefs:
-                    seen_hrefs.add(item['href'])
-                    unique_items.append(item)
+            unique_items = self.deduplicate_sidebar_items(all_items)
             
             self.logger.info(f"📋 找到 {len(unique_items)} 个唯一的目录项")
             if found_selectors:
                 self.logger.info("使用的选择器:")
                 for selector, count in found_selectors[:3]:  # 只显示前3个有效的选择器
-                    self.logger.info(f"  - {selector}: {count} 个元素")
+                    self.logger.info(f"  - {selector}: {count} 个元素, 贡献 {contributions.get(selector, 0)} 个唯一项")
+            
+            # 记录贡献最多唯一项的选择器，下次优先使用
+            if contributions and hasattr(self, 'record_winning_selector'):
+                winner = max(self.SIDEBAR_SELECTORS, key=lambda sel: contributions.get(sel, 0))
+                self.record_winning_selector(winner, contributions[winner], found_selectors)
             
             return unique_items
             
@@ -111,8 +300,68 @@ class DiscoveryMixin:
             self.logger.error(f"查找侧边栏项目失败: {e}")
             return []
     
+    def collect_sidebar_items_by_selector(self, selector: str):
+        """使用单个选择器收集目录项，返回(目录项列表, 匹配元素数)"""
+        items = []
+        try:
+            elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+        except Exception as e:
+            self.logger.debug(f"选择器 {selector} 查找失败: {e}")
+            return items, 0
+        
+        for element in elements:
+            try:
+                # 检查元素是否可见和可点击
+                if not element.is_displayed() or not element.is_enabled():
+                    continue
+                
+                text = element.text.strip()
+                
+                # 获取href（如果有的话）
+                href = element.get_attribute('href')
+                
+                # 对于目录树节点，可能没有href，但有文本内容
+                if not text:
+                    continue
+                
+                # 检查是否在左侧区域
+                location = element.location
+                if location['x'] > 400:  # 左侧区域宽度限制
+                    continue
+                
+                # 过滤明显不是目录项的文本
+                if self.is_valid_directory_item(text, href):
+                    # 对于没有href的可点击元素，使用文本作为标识
+                    item_href = href if href else f"javascript:void(0)#{text}"
+                    
+                    items.append({
+                        'element': element,
+                        'name': text,
+                        'href': item_href,
+                        'location': location,
+                        'is_clickable_node': not bool(href)  # 标记是否为可点击节点
+                    })
+                
+            except Exception:
+                continue
+        
+        return items, len(elements)
+    
+    def deduplicate_sidebar_items(self, items: List[Dict]) -> List[Dict]:
+        """基于href去重目录项"""
+        seen_hrefs = set()
+        unique_items = []
+        for item in items:
+            if item['href'] not in seen_hrefs:
+                seen_hrefs.add(item['href'])
+                unique_items.append(item)
+        return unique_items
+    
     def find_sidebar_items_fresh(self) -> List[Dict]:
         """重新获取侧边栏项目（避免stale element问题）"""
+        if getattr(self, 'use_sidebar_snapshot', False):
+            return self.find_sidebar_items_from_snapshot()
+        
         try:
             # 使用相同的逻辑重新查找，但每次都是新的元素引用
             selector = '.workspace-tree-view-node-content'
@@ -122,7 +371,7 @@ class DiscoveryMixin:
             for element in elements:
                 try:
                     if element.is_displayed() and element.is_enabled():
-                        text = element.text.strip()
+                        text = normalize_title(element.text)
                         location = element.location
                         
                         # 检查是否在左侧区域
@@ -143,11 +392,259 @@ class DiscoveryMixin:
             self.logger.error(f"重新获取侧边栏项目失败: {e}")
             return []
     
+    def snapshot_sidebar(self) -> List[Dict]:
+        """一次execute_script获取目录树所有节点的纯数据快照"""
+        try:
+            nodes = self.driver.execute_script(SIDEBAR_SNAPSHOT_JS, '.workspace-tree-view-node-content')
+            return nodes or []
+        except Exception as e:
+            self.logger.error(f"获取目录树快照失败: {e}")
+            return []
+    
+    def find_sidebar_items_from_snapshot(self) -> List[Dict]:
+        """基于快照构建目录项列表，元素句柄延迟到点击前再解析（虚拟列表时分页滚动收集）"""
+        if getattr(self, 'scroll_collect_sidebar', False) and self.is_sidebar_virtualized():
+            return self.collect_virtualized_sidebar()
+        return self.snapshot_nodes_to_items(self.snapshot_sidebar())
+    
+    def snapshot_nodes_to_items(self, nodes: List[Dict]) -> List[Dict]:
+        """把快照节点转换为目录项（过滤不可见/非目录项），并写入节点索引"""
+        items = []
+        for node in nodes:
+            text = normalize_title(node.get('name') or '')
+            rect = node.get('rect') or {}
+            
+            if not node.get('visible') or not node.get('enabled'):
+                continue
+            
+            # 检查是否在左侧区域
+            if rect.get('x', 0) < 400 and text and self.is_valid_directory_item(text):
+                items.append({
+                    'element': None,
+                    'name': text,
+                    'href': f"javascript:void(0)#{text}",
+                    'url': node.get('href'),
+                    'location': {'x': int(rect.get('x', 0)), 'y': int(rect.get('y', 0))},
+                    'is_clickable_node': True,
+                    'node_key': node.get('key'),
+                    'token': node.get('token'),
+                    'depth': node.get('depth'),
+                    'expanded': node.get('expanded'),
+                    'has_children': node.get('has_children'),
+                    'parent_key': node.get('parent'),
+                    'setsize': node.get('setsize'),
+                    'scroll_offset': node.get('offset')
+                })
+        
+        # 写入节点索引，建立父子关系与定位器缓存
+        if hasattr(self, 'node_index'):
+            self.node_index.ingest_snapshot(items)
+        
+        return items
+    
+    def resolve_item_element(self, item: Dict):
+        """解析目录项对应的DOM元素（快照模式下按节点标识延迟查找）"""
+        if item.get('element') is not None:
+            return item['element']
+        
+        node_key = item.get('node_key')
+        if node_key:
+            # 优先使用节点索引中缓存的定位器，O(1)定位
+            node = self.node_index.get(node_key) if hasattr(self, 'node_index') else None
+            locator = node['locator'] if node and node.get('locator') else css_attr_selector('data-kb-key', node_key)
+            element = self.query_element(locator)
+            
+            # 虚拟列表中节点不在可视区域时未渲染，先滚动到其偏移位置再查找
+            if not element and getattr(self, 'sidebar_virtualized', False):
+                offset = item.get('scroll_offset')
+                offset = offset if offset is not None else self.sidebar_offsets.get(node_key)
+                if offset is not None:
+                    self.scroll_sidebar_step(max(offset - 200, 0))
+                    element = self.query_element(locator)
+            
+            if element:
+                item['element'] = element
+                return element
+        
+        element = self.find_element_by_text(item['name'])
+        item['element'] = element
+        return element
+    
+    def query_element(self, locator: str):
+        """按CSS选择器查找元素（失败返回None）"""
+        try:
+            return self.driver.execute_script("return document.querySelector(arguments[0]);", locator)
+        except Exception as e:
+            self.logger.debug(f"按节点标识查找元素失败: {e}")
+            return None
+    
+    def find_child_items(self, parent_item: Dict) -> List[Dict]:
+        """按树结构获取节点的直接子节点（aria-expanded/展开按钮、层级与嵌套关系），不做前后计数比较
+        
+        快照已确认为叶子节点时不再扫描侧边栏；否则一次快照即可得到子节点，
+        仅在节点折叠且尚未渲染子节点时展开后再扫描一次
+        """
+        if parent_item.get('has_children') is False:
+            self.record_child_detection(scans=0, has_children=False)
+            return []
+        
+        parent_key = self.get_item_node_key(parent_item)
+        
+        # 网络后端已捕获该节点的子节点时直接使用，无需读取DOM
+        network_children = self.network_child_items(parent_key)
+        if network_children is not None:
+            self.stats["network_child_lookups"] = self.stats.get("network_child_lookups", 0) + 1
+            self.record_child_detection(scans=0, has_children=bool(network_children))
+            return network_children
+        
+        items = self.find_child_scan_items(parent_key)
+        scans = 1
+        parent, children = self.split_child_items(items, parent_key, parent_item.get('name'))
+        
+        if parent and parent.get('has_children') and parent.get('expanded') is False and not children:
+            if self.expand_sidebar_node(parent, fresh=True):
+                items = self.find_child_scan_items(parent_key)
+                scans += 1
+                parent, children = self.split_child_items(items, parent_key, parent_item.get('name'))
+        
+        self.record_child_detection(scans=scans, has_children=bool(children))
+        return children
+    
+    def find_child_scan_items(self, parent_key: str) -> List[Dict]:
+        """获取用于判断子节点的目录项（虚拟列表时只收集该节点的子树）"""
+        if getattr(self, 'scroll_collect_sidebar', False):
+            return self.find_subtree_items(parent_key)
+        return self.find_sidebar_items_from_snapshot()
+    
+    def get_network_tree(self) -> Optional[NetworkTreeCapture]:
+        """网络目录树捕获（discovery_backend为network时首次使用创建），不可用时返回None由DOM后端兜底"""
+        if getattr(self, 'discovery_backend', 'dom') != 'network':
+            return None
+        
+        if self.network_tree is None:
+            self.network_tree = NetworkTreeCapture(self.driver, self.network_tree_url_patterns, self.logger)
+            if self.network_tree.start():
+                self.logger.info("📡 已开启网络目录树捕获")
+            else:
+                self.logger.warning("⚠️ 网络目录树捕获不可用，使用DOM发现目录")
+        return self.network_tree if self.network_tree.available else None
+    
+    def sync_network_tree(self) -> int:
+        """把新到达的目录树响应写入节点索引（与DOM快照共用同一个索引），返回捕获的节点数"""
+        capture = self.get_network_tree()
+        if capture is None:
+            return 0
+        
+        nodes = capture.poll()
+        if nodes:
+            self.node_index.ingest_network_nodes(nodes)
+        return len(nodes)
+    
+    def network_child_items(self, parent_key: str) -> Optional[List[Dict]]:
+        """按网络捕获的目录树返回直接子节点（尚未捕获该节点的子节点时返回None，由DOM判断）"""
+        if self.get_network_tree() is None:
+            return None
+        
+        self.sync_network_tree()
+        node = self.node_index.get(parent_key)
+        if node is None or node.get('has_children') is None:
+            return None
+        if node['has_children'] is False:
+            return []
+        
+        children = self.node_index.children(parent_key)
+        return [self.index_node_to_item(child) for child in children] or None
+    
+    def network_root_items(self) -> List[Dict]:
+        """网络捕获的根节点；会话建立前加载的响应无法读取，未捕获到时返回空列表由DOM发现根目录
+        
+        只有开启 network_tree_allow_refresh 时才刷新页面一次重新捕获（刷新会丢失页面上的未保存内容）
+        """
+        if self.get_network_tree() is None:
+            return []
+        
+        self.sync_network_tree()
+        roots = self.captured_root_nodes()
+        if not roots and getattr(self, 'network_tree_allow_refresh', False):
+            self.logger.info("🔄 未捕获到目录树响应，刷新页面重新捕获")
+            self.driver.refresh()
+            self.wait_for_settle(fallback_delay=3)
+            self.sync_network_tree()
+            roots = self.captured_root_nodes()
+        if not roots:
+            self.logger.warning("⚠️ 未捕获到目录树根节点（页面在开启捕获前已加载，需要重新加载页面），根目录使用DOM发现")
+        return [self.index_node_to_item(node) for node in roots]
+    
+    def captured_root_nodes(self) -> List[Dict]:
+        return [node for node in self.node_index.nodes.values() if 'has_children' in node and node.get('depth') == 1]
+    
+    def index_node_to_item(self, node: Dict) -> Dict:
+        """把节点索引中的节点转换为目录项（元素句柄延迟到点击前解析）"""
+        return {
+            'element': None,
+            'name': node['title'],
+            'href': f"javascript:void(0)#{node['title']}",
+            'url': node.get('url'),
+            'location': {'x': 0, 'y': 0},
+            'is_clickable_node': True,
+            'node_key': node['key'],
+            'token': node.get('token'),
+            'depth': node.get('depth'),
+            'expanded': None,
+            'has_children': node.get('has_children'),
+            'parent_key': node.get('parent'),
+            'updated_at': node.get('modified_time')
+        }
+    
+    def split_child_items(self, items: List[Dict], parent_key: str, parent_name: str = None):
+        """在按文档顺序排列的快照中定位父节点，返回(父节点, 直接子节点列表)
+        
+        快照带有父节点标识时按嵌套关系取子节点，否则按层级取紧随其后的下一层节点；
+        节点标识对不上（旧版按标题生成的标识）时按名称定位父节点
+        """
+        position = next((i for i, item in enumerate(items) if item.get('node_key') == parent_key), None)
+        if position is None and parent_name:
+            position = next((i for i, item in enumerate(items) if item.get('name') == parent_name), None)
+        if position is None:
+            return None, []
+        
+        parent = items[position]
+        if any('parent_key' in item for item in items):
+            return parent, [item for item in items if item.get('parent_key') == parent['node_key']]
+        
+        parent_depth = parent.get('depth') or 1
+        children = []
+        for following in items[position + 1:]:
+            depth = following.get('depth') or 1
+            if depth <= parent_depth:
+                break
+            if depth == parent_depth + 1:
+                children.append(following)
+        return parent, children
+    
+    def record_child_detection(self, scans: int, has_children: bool):
+        """统计结构化子节点判断节省的侧边栏扫描
+        
+        计数比较方式每个节点需要一次额外扫描来比较数量，有子节点时再扫描一次列出子节点
+        """
+        baseline = 2 if has_children else 1
+        self.stats["structural_child_checks"] = self.stats.get("structural_child_checks", 0) + 1
+        self.stats["child_detection_scans"] = self.stats.get("child_detection_scans", 0) + scans
+        self.stats["child_detection_scans_saved"] = self.stats.get("child_detection_scans_saved", 0) + max(baseline - scans, 0)
+    
+    def get_item_node_key(self, item: Dict) -> str:
+        """获取目录项的稳定节点标识（快照提供的token/DOM标识，否则以规范化标题兜底）"""
+        node_key = item.get('node_key')
+        if not node_key:
+            node_key = NodeIndex.make_key(token=item.get('token'), title=item['name'])
+            item['node_key'] = node_key
+        return node_key
+    
     def find_element_by_text(self, text: str):
         """根据文本内容重新查找元素"""
         try:
-            # 使用contains来匹配类名和文本，更灵活
-            xpath = f"//*[contains(@class,'workspace-tree-view-node-content') and contains(text(),'{text}')]"
+            # 使用contains来匹配类名和文本，更灵活（文本按XPath字面量转义，兼容引号）
+            xpath = f"//*[contains(@class,'workspace-tree-view-node-content') and contains(text(),{self.xpath_literal(text)})]"
             elements = self.driver.find_elements(By.XPATH, xpath)
             self.logger.debug(f"找到 {len(elements)} 个匹配元素，XPath: {xpath}")
             
@@ -161,6 +658,16 @@ class DiscoveryMixin:
             self.logger.debug(f"根据文本查找元素失败: {e}")
             return None
     
+    @staticmethod
+    def xpath_literal(text: str) -> str:
+        """将文本转换为XPath字符串字面量（同时包含单双引号时使用concat）"""
+        if "'" not in text:
+            return f"'{text}'"
+        if '"' not in text:
+            return f'"{text}"'
+        parts = text.split("'")
+        return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
+    
     def is_valid_document_link(self, href: str) -> bool:
         """判断是否是有效的文档链接"""
         if not href:
@@ -226,48 +733,50 @@ class DiscoveryMixin:
         # 对于可点击节点，如果文本看起来像目录名称，接受它
         return True
     
-    def expand_collapsed_items(self):
-        """展开所有折叠的目录项"""
+    def expand_collapsed_items(self, max_depth: int = None, max_nodes: int = None) -> List[Dict]:
+        """一次注入脚本逐层展开折叠的目录项，返回展开后的完整目录项列表
+        
+        懒加载的子节点由页面内MutationObserver等待，不再逐个按钮往返WebDriver；
+        max_depth为展开到的最大层级，max_nodes为目录树节点预算（默认取配置）
+        """
+        max_depth = max_depth if max_depth is not None else self.bulk_expand_max_depth
+        max_nodes = max_nodes if max_nodes is not None else self.bulk_expand_max_nodes
+        self.logger.info(f"🔓 批量展开折叠的目录项（最大层级: {max_depth or '不限'}, 节点预算: {max_nodes}）...")
+        
+        start_time = time.time()
         try:
-            self.logger.info("🔓 尝试展开折叠的目录项...")
-            
-            # 查找展开按钮的选择器
-            expand_selectors = [
-                '[class*="expand"]',
-                '[class*="collapse"]', 
-                '[class*="toggle"]',
-                '.tree-expand',
-                '.tree-toggle',
-                '[aria-expanded="false"]'
-            ]
-            
-            expanded_count = 0
-            
-            for selector in expand_selectors:
-                try:
-                    expand_buttons = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    
-                    for button in expand_buttons:
-                        try:
-                            if button.is_displayed() and button.is_enabled():
-                                # 检查是否是展开按钮（未展开状态）
-                                aria_expanded = button.get_attribute('aria-expanded')
-                                if aria_expanded == 'false':
-                                    self.driver.execute_script("arguments[0].click();", button)
-                                    expanded_count += 1
-                                    time.sleep(0.5)  # 等待展开动画
-                                    
-                        except Exception:
-                            continue
-                            
-                except Exception:
-                    continue
-            
-            if expanded_count > 0:
-                self.logger.info(f"✅ 展开了 {expanded_count} 个折叠项目")
-                time.sleep(2)  # 等待所有展开动画完成
-            else:
-                self.logger.info("ℹ️ 没有找到需要展开的折叠项目")
-                
+            self.driver.set_script_timeout(self.bulk_expand_timeout + 5)
+            result = self.driver.execute_async_script(
+                BULK_EXPAND_JS,
+                '.workspace-tree-view-node-content',
+                int(max_depth or 0),
+                int(max_nodes),
+                int(self.settle_quiet_ms),
+                int(self.bulk_expand_level_timeout * 1000),
+                int(self.bulk_expand_timeout * 1000)
+            ) or {}
         except Exception as e:
-            self.logger.warning(f"展开折叠项目时出错: {e}")
\ No newline at end of file
+            result = {'error': str(e)}
+        finally:
+            # 恢复事件驱动等待使用的脚本超时
+            self.driver.set_script_timeout(self.wait_ceiling + 5)
+        
+        if result.get('error'):
+            self.logger.warning(f"展开折叠项目时出错，使用当前目录树: {result['error']}")
+            return self.find_sidebar_items_fresh()
+        
+        stats = result.get('stats') or {}
+        elapsed = time.time() - start_time
+        self.stats["bulk_expand_clicks"] = self.stats.get("bulk_expand_clicks", 0) + stats.get('expanded', 0)
+        self.stats["bulk_expand_time"] = self.stats.get("bulk_expand_time", 0) + elapsed
+        
+        items = self.snapshot_nodes_to_items(result.get('nodes') or [])
+        self.logger.info(f"✅ 展开了 {stats.get('expanded', 0)} 个折叠项目（{stats.get('levels', 0)} 层），"
+                         f"目录树共 {len(items)} 个目录项，耗时 {elapsed:.1f} 秒")
+        if stats.get('truncated'):
+            self.logger.info(f"ℹ️ 已达到节点预算 {max_nodes}，其余节点在遍历中按需展开")
+        if stats.get('timed_out') or stats.get('level_timeouts'):
+            self.logger.info(f"ℹ️ 部分懒加载未在时限内完成（{stats.get('level_timeouts', 0)} 层超时），其余节点在遍历中按需展开")
+        if stats.get('skipped'):
+            self.logger.debug(f"{stats['skipped']} 个折叠节点未找到展开按钮")
+        return items
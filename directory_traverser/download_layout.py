@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+下载目录布局模块
+每次运行通过CDP（Browser.setDownloadBehavior）把Chrome的下载目录设为本次运行的暂存目录，
+文件落盘确认后原子移动到与知识库路径一致的目录树中：目录树本身就是索引，
+不同文件夹下的同名文档互不覆盖，也不会出现 (1) 之类的改名；
+标题转换后映射到同一文件名的不同文档按归档归属记录追加节点token区分
+"""
+
+import os
+import re
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+STAGING_DIR_NAME = ".staging"
+OWNERS_FILE_NAME = ".owners.jsonl"
+
+# Windows/macOS/Linux 文件名中都不安全的字符
+_UNSAFE_CHARS_RE = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+MAX_SEGMENT_LENGTH = 120
+
+
+def safe_path_segment(title: str) -> str:
+    """把文档标题转换为可用作文件/目录名的路径片段"""
+    segment = _UNSAFE_CHARS_RE.sub('_', title or '').strip().rstrip('. ')
+    if segment in ('', '.', '..'):
+        return '_'
+    return segment[:MAX_SEGMENT_LENGTH]
+
+
+def mirror_path(root: str, titles: List[str], file_name: str) -> str:
+    """镜像路径：<root>/<祖先标题>/.../<文档标题><扩展名>
+    
+    titles 为从根到文档自身的标题路径；文档的子文档位于同名目录下，与文档文件并列
+    """
+    extension = os.path.splitext(file_name)[1]
+    segments = [safe_path_segment(title) for title in titles] or [safe_path_segment(os.path.splitext(file_name)[0])]
+    return os.path.join(root, *segments[:-1], segments[-1] + extension)
+
+
+def create_staging_dir(root: str, run_id: str = None) -> str:
+    """本次运行的暂存目录（与归档目录树在同一文件系统，移动是原子的）"""
+    run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+    staging = os.path.abspath(os.path.join(root, STAGING_DIR_NAME, run_id))
+    os.makedirs(staging, exist_ok=True)
+    return staging
+
+
+def set_browser_download_dir(driver, path: Optional[str]) -> bool:
+    """通过CDP设置整个浏览器的下载目录（所有标签页生效），path为None时恢复默认行为"""
+    params = {'behavior': 'allow', 'downloadPath': path} if path else {'behavior': 'default'}
+    try:
+        driver.execute_cdp_cmd('Browser.setDownloadBehavior', params)
+        return True
+    except Exception:
+        pass
+    # 旧版Chrome只支持页面级命令（仅对当前标签页生效）
+    try:
+        driver.execute_cdp_cmd('Page.setDownloadBehavior', params if path else {'behavior': 'default'})
+        return True
+    except Exception:
+        return False
+
+
+def place_file(source: str, destination: str) -> str:
+    """把暂存目录中的文件原子移动到归档位置（目标已存在时替换，是否属于同一文档由ArchiveOwners判断）"""
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    os.replace(source, destination)
+    return destination
+
+
+class ArchiveOwners:
+    """归档文件属于哪个文档（追加写入 <root>/.owners.jsonl），同一文档重新下载时替换，其他文档不被覆盖"""
+    
+    def __init__(self, root: str):
+        self.root = root
+        self.owners_file = os.path.join(root, OWNERS_FILE_NAME)
+        self.lock = threading.Lock()
+        self.owners: Dict[str, str] = {}  # 相对路径 -> 节点标识
+        self.load()
+    
+    def load(self):
+        if not os.path.exists(self.owners_file):
+            return
+        with open(self.owners_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃留下的半行
+                self.owners[entry['file']] = entry['node_key']
+    
+    def resolve(self, destination: str, node_key: str = None) -> str:
+        """文档的归档路径：目标不存在或属于同一文档时不变，否则追加节点token（仍冲突时再追加序号）
+        
+        没有节点标识时无法判断是否同一文档，只使用空闲的文件名（追加序号）
+        """
+        stem, extension = os.path.splitext(destination)
+        if node_key:
+            token = node_key.split(':', 1)[-1][:8]
+            candidates = [destination, f"{stem}_{token}{extension}"]
+            candidates += (f"{stem}_{token}_{i}{extension}" for i in range(2, 1000))
+        else:
+            candidates = [destination]
+            candidates += (f"{stem}_{i}{extension}" for i in range(2, 1000))
+        for candidate in candidates:
+            owner = self.owners.get(os.path.relpath(candidate, self.root))
+            if (node_key and owner == node_key) or (owner is None and not os.path.exists(candidate)):
+                return candidate
+        raise FileExistsError(destination)
+    
+    def place(self, source: str, destination: str, node_key: str = None) -> str:
+        """移动到归档位置并记录归属，返回实际路径（没有节点标识时移动到空闲的文件名，不记录归属）"""
+        with self.lock:
+            destination = place_file(source, self.resolve(destination, node_key))
+            if not node_key:
+                return destination
+            relative = os.path.relpath(destination, self.root)
+            if self.owners.get(relative) != node_key:
+                self.owners[relative] = node_key
+                with open(self.owners_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'file': relative, 'node_key': node_key}, ensure_ascii=False) + '\n')
+            return destination
@@ -9,6 +9,12 @@ import sys
 import time
 from datetime import datetime
 
+from .navigation import AccessStatus
+from .node_index import NodeIndex, extract_wiki_token, normalize_title
+from .download_session import DownloadSession
+from .download_tracker import DownloadTracker
+from .download_layout import create_staging_dir, set_browser_download_dir, mirror_path, ArchiveOwners
+
 # 添加项目根目录到路径，以便导入 test_word_click_fix_fast6
 sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
 
@@ -19,6 +25,10 @@ except ImportError:
     FastFeishuDownloader = None
 
 
+# 下载器菜单支持的文档类型（"下载为"对应文档，"导出"对应表格/多维表格）
+DOWNLOADABLE_DOC_TYPES = {'docx', 'doc', 'sheet', 'bitable'}
+
+
 class DownloadMixin:
     """文档下载功能混入类"""
     
@@ -30,20 +40,133 @@ class DownloadMixin:
         # 添加下载统计字段
         self.stats.update({
             "download_attempted": 0,
+            "download_requested": 0,
             "download_successful": 0, 
             "download_failed": 0,
+            "download_unconfirmed": 0,
+            "download_blocked_time": 0,
             "download_skipped": 0,
             "download_total_time": 0
         })
     
+    def get_download_session(self) -> DownloadSession:
+        """每个遍历器（标签页）一个长期复用的下载会话，首次下载时创建"""
+        if getattr(self, 'download_session', None) is None:
+            self.download_session = DownloadSession(self.driver, self.logger, FastFeishuDownloader(),
+                                                    step_timeout=self.download_step_timeout)
+            if self.download_session.downloader is not None:
+                self.download_session.downloader.output_dir = self.download_dir
+        return self.download_session
+    
+    def get_download_root(self) -> str:
+        """归档目录树的根目录（默认为output目录下的downloads）"""
+        return self.download_root or os.path.join(self.output_dir, "downloads")
+    
+    def get_archive_owners(self) -> ArchiveOwners:
+        """归档文件归属记录（首次归档时从归档根目录读取）"""
+        if getattr(self, 'archive_owners', None) is None:
+            self.archive_owners = ArchiveOwners(self.get_download_root())
+        return self.archive_owners
+    
+    def prepare_download_staging(self) -> bool:
+        """通过CDP把浏览器下载目录设为本次运行的暂存目录，失败时继续监视原下载目录"""
+        staging = create_staging_dir(self.get_download_root())
+        if not set_browser_download_dir(self.driver, staging):
+            self.logger.warning(f"⚠️ 无法通过CDP设置下载目录，继续使用: {self.download_dir}")
+            self.use_download_staging = False
+            return False
+        
+        self.download_dir = staging
+        self.download_staging_dir = staging
+        self.logger.info(f"📂 本次运行的下载暂存目录: {staging}")
+        return True
+    
+    def download_titles(self, node_key: str, item_name: str) -> list:
+        """文档在归档目录树中的标题路径（同一父节点下有同名文档时追加token区分）"""
+        node = self.node_index.get(node_key) if node_key else None
+        if node is None:
+            return [item_name]
+        
+        titles = []
+        seen = set()
+        while node and node['key'] not in seen:
+            seen.add(node['key'])
+            title = node['title']
+            if node['parent']:
+                siblings = self.node_index.children(node['parent'])
+                if sum(1 for sibling in siblings if normalize_title(sibling['title']) == normalize_title(title)) > 1:
+                    title = f"{title}_{(node['token'] or node['key'].split(':', 1)[-1])[:8]}"
+            titles.append(title)
+            node = self.node_index.get(node['parent']) if node['parent'] else None
+        return list(reversed(titles))
+    
+    def resolve_download_node_key(self, url: str):
+        token = extract_wiki_token(url)
+        node = self.node_index.get_by_token(token) if token else None
+        return node['key'] if node else None
+    
+    def get_download_tracker(self):
+        """下载目录监视器（多标签页共用），下载目录不存在时返回None，按导出请求计为成功"""
+        if getattr(self, 'download_tracker', None) is None and self.download_dir:
+            # 首次导出之前设置浏览器下载目录
+            if self.use_download_staging and self.download_staging_dir is None:
+                self.prepare_download_staging()
+            tracker = DownloadTracker(self.download_dir, self.logger, on_complete=self.on_download_confirmed,
+                                      timeout=self.download_confirm_timeout)
+            if not tracker.start():
+                self.download_dir = None
+                return None
+            self.download_tracker = tracker
+        return self.download_tracker
+    
+    def on_download_confirmed(self, record: dict):
+        """监视线程回调：文件落盘（或超时未出现）时更新统计并写入状态库"""
+        if record['status'] == 'success':
+            self.stats["download_successful"] += 1
+            if self.download_staging_dir and record.get('titles'):
+                # 暂存目录 -> 与知识库路径一致的归档目录树
+                destination = mirror_path(self.get_download_root(), record['titles'], record['file'])
+                # 节点索引中没有该文档时按URL中的token区分，仍没有时只使用空闲的文件名
+                token = extract_wiki_token(record['url']) if record.get('url') else None
+                node_key = record.get('node_key') or (NodeIndex.make_key(token=token) if token else None)
+                record['file'] = self.get_archive_owners().place(record['file'], destination, node_key)
+                self.logger.debug(f"归档下载文件: {record['file']}")
+        else:
+            self.stats["download_unconfirmed"] += 1
+        self.store_download(record['name'], record['url'], record['status'], record['latency'],
+                            file=record.get('file'), size=record.get('size'))
+    
+    def finish_downloads(self, timeout: float = None):
+        """遍历结束时等待未确认的下载落盘，然后停止监视（保留统计用于报告）"""
+        tracker = getattr(self, 'download_tracker', None)
+        if tracker is None:
+            return
+        pending = tracker.unconfirmed()
+        if pending:
+            self.logger.info(f"⏳ 等待 {pending} 个下载完成...")
+        if not tracker.wait_all(timeout):
+            self.logger.warning(f"⚠️ 仍有 {tracker.unconfirmed()} 个下载未确认")
+        tracker.stop()
+        self.download_completion = tracker.snapshot()
+        self.download_tracker = None
+        
+        if self.download_staging_dir:
+            # 恢复浏览器默认下载目录；暂存目录只剩未匹配的文件时保留供检查
+            set_browser_download_dir(self.driver, None)
+            try:
+                os.rmdir(self.download_staging_dir)
+            except OSError:
+                self.logger.warning(f"⚠️ 暂存目录中有未匹配的文件: {self.download_staging_dir}")
+            self.download_staging_dir = None
+    
     def is_download_enabled(self) -> bool:
         """检查下载功能是否启用"""
         return (hasattr(self, 'enable_download') and 
                 self.enable_download and 
                 FastFeishuDownloader is not None)
     
-    def should_download_document(self, current_url: str) -> bool:
-        """判断当前文档是否应该下载"""
+    def should_download_document(self, current_url: str, doc_type: str = None) -> bool:
+        """判断当前文档是否应该下载（已知文档类型时，不支持的类型不再打开菜单尝试）"""
         if not self.is_download_enabled():
             return False
         
@@ -51,20 +174,26 @@ class DownloadMixin:
         if '/wiki/' not in current_url:
             return False
         
-        # 可以在这里添加更多过滤条件
-        # 例如：文档类型过滤、大小限制等
+        if doc_type and doc_type not in DOWNLOADABLE_DOC_TYPES:
+            return False
         
         return True
     
-    def attempt_download_current_document(self, indent: str = "", item_name: str = ""):
-        """尝试下载当前文档"""
+    def attempt_download_current_document(self, indent: str = "", item_name: str = "", doc_type: str = None,
+                                          node_key: str = None, titles: list = None):
+        """尝试下载当前文档
+        
+        node_key/titles 由调用方给出时直接使用（下载标签页的节点索引中可能没有该节点），否则按URL查找
+        """
         if not self.is_download_enabled():
             return False
         
         current_url = self.driver.current_url
         
-        if not self.should_download_document(current_url):
+        if not self.should_download_document(current_url, doc_type):
             self.stats["download_skipped"] += 1
+            if doc_type and doc_type not in DOWNLOADABLE_DOC_TYPES:
+                self.logger.info(f"{indent}⏭️ 跳过下载（{doc_type} 类型不支持导出）: {item_name}")
             return False
         
         self.logger.info(f"{indent}📥 开始下载文档: {item_name}")
@@ -73,19 +202,30 @@ class DownloadMixin:
         download_start_time = time.time()
         
         try:
-            # 创建下载器实例并复用当前的driver
-            downloader = FastFeishuDownloader()
-            downloader.driver = self.driver
-            downloader.wait = self.wait
-            downloader.window_size = self.driver.get_window_size()
+            tracker = self.get_download_tracker()
             
-            # 执行下载
-            success = downloader.execute_download_steps()
+            # 复用下载会话：已知定位器和文档类型分支直接执行所需的点击
+            success = self.get_download_session().download(doc_type)
             
             download_duration = time.time() - download_start_time
             self.stats["download_total_time"] += download_duration
             
+            if success and tracker:
+                # 已请求导出：文件落盘由监视器确认，只有未确认的下载达到上限时才等待
+                self.store_download(item_name, current_url, 'requested', download_duration)
+                self.stats["download_requested"] += 1
+                node_key = node_key or self.resolve_download_node_key(current_url)
+                tracker.expect(item_name, current_url, node_key, titles or self.download_titles(node_key, item_name))
+                self.logger.info(f"{indent}📤 已请求导出: {item_name} (耗时: {download_duration:.1f}秒, "
+                                 f"未确认 {tracker.unconfirmed()} 个)")
+                blocked = tracker.wait_for_capacity(self.download_max_unconfirmed)
+                self.stats["download_blocked_time"] += blocked
+                return True
+            
+            self.store_download(item_name, current_url, 'success' if success else 'failed', download_duration)
+            
             if success:
+                self.stats["download_requested"] += 1
                 self.stats["download_successful"] += 1
                 self.logger.info(f"{indent}✅ 文档下载成功: {item_name} (耗时: {download_duration:.1f}秒)")
                 return True
@@ -98,6 +238,7 @@ class DownloadMixin:
             download_duration = time.time() - download_start_time
             self.stats["download_total_time"] += download_duration
             self.stats["download_failed"] += 1
+            self.store_download(item_name, current_url, 'error', download_duration)
             
             self.logger.error(f"{indent}❌ 下载异常: {item_name} - {str(e)} (耗时: {download_duration:.1f}秒)")
             
@@ -110,6 +251,48 @@ class DownloadMixin:
             
             return False
     
+    def store_download(self, item_name: str, url: str, status: str, duration: float,
+                       file: str = None, size: int = None):
+        """把下载结果写入状态库"""
+        store = self.get_state_store() if hasattr(self, 'get_state_store') else None
+        if not store:
+            return
+        
+        store.record_download(item_name, url, status, round(duration, 2),
+                              datetime.now().strftime('%Y-%m-%d %H:%M:%S'), self.resolve_download_node_key(url),
+                              file=file, size=size)
+    
+    def download_only_pass(self) -> int:
+        """仅下载模式：按CSV中已记录的URL直接打开文档并下载，不操作侧边栏"""
+        if not self.is_download_enabled():
+            self.logger.warning("下载功能未启用，跳过仅下载模式")
+            return 0
+        
+        records = self.load_logged_records()
+        self.logger.info(f"📥 仅下载模式: 共 {len(records)} 个已记录文档")
+        
+        downloaded = 0
+        for i, record in enumerate(records, 1):
+            if i > 1:
+                self.wait_with_respect()
+            
+            self.logger.info(f"📄 [{record['index']}] {record['name']}")
+            if not self.navigate_to_url(record['url'], record['name']):
+                continue
+            
+            if getattr(self, 'use_permission_probe', False):
+                access = self.probe_access_permission()
+                if access['status'] != AccessStatus.OK:
+                    self.record_permission_denied(record['name'], record['url'], access)
+                    continue
+            
+            if self.attempt_download_current_document("  ", record['name']):
+                downloaded += 1
+        
+        self.finish_downloads()
+        self.logger.info(f"✅ 仅下载模式完成: 成功 {downloaded}/{len(records)}")
+        return downloaded
+    
     def get_download_stats_summary(self) -> dict:
         """获取下载统计摘要"""
         if not self.is_download_enabled():
@@ -124,7 +307,18 @@ class DownloadMixin:
         success_rate = (successful / total_attempts * 100) if total_attempts > 0 else 0
         avg_time = (total_time / total_attempts) if total_attempts > 0 else 0
         
+        session = getattr(self, 'download_session', None)
+        tracker = getattr(self, 'download_tracker', None)
+        export_jobs = getattr(self, 'export_jobs', None)
         return {
+            "session": session.snapshot() if session else None,
+            "completion": tracker.snapshot() if tracker else getattr(self, 'download_completion', None),
+            "requested": self.stats.get("download_requested", 0),
+            "unconfirmed": self.stats.get("download_unconfirmed", 0),
+            "blocked_time": self.stats.get("download_blocked_time", 0),
+            "queued": self.stats.get("download_queued", 0),
+            "queue_blocked_time": self.stats.get("download_queue_blocked_time", 0),
+            "export_jobs": export_jobs.counts() if export_jobs else None,
             "enabled": True,
             "total_attempted": total_attempts,
             "successful": successful,
@@ -151,4 +345,20 @@ class DownloadMixin:
         self.logger.info(f"   📈 成功率: {stats['success_rate']:.1f}%")
         self.logger.info(f"   ⏱️ 总耗时: {stats['total_time']:.1f}秒")
         if stats['total_attempted'] > 0:
-            self.logger.info(f"   ⚡ 平均耗时: {stats['average_time']:.1f}秒/个")
\ No newline at end of file
+            self.logger.info(f"   ⚡ 平均耗时: {stats['average_time']:.1f}秒/个")
+        if stats['session']:
+            session = stats['session']
+            self.logger.info(f"   ♻️ 下载会话: 复用定位器完成 {session['warm_downloads']}/{session['downloads']} 个, "
+                             f"完整查找 {session['fallback_lookups']} 次, 流程平均 {session['average_flow_seconds']}秒")
+        if stats['completion']:
+            completion = stats['completion']
+            self.logger.info(f"   📦 落盘确认（{completion['mode']}）: {completion['confirmed']} 个, "
+                             f"未确认 {completion['unconfirmed']} 个, 平均延迟 {completion['average_latency']}秒, "
+                             f"吞吐 {(completion['throughput'] or 0) / 1024:.1f} KB/s, "
+                             f"等待下载确认 {stats['blocked_time']:.1f}秒")
+        if stats['queued']:
+            self.logger.info(f"   📮 下载队列: 入队 {stats['queued']} 个, 遍历因队列满等待 {stats['queue_blocked_time']:.1f}秒")
+        if stats['export_jobs']:
+            jobs = stats['export_jobs']
+            self.logger.info(f"   🗂️ 批量导出: 已下载 {jobs['downloaded']}, 失败 {jobs['failed']}, "
+                             f"未完成 {jobs['requested'] + jobs['ready']}")
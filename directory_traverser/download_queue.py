@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+下载队列模块
+遍历只把文档URL放入有界下载队列后继续，由专用下载标签页 driver.get(url) 打开文档并执行导出流程；
+队列满时遍历等待（背压），队列内容随检查点持久化，中断后的运行无需重新遍历即可继续未完成的下载
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Optional, Dict, List
+
+
+# 队列满时每隔多少秒检查一次下载标签页是否还在运行
+ENQUEUE_CHECK_INTERVAL = 1.0
+
+
+class DownloadQueue:
+    """线程安全的有界下载队列（待下载 + 下载中，按入队顺序）"""
+    
+    def __init__(self, maxsize: int = 20, entries: List[Dict] = None):
+        self.maxsize = maxsize
+        self.condition = threading.Condition()
+        self.pending: List[Dict] = []
+        self.active: Dict[str, Dict] = {}  # 下载标签页正在处理的条目（不单独序列化，恢复后重新待下载）
+        self.keys = set()  # 队列中（待下载或下载中）的条目标识，防止重复入队
+        self.closed = False
+        
+        # 恢复的条目不受容量限制
+        for entry in entries or []:
+            if entry['key'] not in self.keys:
+                self.keys.add(entry['key'])
+                self.pending.append(entry)
+    
+    def __len__(self):
+        with self.condition:
+            return len(self.pending) + len(self.active)
+    
+    def __contains__(self, key: str) -> bool:
+        with self.condition:
+            return key in self.keys
+    
+    def put(self, entry: Dict, timeout: float = None) -> Optional[float]:
+        """入队，队列满时阻塞（背压）；返回阻塞时长，已在队列中或超时返回None"""
+        start_time = time.time()
+        deadline = start_time + timeout if timeout is not None else None
+        with self.condition:
+            if entry['key'] in self.keys:
+                return None
+            while len(self.pending) + len(self.active) >= self.maxsize and not self.closed:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.condition.wait(timeout=remaining)
+            
+            self.keys.add(entry['key'])
+            self.pending.append(entry)
+            self.condition.notify_all()
+        return time.time() - start_time
+    
+    def claim(self, timeout: float = 1.0) -> Optional[Dict]:
+        """领取下一个待下载条目，队列为空时最多等待timeout秒"""
+        with self.condition:
+            if not self.pending and not self.closed:
+                self.condition.wait(timeout=timeout)
+            if not self.pending:
+                return None
+            entry = self.pending.pop(0)
+            self.active[entry['key']] = entry
+            return entry
+    
+    def complete(self, key: str):
+        """下载结束（无论成败），释放容量"""
+        with self.condition:
+            self.active.pop(key, None)
+            self.keys.discard(key)
+            self.condition.notify_all()
+    
+    def close(self):
+        """不再入队；下载标签页处理完剩余条目后退出"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+    
+    def is_drained(self) -> bool:
+        with self.condition:
+            return self.closed and not self.pending
+    
+    def to_dict(self) -> Dict:
+        """序列化：下载中的条目排在最前，恢复后最先重新下载"""
+        with self.condition:
+            return {'entries': list(self.active.values()) + list(self.pending)}
+    
+    @classmethod
+    def from_dict(cls, data: Dict, maxsize: int = 20) -> 'DownloadQueue':
+        return cls(maxsize=maxsize, entries=data.get('entries', []))
+
+
+class DownloadQueueMixin:
+    """流水线下载功能混入类"""
+    
+    def get_download_queue_file(self) -> str:
+        return os.path.join(self.output_dir, "download_queue.json")
+    
+    def save_download_queue(self):
+        """保存下载队列（启用状态库时写入状态库，否则原子写入JSON文件）"""
+        queue = getattr(self, 'download_queue', None)
+        if queue is None:
+            return
+        
+        data = json.dumps(queue.to_dict(), ensure_ascii=False)
+        store = self.get_state_store()
+        if store:
+            # 立即提交，不等下一个批量事务或检查点
+            store.save_meta('download_queue', data)
+            store.commit()
+            return
+        
+        queue_file = self.get_download_queue_file()
+        tmp_file = f"{queue_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_file, queue_file)
+    
+    def load_download_queue(self) -> DownloadQueue:
+        """读取上次保存的下载队列（没有时返回空队列）"""
+        try:
+            store = self.get_state_store()
+            data = store.load_meta('download_queue') if store else None
+            if data is None and os.path.exists(self.get_download_queue_file()):
+                with open(self.get_download_queue_file(), 'r', encoding='utf-8') as f:
+                    data = f.read()
+            if data:
+                return DownloadQueue.from_dict(json.loads(data), maxsize=self.download_queue_size)
+        except Exception as e:
+            self.logger.warning(f"读取下载队列失败，从空队列开始: {e}")
+        return DownloadQueue(maxsize=self.download_queue_size)
+    
+    def start_download_pipeline(self) -> bool:
+        """恢复下载队列并启动专用下载标签页，无法创建标签页时回退到遍历中直接下载"""
+        if self.download_worker is not None:
+            return True
+        
+        self.download_queue = self.load_download_queue()
+        if len(self.download_queue):
+            self.logger.info(f"🔄 恢复上次未完成的下载: {len(self.download_queue)} 个文档")
+        
+        try:
+            worker = self.__class__(output_dir=self.output_dir, enable_download=True)
+            for attr in self.WORKER_CONFIG_ATTRS:
+                setattr(worker, attr, getattr(self, attr))
+            
+            # 共享：限速器、状态库、下载目录监视器、下载队列
+            worker.worker_id = 'download'
+            worker.rate_limiter = self.get_rate_limiter()
+            worker.node_index = self.node_index
+            worker.state_store = self.get_state_store()
+            worker.use_state_store = self.state_store is not None
+            worker.download_tracker = self.get_download_tracker()
+            worker.download_dir = self.download_dir
+            worker.download_staging_dir = self.download_staging_dir
+            worker.download_queue = self.download_queue
+            
+            if not worker.setup_driver():
+                raise RuntimeError("无法连接Chrome")
+            worker.driver.switch_to.new_window('tab')
+        except Exception as e:
+            self.logger.warning(f"⚠️ 无法创建下载标签页，改为遍历中直接下载: {e}")
+            self.download_pipeline = False
+            return False
+        
+        self.download_worker = worker
+        self.download_thread = threading.Thread(target=worker.run_download_worker, name="download-worker", daemon=True)
+        self.download_thread.start()
+        self.logger.info(f"📥 下载标签页已就绪（队列容量 {self.download_queue_size}）")
+        return True
+    
+    def enqueue_download(self, indent: str, item_name: str, url: str, doc_type: str = None,
+                         node_key: str = None) -> bool:
+        """把文档放入下载队列后立即返回，队列满时等待下载标签页腾出容量"""
+        if not self.should_download_document(url, doc_type):
+            self.stats["download_skipped"] += 1
+            return False
+        
+        # 标题路径在入队时确定（发现该节点的标签页的节点索引中才有完整的祖先链）
+        entry = {'key': node_key or url, 'node_key': node_key, 'name': item_name, 'url': url, 'doc_type': doc_type,
+                 'titles': self.download_titles(node_key, item_name), 'enqueued_at': time.time()}
+        queued = len(self.download_queue)
+        if queued >= self.download_queue.maxsize:
+            self.logger.info(f"{indent}⏳ 下载队列已满（{queued} 个），等待下载标签页...")
+        
+        start_time = time.time()
+        while True:
+            thread = getattr(self, 'download_thread', None)
+            if thread is not None and not thread.is_alive():
+                # 下载标签页已退出：队列中剩余的文档保留到下次运行，当前文档直接在遍历中下载
+                self.logger.error(f"{indent}❌ 下载标签页已停止，改为遍历中直接下载（队列中 {len(self.download_queue)} 个文档留待下次运行）")
+                self.download_pipeline = False
+                return self.attempt_download_current_document(indent, item_name, doc_type, node_key, entry['titles'])
+            if self.download_queue.put(entry, timeout=ENQUEUE_CHECK_INTERVAL) is not None:
+                break
+            if entry['key'] in self.download_queue:
+                return False  # 已在队列中
+        
+        blocked = time.time() - start_time
+        self.stats["download_queued"] = self.stats.get("download_queued", 0) + 1
+        self.stats["download_queue_blocked_time"] = self.stats.get("download_queue_blocked_time", 0) + blocked
+        self.save_download_queue()
+        self.logger.info(f"{indent}📥 加入下载队列: {item_name}（队列 {len(self.download_queue)} 个）")
+        return True
+    
+    def run_download_worker(self):
+        """下载标签页主循环：逐个打开队列中的文档并导出，直到队列关闭且清空"""
+        if self.download_batch_size > 1 and self.get_download_tracker():
+            # 批量模式依赖下载目录监视器收集文件
+            self.run_batch_export_worker()
+            return
+        
+        queue = self.download_queue
+        while not queue.is_drained():
+            entry = queue.claim()
+            if entry is None:
+                continue
+            
+            try:
+                self.wait_with_respect()
+                if self.navigate_to_url(entry['url'], entry['name']):
+                    self.wait_for_settle(fallback_delay=2)
+                    self.attempt_download_current_document("[下载] ", entry['name'], entry.get('doc_type'),
+                                                           entry.get('node_key'), entry.get('titles'))
+                else:
+                    self.stats["download_failed"] += 1
+                    self.store_download(entry['name'], entry['url'], 'failed', 0)
+            except Exception as e:
+                self.logger.error(f"[下载] ❌ 下载 '{entry['name']}' 时出错: {e}")
+            finally:
+                queue.complete(entry['key'])
+                self.save_download_queue()
+    
+    def finish_download_pipeline(self):
+        """遍历结束：关闭队列，等待下载标签页处理完剩余文档后合并统计并关闭标签页"""
+        worker = getattr(self, 'download_worker', None)
+        if worker is None:
+            return
+        
+        remaining = len(self.download_queue)
+        if remaining:
+            self.logger.info(f"⏳ 等待下载标签页完成剩余 {remaining} 个文档...")
+        self.download_queue.close()
+        self.download_thread.join()
+        
+        for key in self.MERGED_STAT_KEYS:
+            if key.startswith('download_') and key in worker.stats:
+                self.stats[key] = self.stats.get(key, 0) + worker.stats[key]
+        self.download_session = worker.download_session
+        self.export_jobs = worker.export_jobs
+        worker.close_tab_worker()
+        self.download_worker = None
+        self.save_download_queue()
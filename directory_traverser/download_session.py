@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+下载会话模块
+每个遍历器一个长期复用的下载会话：缓存窗口尺寸，记住三个点按钮、"下载为"/"导出"菜单
+和Word/Excel选项的定位器以及各文档类型对应的菜单分支；定位器命中时每一步只等待目标元素出现，
+不再固定sleep或整页扫描，失效时回退到FastFeishuDownloader的完整查找并重新学习
+"""
+
+import time
+from typing import Optional, Dict, Tuple
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+
+# 菜单分支
+BRANCH_DOWNLOAD_AS = "download_as"  # "下载为" -> Word -> 导出正文及评论 -> 导出
+BRANCH_EXPORT = "export"  # "导出" -> Excel/CSV 文件 -> 下载
+
+# 文档类型的默认菜单分支（实际检测到的分支会覆盖）
+DOC_TYPE_BRANCHES = {
+    'docx': BRANCH_DOWNLOAD_AS,
+    'doc': BRANCH_DOWNLOAD_AS,
+    'sheet': BRANCH_EXPORT,
+    'bitable': BRANCH_EXPORT,
+}
+
+# 会话状态
+STATE_IDLE = "idle"
+STATE_MENU_OPEN = "menu_open"
+STATE_SUBMENU_OPEN = "submenu_open"
+STATE_OPTION_SELECTED = "option_selected"
+STATE_EXPORT_REQUESTED = "export_requested"
+
+
+def text_xpath(text: str) -> str:
+    """按元素自身文本精确匹配的XPath"""
+    return f"//*[not(self::script) and not(self::style) and normalize-space(text())='{text}']"
+
+
+# 初始定位器（与FastFeishuDownloader中的精确匹配一致），其余步骤首次下载时学习
+DEFAULT_LOCATORS: Dict[str, Tuple[str, str]] = {
+    'more_menu': (By.CSS_SELECTOR, 'button[data-selector="more-menu"]'),
+    'menu_download_as': (By.XPATH, "//*[not(self::script) and (contains(text(), '下载为') or contains(text(), 'Download as'))]"),
+    'menu_export': (By.XPATH, "//*[not(self::script) and normalize-space(text())='导出']"),
+    'option_excel': (By.XPATH, text_xpath('Excel/CSV 文件')),
+    'comments_option': (By.XPATH, "//*[not(self::script) and contains(text(), '导出正文及评论')]"),
+    'confirm_export': (By.XPATH, "//button[text()='导出'] | //*[text()='导出' and (@role='button' or name()='button')]"),
+    'confirm_download': (By.XPATH, "//button[text()='下载'] | //*[text()='下载' and (@role='button' or name()='button')]"),
+}
+
+# 一次脚本检测菜单分支（"下载为"优先于"导出"，与原流程一致），返回分支、菜单项和文本
+MENU_BRANCH_JS = """
+const found = document.evaluate(
+    "//*[not(self::script) and (contains(text(), '下载为') or contains(text(), '导出') or contains(text(), 'Download as') or contains(text(), 'Export'))]",
+    document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+let exportItem = null;
+for (let i = 0; i < found.snapshotLength; i++) {
+    const el = found.snapshotItem(i);
+    const rect = el.getBoundingClientRect();
+    if (!rect.width || !rect.height) continue;
+    const text = (el.innerText || el.textContent || '').trim();
+    if (text.includes('下载为') || text.toLowerCase().includes('download as')) {
+        return {branch: 'download_as', element: el, text: text};
+    }
+    if (!exportItem && (text.includes('导出') || text.toLowerCase().includes('export')) && !text.includes('下载')) {
+        exportItem = {branch: 'export', element: el, text: text};
+    }
+}
+return exportItem;
+"""
+
+# 为找到的元素生成可复用的定位信息
+DESCRIBE_ELEMENT_JS = """
+const el = arguments[0];
+return {
+    data_selector: el.getAttribute('data-selector'),
+    aria_label: el.getAttribute('aria-label'),
+    tag: el.tagName.toLowerCase(),
+    text: Array.from(el.childNodes).filter((n) => n.nodeType === 3).map((n) => n.textContent).join('').trim()
+};
+"""
+
+
+class DownloadSession:
+    """长期复用的下载会话（状态机：空闲 -> 菜单 -> 子菜单 -> 已选格式 -> 已请求导出）"""
+    
+    def __init__(self, driver, logger, downloader=None, step_timeout: float = 5.0):
+        self.driver = driver
+        self.logger = logger
+        self.downloader = downloader  # FastFeishuDownloader，学习到的定位器失效时用其完整查找兜底
+        self.step_timeout = step_timeout
+        self.window_size = None
+        self.locators: Dict[str, Tuple[str, str]] = dict(DEFAULT_LOCATORS)
+        self.branches: Dict[str, str] = dict(DOC_TYPE_BRANCHES)
+        self.state = STATE_IDLE
+        
+        self.bind_downloader()
+        
+        # 统计
+        self.attempts = 0
+        self.downloads = 0
+        self.warm_downloads = 0  # 全程命中已知定位器、未回退完整查找的下载
+        self.fallback_lookups = 0
+        self.locators_learned = 0
+        self.step_time = 0.0
+    
+    def get_window_size(self) -> Dict:
+        """窗口尺寸只在会话内读取一次"""
+        if self.window_size is None:
+            self.window_size = self.driver.get_window_size()
+        return self.window_size
+    
+    def bind_downloader(self):
+        """把当前驱动和缓存的窗口尺寸交给兜底下载器"""
+        if self.downloader is not None:
+            self.downloader.driver = self.driver
+            self.downloader.wait = WebDriverWait(self.driver, 10)
+            self.downloader.window_size = self.get_window_size()
+    
+    def find(self, step: str, clickable: bool = False):
+        """按已知定位器等待元素出现，超时返回None"""
+        locator = self.locators.get(step)
+        if locator is None:
+            return None
+        condition = EC.element_to_be_clickable(locator) if clickable else EC.visibility_of_element_located(locator)
+        try:
+            return WebDriverWait(self.driver, self.step_timeout, poll_frequency=0.1).until(condition)
+        except TimeoutException:
+            return None
+    
+    def locate(self, step: str, fallback=None, clickable: bool = False):
+        """先用已知定位器，失效时回退完整查找并学习新的定位器"""
+        element = self.find(step, clickable)
+        if element is not None or fallback is None:
+            return element
+        
+        self.fallback_lookups += 1
+        self.logger.debug(f"下载定位器未命中，完整查找: {step}")
+        element = fallback()
+        if element is not None:
+            self.learn(step, element)
+        return element
+    
+    def learn(self, step: str, element):
+        """记住找到的元素的定位方式（data-selector、aria-label或自身文本）"""
+        try:
+            info = self.driver.execute_script(DESCRIBE_ELEMENT_JS, element) or {}
+        except Exception:
+            return
+        
+        if info.get('data_selector'):
+            locator = (By.CSS_SELECTOR, f"{info['tag']}[data-selector=\"{info['data_selector']}\"]")
+        elif info.get('aria_label') and '"' not in info['aria_label']:
+            locator = (By.CSS_SELECTOR, f"{info['tag']}[aria-label=\"{info['aria_label']}\"]")
+        elif info.get('text') and "'" not in info['text']:
+            locator = (By.XPATH, text_xpath(info['text']))
+        else:
+            return
+        
+        if self.locators.get(step) != locator:
+            self.locators[step] = locator
+            self.locators_learned += 1
+            self.logger.debug(f"学习下载定位器 {step}: {locator[1]}")
+    
+    def click(self, element) -> bool:
+        """点击元素，失败时依次改用JS点击元素和其父元素"""
+        for method in (
+            lambda: element.click(),
+            lambda: self.driver.execute_script("arguments[0].click();", element),
+            lambda: self.driver.execute_script("arguments[0].parentElement.click();", element),
+        ):
+            try:
+                method()
+                return True
+            except Exception:
+                continue
+        return False
+    
+    def open_branch_menu(self, doc_type: Optional[str]):
+        """打开三个点菜单并返回(分支, 菜单项)：已知文档类型直接等待对应菜单项，否则一次脚本检测"""
+        more_button = self.locate('more_menu', self.downloader.find_three_dots_button if self.downloader else None,
+                                  clickable=True)
+        if more_button is None:
+            return None, None
+        self.driver.execute_script("arguments[0].click();", more_button)
+        self.state = STATE_MENU_OPEN
+        
+        branch = self.branches.get(doc_type) if doc_type else None
+        if branch:
+            entry = self.find(f"menu_{branch}")
+            if entry is not None:
+                return branch, entry
+        
+        # 文档类型未知或菜单与预期不符：等待菜单出现后一次脚本检测分支
+        self.fallback_lookups += 1
+        try:
+            detected = WebDriverWait(self.driver, self.step_timeout, poll_frequency=0.1).until(
+                lambda driver: driver.execute_script(MENU_BRANCH_JS))
+        except TimeoutException:
+            return None, None
+        
+        branch = detected['branch']
+        if doc_type:
+            self.branches[doc_type] = branch
+        self.learn(f"menu_{branch}", detected['element'])
+        return branch, detected['element']
+    
+    def select_format(self, branch: str) -> bool:
+        """悬停分支菜单后选择Word或Excel格式"""
+        if branch == BRANCH_DOWNLOAD_AS:
+            option = self.locate('option_word', self.downloader.find_word_option if self.downloader else None)
+        else:
+            option = self.locate('option_excel', self.downloader.find_excel_option if self.downloader else None)
+        if option is None or not self.click(option):
+            return False
+        self.state = STATE_OPTION_SELECTED
+        return True
+    
+    def confirm_export(self, branch: str) -> bool:
+        """导出设置：Word分支选择"导出正文及评论"后点击导出，Excel分支点击下载"""
+        if branch == BRANCH_DOWNLOAD_AS:
+            comments = self.locate('comments_option')
+            if comments is None and self.downloader:
+                self.fallback_lookups += 1
+                if not self.downloader.find_and_click_export_content_comments():
+                    self.logger.debug("无法选择导出选项，使用默认设置")
+            elif comments is not None and not self.click(comments):
+                self.logger.debug("无法选择导出选项，使用默认设置")
+            
+            button = self.find('confirm_export', clickable=True)
+            if button is None:
+                self.fallback_lookups += 1
+                return bool(self.downloader and self.downloader.click_export_button_smart())
+        else:
+            button = self.find('confirm_download', clickable=True)
+            if button is None:
+                return False
+        
+        self.driver.execute_script("arguments[0].click();", button)
+        return True
+    
+    def reset(self):
+        """关闭可能残留的菜单和弹窗，回到空闲状态"""
+        try:
+            self.driver.execute_script("document.body.click();")
+        except Exception:
+            pass
+        self.state = STATE_IDLE
+    
+    def download(self, doc_type: Optional[str] = None) -> bool:
+        """对当前文档执行一次导出流程，返回是否已请求导出"""
+        start_time = time.time()
+        fallbacks_before = self.fallback_lookups
+        self.attempts += 1
+        
+        try:
+            self.driver.execute_script("window.scrollTo(0, 0);")
+            branch, entry = self.open_branch_menu(doc_type)
+            if entry is None:
+                self.logger.warning("❌ 未找到支持的下载菜单（'下载为'或'导出'）")
+                return False
+            
+            # 悬停展开子菜单，等待格式选项出现（替代固定等待）
+            ActionChains(self.driver).move_to_element(entry).perform()
+            self.state = STATE_SUBMENU_OPEN
+            if not self.select_format(branch):
+                self.logger.warning(f"❌ 未找到{'Word' if branch == BRANCH_DOWNLOAD_AS else 'Excel'}选项")
+                return False
+            
+            if not self.confirm_export(branch):
+                self.logger.warning("❌ 未找到导出确认按钮")
+                return False
+            
+            self.state = STATE_EXPORT_REQUESTED
+            self.downloads += 1
+            if self.fallback_lookups == fallbacks_before:
+                self.warm_downloads += 1
+            return True
+        
+        finally:
+            self.step_time += time.time() - start_time
+            if self.state != STATE_EXPORT_REQUESTED:
+                self.reset()
+            self.state = STATE_IDLE
+    
+    def snapshot(self) -> Dict:
+        """导出会话统计"""
+        return {
+            'downloads': self.downloads,
+            'warm_downloads': self.warm_downloads,
+            'fallback_lookups': self.fallback_lookups,
+            'locators_learned': self.locators_learned,
+            'branches': dict(self.branches),
+            'average_flow_seconds': round(self.step_time / max(self.attempts, 1), 2)
+        }
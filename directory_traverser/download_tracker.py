@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+下载完成跟踪模块
+监视下载目录（Linux使用inotify，其他平台轮询），忽略.crdownload等未完成文件，
+按预期文件名和请求时间把新完成的文件匹配到发起下载的文档，
+统计真实完成延迟、文件大小和吞吐量；未确认的下载达到上限时才阻塞遍历
+"""
+
+import os
+import re
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from typing import Optional, Dict, List, Callable
+
+from .node_index import normalize_title
+
+
+# 浏览器下载中的临时文件后缀
+PARTIAL_SUFFIXES = ('.crdownload', '.part', '.partial', '.download', '.tmp')
+
+# inotify事件
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+INOTIFY_EVENT = struct.Struct('iIII')
+
+# 文件名中不能出现的字符（导出时被替换），匹配时一并去掉
+_ILLEGAL_CHARS_RE = re.compile(r'[\\/:*?"<>|\s]+')
+_DUPLICATE_SUFFIX_RE = re.compile(r'\s*[(（]\d+[)）]$')
+
+
+def is_partial_file(name: str) -> bool:
+    return name.startswith('.') or name.lower().endswith(PARTIAL_SUFFIXES)
+
+
+def file_match_key(name: str) -> str:
+    """文件名/文档标题的匹配键：去掉扩展名、浏览器追加的 (1) 和非法字符"""
+    stem = os.path.splitext(name)[0] if '.' in name else name
+    stem = _DUPLICATE_SUFFIX_RE.sub('', stem)
+    return _ILLEGAL_CHARS_RE.sub('', normalize_title(stem)).lower()
+
+
+def title_match_key(title: str) -> str:
+    return _ILLEGAL_CHARS_RE.sub('', normalize_title(title)).lower()
+
+
+class InotifyWatcher:
+    """通过ctypes调用inotify监视单个目录（不依赖第三方包），不可用时create返回None"""
+    
+    def __init__(self, fd: int):
+        self.fd = fd
+    
+    @classmethod
+    def create(cls, directory: str) -> Optional['InotifyWatcher']:
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK)
+            if fd < 0:
+                return None
+            if libc.inotify_add_watch(fd, directory.encode(), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+                os.close(fd)
+                return None
+            return cls(fd)
+        except (OSError, AttributeError):
+            return None
+    
+    def read(self, timeout: float) -> List[tuple]:
+        """等待事件，返回[(mask, 文件名), ...]"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        
+        events = []
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', errors='replace')
+            offset += length
+            if name:
+                events.append((mask, name))
+        return events
+    
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class DownloadTracker:
+    """下载完成跟踪器（多标签页共用一个，后台线程监视下载目录）"""
+    
+    def __init__(self, directory: str, logger=None, on_complete: Callable[[Dict], None] = None,
+                 poll_interval: float = 0.5, timeout: float = 300, use_inotify: bool = True):
+        self.directory = directory
+        self.logger = logger
+        self.on_complete = on_complete  # 文件确认（或超时）后的回调，在监视线程中调用
+        self.poll_interval = poll_interval
+        self.timeout = timeout  # 请求后多久仍未出现文件视为未确认
+        self.use_inotify = use_inotify
+        self.condition = threading.Condition()
+        self.pending: List[Dict] = []  # 按请求顺序排列的待确认下载
+        self.partials: Dict[str, float] = {}  # 未完成文件名 -> 首次出现时间
+        self.known: Dict[str, tuple] = {}  # 轮询模式：已知文件 -> (大小, 修改时间)
+        self.settling = set()  # 轮询模式：新出现、等待大小稳定的文件
+        self.watcher: Optional[InotifyWatcher] = None
+        self.mode = None  # 'inotify' 或 'polling'
+        self.thread = None
+        self.running = False
+        self.sequence = 0
+        
+        # 统计
+        self.completed: List[Dict] = []
+        self.results: Dict[int, Dict] = {}  # 请求编号 -> 最终记录（已落盘或未确认）
+        self.timed_out = 0
+        self.unmatched_files: List[str] = []
+    
+    def start(self) -> bool:
+        """记录目录中已有的文件并启动监视线程，目录不存在时返回False"""
+        if not os.path.isdir(self.directory):
+            if self.logger:
+                self.logger.warning(f"⚠️ 下载目录不存在，无法确认下载完成: {self.directory}")
+            return False
+        
+        self.known = self.scan()
+        self.watcher = InotifyWatcher.create(self.directory) if self.use_inotify else None
+        self.mode = 'inotify' if self.watcher else 'polling'
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="download-tracker", daemon=True)
+        self.thread.start()
+        if self.logger:
+            self.logger.info(f"👀 监视下载目录（{self.mode}）: {self.directory}")
+        return True
+    
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=self.poll_interval * 4)
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
+    
+    def expect(self, name: str, url: str = None, node_key: str = None, titles: List[str] = None) -> Dict:
+        """登记一次已发起的下载，返回待确认记录（titles为文档在知识库中的标题路径，用于归档）"""
+        with self.condition:
+            self.sequence += 1
+            ticket = {
+                'id': self.sequence,
+                'name': name,
+                'url': url,
+                'node_key': node_key,
+                'titles': titles,
+                'match_key': title_match_key(name),
+                'requested_at': time.time()
+            }
+            self.pending.append(ticket)
+            return ticket
+    
+    def unconfirmed(self) -> int:
+        with self.condition:
+            return len(self.pending)
+    
+    def wait_for_capacity(self, max_unconfirmed: int) -> float:
+        """未确认的下载达到上限时阻塞，直到有下载完成或超时，返回阻塞时长"""
+        start_time = time.time()
+        with self.condition:
+            while self.running and len(self.pending) >= max(max_unconfirmed, 1):
+                self.condition.wait(timeout=self.poll_interval)
+        return time.time() - start_time
+    
+    def wait_all(self, timeout: float = None) -> bool:
+        """等待所有下载确认（或超时），返回是否全部结束"""
+        deadline = time.time() + (timeout if timeout is not None else self.timeout)
+        with self.condition:
+            while self.running and self.pending and time.time() < deadline:
+                self.condition.wait(timeout=self.poll_interval)
+            return not self.pending
+    
+    def wait_for(self, ticket_ids, timeout: float) -> bool:
+        """等待指定请求全部有结果（落盘或未确认），返回是否全部结束"""
+        deadline = time.time() + timeout
+        with self.condition:
+            while self.running and any(ticket_id not in self.results for ticket_id in ticket_ids):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(timeout=min(remaining, self.poll_interval))
+            return True
+    
+    def result(self, ticket_id: int) -> Optional[Dict]:
+        with self.condition:
+            return self.results.get(ticket_id)
+    
+    # ---- 监视线程 ----
+    
+    def run(self):
+        while self.running:
+            try:
+                if self.watcher:
+                    for mask, name in self.watcher.read(self.poll_interval):
+                        self.handle_event(mask, name)
+                else:
+                    time.sleep(self.poll_interval)
+                    self.poll()
+                self.expire()
+            except Exception as e:
+                if self.logger:
+                    self.logger.debug(f"下载目录监视出错: {e}")
+    
+    def handle_event(self, mask: int, name: str):
+        if is_partial_file(name):
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self.partial_started(name)
+            return
+        if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            self.file_finished(name)
+    
+    def scan(self) -> Dict[str, tuple]:
+        files = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        files[entry.name] = (stat.st_size, stat.st_mtime)
+        except OSError:
+            pass
+        return files
+    
+    def poll(self):
+        """轮询模式：新文件大小连续两次不变才视为完成"""
+        current = self.scan()
+        now = time.time()
+        for name, state in current.items():
+            if is_partial_file(name):
+                if name not in self.partials:
+                    self.partial_started(name, now)
+            elif name in self.settling and self.known.get(name) == state:
+                self.settling.discard(name)
+                self.file_finished(name)
+            elif self.known.get(name) != state:
+                self.settling.add(name)
+        self.known = current
+    
+    def match_ticket(self, name: str, candidates: List[Dict]) -> Optional[Dict]:
+        """按文件名匹配请求（调用方持有锁）：名称完全一致优先；否则只在唯一一个请求与文件名互为前缀
+        （导出时标题被截断）时归属；名称对不上的文件（目录中无关的文件）不归属任何请求
+        """
+        key = file_match_key(name)
+        if not key:
+            return None
+        candidates = [ticket for ticket in candidates if ticket['match_key']]
+        exact = [ticket for ticket in candidates if ticket['match_key'] == key]
+        if exact:
+            return exact[0]
+        prefixed = [ticket for ticket in candidates
+                    if key.startswith(ticket['match_key']) or ticket['match_key'].startswith(key)]
+        return prefixed[0] if len(prefixed) == 1 else None
+    
+    def partial_started(self, name: str, now: float = None):
+        """未完成文件出现：服务端导出已就绪、浏览器开始接收，对应请求记下就绪时间"""
+        now = now or time.time()
+        self.partials.setdefault(name, now)
+        final_name = name
+        for suffix in PARTIAL_SUFFIXES:
+            if final_name.lower().endswith(suffix):
+                final_name = final_name[:-len(suffix)]
+        if not final_name or final_name.startswith('.') or final_name.lower().startswith('unconfirmed '):
+            return  # Chrome的临时名称，改名后再匹配
+        
+        with self.condition:
+            ticket = self.match_ticket(final_name, [t for t in self.pending if 'ready_at' not in t])
+            if ticket is not None:
+                ticket['ready_at'] = now
+                self.condition.notify_all()
+    
+    def file_finished(self, name: str):
+        """一个完整文件落盘：匹配待确认的下载"""
+        path = os.path.join(self.directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        finished_at = time.time()
+        
+        with self.condition:
+            # 只考虑在文件出现之前发起的请求
+            candidates = [ticket for ticket in self.pending
+                          if not ticket.get('matched') and ticket['requested_at'] <= stat.st_mtime + 1]
+            ticket = self.match_ticket(name, candidates)
+            if ticket is None:
+                self.unmatched_files.append(name)
+                return
+            ticket['matched'] = True
+            
+            transfer_start = self.partials.pop(name + '.crdownload', None)
+            latency = finished_at - ticket['requested_at']
+            transfer_seconds = finished_at - transfer_start if transfer_start else latency
+            record = dict(ticket, status='success', file=path, size=stat.st_size, latency=round(latency, 2),
+                          transfer_seconds=round(transfer_seconds, 2),
+                          throughput=round(stat.st_size / transfer_seconds, 1) if transfer_seconds > 0 else None)
+        
+        if self.logger:
+            self.logger.info(f"📦 下载完成: {name} ({stat.st_size / 1024:.1f} KB, 延迟 {latency:.1f}秒)")
+        self.publish(ticket, record)
+    
+    def publish(self, ticket: Dict, record: Dict):
+        """先执行回调（如把文件移入归档目录），再结束该请求，等待方看到的是回调处理后的记录"""
+        if self.on_complete:
+            try:
+                self.on_complete(record)
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"⚠️ 下载完成回调出错: {record['name']} - {e}")
+        
+        with self.condition:
+            self.pending.remove(ticket)
+            if record['status'] == 'success':
+                self.completed.append(record)
+            self.results[ticket['id']] = record
+            self.condition.notify_all()
+    
+    def expire(self):
+        """超过等待上限仍未出现文件的下载记为未确认"""
+        now = time.time()
+        with self.condition:
+            expired = [ticket for ticket in self.pending
+                       if not ticket.get('matched') and now - ticket['requested_at'] > self.timeout]
+            for ticket in expired:
+                ticket['matched'] = True
+                self.timed_out += 1
+        
+        for ticket in expired:
+            if self.logger:
+                self.logger.warning(f"⚠️ 下载未确认（{self.timeout:.0f}秒内未出现文件）: {ticket['name']}")
+            self.publish(ticket, dict(ticket, status='unconfirmed', file=None, size=None,
+                                      latency=round(now - ticket['requested_at'], 2)))
+    
+    def snapshot(self) -> Dict:
+        """导出跟踪统计"""
+        with self.condition:
+            completed = list(self.completed)
+            pending = len(self.pending)
+        total_bytes = sum(record['size'] for record in completed)
+        transfer_time = sum(record['transfer_seconds'] for record in completed)
+        return {
+            'mode': self.mode,
+            'directory': self.directory,
+            'confirmed': len(completed),
+            'unconfirmed': self.timed_out,
+            'pending': pending,
+            'unmatched_files': len(self.unmatched_files),
+            'total_bytes': total_bytes,
+            'average_latency': round(sum(record['latency'] for record in completed) / len(completed), 2) if completed else None,
+            'throughput': round(total_bytes / transfer_time, 1) if transfer_time > 0 else None
+        }
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+批量导出模块
+飞书的导出在服务端异步生成：下载标签页一次领取K个文档，各自在新标签页中连续发起导出，
+再由下载目录监视器收集陆续落盘的文件，服务端导出耗时在文档之间重叠而不是逐个等待；
+每个文档的导出状态（已请求/已就绪/已下载/失败）记录在状态表中
+"""
+
+import time
+from datetime import datetime
+from typing import Optional, Dict, List
+
+
+# 导出状态
+EXPORT_REQUESTED = "requested"  # 已发起导出，等待服务端生成
+EXPORT_READY = "ready"  # 服务端已生成，浏览器开始接收文件
+EXPORT_DOWNLOADED = "downloaded"  # 文件已落盘
+EXPORT_FAILED = "failed"  # 导出流程失败或超时未出现文件
+
+
+def format_timestamp(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S') if timestamp else None
+
+
+class ExportJobTable:
+    """每个文档的导出状态表（启用状态库时同步写入export_jobs表）"""
+    
+    def __init__(self, store=None):
+        self.store = store
+        self.jobs: Dict[str, Dict] = {}
+    
+    def update(self, key: str, status: str, **fields) -> Dict:
+        job = self.jobs.setdefault(key, {'key': key})
+        job.update(fields)
+        job['status'] = status
+        if self.store:
+            self.store.record_export_job(job)
+        return job
+    
+    def counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (EXPORT_REQUESTED, EXPORT_READY, EXPORT_DOWNLOADED, EXPORT_FAILED)}
+        for job in self.jobs.values():
+            counts[job['status']] += 1
+        return counts
+
+
+class BatchExportMixin:
+    """批量导出功能混入类（在下载标签页中运行）"""
+    
+    def get_export_jobs(self) -> ExportJobTable:
+        if getattr(self, 'export_jobs', None) is None:
+            self.export_jobs = ExportJobTable(self.get_state_store())
+        return self.export_jobs
+    
+    def run_batch_export_worker(self):
+        """下载标签页主循环（批量模式）：领取一批文档、连续发起导出、收集落盘文件"""
+        queue = self.download_queue
+        home_handle = self.driver.current_window_handle
+        while not queue.is_drained():
+            batch = self.claim_export_batch(queue)
+            if not batch:
+                continue
+            
+            started = time.time()
+            jobs = []
+            try:
+                self.fire_exports(batch, home_handle, jobs)
+                self.collect_exports(jobs, home_handle)
+            except Exception as e:
+                self.logger.error(f"[下载] ❌ 批次导出时出错: {e}")
+                self.fail_unfinished_exports(batch, jobs, home_handle, str(e))
+            finally:
+                # 无论成败都释放本批条目，遍历不会因队列占满而阻塞
+                for entry in batch:
+                    queue.complete(entry['key'])
+                self.save_download_queue()
+            
+            counts = self.get_export_jobs().counts()
+            self.logger.info(f"[下载] 📦 批次完成: {len(batch)} 个文档, 耗时 {time.time() - started:.1f}秒 "
+                             f"(累计 已下载 {counts[EXPORT_DOWNLOADED]}, 失败 {counts[EXPORT_FAILED]})")
+    
+    def claim_export_batch(self, queue) -> List[Dict]:
+        """领取至多download_batch_size个文档（队列中暂时没有更多时不等待凑满）"""
+        first = queue.claim()
+        if first is None:
+            return []
+        batch = [first]
+        while len(batch) < self.download_batch_size:
+            entry = queue.claim(timeout=0.1)
+            if entry is None:
+                break
+            batch.append(entry)
+        return batch
+    
+    def fire_exports(self, batch: List[Dict], home_handle: str, jobs: List[Dict] = None) -> List[Dict]:
+        """每个文档在新标签页中打开并发起导出，不等待文件生成
+        
+        每个处理过的文档追加一条记录到jobs并返回；跳过或发起失败的记录done为True
+        """
+        tracker = self.get_download_tracker()
+        table = self.get_export_jobs()
+        jobs = [] if jobs is None else jobs
+        
+        for entry in batch:
+            job = {'entry': entry, 'ticket': None, 'handle': None, 'done': False}
+            jobs.append(job)
+            if not self.should_download_document(entry['url'], entry.get('doc_type')):
+                self.stats["download_skipped"] += 1
+                job['done'] = True
+                continue
+            
+            self.stats["download_attempted"] += 1
+            start_time = time.time()
+            try:
+                self.wait_with_respect()
+                self.driver.switch_to.new_window('tab')
+                job['handle'] = self.driver.current_window_handle
+                success = False
+                if self.navigate_to_url(entry['url'], entry['name']):
+                    self.wait_for_settle(fallback_delay=2)
+                    success = self.get_download_session().download(entry.get('doc_type'))
+                if not success:
+                    raise RuntimeError("导出流程失败")
+                
+                duration = time.time() - start_time
+                self.stats["download_total_time"] += duration
+                node_key = entry.get('node_key')
+                job['ticket'] = tracker.expect(entry['name'], entry['url'], node_key,
+                                               entry.get('titles') or self.download_titles(node_key, entry['name']))
+                self.stats["download_requested"] += 1
+                self.store_download(entry['name'], entry['url'], 'requested', duration)
+                table.update(entry['key'], EXPORT_REQUESTED, name=entry['name'], url=entry['url'],
+                             requested_at=format_timestamp(job['ticket']['requested_at']))
+                self.logger.info(f"[下载] 📤 已发起导出: {entry['name']} ({duration:.1f}秒)")
+            except Exception as e:
+                self.logger.warning(f"[下载] ❌ 发起导出失败: {entry['name']} - {e}")
+                self.finish_failed_export(job, home_handle, str(e), time.time() - start_time)
+        
+        self.driver.switch_to.window(home_handle)
+        return jobs
+    
+    def collect_exports(self, jobs: List[Dict], home_handle: str):
+        """等待本批导出的文件陆续落盘，更新状态表；文件落盘或超时后关闭对应标签页"""
+        tracker = self.get_download_tracker()
+        table = self.get_export_jobs()
+        remaining = [job for job in jobs if not job['done']]
+        
+        while remaining:
+            if not tracker.running:
+                # 监视已停止，无法再确认
+                for job in remaining:
+                    table.update(job['entry']['key'], EXPORT_FAILED, error="下载目录监视已停止")
+                    job['done'] = True
+                    self.close_export_tab(job['handle'], home_handle)
+                return
+            tracker.wait_for([job['ticket']['id'] for job in remaining], timeout=1.0)
+            for job in list(remaining):
+                entry, ticket = job['entry'], job['ticket']
+                record = tracker.result(ticket['id'])
+                if record is None:
+                    if ticket.get('ready_at') and table.jobs[entry['key']]['status'] == EXPORT_REQUESTED:
+                        table.update(entry['key'], EXPORT_READY, ready_at=format_timestamp(ticket['ready_at']))
+                    continue
+                
+                remaining.remove(job)
+                if record['status'] == 'success':
+                    table.update(entry['key'], EXPORT_DOWNLOADED, ready_at=format_timestamp(ticket.get('ready_at')),
+                                 finished_at=format_timestamp(time.time()), file=record['file'], size=record['size'])
+                else:
+                    table.update(entry['key'], EXPORT_FAILED, finished_at=format_timestamp(time.time()),
+                                 error=f"{tracker.timeout:.0f}秒内未出现文件")
+                job['done'] = True
+                self.close_export_tab(job['handle'], home_handle)
+    
+    def fail_unfinished_exports(self, batch: List[Dict], jobs: List[Dict], home_handle: str, error: str):
+        """批次出错：本批尚未结束（或尚未处理到）的文档记为失败，关闭其标签页"""
+        handled = {job['entry']['key'] for job in jobs}
+        for entry in batch:
+            if entry['key'] not in handled:
+                jobs.append({'entry': entry, 'ticket': None, 'handle': None, 'done': False})
+        for job in jobs:
+            if not job['done']:
+                self.finish_failed_export(job, home_handle, error)
+    
+    def finish_failed_export(self, job: Dict, home_handle: str, error: str, duration: float = 0):
+        """记录导出失败并关闭标签页（记录本身出错时只写日志，不影响其余文档）"""
+        entry = job['entry']
+        job['done'] = True
+        self.stats["download_failed"] += 1
+        try:
+            self.store_download(entry['name'], entry['url'], 'failed', duration)
+            self.get_export_jobs().update(entry['key'], EXPORT_FAILED, name=entry['name'], url=entry['url'],
+                                          finished_at=format_timestamp(time.time()), error=error)
+        except Exception as e:
+            self.logger.debug(f"记录导出失败时出错: {e}")
+        self.close_export_tab(job['handle'], home_handle)
+    
+    def close_export_tab(self, handle: Optional[str], home_handle: str):
+        """关闭文档标签页并回到下载标签页"""
+        try:
+            if handle and handle != home_handle:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(home_handle)
+        except Exception as e:
+            self.logger.debug(f"关闭导出标签页时出错: {e}")
@@ -4,46 +4,255 @@
 处理页面信息提取、数据获取等功能
 """
 
+import re
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Set
 from selenium.webdriver.common.by import By
 from urllib.parse import urlparse
 
+from .navigation import AccessStatus
+from .node_index import extract_wiki_token
+from .rate_limiter import AdaptiveRateLimiter
+
+
+# 标记单页应用内跳转的起点：清空资源计时缓冲区（默认只保留250条，满了以后新请求不再记录）
+MARK_NAVIGATION_JS = """
+if (performance.setResourceTimingBufferSize) { performance.setResourceTimingBufferSize(1000); }
+if (performance.clearResourceTimings) { performance.clearResourceTimings(); }
+window.__kbNavStart = performance.now();
+"""
+
+# 页面元数据脚本：一次注入返回token、文档类型、所有者、修改时间、字数和真实加载耗时
+PAGE_METADATA_JS = r"""
+const result = {url: location.href, title: document.title};
+const tokenMatch = location.pathname.match(/\/(wiki|docx|docs|sheets|base|mindnotes|file)\/([A-Za-z0-9_-]+)/);
+result.wiki_token = tokenMatch && tokenMatch[1] === 'wiki' ? tokenMatch[2] : null;
+
+// 文档类型：独立文档按URL路径判断，wiki页面按编辑器容器判断
+const urlTypes = {docx: 'docx', docs: 'doc', sheets: 'sheet', base: 'bitable', mindnotes: 'mindnote', file: 'file'};
+const typeMarkers = [
+    ['docx', '.docx-editor, [class*="docx-container"], [data-doc-type="docx"]'],
+    ['doc', '.etherpad-container, [data-doc-type="doc"]'],
+    ['sheet', '[class*="spreadsheet"], [class*="sheet-container"], [data-doc-type="sheet"]'],
+    ['bitable', '[class*="bitable"], [data-doc-type="bitable"]'],
+    ['mindnote', '[class*="mindnote"], [data-doc-type="mindnote"]'],
+    ['file', '[class*="file-preview"], [class*="drive-file"], [data-doc-type="file"]']
+];
+result.doc_type = tokenMatch ? (urlTypes[tokenMatch[1]] || null) : null;
+if (!result.doc_type) {
+    for (const [type, selector] of typeMarkers) {
+        if (document.querySelector(selector)) { result.doc_type = type; break; }
+    }
+}
+
+const textOf = (selector) => {
+    const el = document.querySelector(selector);
+    const text = el ? (el.innerText || el.textContent || '').trim() : '';
+    return text || null;
+};
+const authorMeta = document.querySelector('meta[name="author"]');
+result.owner = textOf('[class*="owner-name"], [class*="doc-owner"], [class*="author-name"], [data-testid*="owner"]')
+    || (authorMeta ? authorMeta.content : null);
+result.modified_text = textOf('[class*="update-time"], [class*="modify-time"], [class*="edit-time"], [class*="last-modified"], [data-testid*="update-time"]');
+
+// 字数：中日韩字符按字计，其余按词计（与编辑器的字数统计口径一致）
+const body = document.querySelector('.docx-editor, [class*="editor-container"], [contenteditable="true"], [role="main"], main');
+if (body) {
+    const text = body.innerText || '';
+    result.word_count = (text.match(/[\u3400-\u9fff\uf900-\ufaff]/g) || []).length
+        + (text.match(/[A-Za-z0-9]+(?:['’-][A-Za-z0-9]+)*/g) || []).length;
+} else {
+    result.word_count = null;
+}
+
+// 加载耗时：单页应用内跳转按标记之后的资源请求计算，整页加载按Navigation Timing计算
+const timing = {};
+const navStart = window.__kbNavStart;
+if (typeof navStart === 'number') {
+    const resources = performance.getEntriesByType('resource').filter((entry) => entry.startTime >= navStart);
+    timing.mode = 'soft';
+    timing.requests = resources.length;
+    timing.transfer_bytes = resources.reduce((sum, entry) => sum + (entry.transferSize || 0), 0);
+    if (resources.length) {
+        timing.ttfb_ms = Math.min(...resources.map((entry) => entry.responseStart || entry.responseEnd)) - navStart;
+        timing.load_ms = Math.max(...resources.map((entry) => entry.responseEnd)) - navStart;
+    } else {
+        timing.load_ms = performance.now() - navStart;
+    }
+} else {
+    const nav = performance.getEntriesByType('navigation')[0];
+    timing.mode = 'navigation';
+    if (nav) {
+        timing.requests = performance.getEntriesByType('resource').length;
+        timing.transfer_bytes = nav.transferSize;
+        timing.ttfb_ms = nav.responseStart - nav.startTime;
+        timing.dom_content_loaded_ms = nav.domContentLoadedEventEnd - nav.startTime;
+        timing.load_ms = (nav.loadEventEnd || nav.domComplete) - nav.startTime;
+    }
+}
+result.timing = timing;
+return result;
+"""
+
+# 修改时间文本的格式（飞书文档头部显示的"最近修改"）
+_FULL_DATE_RE = re.compile(r'(\d{4})\s*[年/.-]\s*(\d{1,2})\s*[月/.-]\s*(\d{1,2})\s*日?(?:\s*(\d{1,2}):(\d{2}))?')
+_MONTH_DAY_RE = re.compile(r'(\d{1,2})\s*月\s*(\d{1,2})\s*日(?:\s*(\d{1,2}):(\d{2}))?')
+_RELATIVE_DAY_RE = re.compile(r'(今天|昨天|前天|today|yesterday)\s*(\d{1,2}):(\d{2})', re.IGNORECASE)
+_AGO_RE = re.compile(r'(\d+)\s*(分钟|小时|天|minutes?|hours?|days?)\s*(前|ago)', re.IGNORECASE)
+_RELATIVE_DAYS = {'今天': 0, 'today': 0, '昨天': 1, 'yesterday': 1, '前天': 2}
+
+
+def parse_modified_time(text: Optional[str], now: datetime = None) -> Optional[str]:
+    """把页面上的修改时间文本解析为 '%Y-%m-%d %H:%M:%S'，无法识别时返回None"""
+    if not text:
+        return None
+    now = now or datetime.now()
+    
+    try:
+        match = _FULL_DATE_RE.search(text)
+        if match:
+            year, month, day, hour, minute = match.groups()
+            moment = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0))
+            return moment.strftime('%Y-%m-%d %H:%M:%S')
+        
+        match = _MONTH_DAY_RE.search(text)
+        if match:
+            month, day, hour, minute = match.groups()
+            moment = datetime(now.year, int(month), int(day), int(hour or 0), int(minute or 0))
+            if moment > now:  # 不带年份且晚于当前时间，说明是去年
+                moment = moment.replace(year=now.year - 1)
+            return moment.strftime('%Y-%m-%d %H:%M:%S')
+        
+        match = _RELATIVE_DAY_RE.search(text)
+        if match:
+            day = now - timedelta(days=_RELATIVE_DAYS[match.group(1).lower()])
+            moment = day.replace(hour=int(match.group(2)), minute=int(match.group(3)), second=0, microsecond=0)
+            return moment.strftime('%Y-%m-%d %H:%M:%S')
+        
+        match = _AGO_RE.search(text)
+        if match:
+            amount, unit = int(match.group(1)), match.group(2).lower()
+            if unit in ('分钟',) or unit.startswith('minute'):
+                delta = timedelta(minutes=amount)
+            elif unit in ('小时',) or unit.startswith('hour'):
+                delta = timedelta(hours=amount)
+            else:
+                delta = timedelta(days=amount)
+            return (now - delta).replace(second=0, microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
+        
+        if '刚刚' in text or 'just now' in text.lower():
+            return now.replace(microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return None
+    
+    return None
+
 
 class ExtractionMixin:
     """数据提取功能混入类"""
     
+    def mark_navigation_start(self):
+        """在打开节点前标记跳转起点，extract_page_info据此计算单页应用内跳转的真实加载耗时"""
+        try:
+            self.driver.execute_script(MARK_NAVIGATION_JS)
+        except Exception as e:
+            self.logger.debug(f"标记跳转起点失败: {e}")
+    
     def extract_page_info(self) -> Optional[Dict]:
-        """提取当前页面信息"""
+        """一次注入脚本提取当前页面信息和元数据（token、文档类型、所有者、修改时间、字数、加载耗时）"""
         try:
             start_time = time.time()
+            metadata = self.driver.execute_script(PAGE_METADATA_JS) or {}
             
-            # 等待页面加载完成
-            self.wait.until(lambda driver: driver.execute_script("return document.readyState") == "complete")
-            
-            current_url = self.driver.current_url
-            page_title = self.driver.title
-            response_time = time.time() - start_time
+            current_url = metadata.get('url') or self.driver.current_url
+            page_title = metadata.get('title') or ''
             
             # 检查是否是有效的内容页面
-            if not page_title or page_title.strip() == "":
+            if not page_title.strip():
                 return None
             
+            timing = {key: round(value, 1) if isinstance(value, float) else value
+                      for key, value in (metadata.get('timing') or {}).items()}
+            # 没有计时数据时退回脚本往返耗时
+            load_ms = timing.get('load_ms')
+            response_time = load_ms / 1000 if load_ms is not None else time.time() - start_time
+            
             page_info = {
                 'url': current_url,
                 'title': page_title,
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'response_time': round(response_time, 2)
+                'response_time': round(response_time, 2),
+                'wiki_token': metadata.get('wiki_token') or extract_wiki_token(current_url),
+                'doc_type': metadata.get('doc_type'),
+                'owner': metadata.get('owner'),
+                'modified_text': metadata.get('modified_text'),
+                'modified_time': parse_modified_time(metadata.get('modified_text')),
+                'word_count': metadata.get('word_count'),
+                'load_timing': timing
             }
             
-            self.logger.debug(f"提取页面信息: {page_title[:50]}...")
+            if page_info['doc_type']:
+                doc_types = self.stats.setdefault("doc_types", {})
+                doc_types[page_info['doc_type']] = doc_types.get(page_info['doc_type'], 0) + 1
+            
+            self.logger.debug(f"提取页面信息: {page_title[:50]}... ({page_info['doc_type'] or '未知类型'}, "
+                              f"{page_info['word_count']} 字, 加载 {page_info['response_time']}秒)")
             return page_info
             
         except Exception as e:
             self.logger.error(f"提取页面信息失败: {e}")
             return None
     
+    def record_current_page(self, item: Dict, level: int, path_str: str, indent: str = "") -> Optional[Dict]:
+        """探测权限并记录当前页面，返回page_info；无权限或提取失败时返回None"""
+        item_name = item['name']
+        node_key = self.get_item_node_key(item)
+        
+        # 轻量权限探测（不读取整页源码）
+        if getattr(self, 'use_permission_probe', False):
+            access = self.probe_access_permission()
+            if access['status'] != AccessStatus.OK:
+                self.logger.warning(f"{indent}⚠️ 无法访问 ({access['status'].value}): {item_name}")
+                self.record_permission_denied(item_name, self.driver.current_url, access, level + 1)
+                self.report_request_outcome(AdaptiveRateLimiter.OUTCOME_PERMISSION)
+                return None
+        
+        page_info = self.extract_page_info()
+        if not page_info:
+            self.report_request_outcome(AdaptiveRateLimiter.OUTCOME_FAILURE)
+            return None
+        self.report_request_outcome(AdaptiveRateLimiter.OUTCOME_OK)
+        
+        page_info['directory_item'] = item_name
+        page_info['level'] = level + 1
+        page_info['index'] = path_str  # 使用路径字符串作为序号
+        page_info['node_key'] = node_key
+        page_info['parent_key'] = item.get('parent_key')
+        if not page_info.get('modified_time'):
+            # 页面上没有修改时间时使用目录树接口给出的编辑时间
+            page_info['modified_time'] = (self.node_index.get(node_key) or {}).get('modified_time')
+        
+        # 增量遍历：未变化的文档不重复记录和下载
+        if getattr(self, 'incremental_active', False) and not self.should_record_incremental(item, page_info, indent):
+            self.node_index.upsert(node_key, item_name, url=page_info['url'])
+            self.node_index.mark_visited(node_key)
+            return None
+        
+        # 回填节点索引中的URL
+        self.node_index.upsert(node_key, item_name, url=page_info['url'])
+        self.node_index.mark_visited(node_key)
+        
+        self.access_log.append(page_info)
+        self.store_visit(page_info)
+        self.stats["successful_access"] = self.stats.get("successful_access", 0) + 1
+        
+        # 写入CSV缓冲（断点指针在下一个检查点落盘后更新）
+        self.save_single_record_to_csv(page_info)
+        
+        self.logger.info(f"{indent}✅ 成功记录: {page_info['title'][:50]}...")
+        return page_info
+    
     def _diagnose_current_page(self):
         """诊断当前页面，帮助用户了解问题"""
         try:
@@ -118,139 +327,3 @@ class ExtractionMixin:
             
         except Exception as e:
             self.logger.error(f"页面诊断失败: {e}")
-    
-    def recursive_traverse_directory(self, level: int = 0, visited_texts: set = None, path: list = None, resume_mode: bool = False):
-        """递归遍历多层级目录结构"""
-        if visited_texts is None:
-            visited_texts = set()
-        if path is None:
-            path = []
-        
-        # 检查是否启用断点续传
-        if level == 0 and not resume_mode:
-            resume_progress = self.check_resume_progress()
-            if resume_progress:
-                resume_path, resume_name = resume_progress
-                self.logger.info(f"🔄 检测到上次中断位置: {resume_path} - {resume_name}")
-                
-                response = input(f"是否从 '{resume_name}' 位置继续？(y/n): ").strip().lower()
-                if response == 'y' or response == 'yes':
-                    return self.start_from_resume_position(resume_path, resume_name)
-                else:
-                    self.logger.info("📝 选择重新开始，将清空现有进度")
-                    # 清空CSV文件，重新开始
-                    self.clear_csv_file()
-        
-        max_depth = 10  # 防止无限递归
-        if level > max_depth:
-            self.logger.warning(f"⚠️ 达到最大递归深度 {max_depth}，停止遍历")
-            return
-        
-        indent = "  " * level
-        self.logger.info(f"{indent}🌲 开始第 {level + 1} 层目录遍历...")
-        
-        try:
-            # 重新获取当前层级的所有目录项（解决stale element问题）
-            current_items = self.find_sidebar_items_fresh()
-            
-            if not current_items:
-                self.logger.info(f"{indent}📭 第 {level + 1} 层未找到新的目录项")
-                return
-            
-            # 过滤已访问过的项目（基于文本内容）
-            new_items = []
-            for item in current_items:
-                item_text = item['name']
-                if item_text not in visited_texts:
-                    new_items.append(item)
-                    visited_texts.add(item_text)
-            
-            self.logger.info(f"{indent}📋 第 {level + 1} 层发现 {len(new_items)} 个新目录项")
-            
-            for i, item in enumerate(new_items, 1):
-                item_name = item['name']
-                
-                # 生成路径式标识
-                current_path = path + [i]
-                path_str = "-".join(map(str, current_path))
-                
-                self.logger.info(f"{indent}📄 [{path_str}] 处理: {item_name}")
-                
-                # 访问频率控制
-                if self.stats.get("successful_access", 0) > 0 or i > 1:
-                    delay = self.wait_with_respect()
-                
-                try:
-                    # 重新获取元素（避免stale reference）
-                    fresh_element = self.find_element_by_text(item_name)
-                    if not fresh_element:
-                        self.logger.warning(f"{indent}⚠️ 无法重新定位元素: {item_name}")
-                        continue
-                    
-                    # 点击元素
-                    click_success = self.click_element_safe(fresh_element, item_name)
-                    if not click_success:
-                        self.logger.warning(f"{indent}❌ 点击失败: {item_name}")
-                        self.failed_items.append({
-                            'name': item_name,
-                            'level': level + 1,
-                            'reason': '点击失败',
-                            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        })
-                        continue
-                    
-                    # 等待页面响应
-                    time.sleep(2)
-                    
-                    # 检查是否有页面变化（URL或标题改变）
-                    current_url = self.driver.current_url
-                    current_title = self.driver.title
-                    
-                    # 【第一步：先记录父目录】
-                    page_info = self.extract_page_info()
-                    if page_info:
-                        page_info['directory_item'] = item_name
-                        page_info['level'] = level + 1
-                        page_info['index'] = path_str  # 使用路径字符串作为序号
-                        
-                        self.access_log.append(page_info)
-                        self.stats["successful_access"] = self.stats.get("successful_access", 0) + 1
-                        
-                        # 立即保存到CSV文件
-                        self.save_single_record_to_csv(page_info)
-                        
-                        self.logger.info(f"{indent}✅ 成功记录父项: {current_title[:50]}...")
-                    
-                    # 【可选：下载当前文档】
-                    if hasattr(self, 'enable_download') and self.enable_download:
-                        self.attempt_download_current_document(indent, item_name)
-                    
-                    # 【第二步：检查并处理子目录】
-                    time.sleep(1)
-                    items_after_click = self.find_sidebar_items_fresh()
-                    
-                    # 如果点击后出现新项目，说明当前项有子目录
-                    if len(items_after_click) > len(current_items):
-                        self.logger.info(f"{indent}🔍 发现 {item_name} 的子目录，开始递归...")
-                        
-                        # 递归处理子目录，父路径是current_path
-                        self.recursive_traverse_directory(level + 1, visited_texts, current_path, resume_mode=True)
-                        
-                        # 递归返回后重新获取DOM状态（子目录可能已收起）
-                        current_items = self.find_sidebar_items_fresh()
-                        self.logger.info(f"{indent}🔄 完成 {item_name} 子目录处理，继续同级遍历...")
-                    
-                except Exception as e:
-                    self.logger.error(f"{indent}❌ 处理项目 '{item_name}' 时出错: {e}")
-                    self.failed_items.append({
-                        'name': item_name,
-                        'level': level + 1,
-                        'reason': str(e),
-                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    })
-                    continue
-            
-            self.logger.info(f"{indent}✅ 第 {level + 1} 层遍历完成")
-            
-        except Exception as e:
-            self.logger.error(f"{indent}❌ 第 {level + 1} 层遍历失败: {e}")
\ No newline at end of file
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+遍历边界模块
+显式保存遍历边界：每一帧是一个已打开的父节点及其尚未完成的子节点任务，
+支持深度优先、广度优先和优先级顺序，可序列化后在检查点保存，
+断点续传和多标签页并行共用同一个边界
+"""
+
+import heapq
+import threading
+from datetime import datetime
+from typing import Optional, Dict, List, Callable
+
+
+# 遍历顺序
+STRATEGY_DFS = "dfs"
+STRATEGY_BFS = "bfs"
+STRATEGY_SHALLOWEST = "shallowest"
+STRATEGY_RECENTLY_UPDATED = "recently_updated"
+
+
+def shallowest_first(task: Dict):
+    """优先级：层级浅的优先，同层按路径顺序"""
+    return (task.get('level', 0), task.get('path') or [])
+
+
+def recently_updated_first(task: Dict):
+    """优先级：最近更新的优先（无更新时间的排在最后）"""
+    updated_at = task.get('updated_at') or ''
+    try:
+        timestamp = datetime.fromisoformat(str(updated_at)).timestamp() if updated_at else 0
+    except ValueError:
+        timestamp = 0
+    return (-timestamp, task.get('level', 0), task.get('path') or [])
+
+
+PRIORITY_FUNCTIONS = {
+    STRATEGY_SHALLOWEST: shallowest_first,
+    STRATEGY_RECENTLY_UPDATED: recently_updated_first,
+}
+
+
+class TraversalFrontier:
+    """线程安全的遍历边界（帧列表 + 节点位置索引 + 优先级堆）"""
+    
+    def __init__(self, frames: List[Dict] = None, strategy: str = STRATEGY_DFS, priority: Callable = None):
+        if strategy not in (STRATEGY_DFS, STRATEGY_BFS) and priority is None and strategy not in PRIORITY_FUNCTIONS:
+            raise ValueError(f"未知的遍历顺序: {strategy}")
+        
+        self.strategy = strategy
+        self.priority = priority or PRIORITY_FUNCTIONS.get(strategy)
+        self.lock = threading.RLock()
+        
+        # 帧: {'parent_key': 父节点标识(根层为None), 'pending': [子树任务, ...]}
+        self.frames: List[Dict] = []
+        self.location: Dict[str, Dict] = {}  # 节点标识 -> 所在帧
+        self.claimed = set()  # 正在被处理的节点（不序列化，恢复后重新待处理）
+        self.seen = set()  # 本次运行中进入过边界的节点，防止快捷方式等形成环
+        self.heap: List = []
+        self.sequence = 0
+        
+        for frame in frames or []:
+            self.push(frame.get('parent_key'), frame.get('pending', []), complete_parent=False)
+    
+    def __len__(self):
+        with self.lock:
+            return len(self.location)
+    
+    def is_empty(self) -> bool:
+        return len(self) == 0
+    
+    def push(self, parent_key: Optional[str], tasks: List[Dict], complete_parent: bool = True) -> List[Dict]:
+        """压入一层子节点任务，返回实际加入的任务（已进入过边界的节点被跳过）
+        
+        父节点同时从所在帧中移除，二者在同一次保存中生效，崩溃时不会丢失子树
+        """
+        with self.lock:
+            frame = {'parent_key': parent_key, 'pending': []}
+            for task in tasks:
+                if task['node_key'] in self.seen:
+                    continue
+                self.seen.add(task['node_key'])
+                frame['pending'].append(task)
+                self.location[task['node_key']] = frame
+                if self.priority:
+                    self.sequence += 1
+                    heapq.heappush(self.heap, (self.priority(task), self.sequence, task['node_key']))
+            
+            if parent_key and complete_parent:
+                self.complete(parent_key)
+            if frame['pending']:
+                self.frames.append(frame)
+            return frame['pending']
+    
+    def complete(self, node_key: str):
+        """节点已处理完毕（无子节点、失败或子节点已压入），从所在帧移除"""
+        with self.lock:
+            frame = self.location.pop(node_key, None)
+            self.claimed.discard(node_key)
+            if frame is None:
+                return
+            frame['pending'] = [task for task in frame['pending'] if task['node_key'] != node_key]
+            if not frame['pending']:
+                self.frames = [f for f in self.frames if f is not frame]
+    
+    def claim(self) -> Optional[Dict]:
+        """按遍历顺序领取下一个未被领取的任务（无可领取任务时返回None）"""
+        with self.lock:
+            task = self._next_unclaimed()
+            if task is not None:
+                self.claimed.add(task['node_key'])
+            return task
+    
+    def peek(self) -> Optional[Dict]:
+        """按遍历顺序查看下一个未被领取的任务"""
+        with self.lock:
+            return self._next_unclaimed()
+    
+    def release(self, node_key: str):
+        """放弃领取，任务回到待处理状态"""
+        with self.lock:
+            self.claimed.discard(node_key)
+            frame = self.location.get(node_key)
+            if frame is not None and self.priority:
+                task = next(task for task in frame['pending'] if task['node_key'] == node_key)
+                self.sequence += 1
+                heapq.heappush(self.heap, (self.priority(task), self.sequence, node_key))
+    
+    def _next_unclaimed(self) -> Optional[Dict]:
+        if self.priority:
+            while self.heap:
+                _, _, node_key = self.heap[0]
+                frame = self.location.get(node_key)
+                if frame is None:
+                    heapq.heappop(self.heap)  # 已完成的过期条目
+                    continue
+                if node_key in self.claimed:
+                    heapq.heappop(self.heap)  # 已领取的条目移出堆，放弃领取时由release重新加入
+                    continue
+                return next(task for task in frame['pending'] if task['node_key'] == node_key)
+            return None
+        
+        # 深度优先从最新的帧取，广度优先从最早的帧取
+        frames = reversed(self.frames) if self.strategy == STRATEGY_DFS else self.frames
+        for frame in frames:
+            for task in frame['pending']:
+                if task['node_key'] not in self.claimed:
+                    return task
+        return None
+    
+    def pending_keys(self) -> List[str]:
+        """所有待处理节点标识"""
+        with self.lock:
+            return list(self.location.keys())
+    
+    def to_dict(self) -> Dict:
+        """序列化为可保存的纯数据（已领取但未完成的任务仍视为待处理）"""
+        with self.lock:
+            return {
+                'strategy': self.strategy,
+                'frames': [{'parent_key': frame['parent_key'], 'pending': list(frame['pending'])} for frame in self.frames]
+            }
+    
+    @classmethod
+    def from_dict(cls, data: Dict, strategy: str = None, priority: Callable = None) -> 'TraversalFrontier':
+        """从保存的数据恢复（可指定新的遍历顺序）"""
+        data = data or {}
+        return cls(data.get('frames', []), strategy or data.get('strategy') or STRATEGY_DFS, priority)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+增量遍历模块
+以状态库中上次运行的节点索引和文档修改时间为基线，本次只记录和下载新增、移动或修改的文档，
+未变化的叶子文档在目录树元数据已给出修改时间时无需打开；遍历完整结束后把消失的节点标记为墓碑
+"""
+
+from datetime import datetime
+from typing import Optional, Dict
+
+from .node_index import normalize_title
+
+
+# 节点变化类型
+CHANGE_NEW = "new"
+CHANGE_MOVED = "moved"
+CHANGE_MODIFIED = "modified"
+CHANGE_UNCHANGED = "unchanged"
+
+
+def classify_change(previous: Optional[Dict], title: str, parent_key: Optional[str],
+                    modified_time: Optional[str]) -> str:
+    """与基线比较，判断节点的变化类型
+    
+    父节点（None 表示根目录）或标题变化视为移动；任一方缺少修改时间时无法比较，按修改处理
+    """
+    if previous is None:
+        return CHANGE_NEW
+    if (previous.get('parent') or None) != (parent_key or None):
+        return CHANGE_MOVED
+    if previous.get('title') and normalize_title(previous['title']) != normalize_title(title):
+        return CHANGE_MOVED
+    if not modified_time or not previous.get('modified_time'):
+        return CHANGE_MODIFIED
+    # 两边均为 '%Y-%m-%d %H:%M:%S'，字符串比较即时间比较
+    return CHANGE_MODIFIED if modified_time > previous['modified_time'] else CHANGE_UNCHANGED
+
+
+class IncrementalMixin:
+    """增量遍历功能混入类"""
+    
+    def prepare_incremental_run(self) -> bool:
+        """加载上次运行的基线；返回True表示上次运行已完成，直接开始增量遍历（不询问断点续传）"""
+        store = self.get_state_store()
+        if not store or not store.has_visits():
+            self.logger.info("📭 没有上次运行的记录，执行完整遍历")
+            return False
+        
+        self.incremental_baseline = store.node_baseline()
+        self.incremental_active = True
+        
+        saved = self.load_frontier()
+        if saved and not saved.is_empty():
+            self.logger.info("🔄 上次运行未完成，按断点续传继续（已记录的节点不重复记录）")
+            return False
+        
+        self.clear_resume_pointer()
+        self.logger.info(f"♻️ 增量遍历: 基线 {len(self.incremental_baseline)} 个文档，只记录新增/移动/修改的文档")
+        return True
+    
+    def count_incremental_change(self, change: str):
+        key = f"incremental_{change}"
+        self.stats[key] = self.stats.get(key, 0) + 1
+    
+    def add_incremental_time_saved(self, previous: Dict, opened: bool):
+        """按上次运行的耗时估算节省的时间：未打开的节点省去访问间隔和加载，未变化的文档省去下载"""
+        saved = 0.0
+        if not opened:
+            saved += (previous.get('response_time') or 0) + sum(self.access_delay) / 2
+        if self.enable_download:
+            saved += previous.get('download_duration') or 0
+        self.stats["incremental_time_saved"] = self.stats.get("incremental_time_saved", 0) + saved
+    
+    def skip_unchanged_leaf(self, task: Dict, indent: str = "") -> bool:
+        """目录树元数据已给出修改时间且未变化的叶子文档直接跳过，不打开页面"""
+        if task.get('has_children') is not False:
+            return False  # 可能有子节点，需要打开以发现子树
+        
+        node_key = task['node_key']
+        previous = self.incremental_baseline.get(node_key)
+        node = self.node_index.get(node_key) or {}
+        modified_time = task.get('updated_at') or node.get('modified_time')
+        if not modified_time or classify_change(previous, task['name'], task.get('parent_key'), modified_time) != CHANGE_UNCHANGED:
+            return False
+        
+        self.traversal_visited.add(node_key)
+        self.node_index.mark_visited(node_key)
+        self.count_incremental_change(CHANGE_UNCHANGED)
+        self.stats["incremental_unopened"] = self.stats.get("incremental_unopened", 0) + 1
+        self.add_incremental_time_saved(previous, opened=False)
+        self.logger.info(f"{indent}⏭️ 未变化，跳过: {task['name']}")
+        return True
+    
+    def should_record_incremental(self, item: Dict, page_info: Dict, indent: str = "") -> bool:
+        """打开页面后按页面元数据判断是否需要记录和下载（未变化的文档返回False）"""
+        previous = self.incremental_baseline.get(page_info['node_key'])
+        change = classify_change(previous, item['name'], item.get('parent_key'), page_info.get('modified_time'))
+        self.count_incremental_change(change)
+        
+        if change != CHANGE_UNCHANGED:
+            page_info['change'] = change
+            return True
+        
+        self.add_incremental_time_saved(previous, opened=True)
+        self.logger.info(f"{indent}⏭️ 未变化（修改时间 {page_info['modified_time']}），不重复记录: {item['name']}")
+        return False
+    
+    def mark_unexplored(self, node_key: str):
+        """记录子树未能探索的节点（打开失败），其基线中的后代不会被误标为墓碑"""
+        if getattr(self, 'incremental_active', False):
+            self.incremental_unexplored.add(node_key)
+    
+    def finish_incremental_run(self, frontier) -> int:
+        """遍历完整结束后，把基线中本次未出现的节点标记为墓碑，返回墓碑数量"""
+        if not frontier.is_empty():
+            self.logger.warning("⚠️ 遍历未完整结束，不标记墓碑")
+            return 0
+        if self.max_traversal_depth:
+            self.logger.info("ℹ️ 限制了遍历深度，更深的节点未探索，不标记墓碑")
+            return 0
+        
+        seen = frontier.seen | self.traversal_visited
+        baseline = self.incremental_baseline
+        
+        def under_unexplored(key: str) -> bool:
+            chain = set()
+            parent = baseline[key].get('parent')
+            while parent and parent not in chain:
+                if parent in self.incremental_unexplored:
+                    return True
+                chain.add(parent)
+                parent = baseline[parent].get('parent') if parent in baseline else None
+            return False
+        
+        missing = [key for key in baseline if key not in seen and not under_unexplored(key)]
+        if missing:
+            store = self.get_state_store()
+            if store:
+                store.mark_tombstones(missing, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            self.logger.info(f"🪦 {len(missing)} 个文档已从目录树消失，标记为墓碑")
+        
+        self.stats["incremental_tombstones"] = len(missing)
+        return len(missing)
+    
+    def get_incremental_summary(self) -> Optional[Dict]:
+        """增量遍历摘要：记录（新增/移动/修改）与跳过数量、墓碑和估算节省的时间"""
+        if not getattr(self, 'incremental_active', False):
+            return None
+        
+        changed = {change: self.stats.get(f"incremental_{change}", 0)
+                   for change in (CHANGE_NEW, CHANGE_MOVED, CHANGE_MODIFIED)}
+        return {
+            "baseline_documents": len(self.incremental_baseline),
+            "recorded": sum(changed.values()),
+            "changes": changed,
+            "skipped_unchanged": self.stats.get("incremental_unchanged", 0),
+            "skipped_unopened": self.stats.get("incremental_unopened", 0),
+            "tombstones": self.stats.get("incremental_tombstones", 0),
+            "time_saved_seconds": round(self.stats.get("incremental_time_saved", 0), 1)
+        }
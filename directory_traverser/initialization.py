@@ -32,6 +32,10 @@ class InitializationMixin:
         try:
             chrome_options = Options()
             chrome_options.add_experimental_option('debuggerAddress', '127.0.0.1:9222')
+            if getattr(self, 'discovery_backend', 'dom') == 'network':
+                # 网络目录树捕获需要性能日志中的Network事件
+                chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+                chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
             self.driver = webdriver.Chrome(options=chrome_options)
             self.wait = WebDriverWait(self.driver, 10)
             
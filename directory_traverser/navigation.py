@@ -6,24 +6,188 @@
 
 import time
 import random
+from datetime import datetime
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException
-from typing import Dict
+from typing import Dict, Optional
+from enum import Enum
+
+from .rate_limiter import AdaptiveRateLimiter
+from .state_store import FAILURE_FAILED, FAILURE_PERMISSION
+
+
+class AccessStatus(str, Enum):
+    """页面访问权限检查结果"""
+    OK = "ok"
+    NO_PERMISSION = "no-permission"
+    LOGIN_REQUIRED = "login-required"
+    NOT_FOUND = "not-found"
+
+
+# 轻量权限探测脚本：只检查URL路径和已知的权限墙DOM标记，不读取整页源码
+# （不根据标题判断：文档标题本身可能包含"登录"、"404"等字样）
+PERMISSION_PROBE_JS = r"""
+const path = location.pathname.toLowerCase();
+const result = (status, marker) => ({status: status, marker: marker});
+
+// 1. URL路径
+if (/\/(accounts|passport|login|signin)(\/|$)/.test(path)) {
+    return result('login-required', 'url');
+}
+if (/\/(403|forbidden)(\/|$)/.test(path)) {
+    return result('no-permission', 'url');
+}
+if (/\/404(\/|$)/.test(path)) {
+    return result('not-found', 'url');
+}
+
+// 2. 已知权限墙/错误页容器，仅读取这些小节点的文本
+const wallSelectors = [
+    '[class*="no-permission"]', '[class*="noPermission"]', '[class*="permission-apply"]',
+    '[class*="apply-permission"]', '[class*="no-access"]', '[class*="not-found"]',
+    '[class*="notFound"]', '[class*="error-page"]', '[class*="empty-state"]'
+];
+const indicators = [
+    ['login-required', /请登录|登录后|log in to|sign in to/i],
+    ['not-found', /已删除|不存在|been deleted|not found|doesn't exist/i],
+    ['no-permission', /无权|没有权限|申请权限|权限不足|no permission|request access|access denied|forbidden/i]
+];
+for (const selector of wallSelectors) {
+    const wall = document.querySelector(selector);
+    if (!wall || !wall.offsetParent) { continue; }
+    const text = (wall.innerText || '').slice(0, 500);
+    for (const [status, pattern] of indicators) {
+        if (pattern.test(text)) { return result(status, selector); }
+    }
+}
+
+// 3. 登录表单
+if (document.querySelector('input[type="password"]')) {
+    return result('login-required', 'password-input');
+}
+return result('ok', null);
+"""
+
+
+# 文档就绪判断：页面加载完成、标题非空，且正文容器或权限墙已渲染
+DOCUMENT_READY_JS = r"""
+if (document.readyState !== 'complete' || !document.title) { return false; }
+const readySelectors = [
+    '.docx-editor', '.page-block', '[data-block-type]', '[class*="editor-container"]',
+    '[class*="spreadsheet"]', '[class*="sheet-container"]', '[class*="bitable"]',
+    '[class*="mindnote"]', '[class*="file-preview"]',
+    '[class*="no-permission"]', '[class*="permission-apply"]', '[class*="not-found"]'
+];
+return readySelectors.some((selector) => document.querySelector(selector) !== null);
+"""
 
 
 class NavigationMixin:
     """导航功能混入类"""
     
+    def get_rate_limiter(self) -> Optional[AdaptiveRateLimiter]:
+        """获取全局自适应令牌桶（首次使用时按当前access_delay创建，未启用时返回None）"""
+        if not getattr(self, 'use_adaptive_rate_limit', False):
+            return None
+        
+        if self.rate_limiter is None:
+            self.rate_limiter = AdaptiveRateLimiter(self.access_delay)
+        return self.rate_limiter
+    
     def wait_with_respect(self):
-        """尊重性访问等待 - 2-5秒随机延迟"""
-        delay = random.uniform(*self.access_delay)
-        self.logger.info(f"⏳ 尊重访问频率，等待 {delay:.1f} 秒...")
-        time.sleep(delay)
-        return delay
+        """尊重性访问等待 - 全局自适应令牌桶（从上一次请求开始计算间隔，所有标签页共享）"""
+        if not self.get_rate_limiter():
+            delay = random.uniform(*self.access_delay)
+            self.logger.info(f"⏳ 尊重访问频率，等待 {delay:.1f} 秒...")
+            time.sleep(delay)
+            return delay
+        
+        result = self.rate_limiter.acquire()
+        self.stats["average_delay"] = self.rate_limiter.snapshot()['average_delay_seconds']
+        self.logger.info(f"⏳ 尊重访问频率，等待 {result['waited']:.1f} 秒 "
+                         f"(目标间隔 {result['interval']:.1f} 秒, 有效工作已覆盖 {result['covered']:.1f} 秒)")
+        return result['waited']
+    
+    def report_request_outcome(self, outcome: str):
+        """向限速器反馈请求结果（权限错误/超时/慢加载会降速）"""
+        if getattr(self, 'rate_limiter', None):
+            self.rate_limiter.record_outcome(outcome)
     
     def check_access_permission(self) -> bool:
         """检查页面访问权限"""
+        if not getattr(self, 'use_permission_probe', False):
+            return self.check_access_permission_legacy()
+        
+        return self.probe_access_permission()['status'] == AccessStatus.OK
+    
+    def probe_access_permission(self) -> Dict:
+        """轻量权限探测：一次execute_script检查URL路径和权限墙DOM标记
+        
+        返回 {'status': AccessStatus, 'marker': 命中的标记, 'elapsed_ms': 耗时}
+        """
+        start_time = time.time()
+        try:
+            probe = self.driver.execute_script(PERMISSION_PROBE_JS) or {}
+            status = AccessStatus(probe.get('status', AccessStatus.OK.value))
+            marker = probe.get('marker')
+        except Exception as e:
+            self.logger.warning(f"权限探测时出错: {e}")
+            status, marker = AccessStatus.OK, None  # 出错时假设有权限，避免误判
+        
+        elapsed_ms = (time.time() - start_time) * 1000
+        self.stats["permission_probe_count"] = self.stats.get("permission_probe_count", 0) + 1
+        self.stats["permission_probe_time_ms"] = self.stats.get("permission_probe_time_ms", 0) + elapsed_ms
+        
+        return {'status': status, 'marker': marker, 'elapsed_ms': round(elapsed_ms, 1)}
+    
+    def compare_permission_check_methods(self) -> Dict:
+        """对比轻量探测与旧page_source方法的耗时和结果"""
+        probe = self.probe_access_permission()
+        
+        start_time = time.time()
+        legacy_result = self.check_access_permission_legacy()
+        legacy_ms = (time.time() - start_time) * 1000
+        
+        comparison = {
+            'probe_status': probe['status'].value,
+            'probe_ms': probe['elapsed_ms'],
+            'legacy_allowed': legacy_result,
+            'legacy_ms': round(legacy_ms, 1),
+            'agree': (probe['status'] == AccessStatus.OK) == legacy_result
+        }
+        self.logger.info(f"🔐 权限检查对比: 探测 {comparison['probe_status']} ({comparison['probe_ms']}ms) / "
+                         f"旧方法 {'有权限' if legacy_result else '无权限'} ({comparison['legacy_ms']}ms)")
+        return comparison
+    
+    def record_permission_denied(self, item_name: str, href: str, probe: Dict, level: int = None):
+        """记录无法访问的页面"""
+        item = {
+            'name': item_name,
+            'href': href,
+            'status': probe['status'].value,
+            'marker': probe.get('marker'),
+            'level': level,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        self.permission_denied_items.append(item)
+        self.store_failure(FAILURE_PERMISSION, item)
+        self.stats["permission_denied"] = self.stats.get("permission_denied", 0) + 1
+    
+    def record_failed_item(self, item_name: str, level: int, reason: str):
+        """记录打开或处理失败的项目"""
+        item = {
+            'name': item_name,
+            'level': level,
+            'reason': reason,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        self.failed_items.append(item)
+        self.store_failure(FAILURE_FAILED, item)
+    
+    def check_access_permission_legacy(self) -> bool:
+        """检查页面访问权限（旧方法：读取整页源码做关键词匹配）"""
         try:
             # 检查URL是否包含权限相关关键词
             current_url = self.driver.current_url.lower()
@@ -64,18 +228,97 @@ class NavigationMixin:
             self.logger.warning(f"权限检查时出错: {e}")
             return True  # 出错时假设有权限，避免误判
     
+    def get_item_url(self, item: Dict) -> Optional[str]:
+        """获取目录项已知的文档URL（快照中的链接或节点索引中记录的URL）"""
+        url = item.get('url')
+        if url and '/wiki/' in url:
+            return url
+        
+        node_key = item.get('node_key')
+        node = self.node_index.get(node_key) if node_key and hasattr(self, 'node_index') else None
+        if node and node.get('url'):
+            return node['url']
+        return None
+    
+    def navigate_to_url(self, url: str, item_name: str = "") -> bool:
+        """直接通过URL打开文档，并显式等待文档就绪"""
+        try:
+            start_time = time.time()
+            self.driver.get(url)
+            
+            try:
+                WebDriverWait(self.driver, self.url_ready_timeout).until(
+                    lambda driver: driver.execute_script(DOCUMENT_READY_JS)
+                )
+            except TimeoutException:
+                self.logger.warning(f"文档就绪等待超时，继续处理: {item_name or url}")
+                self.report_request_outcome(AdaptiveRateLimiter.OUTCOME_TIMEOUT)
+            
+            self.stats["url_navigations"] = self.stats.get("url_navigations", 0) + 1
+            self.logger.debug(f"URL直达: {item_name or url} ({time.time() - start_time:.2f}秒)")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"URL导航失败: {item_name or url} - {e}")
+            return False
+    
+    def open_item(self, item: Dict) -> bool:
+        """打开目录项：URL直达模式下已知URL时直接打开，否则点击侧边栏"""
+        item_name = item['name']
+        url = self.get_item_url(item)
+        
+        if getattr(self, 'navigation_mode', 'click') == 'url' and url:
+            if not self.navigate_to_url(url, item_name):
+                return False
+            
+            # 整页加载后侧边栏只展开到当前节点，有子节点时再点击一次展开
+            if item.get('has_children') and not item.get('expanded'):
+                self.expand_sidebar_node(item)
+            return True
+        
+        element = self.resolve_item_element(item)
+        if not element:
+            self.logger.warning(f"⚠️ 无法重新定位元素: {item_name}")
+            return False
+        return self.click_element_safe(element, item_name)
+    
+    def expand_sidebar_node(self, item: Dict, fresh: bool = False) -> bool:
+        """在侧边栏中展开指定节点（仅用于发现子节点，fresh表示item来自刚获取的快照，无需重新扫描）"""
+        if fresh:
+            if item.get('expanded'):
+                return True
+            element = self.resolve_item_element(item)
+            return bool(element) and self.click_element_safe(element, item['name'])
+        
+        node_key = self.get_item_node_key(item)
+        for fresh_item in self.find_sidebar_items_fresh():
+            if fresh_item.get('node_key') != node_key:
+                continue
+            if fresh_item.get('expanded'):
+                return True
+            element = self.resolve_item_element(fresh_item)
+            return bool(element) and self.click_element_safe(element, item['name'])
+        
+        self.logger.debug(f"侧边栏中未找到节点: {item['name']}")
+        return False
+    
     def click_directory_item(self, item: Dict) -> bool:
         """点击目录项并等待页面加载"""
         try:
-            element = item['element']
+            element = self.resolve_item_element(item)
             item_name = item['name']
             is_clickable_node = item.get('is_clickable_node', False)
             
+            if element is None:
+                self.logger.warning(f"无法定位目录项元素: {item_name}")
+                return False
+            
             self.logger.info(f"🖱️ 点击项目: {item_name}")
             
-            # 滚动到元素可见位置
+            # 滚动到元素可见位置（即时滚动，事件等待模式下无需固定等待）
             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
-            time.sleep(0.5)
+            if not self.event_waits_enabled():
+                time.sleep(0.5)
             
             # 对于可点击节点（目录树节点），使用特殊的点击策略
             if is_clickable_node:
@@ -89,16 +332,11 @@ class NavigationMixin:
                     for target in click_targets:
                         try:
                             if target.is_displayed() and target.is_enabled():
+                                baseline = self.arm_change_watch()
                                 self.driver.execute_script("arguments[0].click();", target)
-                                time.sleep(2)  # 等待目录节点响应
                                 
-                                # 检查是否有页面变化或新内容加载
-                                current_url_after = self.driver.current_url
-                                if current_url_after != self.driver.current_url:
-                                    return True
-                                    
-                                # 检查页面标题是否改变
-                                time.sleep(1)
+                                # 等待目录节点响应（目录树、文档区或URL/标题发生变化即返回）
+                                self.wait_for_change(baseline, fallback_delay=3)
                                 return True
                                 
                         except Exception:
@@ -108,6 +346,7 @@ class NavigationMixin:
                     pass
             
             # 传统的链接点击方法
+            baseline = self.arm_change_watch()
             click_methods = [
                 lambda: element.click(),
                 lambda: self.driver.execute_script("arguments[0].click();", element),
@@ -117,7 +356,7 @@ class NavigationMixin:
             for method in click_methods:
                 try:
                     method()
-                    time.sleep(1)  # 等待页面开始加载
+                    self.wait_for_change(baseline, fallback_delay=1)  # 等待页面开始变化
                     break
                 except Exception:
                     continue
@@ -128,7 +367,7 @@ class NavigationMixin:
             # 等待页面加载完成
             try:
                 self.wait.until(lambda driver: driver.execute_script("return document.readyState") == "complete")
-                time.sleep(1)  # 额外等待确保内容加载
+                self.wait_for_settle(fallback_delay=1)  # 等待内容渲染稳定
                 return True
             except TimeoutException:
                 self.logger.warning(f"页面加载超时: {item_name}")
@@ -143,9 +382,11 @@ class NavigationMixin:
         try:
             # 滚动到元素可见位置
             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
-            time.sleep(0.5)
+            if not self.event_waits_enabled():
+                time.sleep(0.5)
             
             # 尝试多种点击方法
+            baseline = self.arm_change_watch()
             click_methods = [
                 lambda: element.click(),
                 lambda: self.driver.execute_script("arguments[0].click();", element),
@@ -157,7 +398,7 @@ class NavigationMixin:
             for i, method in enumerate(click_methods):
                 try:
                     method()
-                    time.sleep(1)
+                    self.wait_for_change(baseline, fallback_delay=1)
                     return True
                 except Exception as e:
                     if i == len(click_methods) - 1:
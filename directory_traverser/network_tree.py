@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+网络目录树捕获模块
+开启Chrome性能日志（CDP Network事件），在目录树接口响应到达时直接解析其中的
+节点token、标题、类型和是否有子节点，不再从渲染后的DOM文本反推目录结构
+"""
+
+import json
+import base64
+import threading
+from datetime import datetime
+from urllib.parse import urlsplit
+from typing import Dict, List, Optional
+
+
+# 目录树接口URL特征（飞书wiki目录树的获取/展开接口）
+TREE_API_PATTERNS = [
+    '/space/api/wiki/v2/tree/',
+    '/space/api/wiki/tree/',
+    '/open-apis/wiki/v2/spaces/',
+]
+
+# 响应中节点字段的候选名称（按优先级）
+NODE_TOKEN_FIELDS = ('wiki_token', 'node_token')
+NODE_TITLE_FIELDS = ('title', 'name')
+NODE_PARENT_FIELDS = ('parent_wiki_token', 'parent_node_token', 'parent_token')
+NODE_HAS_CHILD_FIELDS = ('has_child', 'has_children')
+NODE_TYPE_FIELDS = ('obj_type', 'node_type', 'type')
+NODE_EDIT_TIME_FIELDS = ('obj_edit_time', 'edit_time', 'update_time')
+CHILD_MAP_FIELDS = ('child_map', 'children_map')
+
+
+def _first_field(data: Dict, fields):
+    for field in fields:
+        value = data.get(field)
+        if value is not None and value != '':
+            return value
+    return None
+
+
+def format_edit_time(value) -> Optional[str]:
+    """把接口中的编辑时间（秒或毫秒时间戳）转换为 '%Y-%m-%d %H:%M:%S'"""
+    try:
+        timestamp = float(value)
+    except (TypeError, ValueError):
+        return None
+    if timestamp > 1e11:  # 毫秒时间戳
+        timestamp /= 1000
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def parse_tree_payload(payload, base_url: str = None) -> List[Dict]:
+    """从目录树接口的JSON响应中提取节点，返回按兄弟顺序排列的节点列表
+    
+    节点: {'token', 'title', 'parent', 'obj_type', 'has_children', 'modified_time', 'url', 'position'}
+    """
+    nodes: Dict[str, Dict] = {}
+    child_map: Dict[str, List[str]] = {}
+    
+    def walk(value):
+        if isinstance(value, list):
+            for element in value:
+                walk(element)
+            return
+        if not isinstance(value, dict):
+            return
+        
+        token = _first_field(value, NODE_TOKEN_FIELDS)
+        title = _first_field(value, NODE_TITLE_FIELDS)
+        if isinstance(token, str) and isinstance(title, str):
+            has_children = _first_field(value, NODE_HAS_CHILD_FIELDS)
+            node = nodes.setdefault(token, {'token': token, 'position': len(nodes)})
+            node.update({
+                'title': title,
+                'parent': _first_field(value, NODE_PARENT_FIELDS) or node.get('parent'),
+                'obj_type': _first_field(value, NODE_TYPE_FIELDS),
+                'has_children': bool(has_children) if has_children is not None else node.get('has_children'),
+                'modified_time': format_edit_time(_first_field(value, NODE_EDIT_TIME_FIELDS)) or node.get('modified_time'),
+                'url': value.get('url') or (f"{base_url}/wiki/{token}" if base_url else None)
+            })
+        
+        for key, child in value.items():
+            if key in CHILD_MAP_FIELDS and isinstance(child, dict):
+                for parent, children in child.items():
+                    if isinstance(children, list):
+                        child_map[parent] = [c for c in children if isinstance(c, str)]
+            walk(child)
+    
+    walk(payload)
+    
+    # 子节点映射给出的父子关系和兄弟顺序优先
+    for parent, children in child_map.items():
+        for position, token in enumerate(children):
+            if token in nodes:
+                nodes[token]['parent'] = parent
+                nodes[token]['position'] = position
+                if parent in nodes:
+                    nodes[parent]['has_children'] = True
+    
+    return sorted(nodes.values(), key=lambda node: node['position'])
+
+
+class NetworkTreeCapture:
+    """从性能日志中捕获目录树接口响应（需要以goog:loggingPrefs性能日志创建会话）"""
+    
+    def __init__(self, driver, url_patterns: List[str] = None, logger=None):
+        self.driver = driver
+        self.url_patterns = url_patterns or TREE_API_PATTERNS
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.available = False
+        self.pending: Dict[str, str] = {}  # requestId -> 响应URL（等待加载完成再读取响应体）
+        
+        # 统计
+        self.responses = 0
+        self.nodes_captured = 0
+        self.parse_errors = 0
+    
+    def start(self) -> bool:
+        """开启CDP网络事件并确认性能日志可读，返回是否可用"""
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.get_log('performance')  # 丢弃开启前的积压日志
+            self.available = True
+        except Exception as e:
+            self.available = False
+            if self.logger:
+                self.logger.warning(f"⚠️ 无法开启网络目录树捕获（需要性能日志）: {e}")
+        return self.available
+    
+    def matches(self, url: str) -> bool:
+        return bool(url) and any(pattern in url for pattern in self.url_patterns)
+    
+    def poll(self) -> List[Dict]:
+        """读取新到达的性能日志，返回其中目录树响应解析出的节点"""
+        if not self.available:
+            return []
+        
+        with self.lock:
+            try:
+                entries = self.driver.get_log('performance')
+            except Exception as e:
+                if self.logger:
+                    self.logger.debug(f"读取性能日志失败: {e}")
+                return []
+            
+            nodes = []
+            for entry in entries:
+                try:
+                    message = json.loads(entry['message'])['message']
+                except (KeyError, TypeError, ValueError):
+                    continue
+                
+                method = message.get('method')
+                params = message.get('params') or {}
+                request_id = params.get('requestId')
+                if method == 'Network.responseReceived':
+                    url = (params.get('response') or {}).get('url')
+                    if self.matches(url):
+                        self.pending[request_id] = url
+                elif method == 'Network.loadingFinished' and request_id in self.pending:
+                    nodes.extend(self.read_response_nodes(request_id, self.pending.pop(request_id)))
+                elif method == 'Network.loadingFailed':
+                    self.pending.pop(request_id, None)
+            
+            return nodes
+    
+    def read_response_nodes(self, request_id: str, url: str) -> List[Dict]:
+        """读取一个目录树响应体并解析节点"""
+        try:
+            body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            text = body.get('body') or ''
+            if body.get('base64Encoded'):
+                text = base64.b64decode(text).decode('utf-8')
+            parts = urlsplit(url)
+            nodes = parse_tree_payload(json.loads(text), base_url=f"{parts.scheme}://{parts.netloc}")
+        except Exception as e:
+            self.parse_errors += 1
+            if self.logger:
+                self.logger.debug(f"解析目录树响应失败 {url}: {e}")
+            return []
+        
+        self.responses += 1
+        self.nodes_captured += len(nodes)
+        return nodes
+    
+    def snapshot(self) -> Dict:
+        """导出捕获统计"""
+        return {
+            'available': self.available,
+            'responses': self.responses,
+            'nodes_captured': self.nodes_captured,
+            'parse_errors': self.parse_errors,
+            'pending_requests': len(self.pending)
+        }
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+节点索引模块
+以稳定标识（wiki token / DOM节点ID，路径兜底）索引目录树节点，
+替代基于显示名称的去重和XPath文本查找
+"""
+
+import re
+import unicodedata
+from typing import Optional, Dict, List
+
+
+# 飞书标题中常见的站点后缀
+TITLE_SITE_SUFFIXES = [' - 飞书云文档', ' - Feishu Docs', ' - Lark Docs']
+
+WIKI_TOKEN_PATTERN = re.compile(r'/wiki/([A-Za-z0-9_-]+)')
+
+
+def normalize_title(title: str, strip_site_suffix: bool = False) -> str:
+    """规范化标题：去除零宽/格式控制字符，统一全半角，合并空白"""
+    if not title:
+        return ""
+    
+    # Cf类字符包括零宽空格、零宽连接符、BOM、不可见运算符等
+    text = ''.join(ch for ch in title if unicodedata.category(ch) != 'Cf')
+    text = unicodedata.normalize('NFKC', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    
+    if strip_site_suffix:
+        for suffix in TITLE_SITE_SUFFIXES:
+            if text.endswith(suffix):
+                text = text[:-len(suffix)].strip()
+                break
+    
+    return text
+
+
+def css_attr_selector(attr: str, value: str) -> str:
+    """构造属性选择器，转义值中的引号和反斜杠"""
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+    return f'[{attr}="{escaped}"]'
+
+
+def extract_wiki_token(url: str) -> Optional[str]:
+    """从URL中提取wiki token"""
+    if not url:
+        return None
+    match = WIKI_TOKEN_PATTERN.search(url)
+    if match and match.group(1) != 'space':
+        return match.group(1)
+    return None
+
+
+class NodeIndex:
+    """目录树节点索引：稳定标识 -> 节点信息（父节点、子节点、标题、URL、定位器）"""
+    
+    def __init__(self):
+        self.nodes: Dict[str, Dict] = {}
+        self.token_to_key: Dict[str, str] = {}
+    
+    def __len__(self):
+        return len(self.nodes)
+    
+    def __contains__(self, key):
+        return key in self.nodes
+    
+    @staticmethod
+    def make_key(token: str = None, title: str = None, parent_key: str = None) -> str:
+        """生成节点标识：优先token，否则使用父节点路径+规范化标题"""
+        if token:
+            return f"token:{token}"
+        
+        parent_path = ""
+        if parent_key and parent_key.startswith('path:'):
+            parent_path = parent_key[len('path:'):]
+        title = normalize_title(title)
+        return f"path:{parent_path}/{title}" if parent_path else f"path:{title}"
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """O(1)获取节点"""
+        return self.nodes.get(key)
+    
+    def get_by_token(self, token: str) -> Optional[Dict]:
+        """按wiki token获取节点"""
+        key = self.token_to_key.get(token)
+        return self.nodes.get(key) if key else None
+    
+    def upsert(self, key: str, title: str, parent_key: str = None, url: str = None,
+               locator: str = None, depth: int = None, token: str = None) -> Dict:
+        """插入或更新节点，同时维护父子关系"""
+        node = self.nodes.get(key)
+        if node is None:
+            node = {
+                'key': key,
+                'title': normalize_title(title),
+                'parent': None,
+                'children': [],
+                'url': None,
+                'token': None,
+                'locator': None,
+                'depth': depth,
+                'visited': False
+            }
+            self.nodes[key] = node
+        else:
+            node['title'] = normalize_title(title) or node['title']
+            if depth is not None:
+                node['depth'] = depth
+        
+        if url:
+            node['url'] = url
+            token = token or extract_wiki_token(url)
+        if token:
+            node['token'] = token
+            self.token_to_key[token] = key
+        if locator:
+            node['locator'] = locator
+        
+        if parent_key and parent_key != node['parent'] and parent_key in self.nodes:
+            # 节点被移动时从旧父节点摘除
+            if node['parent'] in self.nodes:
+                old_children = self.nodes[node['parent']]['children']
+                if key in old_children:
+                    old_children.remove(key)
+            node['parent'] = parent_key
+            siblings = self.nodes[parent_key]['children']
+            if key not in siblings:
+                siblings.append(key)
+        
+        return node
+    
+    def ingest_snapshot(self, snapshot_nodes: List[Dict]) -> List[Dict]:
+        """根据快照（按文档顺序、带层级）构建父子关系"""
+        ancestors: List[str] = []
+        ingested = []
+        
+        for item in snapshot_nodes:
+            key = item.get('node_key') or item.get('key')
+            if not key:
+                continue
+            
+            depth = item.get('depth') or 1
+            del ancestors[max(depth - 1, 0):]
+            # 快照给出了嵌套关系时直接使用，否则按层级推断
+            if 'parent_key' in item:
+                parent_key = item['parent_key']
+            else:
+                parent_key = ancestors[-1] if ancestors else None
+            
+            node = self.upsert(
+                key,
+                item.get('name', ''),
+                parent_key=parent_key,
+                url=item.get('url'),
+                locator=css_attr_selector('data-kb-key', key),
+                depth=depth,
+                token=item.get('token')
+            )
+            ancestors.append(key)
+            ingested.append(node)
+        
+        return ingested
+    
+    def ingest_network_nodes(self, network_nodes: List[Dict]) -> List[Dict]:
+        """根据网络响应中的树节点（token、父token、是否有子节点、类型）构建父子关系"""
+        keyed = [(self.make_key(token=node['token']), node) for node in network_nodes if node.get('token')]
+        
+        # 先建立全部节点，响应中子节点可能排在父节点之前
+        for key, node in keyed:
+            self.upsert(key, node.get('title', ''), url=node.get('url'), token=node['token'])
+        
+        ingested = []
+        unresolved = set()  # 父节点尚未捕获的节点，层级未知
+        for key, node in keyed:
+            parent_key = self.make_key(token=node['parent']) if node.get('parent') else None
+            if parent_key and parent_key not in self.nodes:
+                unresolved.add(key)
+            entry = self.upsert(key, node.get('title', ''), parent_key=parent_key)
+            if node.get('has_children') is not None:
+                entry['has_children'] = node['has_children']
+            if node.get('obj_type') is not None:
+                entry['obj_type'] = node['obj_type']
+            if node.get('modified_time'):
+                entry['modified_time'] = node['modified_time']
+            ingested.append(entry)
+        
+        # 层级：沿父节点链向上，直到已知层级的节点或根节点
+        for entry in ingested:
+            chain = []
+            node = entry
+            while node is not None and node.get('depth') is None and node['key'] not in chain:
+                chain.append(node['key'])
+                if node['key'] in unresolved:
+                    break
+                node = self.nodes.get(node['parent']) if node['parent'] else None
+            if node is not None and node.get('depth') is None:
+                continue  # 父节点未捕获或父节点链成环
+            depth = node['depth'] if node is not None else 0
+            for key in reversed(chain):
+                depth += 1
+                self.nodes[key]['depth'] = depth
+        
+        return ingested
+    
+    def children(self, key: str) -> List[Dict]:
+        """获取子节点列表"""
+        node = self.nodes.get(key)
+        if not node:
+            return []
+        return [self.nodes[child] for child in node['children'] if child in self.nodes]
+    
+    def path_titles(self, key: str) -> List[str]:
+        """获取从根到该节点的标题路径"""
+        titles = []
+        seen = set()
+        node = self.nodes.get(key)
+        while node and node['key'] not in seen:
+            seen.add(node['key'])
+            titles.append(node['title'])
+            node = self.nodes.get(node['parent']) if node['parent'] else None
+        return list(reversed(titles))
+    
+    def mark_visited(self, key: str):
+        """标记节点已访问"""
+        if key in self.nodes:
+            self.nodes[key]['visited'] = True
+    
+    def is_visited(self, key: str) -> bool:
+        """检查节点是否已访问"""
+        node = self.nodes.get(key)
+        return bool(node and node['visited'])
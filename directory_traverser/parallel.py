@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+多标签页并行遍历模块
+在同一个已登录的Chrome调试会话（端口9222）中打开N个标签页，
+所有标签页从同一个遍历边界领取节点，共用一个全局自适应限速器
+"""
+
+import time
+import threading
+from typing import Dict, List
+
+
+class ParallelTraversalMixin:
+    """多标签页并行遍历功能混入类"""
+    
+    # 需要从主遍历器复制到各标签页工作者的配置
+    WORKER_CONFIG_ATTRS = [
+        'access_delay', 'use_adaptive_rate_limit', 'max_retries', 'retry_delay', 'use_permission_probe',
+        'use_sidebar_snapshot', 'use_event_waits', 'wait_ceiling', 'settle_quiet_ms',
+        'settle_cap_ms', 'url_ready_timeout', 'traversal_strategy', 'max_traversal_depth',
+        'discovery_backend', 'network_tree_url_patterns', 'network_tree_allow_refresh', 'scroll_collect_sidebar',
+        'sidebar_scroll_quiet_ms',
+        'incremental_active', 'incremental_baseline', 'incremental_unexplored', 'download_step_timeout',
+        'download_dir', 'download_max_unconfirmed', 'download_confirm_timeout', 'download_pipeline',
+        'download_batch_size', 'download_root', 'use_download_staging'
+    ]
+    
+    # 合并到主遍历器stats中的数值统计字段
+    MERGED_STAT_KEYS = [
+        'successful_access', 'permission_denied', 'access_failed',
+        'download_attempted', 'download_requested', 'download_successful', 'download_failed',
+        'download_unconfirmed', 'download_skipped', 'download_total_time', 'download_blocked_time',
+        'download_queued', 'download_queue_blocked_time', 'event_waits',
+        'event_wait_timeouts', 'event_wait_time', 'idle_time_saved',
+        'permission_probe_count', 'permission_probe_time_ms', 'url_navigations',
+        'structural_child_checks', 'child_detection_scans', 'child_detection_scans_saved',
+        'network_child_lookups', 'sidebar_scroll_scripts', 'sidebar_scroll_pages', 'sidebar_scroll_gaps',
+        'incremental_new', 'incremental_moved', 'incremental_modified', 'incremental_unchanged',
+        'incremental_unopened', 'incremental_time_saved'
+    ]
+    
+    def parallel_traverse(self, frontier, visited_keys: set = None, tab_count: int = None):
+        """多标签页并行遍历：所有标签页从同一个遍历边界领取节点，主标签页负责定期检查点"""
+        tab_count = tab_count or self.parallel_tabs
+        self.logger.info(f"🧵 启动多标签页并行遍历: {tab_count} 个标签页, {len(frontier)} 个待处理节点")
+        
+        # 并行模式依赖快照提供的层级和节点标识
+        self.use_sidebar_snapshot = True
+        self.traversal_frontier = frontier
+        self.traversal_visited = visited_keys if visited_keys is not None else set()
+        
+        # 1. 创建工作标签页
+        workers = []
+        for worker_id in range(1, tab_count + 1):
+            worker = self.create_tab_worker(worker_id)
+            if worker:
+                workers.append(worker)
+        
+        if not workers:
+            self.logger.error("❌ 无法创建任何工作标签页，回退到单标签页遍历")
+            self.run_traversal(frontier, self.traversal_visited)
+            return
+        
+        threads = [
+            threading.Thread(target=worker.run_tab_worker, name=f"tab-worker-{worker.worker_id}", daemon=True)
+            for worker in workers
+        ]
+        for thread in threads:
+            thread.start()
+        
+        # 2. 等待边界清空（期间定期保存检查点）
+        while any(thread.is_alive() for thread in threads):
+            # 每个检查点周期只有一个截止时间，不随标签页数量拉长
+            deadline = time.time() + self.parallel_checkpoint_interval
+            for thread in threads:
+                thread.join(timeout=max(0, deadline - time.time()))
+            self.checkpoint_records()
+        
+        # 3. 合并各标签页结果并关闭标签页
+        for worker in workers:
+            self.merge_worker_results(worker)
+            worker.close_tab_worker()
+        
+        self.checkpoint_records()
+        self.logger.info(f"✅ 并行遍历完成: {len(workers)} 个标签页, 共记录 {len(self.access_log)} 个页面")
+    
+    def make_subtree_task(self, item: Dict, path: List[int], level: int, origin_url: str,
+                          parent_key: str = None) -> Dict:
+        """构造子树任务（纯数据，可跨标签页传递、可序列化保存）"""
+        return {
+            'node_key': self.get_item_node_key(item),
+            'parent_key': parent_key,
+            'name': item['name'],
+            'url': self.get_item_url(item),
+            'token': item.get('token'),
+            'depth': item.get('depth'),
+            'has_children': item.get('has_children'),
+            'expanded': item.get('expanded'),
+            'updated_at': item.get('updated_at'),
+            'path': path,
+            'level': level,
+            'origin_url': origin_url
+        }
+    
+    def create_tab_worker(self, worker_id: int):
+        """创建工作者：独立WebDriver会话挂接到同一Chrome，并打开新标签页"""
+        try:
+            worker = self.__class__(output_dir=self.output_dir, enable_download=self.enable_download)
+            for attr in self.WORKER_CONFIG_ATTRS:
+                setattr(worker, attr, getattr(self, attr))
+            
+            # 共享：限速器、遍历边界、已访问集合、记录写入器、状态库、下载目录监视器、下载队列
+            worker.worker_id = worker_id
+            worker.navigation_mode = 'url'
+            worker.use_sidebar_snapshot = True
+            worker.rate_limiter = self.get_rate_limiter()
+            worker.traversal_frontier = self.traversal_frontier
+            worker.traversal_visited = self.traversal_visited
+            worker.record_sink = self.get_record_sink()
+            worker.state_store = self.get_state_store()
+            worker.use_state_store = self.state_store is not None
+            if self.is_download_enabled():
+                worker.download_tracker = self.get_download_tracker()
+                worker.download_dir = self.download_dir
+                worker.download_staging_dir = self.download_staging_dir
+                worker.download_queue = self.download_queue
+                worker.download_thread = self.download_thread
+            
+            if not worker.setup_driver():
+                return None
+            worker.driver.switch_to.new_window('tab')
+            self.logger.info(f"🗂️ 标签页 {worker_id} 已就绪")
+            return worker
+        
+        except Exception as e:
+            self.logger.error(f"❌ 创建标签页 {worker_id} 失败: {e}")
+            return None
+    
+    def close_tab_worker(self):
+        """关闭工作标签页并断开会话（不会关闭用户的Chrome）"""
+        if hasattr(self, 'flush_selector_cache'):
+            self.flush_selector_cache()
+        try:
+            self.driver.close()
+            self.driver.quit()
+        except Exception as e:
+            self.logger.debug(f"关闭标签页 {self.worker_id} 时出错: {e}")
+    
+    def run_tab_worker(self):
+        """工作者主循环：从共享边界领取节点直到边界清空（其他标签页处理中的节点可能还会产生子节点）"""
+        while True:
+            task = self.traversal_frontier.claim()
+            if task is None:
+                if self.traversal_frontier.is_empty():
+                    break
+                time.sleep(0.5)
+                continue
+            
+            self.process_frontier_task(task)
+    
+    def open_subtree_task(self, task: Dict) -> bool:
+        """打开边界中的节点：URL直达模式下已知URL时直达，否则在侧边栏中按节点标识点击
+        
+        侧边栏中找不到时先回到来源页（父节点页面，会显示到父节点为止的祖先），必要时只展开父节点
+        """
+        if task.get('url') and getattr(self, 'navigation_mode', 'click') == 'url':
+            return self.navigate_to_url(task['url'], task['name'])
+        
+        for attempt in range(3):
+            for item in self.find_sidebar_items_fresh():
+                if item.get('node_key') == task['node_key']:
+                    element = self.resolve_item_element(item)
+                    return bool(element) and self.click_element_safe(element, task['name'])
+            
+            # 侧边栏中不可见但URL已知时直接打开
+            if task.get('url'):
+                return self.navigate_to_url(task['url'], task['name'])
+            if attempt == 0 and task.get('origin_url') and not self.navigate_to_url(task['origin_url']):
+                return False
+            if attempt == 1 and task.get('parent_key'):
+                self.expand_sidebar_node({'name': task['name'], 'node_key': task['parent_key']})
+        
+        self.logger.warning(f"侧边栏中未找到节点: {task['name']}")
+        return False
+    
+    def merge_worker_results(self, worker):
+        """把工作标签页的记录和统计合并到主遍历器"""
+        self.access_log.extend(worker.access_log)
+        self.failed_items.extend(worker.failed_items)
+        self.permission_denied_items.extend(worker.permission_denied_items)
+        
+        for key in self.MERGED_STAT_KEYS:
+            if key in worker.stats:
+                self.stats[key] = self.stats.get(key, 0) + worker.stats[key]
+        for doc_type, count in worker.stats.get('doc_types', {}).items():
+            doc_types = self.stats.setdefault('doc_types', {})
+            doc_types[doc_type] = doc_types.get(doc_type, 0) + count
+        
+        for key, node in worker.node_index.nodes.items():
+            merged = self.node_index.upsert(key, node['title'], url=node['url'], locator=node['locator'],
+                                            depth=node['depth'], token=node['token'])
+            merged['visited'] = merged['visited'] or node['visited']
+        for key, node in worker.node_index.nodes.items():
+            if node['parent']:
+                self.node_index.upsert(key, node['title'], parent_key=node['parent'])
+        
+        self.stats.setdefault('per_tab', {})[worker.worker_id] = {
+            'successful_access': worker.stats.get('successful_access', 0),
+            'download_requested': worker.stats.get('download_requested', 0),
+            'download_successful': worker.stats.get('download_successful', 0),
+            'failed': len(worker.failed_items)
+        }
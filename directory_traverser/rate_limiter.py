@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+全局自适应限速模块
+令牌桶从上一次请求开始时计算间隔，点击/加载等有效工作耗时会抵扣等待；
+按AIMD调整速率：页面快速正常时加性提速，遇到权限错误、超时、慢加载时乘性降速。
+多标签页/多工作者共享同一个实例
+"""
+
+import time
+import threading
+from typing import Dict
+
+
+class AdaptiveRateLimiter:
+    """线程安全的自适应令牌桶限速器"""
+    
+    # 请求结果类型
+    OUTCOME_OK = "ok"
+    OUTCOME_PERMISSION = "permission"
+    OUTCOME_TIMEOUT = "timeout"
+    OUTCOME_SLOW = "slow"
+    OUTCOME_FAILURE = "failure"
+    
+    def __init__(self, delay_range=(2, 5), burst: int = 1, increase_step: float = 0.02,
+                 decrease_factor: float = 0.5, slow_threshold: float = 8.0, clock=time.monotonic, sleep=time.sleep):
+        min_delay, max_delay = delay_range
+        self.max_rate = 1.0 / min_delay            # 最快不超过access_delay下限
+        self.min_rate = 1.0 / (max_delay * 4)      # 持续受阻时最多退避到上限的4倍间隔
+        self.rate = 2.0 / (min_delay + max_delay)  # 初始速率取区间中值
+        self.burst = burst
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.slow_threshold = slow_threshold
+        
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.tokens = float(burst)
+        self.last_refill = None
+        self.last_request_start = None
+        
+        # 统计
+        self.acquisitions = 0
+        self.total_waited = 0.0
+        self.total_covered = 0.0
+        self.total_spacing = 0.0
+        self.outcomes: Dict[str, int] = {}
+    
+    def current_rate(self) -> float:
+        """当前速率（请求/秒）"""
+        with self.lock:
+            return self.rate
+    
+    def current_interval(self) -> float:
+        """当前目标请求间隔（秒）"""
+        with self.lock:
+            return 1.0 / self.rate
+    
+    def _refill(self, now: float):
+        """按当前速率补充令牌（调用方需持有锁）"""
+        if self.last_refill is None:
+            self.last_refill = now
+            return
+        self.tokens = min(float(self.burst), self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+    
+    def acquire(self) -> Dict:
+        """在请求开始前调用，必要时等待，返回本次等待明细
+        
+        返回 {'waited': 实际等待, 'covered': 被有效工作抵扣的部分, 'interval': 目标间隔}
+        """
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            interval = 1.0 / self.rate
+            
+            # 距上一次请求开始已经过去的时间即被有效工作覆盖的部分（首次请求之前没有工作可抵扣）
+            elapsed = now - self.last_request_start if self.last_request_start is not None else 0.0
+            covered = min(elapsed, interval)
+            
+            if self.tokens >= 1:
+                wait = 0.0
+            else:
+                wait = (1 - self.tokens) / self.rate
+            self.tokens -= 1  # 预留令牌，并发调用方依次排队
+            
+            start = now + wait
+            if self.last_request_start is not None:
+                self.total_spacing += start - self.last_request_start
+            self.last_request_start = start
+            self.acquisitions += 1
+            self.total_waited += wait
+            self.total_covered += covered
+        
+        if wait > 0:
+            self.sleep(wait)
+        self.local.request_start = start
+        return {'waited': wait, 'covered': covered, 'interval': interval}
+    
+    def record_outcome(self, outcome: str, latency: float = None):
+        """记录请求结果并按AIMD调整速率；latency缺省时按本线程上次acquire计算"""
+        if latency is None:
+            request_start = getattr(self.local, 'request_start', None)
+            latency = self.clock() - request_start if request_start is not None else 0.0
+        
+        if outcome == self.OUTCOME_OK and latency > self.slow_threshold:
+            outcome = self.OUTCOME_SLOW
+        
+        with self.lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            if outcome == self.OUTCOME_OK:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+            elif outcome in (self.OUTCOME_PERMISSION, self.OUTCOME_TIMEOUT, self.OUTCOME_SLOW):
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        
+        return outcome
+    
+    def snapshot(self) -> Dict:
+        """导出当前速率与统计"""
+        with self.lock:
+            count = max(self.acquisitions, 1)
+            return {
+                'current_rate_per_second': round(self.rate, 4),
+                'current_interval_seconds': round(1.0 / self.rate, 2),
+                'requests': self.acquisitions,
+                'total_waited_seconds': round(self.total_waited, 2),
+                'total_covered_by_work_seconds': round(self.total_covered, 2),
+                'average_delay_seconds': round(self.total_waited / count, 2),
+                'average_spacing_seconds': round(self.total_spacing / max(self.acquisitions - 1, 1), 2),
+                'outcomes': dict(self.outcomes)
+            }
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+记录写入模块
+长期打开的CSV记录写入器：按条数/时间间隔批量刷新，检查点时fsync，
+每行完整写入，启动时修复崩溃留下的残缺行，保证断点续传可读
+"""
+
+import io
+import os
+import csv
+import time
+import atexit
+import signal
+import threading
+from typing import List, Dict, Optional
+
+
+# 访问记录CSV表头
+RECORD_CSV_HEADER = ['序号', '目录项名称', 'URL', '访问时间', '响应时间(秒)', '状态', '节点标识']
+
+
+def page_info_to_row(page_info: Dict) -> List:
+    """把页面记录转换为CSV数据行"""
+    return [
+        page_info.get('index', ''),
+        page_info.get('directory_item', ''),
+        page_info.get('url', ''),
+        page_info.get('timestamp', ''),
+        page_info.get('response_time', ''),
+        '成功',
+        page_info.get('node_key', '')
+    ]
+
+
+def row_to_page_info(row: List) -> Dict:
+    """把CSV数据行还原为页面记录的基本字段（page_info_to_row的逆操作）"""
+    row = list(row) + [''] * (len(RECORD_CSV_HEADER) - len(row))
+    return {
+        'index': row[0],
+        'directory_item': row[1],
+        'url': row[2],
+        'timestamp': row[3],
+        'response_time': row[4],
+        'node_key': row[6]
+    }
+
+
+def read_last_csv_row(csv_file: str, block_size: int = 4096) -> Optional[List[str]]:
+    """从文件末尾向前按块查找最后一条完整的数据行，耗时与文件大小无关（只有表头时返回None）"""
+    if not os.path.exists(csv_file):
+        return None
+    
+    with open(csv_file, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        tail = b''
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            tail = f.read(position - start) + tail
+            position = start
+            
+            # 首段可能是被截断的行（或文件开头的表头），末段是换行之后未写完的半行，都不是完整数据行
+            lines = [line for line in tail.split(b'\n')[1:-1] if line.strip()]
+            if lines:
+                return next(csv.reader([lines[-1].decode('utf-8')]), None)
+    
+    return None
+
+
+class CsvRecordSink:
+    """线程安全的缓冲CSV记录写入器（多标签页共享同一个实例）"""
+    
+    def __init__(self, csv_file: str, header: List[str] = None, flush_every: int = 20,
+                 flush_interval: float = 5.0, clock=time.monotonic):
+        self.csv_file = csv_file
+        self.header = header or RECORD_CSV_HEADER
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.clock = clock
+        
+        self.lock = threading.RLock()
+        self.fd = None
+        self.buffer: List[str] = []
+        # 已移出缓冲、尚未全部写入文件的字节：写入过程中收到SIGINT时，处理器里的close()接着写完，不丢行也不重复
+        self.inflight = b''
+        self.inflight_rows = 0
+        self.inflight_last_row: Optional[List] = None
+        self.last_flush = clock()
+        self.last_buffered_row: Optional[List] = None
+        self.last_flushed_row: Optional[List] = None  # 最后一条已写入文件的数据行（断点指针只指向已落盘的记录）
+        
+        # 统计
+        self.rows_written = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self.repaired_bytes = 0
+    
+    def open(self):
+        """打开文件（追加模式），修复残缺的末行，空文件写入表头"""
+        with self.lock:
+            if self.fd is not None:
+                return
+            
+            self.repaired_bytes = self.repair_torn_tail()
+            self.fd = os.open(self.csv_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            if os.fstat(self.fd).st_size == 0:
+                self._write(self.format_row(self.header))
+                self.checkpoint()
+    
+    def repair_torn_tail(self) -> int:
+        """截掉文件末尾没有换行结束的半行（上次崩溃时写了一半），返回截掉的字节数"""
+        if not os.path.exists(self.csv_file):
+            return 0
+        
+        with open(self.csv_file, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return 0
+            
+            # 从末尾向前按块查找最后一个换行
+            end = size
+            block = 4096
+            while end > 0:
+                start = max(0, end - block)
+                f.seek(start)
+                chunk = f.read(end - start)
+                if end == size and chunk.endswith(b'\n'):
+                    return 0
+                newline = chunk.rfind(b'\n')
+                if newline >= 0:
+                    keep = start + newline + 1
+                    f.truncate(keep)
+                    return size - keep
+                end = start
+            
+            f.truncate(0)
+            return size
+    
+    @staticmethod
+    def format_row(row: List) -> str:
+        """把一行序列化为完整的CSV文本（字段内换行统一为空格，保证一行一条记录）"""
+        output = io.StringIO()
+        cleaned = [str(value).replace('\r', ' ').replace('\n', ' ') for value in row]
+        csv.writer(output, lineterminator='\n').writerow(cleaned)
+        return output.getvalue()
+    
+    def write_row(self, row: List):
+        """缓冲一行，达到条数或时间阈值时刷新"""
+        with self.lock:
+            if self.fd is None:
+                self.open()
+            self.buffer.append(self.format_row(row))
+            self.last_buffered_row = list(row)
+            if len(self.buffer) >= self.flush_every or self.clock() - self.last_flush >= self.flush_interval:
+                self.flush()
+    
+    def flush(self):
+        """把缓冲的完整行一次性写入文件（不fsync）"""
+        with self.lock:
+            if self.fd is None:
+                return
+            if self.buffer:
+                self.inflight += ''.join(self.buffer).encode('utf-8')
+                self.inflight_rows += len(self.buffer)
+                self.inflight_last_row = self.last_buffered_row
+                self.buffer = []
+            if self.inflight_rows:
+                self._write_inflight()
+    
+    def _write_inflight(self):
+        """写完待写区的剩余字节后才更新统计和已落盘的数据行（中断后再次调用从剩余部分继续）"""
+        while self.inflight:
+            self.inflight = self.inflight[os.write(self.fd, self.inflight):]
+        rows, self.inflight_rows = self.inflight_rows, 0
+        if rows:
+            self.rows_written += rows
+            self.last_flushed_row = self.inflight_last_row
+            self.flushes += 1
+            self.last_flush = self.clock()
+    
+    def checkpoint(self):
+        """检查点：刷新缓冲并fsync落盘"""
+        with self.lock:
+            self.flush()
+            if self.fd is not None:
+                os.fsync(self.fd)
+                self.fsyncs += 1
+    
+    def reset(self):
+        """清空文件并重新写入表头"""
+        with self.lock:
+            self.close()
+            self.last_buffered_row = self.last_flushed_row = self.inflight_last_row = None
+            with open(self.csv_file, 'w', newline='', encoding='utf-8') as f:
+                f.write(self.format_row(self.header))
+                f.flush()
+                os.fsync(f.fileno())
+            self.open()
+    
+    def close(self):
+        """刷新、fsync并关闭文件"""
+        with self.lock:
+            if self.fd is None:
+                return
+            self.checkpoint()
+            os.close(self.fd)
+            self.fd = None
+    
+    def _write(self, text: str):
+        """循环写入直到全部字节落入文件"""
+        data = text.encode('utf-8')
+        while data:
+            written = os.write(self.fd, data)
+            data = data[written:]
+    
+    def install_interrupt_handler(self):
+        """注册SIGINT和退出时的清理：先落盘再交给原处理器（仅主线程可注册信号）"""
+        atexit.register(self.close)
+        if threading.current_thread() is not threading.main_thread():
+            return
+        
+        previous = signal.getsignal(signal.SIGINT)
+        
+        def handle_interrupt(signum, frame):
+            self.close()
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                raise KeyboardInterrupt
+        
+        signal.signal(signal.SIGINT, handle_interrupt)
+    
+    def snapshot(self) -> Dict:
+        """导出写入统计"""
+        with self.lock:
+            return {
+                'rows_written': self.rows_written,
+                'buffered': len(self.buffer) + self.inflight_rows,
+                'flushes': self.flushes,
+                'fsyncs': self.fsyncs,
+                'repaired_bytes': self.repaired_bytes
+            }
@@ -5,11 +5,14 @@
 """
 
 import os
-import csv
 import json
 import time
+import atexit
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from .record_sink import CsvRecordSink, page_info_to_row, row_to_page_info
+from .state_store import CrawlStateStore, FAILURE_FAILED, FAILURE_PERMISSION
 
 
 class ReportingMixin:
@@ -37,84 +40,111 @@ class ReportingMixin:
         except Exception as e:
             self.logger.error(f"保存结果时出错: {e}")
     
+    def get_state_store(self) -> Optional[CrawlStateStore]:
+        """获取SQLite状态库（未启用时返回None）"""
+        if not getattr(self, 'use_state_store', False):
+            return None
+        
+        if self.state_store is None:
+            db_file = os.path.join(self.output_dir, "crawl_state.db")
+            try:
+                self.state_store = CrawlStateStore(db_file, batch_size=self.state_batch_size)
+                atexit.register(self.state_store.close)
+            except Exception as e:
+                self.logger.warning(f"打开状态库失败，回退到CSV: {e}")
+                self.use_state_store = False
+                return None
+        return self.state_store
+    
+    def store_visit(self, page_info: Dict):
+        """把成功访问记录写入状态库"""
+        store = self.get_state_store()
+        if store:
+            try:
+                store.record_visit(page_info, getattr(self, 'worker_id', 0))
+            except Exception as e:
+                self.logger.warning(f"写入状态库失败: {e}")
+    
+    def store_failure(self, kind: str, item: Dict):
+        """把失败/权限不足项写入状态库"""
+        store = self.get_state_store()
+        if store:
+            try:
+                store.record_failure(kind, item)
+            except Exception as e:
+                self.logger.warning(f"写入状态库失败: {e}")
+    
+    def get_failure_items(self, kind: str) -> List[Dict]:
+        """读取失败/权限不足项（优先状态库，包含历次续传的记录）"""
+        store = self.get_state_store()
+        if store:
+            return store.failures(kind)
+        return self.failed_items if kind == FAILURE_FAILED else self.permission_denied_items
+    
+    def get_record_sink(self) -> CsvRecordSink:
+        """获取长期打开的CSV记录写入器（首次使用时创建，多标签页共享）"""
+        if self.record_sink is None:
+            csv_file = os.path.join(self.output_dir, "directory_traverse_log.csv")
+            self.record_sink = CsvRecordSink(csv_file, flush_every=self.record_flush_every,
+                                             flush_interval=self.record_flush_interval)
+            self.record_sink.open()
+            self.record_sink.install_interrupt_handler()
+            if self.record_sink.repaired_bytes:
+                self.logger.warning(f"🩹 CSV末尾存在残缺记录，已截掉 {self.record_sink.repaired_bytes} 字节")
+        return self.record_sink
+    
     def save_to_csv(self):
-        """保存成功访问的页面信息到CSV"""
+        """结束时落盘CSV（记录已实时写入，这里只刷新缓冲并fsync，不再重写整个文件）"""
         if not self.access_log:
             self.logger.warning("没有成功访问的页面，跳过CSV保存")
             return
         
-        csv_file = os.path.join(self.output_dir, "directory_traverse_log.csv")
-        
         try:
-            with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                
-                # 写入标题行
-                writer.writerow([
-                    '序号', '目录项名称', 'URL', 
-                    '访问时间', '响应时间(秒)', '状态'
-                ])
-                
-                # 写入数据行
-                for item in self.access_log:
-                    writer.writerow([
-                        item.get('index', ''),
-                        item.get('directory_item', ''),
-                        item.get('url', ''),
-                        item.get('timestamp', ''),
-                        item.get('response_time', ''),
-                        '成功'
-                    ])
+            sink = self.get_record_sink()
+            self.checkpoint_records()
+            sink_stats = sink.snapshot()
             
-            self.logger.info(f"📄 CSV文件已保存: {csv_file}")
-            self.logger.info(f"   包含 {len(self.access_log)} 条成功访问记录")
+            self.logger.info(f"📄 CSV文件已保存: {sink.csv_file}")
+            self.logger.info(f"   本次写入 {sink_stats['rows_written']} 条成功访问记录 "
+                             f"({sink_stats['flushes']} 次刷新, {sink_stats['fsyncs']} 次落盘)")
             
         except Exception as e:
             self.logger.error(f"保存CSV文件失败: {e}")
     
     def save_single_record_to_csv(self, page_info):
-        """立即将单条记录追加到CSV文件"""
-        csv_file = os.path.join(self.output_dir, "directory_traverse_log.csv")
-        
-        # 检查文件是否存在，决定是否写入表头
-        file_exists = os.path.exists(csv_file)
-        
+        """将单条记录写入缓冲，按条数/时间间隔批量刷新"""
         try:
-            with open(csv_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                
-                # 第一次写入时，先写表头
-                if not file_exists:
-                    writer.writerow([
-                        '序号', '目录项名称', 'URL', 
-                        '访问时间', '响应时间(秒)', '状态'
-                    ])
-                
-                # 追加数据行
-                writer.writerow([
-                    page_info.get('index', ''),
-                    page_info.get('directory_item', ''),
-                    page_info.get('url', ''),
-                    page_info.get('timestamp', ''),
-                    page_info.get('response_time', ''),
-                    '成功'
-                ])
-                
+            self.get_record_sink().write_row(page_info_to_row(page_info))
         except Exception as e:
             self.logger.warning(f"实时保存CSV记录失败: {e}")
     
+    def checkpoint_records(self):
+        """检查点：把已缓冲的记录刷新并fsync，提交状态库后更新断点指针，供断点续传读取"""
+        try:
+            if self.record_sink is not None:
+                self.record_sink.checkpoint()
+            # 遍历边界与访问记录在同一事务中提交，恢复时二者一致
+            self.save_frontier()
+            if self.state_store is not None:
+                self.state_store.checkpoint()
+            # 断点指针只在记录已落盘、状态库已提交后更新，指向的记录崩溃后一定可读
+            if self.record_sink is not None and self.record_sink.last_flushed_row:
+                self.write_resume_pointer(row_to_page_info(self.record_sink.last_flushed_row))
+            if hasattr(self, 'flush_selector_cache'):
+                self.flush_selector_cache()
+        except Exception as e:
+            self.logger.warning(f"检查点落盘失败: {e}")
+    
     def clear_csv_file(self):
         """清空CSV文件，准备重新开始"""
-        csv_file = os.path.join(self.output_dir, "directory_traverse_log.csv")
-        
         try:
-            # 创建带标题行的新文件
-            with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    '序号', '目录项名称', 'URL', 
-                    '访问时间', '响应时间(秒)', '状态'
-                ])
+            # 截断为只含标题行的新文件
+            self.get_record_sink().reset()
+            store = self.get_state_store()
+            if store:
+                store.reset()
+            self.clear_resume_pointer()
+            self.clear_frontier()
             
             self.logger.info("✅ 已清空CSV文件，准备重新开始")
             
@@ -125,8 +155,9 @@ class ReportingMixin:
             self.logger.error(f"清空CSV文件失败: {e}")
     
     def save_permission_log(self):
-        """保存权限不足的项目日志"""
-        if not self.permission_denied_items:
+        """保存权限不足的项目日志（从状态库导出）"""
+        permission_denied_items = self.get_failure_items(FAILURE_PERMISSION)
+        if not permission_denied_items:
             return
         
         permission_log_file = os.path.join(self.output_dir, "permission_denied_log.txt")
@@ -136,23 +167,33 @@ class ReportingMixin:
                 f.write("飞书知识库遍历 - 权限不足项目日志\n")
                 f.write("="*50 + "\n")
                 f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"权限不足项目数量: {len(self.permission_denied_items)}\n\n")
+                f.write(f"权限不足项目数量: {len(permission_denied_items)}\n\n")
                 
-                for i, item in enumerate(self.permission_denied_items, 1):
+                for i, item in enumerate(permission_denied_items, 1):
                     f.write(f"{i}. {item['name']}\n")
                     f.write(f"   链接: {item['href']}\n")
                     f.write(f"   时间: {item['timestamp']}\n")
-                    f.write(f"   原因: 权限不足或需要特殊访问权限\n\n")
+                    f.write(f"   原因: {self.describe_access_status(item.get('status'))}\n\n")
             
             self.logger.info(f"⚠️ 权限日志已保存: {permission_log_file}")
-            self.logger.info(f"   记录了 {len(self.permission_denied_items)} 个权限不足的项目")
+            self.logger.info(f"   记录了 {len(permission_denied_items)} 个权限不足的项目")
             
         except Exception as e:
             self.logger.error(f"保存权限日志失败: {e}")
     
+    def describe_access_status(self, status: str) -> str:
+        """权限探测结果的可读说明"""
+        descriptions = {
+            'no-permission': '权限不足或需要特殊访问权限',
+            'login-required': '需要登录',
+            'not-found': '页面不存在或已删除'
+        }
+        return descriptions.get(status, '权限不足或需要特殊访问权限')
+    
     def save_failed_log(self):
-        """保存访问失败的项目日志"""
-        if not self.failed_items:
+        """保存访问失败的项目日志（从状态库导出）"""
+        failed_items = self.get_failure_items(FAILURE_FAILED)
+        if not failed_items:
             return
         
         failed_log_file = os.path.join(self.output_dir, "failed_items_log.txt")
@@ -162,16 +203,16 @@ class ReportingMixin:
                 f.write("飞书知识库遍历 - 访问失败项目日志\n")
                 f.write("="*50 + "\n")
                 f.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"访问失败项目数量: {len(self.failed_items)}\n\n")
+                f.write(f"访问失败项目数量: {len(failed_items)}\n\n")
                 
-                for i, item in enumerate(self.failed_items, 1):
+                for i, item in enumerate(failed_items, 1):
                     f.write(f"{i}. {item['name']}\n")
                     f.write(f"   层级: 第{item.get('level', 1)}层\n")
                     f.write(f"   时间: {item['timestamp']}\n")
                     f.write(f"   失败原因: {item['reason']}\n\n")
             
             self.logger.info(f"❌ 失败日志已保存: {failed_log_file}")
-            self.logger.info(f"   记录了 {len(self.failed_items)} 个访问失败的项目")
+            self.logger.info(f"   记录了 {len(failed_items)} 个访问失败的项目")
             
         except Exception as e:
             self.logger.error(f"保存失败日志失败: {e}")
@@ -181,6 +222,8 @@ class ReportingMixin:
         summary_file = os.path.join(self.output_dir, "traverse_summary.json")
         
         try:
+            store = self.get_state_store()
+            
             # 准备摘要数据
             summary_data = {
                 "traverse_info": {
@@ -197,16 +240,31 @@ class ReportingMixin:
                     "access_failed": self.stats["access_failed"],
                     "success_rate": round(self.stats["successful_access"] / max(self.stats["total_items_found"], 1) * 100, 2)
                 },
+                "permission_probe": {
+                    "count": self.stats.get("permission_probe_count", 0),
+                    "average_ms": round(self.stats.get("permission_probe_time_ms", 0) / max(self.stats.get("permission_probe_count", 0), 1), 1)
+                },
+                "doc_types": store.doc_type_counts() if store else self.stats.get("doc_types", {}),
+                "incremental": self.get_incremental_summary() if hasattr(self, 'get_incremental_summary') else None,
+                "network_tree": self.network_tree.snapshot() if getattr(self, 'network_tree', None) else None,
+                "sidebar_coverage": getattr(self, 'sidebar_coverage', None),
+                "child_detection": {
+                    "checks": self.stats.get("structural_child_checks", 0),
+                    "sidebar_scans": self.stats.get("child_detection_scans", 0),
+                    "sidebar_scans_saved": self.stats.get("child_detection_scans_saved", 0)
+                },
                 "download_statistics": self.get_download_stats_summary() if hasattr(self, 'get_download_stats_summary') else {},
                 "output_files": {
                     "csv_log": "directory_traverse_log.csv",
                     "permission_log": "permission_denied_log.txt" if self.permission_denied_items else None,
                     "failed_log": "failed_items_log.txt" if self.failed_items else None,
                     "summary": "traverse_summary.json",
+                    "state_db": "crawl_state.db" if self.state_store else None,
                     "main_log": "traverser.log"
                 },
                 "access_control": {
                     "delay_range_seconds": self.access_delay,
+                    "rate_limiter": self.rate_limiter.snapshot() if getattr(self, 'rate_limiter', None) else None,
                     "total_delays": len(self.access_log) - 1 if len(self.access_log) > 1 else 0,
                     "respect_permissions": True,
                     "retry_mechanism": True
@@ -237,7 +295,7 @@ class ReportingMixin:
     def print_final_summary(self):
         """打印最终统计摘要"""
         self.logger.info("\n" + "="*60)
-        self.logger.info("📊 多层级递归遍历完成统计报告")
+        self.logger.info("📊 多层级遍历完成统计报告")
         self.logger.info("="*60)
         self.logger.info(f"⏰ 开始时间: {self.stats['start_time'].strftime('%Y-%m-%d %H:%M:%S')}")
         self.logger.info(f"⏰ 结束时间: {self.stats['end_time'].strftime('%Y-%m-%d %H:%M:%S')}")
@@ -246,20 +304,69 @@ class ReportingMixin:
         self.logger.info(f"❌ 访问失败项目数: {len(self.failed_items)}")
         self.logger.info(f"⚠️ 权限不足项目数: {len(self.permission_denied_items)}")
         
+        # 限速统计
+        if getattr(self, 'rate_limiter', None):
+            limiter_stats = self.rate_limiter.snapshot()
+            self.logger.info(f"🚦 请求限速: 当前间隔 {limiter_stats['current_interval_seconds']} 秒, 平均等待 {limiter_stats['average_delay_seconds']} 秒, "
+                             f"有效工作覆盖 {self.format_duration(limiter_stats['total_covered_by_work_seconds'])}")
+        
+        # 事件驱动等待统计
+        if self.stats.get("event_waits"):
+            self.logger.info(f"⚡ 事件驱动等待: {self.stats['event_waits']} 次, 实际等待 {self.format_duration(self.stats['event_wait_time'])}, "
+                             f"节省空闲 {self.format_duration(self.stats['idle_time_saved'])}")
+        
+        # 批量展开统计
+        if self.stats.get("bulk_expand_clicks"):
+            self.logger.info(f"🔓 批量展开: {self.stats['bulk_expand_clicks']} 个折叠项目, 耗时 {self.format_duration(self.stats['bulk_expand_time'])}")
+        
+        # 网络目录树捕获统计
+        if getattr(self, 'network_tree', None):
+            network_stats = self.network_tree.snapshot()
+            self.logger.info(f"📡 网络目录树: {network_stats['responses']} 个响应, {network_stats['nodes_captured']} 个节点, "
+                             f"子节点直接查询 {self.stats.get('network_child_lookups', 0)} 次")
+        
+        # 虚拟列表分页收集统计
+        if self.stats.get("sidebar_scroll_pages"):
+            self.logger.info(f"📜 目录树分页滚动: {self.stats['sidebar_scroll_pages']} 页, 脚本 {self.stats['sidebar_scroll_scripts']} 次, "
+                             f"缺口重试 {self.stats.get('sidebar_scroll_gaps', 0)} 次")
+        if getattr(self, 'sidebar_coverage', None) and self.sidebar_coverage['incomplete_parents']:
+            self.logger.warning(f"⚠️ 目录树覆盖不完整: {len(self.sidebar_coverage['incomplete_parents'])} 个父节点的子节点未收集全")
+        
+        # 结构化子节点判断统计
+        if self.stats.get("structural_child_checks"):
+            self.logger.info(f"🌿 子节点判断: {self.stats['structural_child_checks']} 次, 侧边栏扫描 {self.stats['child_detection_scans']} 次, "
+                             f"节省扫描 {self.stats['child_detection_scans_saved']} 次")
+        
+        # 增量遍历统计
+        incremental = self.get_incremental_summary() if hasattr(self, 'get_incremental_summary') else None
+        if incremental:
+            changes = incremental['changes']
+            self.logger.info(f"♻️ 增量遍历: 记录 {incremental['recorded']} 个（新增 {changes['new']}, 移动 {changes['moved']}, "
+                             f"修改 {changes['modified']}），跳过未变化 {incremental['skipped_unchanged']} 个"
+                             f"（其中未打开 {incremental['skipped_unopened']} 个）")
+            self.logger.info(f"   🪦 墓碑: {incremental['tombstones']} 个, ⏱️ 估算节省: {self.format_duration(incremental['time_saved_seconds'])}")
+        
+        # 文档类型统计（页面元数据）
+        store = self.get_state_store()
+        doc_types = store.doc_type_counts() if store else self.stats.get("doc_types", {})
+        if doc_types:
+            self.logger.info("📑 文档类型: " + ", ".join(f"{doc_type} {count} 个" for doc_type, count in sorted(doc_types.items())))
+        
         # 下载功能统计
         if hasattr(self, 'print_download_summary'):
             self.print_download_summary()
         
-        # 层级统计
-        if self.access_log:
-            levels = [item.get('level', 1) for item in self.access_log]
-            max_level = max(levels) if levels else 0
-            self.logger.info(f"🌲 遍历最大深度: {max_level} 层")
-            
-            # 各层级统计
-            level_stats = {}
-            for level in levels:
+        # 层级统计（状态库按层级聚合，否则统计内存记录）
+        level_stats = {}
+        if store:
+            level_stats = store.level_counts()
+        else:
+            for item in self.access_log:
+                level = item.get('level', 1)
                 level_stats[level] = level_stats.get(level, 0) + 1
+        
+        if level_stats:
+            self.logger.info(f"🌲 遍历最大深度: {max(level_stats)} 层")
             
             self.logger.info("📊 各层级访问统计:")
             for level in sorted(level_stats.keys()):
@@ -272,6 +379,9 @@ class ReportingMixin:
             "traverser.log - 详细日志"
         ]
         
+        if self.state_store:
+            output_files.append("crawl_state.db - 遍历状态库")
+        
         if self.permission_denied_items:
             output_files.append("permission_denied_log.txt - 权限不足项目")
         
@@ -6,39 +6,136 @@
 
 import os
 import csv
-import time
+import json
+import threading
 from typing import Optional, Tuple, List
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+from .node_index import NodeIndex
+from .record_sink import read_last_csv_row
+from .frontier import TraversalFrontier
 
 
 class ResumeHandlerMixin:
     """断点续传功能混入类"""
     
+    def get_resume_pointer_file(self) -> str:
+        return os.path.join(self.output_dir, "resume_pointer.json")
+    
+    def write_resume_pointer(self, page_info: dict):
+        """检查点落盘后原子更新断点指针文件（临时文件 + os.replace）"""
+        pointer_file = self.get_resume_pointer_file()
+        tmp_file = f"{pointer_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        
+        pointer = {
+            'index': page_info.get('index', ''),
+            'name': page_info.get('directory_item', ''),
+            'url': page_info.get('url', ''),
+            'node_key': page_info.get('node_key', ''),
+            'timestamp': page_info.get('timestamp', '')
+        }
+        
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(pointer, f, ensure_ascii=False)
+            os.replace(tmp_file, pointer_file)
+        except Exception as e:
+            self.logger.debug(f"更新断点指针失败: {e}")
+    
+    def read_resume_pointer(self) -> Optional[dict]:
+        """读取断点指针文件"""
+        pointer_file = self.get_resume_pointer_file()
+        if not os.path.exists(pointer_file):
+            return None
+        
+        try:
+            with open(pointer_file, 'r', encoding='utf-8') as f:
+                pointer = json.load(f)
+            return pointer if pointer.get('index') and pointer.get('name') else None
+        except Exception as e:
+            self.logger.warning(f"断点指针文件损坏，改用其他来源: {e}")
+            return None
+    
+    def clear_resume_pointer(self):
+        """删除断点指针文件"""
+        try:
+            os.remove(self.get_resume_pointer_file())
+        except FileNotFoundError:
+            pass
+    
+    def get_frontier_file(self) -> str:
+        return os.path.join(self.output_dir, "resume_frontier.json")
+    
+    def save_frontier(self):
+        """保存当前遍历边界（启用状态库时写入状态库，否则原子写入JSON文件）"""
+        frontier = getattr(self, 'traversal_frontier', None)
+        if frontier is None:
+            return
+        
+        data = json.dumps(frontier.to_dict(), ensure_ascii=False)
+        store = self.get_state_store()
+        if store:
+            store.save_meta('frontier', data)
+            return
+        
+        frontier_file = self.get_frontier_file()
+        tmp_file = f"{frontier_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, frontier_file)
+    
+    def load_frontier(self) -> Optional[TraversalFrontier]:
+        """读取上次保存的遍历边界"""
+        try:
+            store = self.get_state_store()
+            data = store.load_meta('frontier') if store else None
+            if data is None and os.path.exists(self.get_frontier_file()):
+                with open(self.get_frontier_file(), 'r', encoding='utf-8') as f:
+                    data = f.read()
+            return self.create_frontier(json.loads(data)) if data else None
+        
+        except Exception as e:
+            self.logger.warning(f"读取遍历边界失败，改用序号定位: {e}")
+            return None
+    
+    def clear_frontier(self):
+        """清除保存的遍历边界"""
+        store = self.get_state_store()
+        if store:
+            store.save_meta('frontier', json.dumps(TraversalFrontier().to_dict()))
+        try:
+            os.remove(self.get_frontier_file())
+        except FileNotFoundError:
+            pass
+    
     def check_resume_progress(self) -> Optional[Tuple[str, str]]:
-        """检查是否有未完成的进度，返回(路径, 项目名)或None"""
-        csv_file = os.path.join(self.output_dir, "directory_traverse_log.csv")
+        """检查是否有未完成的进度，返回(路径, 项目名)或None
         
-        if not os.path.exists(csv_file):
+        依次查询断点指针文件、状态库最后一条记录、CSV末行（从文件末尾向前读取），均为常数时间
+        """
+        pointer = self.read_resume_pointer()
+        if pointer:
+            return (pointer['index'], pointer['name'])
+        
+        store = self.get_state_store()
+        if store and store.has_visits():
+            last_visit = store.last_visit()
+            if last_visit['path_index'] and last_visit['name']:
+                return (last_visit['path_index'], last_visit['name'])
             return None
         
+        csv_file = os.path.join(self.output_dir, "directory_traverse_log.csv")
+        
         try:
-            with open(csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                rows = list(reader)
-                
-                if len(rows) <= 1:  # 只有标题行或空文件
-                    return None
+            last_row = read_last_csv_row(csv_file)
+            if last_row and len(last_row) >= 2:
+                path = last_row[0].strip()  # 序号列 (如: "1-10")
+                name = last_row[1].strip()  # 目录项名称列
                 
-                # 获取最后一行数据
-                last_row = rows[-1]
-                if len(last_row) >= 2:
-                    path = last_row[0].strip()  # 序号列 (如: "1-10")  
-                    name = last_row[1].strip()  # 目录项名称列
-                    
-                    if path and name:
-                        return (path, name)
-                        
+                if path and name:
+                    return (path, name)
+            
             return None
             
         except Exception as e:
@@ -46,7 +143,13 @@ class ResumeHandlerMixin:
             return None
     
     def build_path_name_mapping(self) -> dict:
-        """从CSV文件构建路径-名称映射表"""
+        """构建路径-名称映射表（优先状态库，旧版输出目录读取CSV）"""
+        store = self.get_state_store()
+        if store and store.has_visits():
+            path_mapping = store.path_name_mapping()
+            self.logger.info(f"📋 构建路径映射表: {len(path_mapping)} 个路径")
+            return path_mapping
+        
         csv_file = os.path.join(self.output_dir, "directory_traverse_log.csv")
         path_mapping = {}
         
@@ -69,6 +172,39 @@ class ResumeHandlerMixin:
             self.logger.error(f"构建路径映射表失败: {e}")
             return {}
     
+    def load_logged_records(self) -> List[dict]:
+        """读取已记录的页面（序号、名称、URL、节点标识）"""
+        store = self.get_state_store()
+        if store and store.has_visits():
+            return [
+                {'index': visit['path_index'], 'name': visit['name'], 'url': visit['url'], 'node_key': visit['node_key'] or ''}
+                for visit in store.visits() if visit['url']
+            ]
+        
+        csv_file = os.path.join(self.output_dir, "directory_traverse_log.csv")
+        records = []
+        
+        if not os.path.exists(csv_file):
+            return records
+        
+        try:
+            with open(csv_file, 'r', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader, None)  # 跳过标题行
+                
+                for row in reader:
+                    if len(row) >= 3 and row[2].strip():
+                        records.append({
+                            'index': row[0].strip(),
+                            'name': row[1].strip(),
+                            'url': row[2].strip(),
+                            'node_key': row[6].strip() if len(row) >= 7 else ''
+                        })
+        except Exception as e:
+            self.logger.error(f"读取已记录页面失败: {e}")
+        
+        return records
+    
     def get_navigation_path(self, target_path: str, path_mapping: dict) -> list:
         """获取导航名称路径"""
         try:
@@ -90,170 +226,34 @@ class ResumeHandlerMixin:
             self.logger.error(f"解析导航路径失败: {e}")
             return []
     
-    def find_item_by_name(self, target_name: str):
-        """在当前层级通过名称查找项目"""
-        try:
-            current_items = self.find_sidebar_items_fresh()
-            
-            for item in current_items:
-                if item['name'] == target_name:
-                    self.logger.debug(f"  ✅ 找到目标项目: {target_name}")
-                    return item
-            
-            self.logger.debug(f"  ❌ 未找到目标项目: {target_name}")
-            return None
-            
-        except Exception as e:
-            self.logger.error(f"按名称查找项目失败: {e}")
-            return None
-    
-    def navigate_to_resume_position(self, target_path: str, target_name: str) -> bool:
-        """导航到指定的断点续传位置 - 基于路径-名称映射"""
-        self.logger.info(f"🎯 开始路径-名称映射导航")
-        self.logger.info(f"📋 目标路径: {target_path} → {target_name}")
+    def start_from_resume_position(self, resume_path: str, resume_name: str) -> Tuple[TraversalFrontier, set]:
+        """构建断点续传的遍历边界和已访问集合
         
-        try:
-            # 步骤1: 构建路径-名称映射表
-            path_mapping = self.build_path_name_mapping()
-            if not path_mapping:
-                self.logger.error("❌ 无法构建路径映射表")
-                return False
-            
-            # 步骤2: 获取导航名称路径
-            navigation_path = self.get_navigation_path(target_path, path_mapping)
-            if not navigation_path:
-                self.logger.error("❌ 无法解析导航路径")
-                return False
-            
-            self.logger.info(f"📍 导航路径: {navigation_path}")
-            
-            # 步骤3: 逐级名称导航
-            for level, level_target_name in enumerate(navigation_path[:-1]):
-                self.logger.info(f"第{level + 1}层导航:")
-                self.logger.info(f"🔍 查找目标: {level_target_name}")
-                
-                # 在当前层级查找目标项目
-                target_item = self.find_item_by_name(level_target_name)
-                if not target_item:
-                    self.logger.error(f"❌ 第{level + 1}层未找到目标: {level_target_name}")
-                    return False
-                
-                self.logger.info(f"✅ 找到并准备点击: {level_target_name}")
-                
-                # 找到对应的DOM元素并点击
-                fresh_element = self.find_element_by_text(level_target_name)
-                if not fresh_element:
-                    self.logger.error(f"❌ 无法找到DOM元素: {level_target_name}")
-                    return False
-                
-                # 点击展开下一层
-                click_success = self.click_element_safe(fresh_element, level_target_name)
-                if not click_success:
-                    self.logger.error(f"❌ 点击失败: {level_target_name}")
-                    return False
-                
-                # 等待下一层加载
-                time.sleep(2)
-                self.logger.info(f"✅ 成功展开: {level_target_name}")
-            
-            # 步骤4: 验证最终目标
-            final_target = navigation_path[-1]
-            self.logger.info(f"第{len(navigation_path)}层验证:")
-            self.logger.info(f"🔍 查找目标: {final_target}")
-            
-            final_item = self.find_item_by_name(final_target)
-            if final_item and final_item['name'] == target_name:
-                self.logger.info(f"✅ 成功定位到断点续传位置: {target_name}")
-                return True
-            else:
-                self.logger.error(f"❌ 最终验证失败，期望: {target_name}, 实际: {final_item['name'] if final_item else 'None'}")
-                return False
-            
-        except Exception as e:
-            self.logger.error(f"路径-名称映射导航失败: {e}")
-            return False
-    
-    def calculate_next_position(self, current_path: str, current_name: str) -> str:
-        """简化的下一个序号计算"""
-        try:
-            self.logger.info(f"🔍 检查 {current_name} 是否有子项目...")
-            
-            # 检查当前项目是否有子项目
-            if self.has_children(current_name):
-                next_path = f"{current_path}-1"
-                self.logger.info(f"✅ 发现 {current_name} 有子项目，下一个位置: {next_path}")
-                return next_path
-            
-            # 如果没有子项目，继续同级的下一个
-            path_parts = current_path.split('-')
-            path_parts[-1] = str(int(path_parts[-1]) + 1)  # 最后一级+1
-            next_path = '-'.join(path_parts)
-            
-            self.logger.info(f"📍 下一个同级位置: {next_path}")
-            return next_path
-            
-        except Exception as e:
-            self.logger.error(f"计算下一个位置失败: {e}")
-            # 默认返回下一个同级位置
-            path_parts = current_path.split('-')
-            path_parts[-1] = str(int(path_parts[-1]) + 1)
-            return '-'.join(path_parts)
-    
-    def has_children(self, item_name: str) -> bool:
-        """简单检查项目是否有子项目"""
-        try:
-            # 记录当前DOM状态
-            items_before = self.find_sidebar_items_fresh()
-            count_before = len(items_before)
-            
-            # 点击项目
-            fresh_element = self.find_element_by_text(item_name)
-            if fresh_element:
-                click_success = self.click_element_safe(fresh_element, item_name)
-                if click_success:
-                    time.sleep(1)  # 等待可能的子项目加载
-                    
-                    # 检查是否有新项目出现
-                    items_after = self.find_sidebar_items_fresh()
-                    count_after = len(items_after)
-                    
-                    return count_after > count_before
-            
-            return False
-            
-        except Exception as e:
-            self.logger.error(f"检查子项目失败: {e}")
-            return False
-    
-    def start_from_resume_position(self, resume_path: str, resume_name: str) -> bool:
-        """从断点续传位置开始遍历"""
-        self.logger.info("🔄 启动断点续传模式")
-        
-        # 导航到断点位置
-        if not self.navigate_to_resume_position(resume_path, resume_name):
-            self.logger.error("❌ 无法导航到断点续传位置")
-            return False
-        
-        # 计算下一个要处理的位置
-        next_path_str = self.calculate_next_position(resume_path, resume_name)
+        优先恢复保存的遍历边界（不重放祖先点击）；旧版输出目录没有边界时从根节点重新播种，已记录的页面不重复记录
+        """
+        self.logger.info(f"🔄 启动断点续传模式（上次位置: {resume_path} - {resume_name}）")
         
-        self.logger.info(f"▶️ 从 {next_path_str} 开始继续遍历...")
+        visited_keys = set()
+        self.populate_visited_keys_from_csv(visited_keys)
         
-        # 从计算出的下一个位置开始遍历
-        next_path_parts = [int(x) for x in next_path_str.split('-')]
-        level = len(next_path_parts) - 1  # 计算当前层级
+        frontier = self.load_frontier()
+        if frontier and not frontier.is_empty():
+            self.logger.info(f"🧭 恢复遍历边界: {len(frontier.frames)} 层, {len(frontier)} 个待处理节点")
+            return frontier, visited_keys
         
-        # 构建已访问项目集合（避免重复处理）
-        visited_texts = set()
-        self.populate_visited_texts_from_csv(visited_texts)
-        
-        # 从指定位置开始递归遍历
-        self.resume_recursive_traverse(level, next_path_parts, visited_texts)
-        
-        return True
+        self.logger.info("📭 未找到保存的遍历边界，从根节点重新播种（已记录的页面不重复记录）")
+        frontier = self.create_frontier()
+        self.seed_root_frontier(frontier)
+        return frontier, visited_keys
     
-    def populate_visited_texts_from_csv(self, visited_texts: set):
-        """从CSV文件中读取已访问的项目名称"""
+    def populate_visited_keys_from_csv(self, visited_keys: set):
+        """读取已访问的节点标识（优先状态库；旧版CSV无标识列时以规范化标题兜底）"""
+        store = self.get_state_store()
+        if store and store.has_visits():
+            visited_keys.update(store.visited_keys())
+            self.logger.info(f"📋 从状态库读取已访问节点: {len(visited_keys)} 个")
+            return
+        
         csv_file = os.path.join(self.output_dir, "directory_traverse_log.csv")
         
         if not os.path.exists(csv_file):
@@ -265,119 +265,14 @@ class ResumeHandlerMixin:
                 next(reader)  # 跳过标题行
                 
                 for row in reader:
-                    if len(row) >= 2:
+                    if len(row) >= 7 and row[6].strip():
+                        visited_keys.add(row[6].strip())  # 节点标识列
+                    elif len(row) >= 2:
                         name = row[1].strip()  # 目录项名称列
                         if name:
-                            visited_texts.add(name)
+                            visited_keys.add(NodeIndex.make_key(title=name))
                             
-            self.logger.info(f"📋 从CSV读取已访问项目: {len(visited_texts)} 个")
+            self.logger.info(f"📋 从CSV读取已访问节点: {len(visited_keys)} 个")
             
         except Exception as e:
             self.logger.error(f"读取已访问项目失败: {e}")
-    
-    def resume_recursive_traverse(self, level: int, start_path_parts: List[int], visited_texts: set):
-        """从指定位置开始的递归遍历"""
-        max_depth = 10
-        if level > max_depth:
-            self.logger.warning(f"⚠️ 达到最大递归深度 {max_depth}，停止遍历")
-            return
-        
-        indent = "  " * level
-        self.logger.info(f"{indent}🌲 从断点续传位置开始第 {level + 1} 层遍历...")
-        
-        try:
-            # 获取当前层级的所有项目
-            current_items = self.find_sidebar_items_fresh()
-            
-            if not current_items:
-                self.logger.info(f"{indent}📭 第 {level + 1} 层未找到项目")
-                return
-            
-            # 确定开始的索引位置
-            start_index = start_path_parts[level] if level < len(start_path_parts) else 1
-            
-            # 从指定索引开始处理
-            for i in range(start_index, len(current_items) + 1):
-                if i > len(current_items):
-                    break
-                
-                item = current_items[i - 1]  # 转换为0基索引
-                item_name = item['name']
-                
-                # 跳过已访问的项目
-                if item_name in visited_texts:
-                    self.logger.info(f"{indent}⏭️ 跳过已访问项目: {item_name}")
-                    continue
-                
-                # 生成当前项目的路径
-                current_path = start_path_parts[:level] + [i]
-                path_str = "-".join(map(str, current_path))
-                
-                self.logger.info(f"{indent}📄 [{path_str}] 处理: {item_name}")
-                
-                # 标记为已访问
-                visited_texts.add(item_name)
-                
-                # 访问控制
-                if self.stats.get("successful_access", 0) > 0 or i > start_index:
-                    delay = self.wait_with_respect()
-                
-                try:
-                    # 重新获取元素并点击
-                    fresh_element = self.find_element_by_text(item_name)
-                    if not fresh_element:
-                        self.logger.warning(f"{indent}⚠️ 无法重新定位元素: {item_name}")
-                        continue
-                    
-                    click_success = self.click_element_safe(fresh_element, item_name)
-                    if not click_success:
-                        self.logger.warning(f"{indent}❌ 点击失败: {item_name}")
-                        continue
-                    
-                    # 等待页面响应
-                    time.sleep(2)
-                    
-                    # 提取并记录页面信息
-                    page_info = self.extract_page_info()
-                    if page_info:
-                        page_info['directory_item'] = item_name
-                        page_info['level'] = level + 1
-                        page_info['index'] = path_str
-                        
-                        self.access_log.append(page_info)
-                        self.stats["successful_access"] = self.stats.get("successful_access", 0) + 1
-                        
-                        # 立即保存到CSV
-                        self.save_single_record_to_csv(page_info)
-                        
-                        self.logger.info(f"{indent}✅ 成功记录: {self.driver.title[:50]}...")
-                    
-                    # 【可选：下载当前文档】
-                    if hasattr(self, 'enable_download') and self.enable_download:
-                        self.attempt_download_current_document(indent, item_name)
-                    
-                    # 检查是否有子项目
-                    time.sleep(1)
-                    items_after_click = self.find_sidebar_items_fresh()
-                    
-                    if len(items_after_click) > len(current_items):
-                        self.logger.info(f"{indent}🔍 发现 {item_name} 的子目录，开始递归...")
-                        self.resume_recursive_traverse(level + 1, current_path + [1], visited_texts)
-                        
-                        # 递归返回后重新获取DOM状态
-                        current_items = self.find_sidebar_items_fresh()
-                
-                except Exception as e:
-                    self.logger.error(f"{indent}❌ 处理项目 '{item_name}' 时出错: {e}")
-                    self.failed_items.append({
-                        'name': item_name,
-                        'level': level + 1,
-                        'reason': str(e),
-                        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-                    })
-                    continue
-            
-            self.logger.info(f"{indent}✅ 第 {level + 1} 层断点续传遍历完成")
-            
-        except Exception as e:
-            self.logger.error(f"{indent}❌ 第 {level + 1} 层断点续传遍历失败: {e}")
\ No newline at end of file
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+运行差异模块
+比较两次遍历的输出（访问记录CSV或SQLite状态库），按稳定标识（wiki token优先，其次节点标识）
+用哈希连接找出新增、删除、重命名、移动和更换父节点的文档，输出机器可读的JSON
+
+用法: python -m directory_traverser.run_diff <旧快照> <新快照> [-o diff.json]
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from typing import Optional, Dict, List
+
+from .node_index import normalize_title, extract_wiki_token
+
+
+def record_identity(node_key: str, url: str) -> Optional[str]:
+    """文档的稳定标识：wiki token（移动、重命名后不变），没有token时使用节点标识"""
+    if node_key and node_key.startswith('token:'):
+        return node_key
+    token = extract_wiki_token(url)
+    if token:
+        return f"token:{token}"
+    return node_key or None
+
+
+def parent_path_index(path_index: str) -> Optional[str]:
+    """序号路径的父路径（'1-2-3' -> '1-2'，根节点返回None）"""
+    if not path_index or '-' not in path_index:
+        return None
+    return path_index.rsplit('-', 1)[0]
+
+
+def build_snapshot(rows: List[Dict]) -> Dict[str, Dict]:
+    """把访问记录行整理为快照：稳定标识 -> {'id', 'title', 'url', 'path_index', 'parent', 'node_key'}
+    
+    同一文档多次出现时以最后一条为准；没有记录父节点时按序号路径推出父节点
+    """
+    snapshot: Dict[str, Dict] = {}
+    key_to_id: Dict[str, str] = {}
+    path_to_id: Dict[str, str] = {}
+    
+    for row in rows:
+        identity = record_identity(row.get('node_key'), row.get('url'))
+        if not identity:
+            continue
+        snapshot[identity] = {
+            'id': identity,
+            'title': row.get('name') or '',
+            'url': row.get('url') or '',
+            'path_index': row.get('path_index') or '',
+            'node_key': row.get('node_key') or '',
+            'parent_key': row.get('parent'),
+        }
+        if row.get('node_key'):
+            key_to_id[row['node_key']] = identity
+        if row.get('path_index'):
+            path_to_id[row['path_index']] = identity
+    
+    for record in snapshot.values():
+        parent_key = record.pop('parent_key')
+        if parent_key:
+            record['parent'] = key_to_id.get(parent_key, parent_key)
+        else:
+            record['parent'] = path_to_id.get(parent_path_index(record['path_index']))
+    
+    return snapshot
+
+
+def load_csv_snapshot(csv_file: str) -> Dict[str, Dict]:
+    """读取访问记录CSV（序号, 名称, URL, ..., 节点标识）"""
+    rows = []
+    with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # 跳过标题行
+        for row in reader:
+            if len(row) < 3:
+                continue
+            rows.append({
+                'path_index': row[0].strip(),
+                'name': row[1].strip(),
+                'url': row[2].strip(),
+                'node_key': row[6].strip() if len(row) >= 7 else ''
+            })
+    return build_snapshot(rows)
+
+
+def load_store_snapshot(db_file: str) -> Dict[str, Dict]:
+    """只读打开状态库：每个节点最近一次访问，墓碑节点不计入"""
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        node_columns = {row['name'] for row in conn.execute("PRAGMA table_info(nodes)")}
+        tombstone_filter = "WHERE n.deleted_at IS NULL" if 'deleted_at' in node_columns else ""
+        rows = conn.execute(
+            f"""SELECT v.path_index, v.name, v.url, v.node_key, n.parent
+                FROM (SELECT node_key, path_index, name, url, MAX(seq) FROM visits GROUP BY node_key) v
+                LEFT JOIN nodes n ON n.key = v.node_key
+                {tombstone_filter}
+                ORDER BY v.path_index"""
+        ).fetchall()
+    finally:
+        conn.close()
+    return build_snapshot([dict(row) for row in rows])
+
+
+def load_snapshot(path: str) -> Dict[str, Dict]:
+    """按文件类型读取快照（.db/.sqlite为状态库，其余按CSV读取；目录时取其中的状态库或CSV）"""
+    if os.path.isdir(path):
+        db_file = os.path.join(path, "crawl_state.db")
+        path = db_file if os.path.exists(db_file) else os.path.join(path, "directory_traverse_log.csv")
+    if path.endswith(('.db', '.sqlite', '.sqlite3')):
+        return load_store_snapshot(path)
+    return load_csv_snapshot(path)
+
+
+def title_paths(snapshot: Dict[str, Dict], titles: Dict[str, str]) -> Dict[str, str]:
+    """每个文档从根到自身的规范化标题路径（沿父节点向上，逐层缓存）"""
+    paths: Dict[str, str] = {}
+    for identity in snapshot:
+        chain = []
+        current = identity
+        while current in snapshot and current not in paths and current not in chain:
+            chain.append(current)
+            current = snapshot[current].get('parent')
+        prefix = paths.get(current, '')
+        for node in reversed(chain):
+            prefix = f"{prefix}/{titles[node]}" if prefix else titles[node]
+            paths[node] = prefix
+    return paths
+
+
+def diff_snapshots(old: Dict[str, Dict], new: Dict[str, Dict]) -> Dict:
+    """以稳定标识哈希连接两个快照，返回差异
+    
+    一个文档可同时属于多个类别（例如重命名并更换父节点）：
+    - renamed: 标题变化
+    - reparented: 父节点变化
+    - moved: 父节点未变但所在路径变化（祖先被移动或重命名）
+    """
+    # 每个快照的标题只规范化一次
+    old_titles = {identity: normalize_title(record['title']) for identity, record in old.items()}
+    new_titles = {identity: normalize_title(record['title']) for identity, record in new.items()}
+    old_paths = title_paths(old, old_titles)
+    new_paths = title_paths(new, new_titles)
+    
+    def entry(identity: str) -> Dict:
+        return {'id': identity, 'old': old.get(identity), 'new': new.get(identity)}
+    
+    added = [new[identity] for identity in new if identity not in old]
+    removed = [old[identity] for identity in old if identity not in new]
+    renamed, reparented, moved = [], [], []
+    
+    for identity, current in new.items():
+        previous = old.get(identity)
+        if previous is None:
+            continue
+        if old_titles[identity] != new_titles[identity]:
+            renamed.append(entry(identity))
+        if previous.get('parent') != current.get('parent'):
+            reparented.append(entry(identity))
+        elif old_paths.get(identity, '').rsplit('/', 1)[0] != new_paths.get(identity, '').rsplit('/', 1)[0]:
+            moved.append(entry(identity))
+    
+    changed_ids = {item['id'] for group in (renamed, reparented, moved) for item in group}
+    return {
+        'summary': {
+            'old_documents': len(old),
+            'new_documents': len(new),
+            'added': len(added),
+            'removed': len(removed),
+            'renamed': len(renamed),
+            'reparented': len(reparented),
+            'moved': len(moved),
+            'unchanged': len(new) - len(added) - len(changed_ids)
+        },
+        'added': added,
+        'removed': removed,
+        'renamed': renamed,
+        'reparented': reparented,
+        'moved': moved,
+        # 增量下载的输入：新增文档和保存位置会变化的文档
+        'download': [new[identity] for identity in new if identity not in old or identity in changed_ids]
+    }
+
+
+def diff_runs(old_path: str, new_path: str) -> Dict:
+    """读取两个快照并计算差异"""
+    start_time = time.time()
+    old = load_snapshot(old_path)
+    new = load_snapshot(new_path)
+    diff = diff_snapshots(old, new)
+    diff['source'] = {'old': old_path, 'new': new_path, 'elapsed_seconds': round(time.time() - start_time, 3)}
+    return diff
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="比较两次遍历的输出（CSV或状态库），输出JSON差异")
+    parser.add_argument('old', help="旧快照：directory_traverse_log.csv、crawl_state.db 或输出目录")
+    parser.add_argument('new', help="新快照：directory_traverse_log.csv、crawl_state.db 或输出目录")
+    parser.add_argument('-o', '--output', help="差异JSON输出文件（默认输出到标准输出）")
+    args = parser.parse_args(argv)
+    
+    diff = diff_runs(args.old, args.new)
+    summary = diff['summary']
+    print(f"📊 新增 {summary['added']}, 删除 {summary['removed']}, 重命名 {summary['renamed']}, "
+          f"更换父节点 {summary['reparented']}, 移动 {summary['moved']}, 未变化 {summary['unchanged']} "
+          f"（{diff['source']['elapsed_seconds']}秒）", file=sys.stderr)
+    
+    if args.output:
+        tmp_file = args.output + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(diff, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, args.output)
+        print(f"💾 差异已保存: {args.output}", file=sys.stderr)
+    else:
+        json.dump(diff, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
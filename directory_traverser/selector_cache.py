@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+选择器缓存模块
+记录目录发现中产出目录项的获胜选择器，按知识空间/页面类型持久化到磁盘；
+命中/未命中只在内存中计数，获胜选择器变化时立即保存，其余在检查点和退出时保存
+"""
+
+import os
+import re
+import json
+import atexit
+import threading
+from datetime import datetime
+from typing import Optional, List, Tuple
+from urllib.parse import urlparse
+
+
+class SelectorCacheMixin:
+    """获胜选择器缓存功能混入类"""
+    
+    def get_selector_cache_file(self) -> str:
+        """获取选择器缓存文件路径"""
+        return os.path.join(self.output_dir, "selector_cache.json")
+    
+    def load_selector_cache(self) -> dict:
+        """加载选择器缓存（只在首次使用时读取磁盘）"""
+        if getattr(self, 'selector_cache', None) is not None:
+            return self.selector_cache
+        
+        self.selector_cache = {}
+        self.selector_cache_dirty = False
+        atexit.register(self.flush_selector_cache)
+        cache_file = self.get_selector_cache_file()
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    self.selector_cache = json.load(f)
+                self.logger.debug(f"加载选择器缓存: {len(self.selector_cache)} 个作用域")
+            except Exception as e:
+                self.logger.warning(f"读取选择器缓存失败，将重新学习: {e}")
+                self.selector_cache = {}
+        
+        return self.selector_cache
+    
+    def save_selector_cache(self):
+        """保存选择器缓存（先写临时文件再替换，避免中断时损坏）"""
+        cache_file = self.get_selector_cache_file()
+        # 临时文件名带进程和线程标识，多个标签页/进程同时保存时互不截断
+        tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.load_selector_cache(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, cache_file)
+            self.selector_cache_dirty = False
+        except Exception as e:
+            self.logger.warning(f"保存选择器缓存失败: {e}")
+    
+    def flush_selector_cache(self):
+        """保存内存中尚未写入磁盘的命中/未命中计数（检查点和退出时调用）"""
+        if getattr(self, 'selector_cache_dirty', False):
+            self.save_selector_cache()
+    
+    def get_selector_cache_scope(self) -> str:
+        """根据当前URL计算缓存作用域（知识空间优先，其次页面类型）"""
+        try:
+            parsed = urlparse(self.driver.current_url)
+        except Exception:
+            return "default"
+        
+        # 知识空间页面: /wiki/space/<space_id>
+        space_match = re.search(r'/wiki/space/([A-Za-z0-9_-]+)', parsed.path)
+        if space_match:
+            return f"{parsed.netloc}/wiki/space/{space_match.group(1)}"
+        
+        # 其余按页面类型区分: /wiki/<token> -> wiki, /drive/... -> drive
+        segments = [segment for segment in parsed.path.split('/') if segment]
+        page_type = segments[0] if segments else "root"
+        return f"{parsed.netloc}/{page_type}"
+    
+    def get_cached_selector(self) -> Optional[str]:
+        """获取当前作用域缓存的获胜选择器"""
+        entry = self.load_selector_cache().get(self.get_selector_cache_scope())
+        if entry and entry.get('selector') in self.SIDEBAR_SELECTORS:
+            return entry['selector']
+        return None
+    
+    def record_winning_selector(self, selector: str, item_count: int, found_selectors: List[Tuple[str, int]] = None):
+        """记录完整选择器列表中贡献唯一目录项最多的选择器"""
+        scope = self.get_selector_cache_scope()
+        cache = self.load_selector_cache()
+        previous = cache.get(scope, {})
+        
+        cache[scope] = {
+            'selector': selector,
+            'item_count': item_count,
+            'hits': previous.get('hits', 0) if previous.get('selector') == selector else 0,
+            'misses': previous.get('misses', 0),
+            'matched_selectors': [list(entry) for entry in (found_selectors or [])],
+            'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        
+        if previous.get('selector') != selector:
+            self.logger.info(f"🧠 学习到获胜选择器 [{scope}]: {selector} ({item_count} 个唯一项)")
+            self.save_selector_cache()
+        else:
+            self.selector_cache_dirty = True
+    
+    def record_selector_hit(self, selector: str, item_count: int):
+        """记录缓存选择器命中（只更新内存）"""
+        entry = self.load_selector_cache().setdefault(self.get_selector_cache_scope(), {'selector': selector})
+        entry['hits'] = entry.get('hits', 0) + 1
+        entry['item_count'] = item_count
+        self.selector_cache_dirty = True
+    
+    def record_selector_miss(self, selector: str):
+        """记录缓存选择器未命中（只更新内存，随后会回退到完整选择器列表并重新学习）"""
+        entry = self.load_selector_cache().setdefault(self.get_selector_cache_scope(), {'selector': selector})
+        entry['misses'] = entry.get('misses', 0) + 1
+        self.selector_cache_dirty = True
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+遍历状态存储模块
+嵌入式SQLite（WAL模式、批量事务）保存节点、访问记录、下载和失败项，
+断点续传、去重和报告均使用索引查询；权限/失败日志由存储导出，
+访问记录CSV由记录写入器实时写入（崩溃安全，也覆盖启用状态库之前的记录）
+"""
+
+import sqlite3
+import threading
+from typing import Optional, List, Dict, Set
+
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS nodes (
+    key TEXT PRIMARY KEY,
+    title TEXT,
+    parent TEXT,
+    url TEXT,
+    token TEXT,
+    depth INTEGER,
+    visited INTEGER DEFAULT 0,
+    deleted_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_nodes_token ON nodes(token);
+CREATE INDEX IF NOT EXISTS idx_nodes_parent ON nodes(parent);
+
+CREATE TABLE IF NOT EXISTS visits (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    node_key TEXT,
+    path_index TEXT,
+    name TEXT,
+    url TEXT,
+    title TEXT,
+    level INTEGER,
+    timestamp TEXT,
+    response_time REAL,
+    worker_id INTEGER,
+    doc_type TEXT,
+    owner TEXT,
+    modified_time TEXT,
+    word_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_visits_node ON visits(node_key);
+CREATE INDEX IF NOT EXISTS idx_visits_path ON visits(path_index);
+
+CREATE TABLE IF NOT EXISTS downloads (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    node_key TEXT,
+    name TEXT,
+    url TEXT,
+    status TEXT,
+    duration REAL,
+    timestamp TEXT,
+    file TEXT,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_downloads_node ON downloads(node_key);
+
+CREATE TABLE IF NOT EXISTS failures (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT,
+    name TEXT,
+    href TEXT,
+    level INTEGER,
+    reason TEXT,
+    status TEXT,
+    marker TEXT,
+    timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_failures_kind ON failures(kind);
+
+CREATE TABLE IF NOT EXISTS export_jobs (
+    key TEXT PRIMARY KEY,
+    name TEXT,
+    url TEXT,
+    status TEXT,
+    requested_at TEXT,
+    ready_at TEXT,
+    finished_at TEXT,
+    file TEXT,
+    size INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_export_jobs_status ON export_jobs(status);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 页面元数据列（旧状态库打开时补齐）
+VISIT_METADATA_COLUMNS = {
+    'doc_type': 'TEXT',
+    'owner': 'TEXT',
+    'modified_time': 'TEXT',
+    'word_count': 'INTEGER'
+}
+
+# 墓碑列：增量遍历中已从目录树消失的节点
+NODE_TOMBSTONE_COLUMNS = {
+    'deleted_at': 'TEXT'
+}
+
+# 下载文件列：监视下载目录确认的文件路径和大小
+DOWNLOAD_FILE_COLUMNS = {
+    'file': 'TEXT',
+    'size': 'INTEGER'
+}
+
+# 失败类型
+FAILURE_FAILED = "failed"
+FAILURE_PERMISSION = "permission"
+
+
+class CrawlStateStore:
+    """线程安全的遍历状态存储（多标签页共享同一个连接）"""
+    
+    def __init__(self, db_file: str, batch_size: int = 50):
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.lock = threading.RLock()
+        self.pending = 0
+        
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA_SQL)
+        self.migrate_columns('visits', VISIT_METADATA_COLUMNS)
+        self.migrate_columns('nodes', NODE_TOMBSTONE_COLUMNS)
+        self.migrate_columns('downloads', DOWNLOAD_FILE_COLUMNS)
+        self.conn.commit()
+    
+    def migrate_columns(self, table: str, columns: Dict[str, str]):
+        """给旧版本状态库的表补齐新增列"""
+        existing = {row['name'] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+        for name, column_type in columns.items():
+            if name not in existing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+    
+    def _execute(self, sql: str, params=()):
+        """写操作：累积到批量事务中，达到批量大小时提交"""
+        with self.lock:
+            self.conn.execute(sql, params)
+            self.pending += 1
+            if self.pending >= self.batch_size:
+                self.commit()
+    
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+    
+    def commit(self):
+        """提交当前批量事务"""
+        with self.lock:
+            self.conn.commit()
+            self.pending = 0
+    
+    def checkpoint(self):
+        """检查点：提交事务并把WAL合并回主库"""
+        with self.lock:
+            self.commit()
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    
+    def close(self):
+        with self.lock:
+            if self.conn is None:
+                return
+            self.checkpoint()
+            self.conn.close()
+            self.conn = None
+    
+    def reset(self):
+        """清空所有状态，准备重新开始"""
+        with self.lock:
+            for table in ('nodes', 'visits', 'downloads', 'failures', 'export_jobs', 'meta'):
+                self.conn.execute(f"DELETE FROM {table}")
+            self.commit()
+    
+    # ---- 写入 ----
+    
+    def upsert_node(self, key: str, title: str, parent: str = None, url: str = None, token: str = None,
+                    depth: int = None, visited: bool = False):
+        """插入或更新节点（空值不覆盖已有值）"""
+        self._execute(
+            """INSERT INTO nodes (key, title, parent, url, token, depth, visited) VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(key) DO UPDATE SET
+                   title = COALESCE(NULLIF(excluded.title, ''), title),
+                   parent = COALESCE(excluded.parent, parent),
+                   url = COALESCE(excluded.url, url),
+                   token = COALESCE(excluded.token, token),
+                   depth = COALESCE(excluded.depth, depth),
+                   visited = MAX(visited, excluded.visited),
+                   deleted_at = CASE WHEN excluded.visited THEN NULL ELSE deleted_at END""",
+            (key, title, parent, url, token, depth, int(visited))
+        )
+    
+    def record_visit(self, page_info: Dict, worker_id: int = 0):
+        """记录一次成功访问"""
+        self._execute(
+            """INSERT INTO visits (node_key, path_index, name, url, title, level, timestamp, response_time, worker_id,
+                                  doc_type, owner, modified_time, word_count)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                page_info.get('node_key'),
+                page_info.get('index'),
+                page_info.get('directory_item'),
+                page_info.get('url'),
+                page_info.get('title'),
+                page_info.get('level'),
+                page_info.get('timestamp'),
+                page_info.get('response_time'),
+                worker_id,
+                page_info.get('doc_type'),
+                page_info.get('owner'),
+                page_info.get('modified_time'),
+                page_info.get('word_count')
+            )
+        )
+        if page_info.get('node_key'):
+            self.upsert_node(page_info['node_key'], page_info.get('directory_item', ''), parent=page_info.get('parent_key'),
+                             url=page_info.get('url'), depth=page_info.get('level'), visited=True)
+    
+    def mark_tombstones(self, keys: List[str], timestamp: str) -> int:
+        """把已从目录树消失的节点标记为墓碑，返回标记数量"""
+        with self.lock:
+            self.conn.executemany("UPDATE nodes SET deleted_at = ? WHERE key = ? AND deleted_at IS NULL",
+                                  [(timestamp, key) for key in keys])
+            self.commit()
+        return len(keys)
+    
+    def record_failure(self, kind: str, item: Dict):
+        """记录失败项或权限不足项"""
+        self._execute(
+            """INSERT INTO failures (kind, name, href, level, reason, status, marker, timestamp)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (kind, item.get('name'), item.get('href'), item.get('level'), item.get('reason'),
+             item.get('status'), item.get('marker'), item.get('timestamp'))
+        )
+    
+    def record_download(self, name: str, url: str, status: str, duration: float, timestamp: str,
+                        node_key: str = None, file: str = None, size: int = None):
+        """记录一次下载结果（requested: 已请求导出；success: 文件已落盘或无法确认时已请求；unconfirmed: 超时未出现文件）"""
+        self._execute(
+            "INSERT INTO downloads (node_key, name, url, status, duration, timestamp, file, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (node_key, name, url, status, duration, timestamp, file, size)
+        )
+    
+    def record_export_job(self, job: Dict):
+        """写入文档的批量导出状态（同一文档只保留最新状态）"""
+        self._execute(
+            """INSERT OR REPLACE INTO export_jobs
+               (key, name, url, status, requested_at, ready_at, finished_at, file, size, error)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (job['key'], job.get('name'), job.get('url'), job['status'], job.get('requested_at'),
+             job.get('ready_at'), job.get('finished_at'), job.get('file'), job.get('size'), job.get('error'))
+        )
+    
+    def save_meta(self, key: str, value: str):
+        """保存键值（如遍历边界），与访问记录在同一批事务中提交"""
+        self._execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+    
+    # ---- 查询 ----
+    
+    def load_meta(self, key: str) -> Optional[str]:
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+    
+    def visit_count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM visits")[0][0]
+    
+    def has_visits(self) -> bool:
+        """是否已有访问记录（不做全表计数）"""
+        return bool(self._query("SELECT 1 FROM visits LIMIT 1"))
+    
+    def last_visit(self) -> Optional[Dict]:
+        """最后一条访问记录"""
+        rows = self._query("SELECT * FROM visits ORDER BY seq DESC LIMIT 1")
+        return dict(rows[0]) if rows else None
+    
+    def get_visit_by_path(self, path_index: str) -> Optional[Dict]:
+        """按路径序号查找访问记录"""
+        rows = self._query("SELECT * FROM visits WHERE path_index = ? ORDER BY seq DESC LIMIT 1", (path_index,))
+        return dict(rows[0]) if rows else None
+    
+    def is_visited(self, node_key: str) -> bool:
+        return bool(self._query("SELECT 1 FROM visits WHERE node_key = ? LIMIT 1", (node_key,)))
+    
+    def visited_keys(self) -> Set[str]:
+        return {row[0] for row in self._query("SELECT DISTINCT node_key FROM visits WHERE node_key IS NOT NULL AND node_key != ''")}
+    
+    def path_name_mapping(self) -> Dict[str, str]:
+        return {row['path_index']: row['name'] for row in self._query("SELECT path_index, name FROM visits ORDER BY seq")}
+    
+    def node_baseline(self) -> Dict[str, Dict]:
+        """上次运行的节点基线：已访问且未删除的节点及其最近一次访问的修改时间、耗时和下载耗时"""
+        rows = self._query(
+            """SELECT n.key, n.title, n.parent, n.url, v.modified_time, v.response_time, d.duration AS download_duration
+               FROM nodes n
+               LEFT JOIN (SELECT node_key, modified_time, response_time, MAX(seq) FROM visits GROUP BY node_key) v
+                   ON v.node_key = n.key
+               LEFT JOIN (SELECT node_key, duration, MAX(seq) FROM downloads WHERE status = 'success' GROUP BY node_key) d
+                   ON d.node_key = n.key
+               WHERE n.visited = 1 AND n.deleted_at IS NULL"""
+        )
+        return {row['key']: dict(row) for row in rows}
+    
+    def tombstones(self) -> List[Dict]:
+        """已标记为墓碑的节点"""
+        return [dict(row) for row in self._query("SELECT * FROM nodes WHERE deleted_at IS NOT NULL ORDER BY deleted_at, key")]
+    
+    def visits(self) -> List[Dict]:
+        return [dict(row) for row in self._query("SELECT * FROM visits ORDER BY seq")]
+    
+    def failures(self, kind: str) -> List[Dict]:
+        return [dict(row) for row in self._query("SELECT * FROM failures WHERE kind = ? ORDER BY seq", (kind,))]
+    
+    def failure_count(self, kind: str) -> int:
+        return self._query("SELECT COUNT(*) FROM failures WHERE kind = ?", (kind,))[0][0]
+    
+    def level_counts(self) -> Dict[int, int]:
+        """各层级访问数量"""
+        rows = self._query("SELECT level, COUNT(*) FROM visits GROUP BY level ORDER BY level")
+        return {row[0]: row[1] for row in rows if row[0] is not None}
+    
+    def doc_type_counts(self) -> Dict[str, int]:
+        """各文档类型访问数量"""
+        rows = self._query("SELECT doc_type, COUNT(*) FROM visits WHERE doc_type IS NOT NULL GROUP BY doc_type")
+        return {row[0]: row[1] for row in rows}
+    
+    def download_counts(self) -> Dict[str, int]:
+        rows = self._query("SELECT status, COUNT(*) FROM downloads GROUP BY status")
+        return {row[0]: row[1] for row in rows}
+    
+    def export_jobs(self, status: str = None) -> List[Dict]:
+        if status:
+            return [dict(row) for row in self._query("SELECT * FROM export_jobs WHERE status = ?", (status,))]
+        return [dict(row) for row in self._query("SELECT * FROM export_jobs")]
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+迭代遍历引擎模块
+以显式遍历边界驱动遍历（深度优先/广度优先/优先级），没有递归深度上限；
+单标签页遍历、断点续传和多标签页并行共用同一条处理路径
+"""
+
+from typing import Dict
+
+from .frontier import TraversalFrontier
+
+
+class TraversalEngineMixin:
+    """迭代遍历引擎混入类"""
+    
+    def create_frontier(self, data: Dict = None) -> TraversalFrontier:
+        """按配置的遍历顺序创建边界（data为保存的边界时从中恢复）"""
+        if data:
+            return TraversalFrontier.from_dict(data, strategy=self.traversal_strategy)
+        return TraversalFrontier(strategy=self.traversal_strategy)
+    
+    def traverse_directory(self):
+        """遍历入口：检测断点、准备边界后由单标签页或多标签页运行"""
+        frontier, visited_keys = None, set()
+        
+        # 增量遍历：上次运行已完成时直接以其为基线开始，不询问断点续传
+        incremental_start = self.incremental and self.prepare_incremental_run()
+        
+        resume_progress = None if incremental_start else self.check_resume_progress()
+        if resume_progress:
+            resume_path, resume_name = resume_progress
+            self.logger.info(f"🔄 检测到上次中断位置: {resume_path} - {resume_name}")
+            
+            response = input(f"是否从 '{resume_name}' 位置继续？(y/n): ").strip().lower()
+            if response == 'y' or response == 'yes':
+                frontier, visited_keys = self.start_from_resume_position(resume_path, resume_name)
+            else:
+                self.logger.info("📝 选择重新开始，将清空现有进度")
+                # 清空CSV文件，重新开始
+                self.clear_csv_file()
+                self.incremental_active = False  # 状态库已清空，没有基线
+        
+        if frontier is None:
+            frontier = self.create_frontier()
+            if not self.seed_root_frontier(frontier):
+                return
+        
+        if self.parallel_tabs > 1:
+            self.parallel_traverse(frontier, visited_keys)
+        else:
+            self.run_traversal(frontier, visited_keys)
+        
+        # 墓碑只在从头完整遍历后标记（续传时中断前跳过的节点不在本次边界中）
+        if incremental_start:
+            self.finish_incremental_run(frontier)
+    
+    def seed_root_frontier(self, frontier: TraversalFrontier) -> int:
+        """用侧边栏根节点播种边界，返回播种数量"""
+        origin_url = self.driver.current_url
+        # 网络后端直接使用目录树接口返回的根节点，未捕获到时回退DOM
+        items = self.network_root_items()
+        if not items:
+            # 预先批量展开时，子节点已在目录树中渲染，遍历中无需逐个展开
+            items = self.expand_collapsed_items() if self.bulk_expand_on_start else self.find_sidebar_items_fresh()
+        if not items:
+            self.logger.warning("📭 未找到根目录项")
+            return 0
+        
+        root_depth = min(item.get('depth') or 1 for item in items)
+        roots = [item for item in items if (item.get('depth') or 1) == root_depth]
+        added = frontier.push(None, [
+            self.make_subtree_task(item, [i], 0, origin_url) for i, item in enumerate(roots, 1)
+        ])
+        self.logger.info(f"🌱 播种 {len(added)} 个根节点（遍历顺序: {frontier.strategy}）")
+        return len(added)
+    
+    def run_traversal(self, frontier: TraversalFrontier, visited_keys: set = None):
+        """单标签页运行遍历引擎，直到边界清空"""
+        self.traversal_frontier = frontier
+        self.traversal_visited = visited_keys if visited_keys is not None else set()
+        
+        processed = 0
+        task = frontier.claim()
+        while task is not None:
+            self.process_frontier_task(task)
+            processed += 1
+            if processed % self.checkpoint_every == 0:
+                self.checkpoint_records()
+            task = frontier.claim()
+        
+        self.checkpoint_records()
+        self.logger.info(f"✅ 遍历边界已清空，本次处理 {processed} 个节点")
+    
+    def process_frontier_task(self, task: Dict):
+        """处理边界中的一个节点：打开、记录（已记录的跳过），再把子节点作为新的一层压入边界"""
+        frontier = self.traversal_frontier
+        node_key = task['node_key']
+        indent = "  " * task['level']
+        path_str = "-".join(map(str, task['path']))
+        prefix = f"[标签{self.worker_id}] {indent}" if self.worker_id else indent
+        self.logger.info(f"{prefix}📄 [{path_str}] 处理: {task['name']}")
+        
+        try:
+            # 增量遍历：目录树元数据显示未变化的叶子文档无需打开
+            if self.incremental_active and node_key not in self.traversal_visited and self.skip_unchanged_leaf(task, prefix):
+                frontier.complete(node_key)
+                return
+            
+            self.wait_with_respect()
+            self.mark_navigation_start()
+            if not self.open_subtree_task(task):
+                self.logger.warning(f"{prefix}❌ 打开失败: {task['name']}")
+                self.record_failed_item(task['name'], task['level'] + 1, '打开失败')
+                self.mark_unexplored(node_key)
+                frontier.complete(node_key)
+                return
+            
+            # 等待页面响应（内容稳定即返回）
+            self.wait_for_settle(fallback_delay=2)
+            item = {'name': task['name'], 'node_key': node_key, 'token': task.get('token'),
+                    'has_children': task.get('has_children'), 'parent_key': task.get('parent_key')}
+            
+            # 断点续传时已记录的节点不重复记录，但仍需展开其子节点
+            if node_key not in self.traversal_visited:
+                self.traversal_visited.add(node_key)
+                page_info = self.record_current_page(item, task['level'], path_str, prefix)
+                if page_info and self.enable_download:
+                    if self.download_pipeline and self.download_queue is not None:
+                        # 交给下载标签页，遍历不等待导出流程
+                        self.enqueue_download(prefix, task['name'], page_info.get('url') or self.driver.current_url,
+                                              page_info.get('doc_type'), node_key)
+                    else:
+                        self.attempt_download_current_document(prefix, task['name'], page_info.get('doc_type'), node_key)
+            
+            if self.max_traversal_depth and task['level'] + 1 >= self.max_traversal_depth:
+                frontier.complete(node_key)
+                return
+            
+            # 按树结构判断子节点：发现时已确认是叶子节点的不再扫描侧边栏
+            children = self.find_child_items(item)
+            if not children:
+                frontier.complete(node_key)
+                return
+            
+            origin_url = self.driver.current_url
+            added = frontier.push(node_key, [
+                self.make_subtree_task(child, task['path'] + [j], task['level'] + 1, origin_url, node_key)
+                for j, child in enumerate(children, 1)
+            ])
+            if added:
+                self.logger.info(f"{prefix}🔍 发现 {task['name']} 的 {len(added)} 个子节点")
+        
+        except Exception as e:
+            self.logger.error(f"{prefix}❌ 处理项目 '{task['name']}' 时出错: {e}")
+            self.record_failed_item(task['name'], task['level'] + 1, str(e))
+            self.mark_unexplored(node_key)
+            frontier.complete(node_key)
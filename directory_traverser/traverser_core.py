@@ -16,9 +16,18 @@ from .extraction import ExtractionMixin
 from .reporting import ReportingMixin
 from .resume_handler import ResumeHandlerMixin
 from .download_mixin import DownloadMixin
+from .selector_cache import SelectorCacheMixin
+from .node_index import NodeIndex
+from .waits import WaitMixin
+from .parallel import ParallelTraversalMixin
+from .traversal_engine import TraversalEngineMixin
+from .virtual_sidebar import VirtualSidebarMixin
+from .incremental import IncrementalMixin
+from .download_queue import DownloadQueueMixin
+from .export_batch import BatchExportMixin
 
 
-class FeishuDirectoryTraverser(InitializationMixin, DiscoveryMixin, NavigationMixin, ExtractionMixin, ReportingMixin, ResumeHandlerMixin, DownloadMixin):
+class FeishuDirectoryTraverser(InitializationMixin, DiscoveryMixin, NavigationMixin, ExtractionMixin, ReportingMixin, ResumeHandlerMixin, DownloadMixin, SelectorCacheMixin, WaitMixin, ParallelTraversalMixin, TraversalEngineMixin, VirtualSidebarMixin, IncrementalMixin, DownloadQueueMixin, BatchExportMixin):
     """飞书知识库目录遍历器主类"""
     
     def __init__(self, output_dir: str = "/Users/abc/PycharmProjects/knowledge/output", enable_download: bool = False):
@@ -29,11 +38,90 @@ class FeishuDirectoryTraverser(InitializationMixin, DiscoveryMixin, NavigationMi
         
         # 访问控制配置
         self.access_delay = (2, 5)  # 2-5秒随机延迟
+        self.use_adaptive_rate_limit = True  # 全局自适应令牌桶（False时每次请求前按access_delay随机等待）
+        self.rate_limiter = None  # 自适应令牌桶，首次请求时按当前access_delay创建，所有标签页共享
         self.max_retries = 3
         self.retry_delay = 10
+        self.use_permission_probe = True  # 轻量权限探测（URL/标题/权限墙DOM标记），不读取整页源码
+        
+        # 下载配置
+        self.download_session = None  # 长期复用的下载会话，首次下载时创建
+        self.download_step_timeout = 5.0  # 下载流程中每一步等待菜单/按钮出现的上限（秒）
+        self.download_dir = os.path.expanduser("~/Downloads")  # Chrome下载目录，监视其中新完成的文件；None不确认落盘
+        self.download_root = None  # 归档目录树的根目录，None为output目录下的downloads
+        self.use_download_staging = False  # 每次运行通过CDP把（整个浏览器的）下载目录设为暂存目录，落盘后移入镜像知识库路径的目录树
+        self.download_staging_dir = None  # 本次运行的暂存目录
+        self.archive_owners = None  # 归档文件归属记录，首次归档时创建
+        self.download_tracker = None  # 下载目录监视器，首次下载时创建（多标签页共用）
+        self.download_max_unconfirmed = 3  # 未确认的下载达到此数量时才阻塞遍历
+        self.download_confirm_timeout = 300.0  # 请求导出后多久仍未出现文件视为未确认（秒）
+        self.download_pipeline = False  # 遍历只把文档放入下载队列，由专用下载标签页导出（会额外打开一个标签页）
+        self.download_queue_size = 20  # 下载队列容量，队列满时遍历等待
+        self.download_queue = None  # 下载队列（多标签页共用），随检查点持久化
+        self.download_worker = None  # 专用下载标签页
+        self.download_thread = None
+        self.download_batch_size = 1  # 大于1时下载标签页一次连续发起K个导出再收集落盘文件（需下载目录监视）
+        self.export_jobs = None  # 批量导出的每文档状态表
+        
+        # 目录发现配置
+        self.use_sidebar_snapshot = True  # 单次脚本获取目录树快照，元素句柄延迟解析
+        self.discovery_backend = "dom"  # "dom": 读取渲染后的目录树; "network": 解析目录树接口响应（需性能日志），DOM兜底
+        self.network_tree = None  # 网络目录树捕获，首次使用时创建
+        self.network_tree_url_patterns = None  # 目录树接口URL特征，None使用默认值
+        self.network_tree_allow_refresh = False  # 未捕获到根节点时是否允许刷新页面重新捕获（默认不刷新，回退DOM）
+        self.scroll_collect_sidebar = True  # 虚拟列表目录树按可视高度分页滚动收集
+        self.sidebar_virtualized = None  # 是否为虚拟列表，None为首次收集时自动检测
+        self.sidebar_scroll_quiet_ms = 150  # 滚动后目录树静默多久视为渲染完成（毫秒）
+        self.sidebar_offsets: Dict[str, int] = {}  # 节点标识 -> 在虚拟列表中的偏移
+        self.sidebar_coverage = None  # 最近一次完整分页收集的覆盖率
+        self.selector_cache = None  # 获胜选择器缓存，首次使用时从output目录加载
+        self.bulk_expand_on_start = False  # 开始遍历前用一次注入脚本逐层展开整棵目录树
+        self.bulk_expand_max_depth = None  # 批量展开的最大层级，None为不限制
+        self.bulk_expand_max_nodes = 2000  # 批量展开的目录树节点预算
+        self.bulk_expand_level_timeout = 5  # 每层等待懒加载子节点的上限（秒）
+        self.bulk_expand_timeout = 60  # 批量展开总时长上限（秒）
+        
+        # 导航模式配置
+        self.navigation_mode = "click"  # "click": 点击侧边栏打开; "url": 已知URL时driver.get直达，侧边栏只用于发现子节点
+        self.url_ready_timeout = 15  # URL直达后等待文档就绪的上限（秒）
+        
+        # 遍历引擎配置
+        self.traversal_strategy = "dfs"  # "dfs" / "bfs" / "shallowest"（浅层优先） / "recently_updated"（最近更新优先）
+        self.max_traversal_depth = None  # 最大遍历层数，None为不限制
+        self.checkpoint_every = 10  # 每处理多少个节点保存一次检查点（含遍历边界）
+        
+        # 增量遍历配置
+        self.incremental = False  # 以上次运行的节点索引和修改时间为基线，只记录/下载新增、移动或修改的文档
+        self.incremental_active = False  # 本次运行是否有可用基线
+        self.incremental_baseline: Dict[str, Dict] = {}  # 节点标识 -> 上次运行的标题/父节点/修改时间/耗时
+        self.incremental_unexplored: Set[str] = set()  # 打开失败、子树未能探索的节点
+        
+        # 并行遍历配置
+        self.parallel_tabs = 1  # 工作标签页数量，大于1时在同一Chrome会话中多标签页并行遍历
+        self.worker_id = 0  # 0为主标签页
+        self.parallel_checkpoint_interval = 30  # 并行遍历时主标签页保存检查点的间隔（秒）
+        
+        # 等待策略配置
+        self.use_event_waits = True  # 基于MutationObserver/URL变化的事件驱动等待，替代固定sleep
+        self.wait_ceiling = 5.0  # 单次等待上限（秒）
+        self.settle_quiet_ms = 300  # 连续无变化多久视为页面稳定（毫秒）
+        self.settle_cap_ms = 1500  # 首次变化后最多再等待多久（毫秒）
+        
+        # 记录写入配置
+        self.record_sink = None  # 长期打开的CSV写入器，首次写入时创建（多标签页共用）
+        self.record_flush_every = 20  # 缓冲多少条记录刷新一次
+        self.record_flush_interval = 5.0  # 距上次刷新超过多少秒刷新一次
+        
+        # 状态存储配置
+        self.use_state_store = True  # SQLite状态库（WAL），断点续传/去重/报告走索引查询
+        self.state_store = None  # 首次使用时在output目录创建（多标签页共用）
+        self.state_batch_size = 50  # 批量事务大小
         
         # 数据记录
         self.visited_urls: Set[str] = set()
+        self.node_index = NodeIndex()  # 稳定节点标识 -> 父子关系/标题/URL/定位器
+        self.traversal_frontier = None  # 显式遍历边界，检查点时保存，断点续传时直接恢复
+        self.traversal_visited: Set[str] = set()  # 本次遍历已记录的节点标识（多标签页共用）
         self.access_log: List[Dict] = []
         self.failed_items: List[Dict] = []
         self.permission_denied_items: List[Dict] = []
@@ -56,14 +144,17 @@ class FeishuDirectoryTraverser(InitializationMixin, DiscoveryMixin, NavigationMi
         # 初始化下载统计
         self.init_download_stats()
         
+        # 初始化等待统计
+        self.init_wait_stats()
+        
         # 设置日志
         self.setup_logging()
     
     def traverse_all_items(self):
-        """主遍历逻辑 - 多层级递归遍历"""
+        """主遍历逻辑 - 多层级迭代遍历"""
         self.logger.info("🚀 开始遍历知识库目录...")
         self.logger.info("严格遵循2-5秒访问间隔，尊重访问权限")
-        self.logger.info("🌲 支持多层级目录递归遍历")
+        self.logger.info(f"🌲 支持多层级目录遍历（遍历顺序: {self.traversal_strategy}）")
         
         self.stats["start_time"] = datetime.now()
         
@@ -93,13 +184,24 @@ class FeishuDirectoryTraverser(InitializationMixin, DiscoveryMixin, NavigationMi
             self.logger.info(f"🔗 当前URL: {current_url}")
             self.logger.info("=" * 50)
         
-        # 开始递归遍历
-        self.recursive_traverse_directory()
+        # 下载流水线：恢复上次未完成的下载队列并启动专用下载标签页
+        if self.is_download_enabled() and self.download_pipeline:
+            self.start_download_pipeline()
+        
+        # 开始遍历：迭代遍历引擎（单标签页或多标签页共用遍历边界）
+        self.traverse_directory()
+        
+        # 等待下载标签页处理完队列中的文档
+        self.finish_download_pipeline()
         
         # 更新统计信息
         self.stats["end_time"] = datetime.now()
         self.stats["total_duration"] = (self.stats["end_time"] - self.stats["start_time"]).total_seconds()
         
+        # 等待未确认的下载落盘
+        if hasattr(self, 'finish_downloads'):
+            self.finish_downloads()
+        
         # 保存结果
         self.save_results()
         
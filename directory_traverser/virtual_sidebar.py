@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+虚拟列表侧边栏模块
+目录树只渲染可视区域内的节点时，按可视高度分页滚动收集全部节点，
+按节点标识去重，并按aria-setsize核对每个父节点的子节点覆盖率
+"""
+
+from typing import Optional, Dict, List
+
+from .discovery import SIDEBAR_TREE_FUNCTIONS_JS
+
+
+# 分页滚动脚本：滚动目录树容器到指定位置，等待虚拟列表重新渲染后返回当前渲染的节点及其在列表中的偏移
+SIDEBAR_SCROLL_STEP_JS = SIDEBAR_TREE_FUNCTIONS_JS + r"""
+const selector = arguments[0];
+const targetTop = arguments[1];  // null为不滚动，只读取当前页
+const quietMs = arguments[2];
+const done = arguments[arguments.length - 1];
+
+function kbScrollContainer() {
+    const first = document.querySelector(selector);
+    let container = first ? first.parentElement : null;
+    while (container && container !== document.body) {
+        const overflow = window.getComputedStyle(container).overflowY;
+        if (container.scrollHeight > container.clientHeight + 1 && /(auto|scroll|overlay)/.test(overflow)) {
+            return container;
+        }
+        container = container.parentElement;
+    }
+    return null;
+}
+
+const container = kbScrollContainer();
+const collect = () => {
+    const nodes = kbSnapshotTree(selector);
+    if (!container) {
+        done({scrollable: false, nodes: nodes});
+        return;
+    }
+    const top = container.getBoundingClientRect().top;
+    let renderedHeight = 0;
+    nodes.forEach((node) => {
+        node.offset = Math.round(node.rect.y - top + container.scrollTop);
+        renderedHeight += node.rect.height;
+    });
+    done({
+        scrollable: true,
+        nodes: nodes,
+        scroll_top: container.scrollTop,
+        client_height: container.clientHeight,
+        scroll_height: container.scrollHeight,
+        rendered_height: renderedHeight
+    });
+};
+
+if (targetTop === null || !container) {
+    collect();
+} else {
+    container.scrollTop = targetTop;
+    // 虚拟列表在滚动事件后异步重新渲染：等待目录树静默后再读取（不依赖requestAnimationFrame，后台标签页同样可用）
+    const begin = performance.now();
+    let last = begin;
+    const observer = new MutationObserver(() => { last = performance.now(); });
+    observer.observe(container, {childList: true, subtree: true});
+    (function poll() {
+        const now = performance.now();
+        if ((now - last >= quietMs && now - begin >= 50) || now - begin >= 1000) {
+            observer.disconnect();
+            collect();
+            return;
+        }
+        setTimeout(poll, 30);
+    })();
+}
+"""
+
+
+def assign_tree_keys(nodes: List[Dict], path_prefix: List[str] = None, key_prefix: List[str] = None) -> List[Dict]:
+    """按文档顺序为合并后的节点重新生成节点标识和父节点（与快照脚本规则一致）
+    
+    单页快照只看到部分祖先节点，路径标识需要在合并全部分页后统一生成；
+    从子树中途开始收集时用path_prefix/key_prefix传入祖先的标题和标识
+    """
+    path_stack = list(path_prefix or [])
+    key_stack = list(key_prefix or [])
+    seen_keys: Dict[str, int] = {}
+    
+    for node in nodes:
+        depth = node.get('depth') or 1
+        del path_stack[max(depth - 1, 0):]
+        path_stack.append(node.get('name') or '')
+        key = f"token:{node['token']}" if node.get('token') else 'path:' + '/'.join(path_stack)
+        if key in seen_keys:
+            seen_keys[key] += 1
+            key = f"{key}#{seen_keys[key]}"
+        else:
+            seen_keys[key] = 1
+        
+        del key_stack[max(depth - 1, 0):]
+        node['parent'] = key_stack[depth - 2] if depth > 1 and len(key_stack) >= depth - 1 else None
+        node['key'] = key
+        key_stack.append(key)
+    
+    return nodes
+
+
+def sidebar_coverage(nodes: List[Dict]) -> Dict:
+    """按aria-setsize核对覆盖率：每个父节点实际收集到的子节点数 vs 预期的同级节点总数"""
+    seen: Dict[Optional[str], int] = {}
+    expected: Dict[Optional[str], int] = {}
+    for node in nodes:
+        parent = node.get('parent')
+        seen[parent] = seen.get(parent, 0) + 1
+        if node.get('setsize'):
+            expected[parent] = max(expected.get(parent, 0), node['setsize'])
+    
+    incomplete = [
+        {'parent': parent, 'seen': seen.get(parent, 0), 'expected': count}
+        for parent, count in expected.items() if seen.get(parent, 0) < count
+    ]
+    return {
+        'nodes_seen': len(nodes),
+        'nodes_expected': sum(expected.values()) + sum(count for parent, count in seen.items() if parent not in expected),
+        'parents_checked': len(expected),
+        'incomplete_parents': incomplete
+    }
+
+
+class VirtualSidebarMixin:
+    """虚拟列表侧边栏收集功能混入类"""
+    
+    def scroll_sidebar_step(self, target_top: Optional[float] = None) -> Optional[Dict]:
+        """执行一次分页脚本（target_top为None时只读取当前页），失败返回None"""
+        try:
+            self.stats["sidebar_scroll_scripts"] = self.stats.get("sidebar_scroll_scripts", 0) + 1
+            return self.driver.execute_async_script(
+                SIDEBAR_SCROLL_STEP_JS,
+                '.workspace-tree-view-node-content',
+                target_top,
+                int(self.sidebar_scroll_quiet_ms)
+            )
+        except Exception as e:
+            self.logger.debug(f"滚动目录树失败: {e}")
+            return None
+    
+    def is_sidebar_virtualized(self) -> bool:
+        """检测目录树是否为虚拟列表（容器可滚动高度远大于已渲染节点高度），结果缓存"""
+        if self.sidebar_virtualized is None:
+            page = self.scroll_sidebar_step()
+            self.sidebar_virtualized = bool(
+                page and page.get('scrollable') and
+                page['scroll_height'] > max(page['rendered_height'] * 1.5, page['client_height'])
+            )
+            if self.sidebar_virtualized:
+                self.logger.info(f"📜 目录树为虚拟列表（总高度 {page['scroll_height']}px，已渲染 {int(page['rendered_height'])}px），"
+                                 f"将分页滚动收集")
+        return self.sidebar_virtualized
+    
+    def find_subtree_items(self, parent_key: str) -> List[Dict]:
+        """获取包含指定节点子树的目录项：虚拟列表时只从该节点位置滚动到子树结束"""
+        if self.scroll_collect_sidebar and self.sidebar_offsets.get(parent_key) is not None and self.is_sidebar_virtualized():
+            return self.collect_virtualized_sidebar(anchor_key=parent_key)
+        return self.find_sidebar_items_from_snapshot()
+    
+    def collect_virtualized_sidebar(self, anchor_key: str = None) -> List[Dict]:
+        """按可视高度分页滚动收集目录树，按节点标识/偏移去重，脚本次数为 节点数/每页节点数
+        
+        步长自适应：相邻两页出现缺口时减半重试，重叠充足时逐步增大到一页渲染范围；
+        anchor_key给定时从该节点附近开始，遇到层级不深于它的节点即停止（只收集其子树）
+        """
+        first = self.scroll_sidebar_step()
+        if not first or not first.get('scrollable'):
+            return self.snapshot_nodes_to_items(first['nodes'] if first else [])
+        
+        original_top = first['scroll_top']
+        heights = sorted(node['rect']['height'] for node in first['nodes'] if node['rect']['height'] > 0)
+        row_height = heights[len(heights) // 2] if heights else 24
+        
+        # 子树模式：记录的偏移可能因上方节点展开而移动，从其上方半页开始并按标识重新定位
+        anchor = self.node_index.get(anchor_key) if anchor_key else None
+        anchor_offset, anchor_depth = None, None
+        top = 0
+        if anchor_key:
+            top = max(self.sidebar_offsets.get(anchor_key, 0) - first['client_height'] / 2, 0)
+        
+        rows: Dict[int, Dict] = {}
+        seen_tokens = set()
+        step = max(first['client_height'] - row_height, row_height)
+        previous_top, previous_bottom = None, None
+        pages, gaps = 0, 0
+        max_pages = int(first['scroll_height'] / row_height) + 10
+        
+        while pages < max_pages:
+            page = self.scroll_sidebar_step(top)
+            pages += 1
+            if not page or not page.get('scrollable') or not page['nodes']:
+                break
+            
+            offsets = [node['offset'] for node in page['nodes']]
+            if previous_bottom is not None and min(offsets) > previous_bottom + row_height * 1.5 and step > row_height:
+                # 两页之间有缺口（缓冲渲染的节点比预期少）：缩小步长重新滚动
+                gaps += 1
+                step = max(step / 2, row_height)
+                top = previous_top + step
+                continue
+            
+            for node in page['nodes']:
+                if node.get('token'):
+                    if node['token'] in seen_tokens:
+                        continue
+                    seen_tokens.add(node['token'])
+                rows.setdefault(node['offset'], node)
+            
+            if anchor_key:
+                if anchor_offset is None:
+                    anchor_offset = next((node['offset'] for node in page['nodes']
+                                          if self.matches_anchor(node, anchor_key, anchor)), None)
+                    if anchor_offset is None and pages >= 3:
+                        break
+                    anchor_depth = rows[anchor_offset].get('depth') or 1 if anchor_offset is not None else None
+                if anchor_offset is not None and any(
+                        offset > anchor_offset and (node.get('depth') or 1) <= anchor_depth for offset, node in rows.items()):
+                    break
+            if page['scroll_top'] + page['client_height'] >= page['scroll_height'] - 1:
+                break
+            
+            # 重叠充足时增大步长，最多为本页实际渲染范围减去一行
+            rendered_span = max(offsets) + row_height - min(offsets)
+            step = min(step * 1.5, max(rendered_span - row_height, row_height))
+            previous_top, previous_bottom = page['scroll_top'], max(offsets)
+            top = page['scroll_top'] + step
+        
+        self.scroll_sidebar_step(original_top)
+        self.stats["sidebar_scroll_pages"] = self.stats.get("sidebar_scroll_pages", 0) + pages
+        self.stats["sidebar_scroll_gaps"] = self.stats.get("sidebar_scroll_gaps", 0) + gaps
+        
+        ordered = [rows[offset] for offset in sorted(rows)]
+        if anchor_key:
+            if anchor_offset is None:
+                self.logger.debug(f"分页滚动未定位到节点 {anchor_key}，改为收集整棵目录树")
+                return self.collect_virtualized_sidebar()
+            ordered = self.assign_subtree_keys(ordered, anchor_offset, anchor_depth, anchor_key)
+        else:
+            assign_tree_keys(ordered)
+            self.sidebar_coverage = sidebar_coverage(ordered)
+            self.report_sidebar_coverage()
+        
+        for node in ordered:
+            self.sidebar_offsets[node['key']] = node['offset']
+        self.logger.debug(f"分页滚动收集 {len(ordered)} 个节点，{pages} 页，缺口重试 {gaps} 次")
+        return self.snapshot_nodes_to_items(ordered)
+    
+    @staticmethod
+    def matches_anchor(node: Dict, anchor_key: str, anchor: Optional[Dict]) -> bool:
+        """页面节点是否为锚点（token标识精确匹配，路径标识按标题匹配）"""
+        if node.get('token'):
+            return f"token:{node['token']}" == anchor_key
+        return bool(anchor) and node.get('name') == anchor['title']
+    
+    def assign_subtree_keys(self, ordered: List[Dict], anchor_offset: int, anchor_depth: int, anchor_key: str) -> List[Dict]:
+        """只保留锚点及其子树并生成标识，祖先标题/标识取自节点索引，锚点保持原标识"""
+        start = next(i for i, node in enumerate(ordered) if node['offset'] == anchor_offset)
+        subtree = [ordered[start]]
+        for node in ordered[start + 1:]:
+            if (node.get('depth') or 1) <= anchor_depth:
+                break
+            subtree.append(node)
+        
+        # 祖先链补齐到锚点层级，保证子节点的父节点正确指向锚点
+        ancestors = self.index_ancestor_keys(anchor_key)[-(anchor_depth - 1):] if anchor_depth > 1 else []
+        padding = anchor_depth - 1 - len(ancestors)
+        titles = [''] * padding + [self.node_index.get(key)['title'] for key in ancestors]
+        assign_tree_keys(subtree, titles, [None] * padding + ancestors)
+        
+        generated = subtree[0]['key']
+        if generated != anchor_key:
+            for node in subtree:
+                if node['parent'] == generated:
+                    node['parent'] = anchor_key
+            subtree[0]['key'] = anchor_key
+        return subtree
+    
+    def index_ancestor_keys(self, key: str) -> List[str]:
+        """节点索引中从根到该节点父节点的标识链"""
+        chain = []
+        node = self.node_index.get(key)
+        while node and node.get('parent') and node['parent'] not in chain:
+            chain.append(node['parent'])
+            node = self.node_index.get(node['parent'])
+        return [key for key in reversed(chain) if self.node_index.get(key)]
+    
+    def report_sidebar_coverage(self):
+        """输出覆盖率：收集到的节点数 vs 父节点声明的子节点数，存在缺口时告警"""
+        coverage = self.sidebar_coverage
+        self.logger.info(f"📜 目录树分页收集: {coverage['nodes_seen']} 个节点"
+                         f"（预期 {coverage['nodes_expected']}，核对 {coverage['parents_checked']} 个父节点）")
+        for gap in coverage['incomplete_parents'][:5]:
+            self.logger.warning(f"⚠️ 目录树覆盖不完整: {gap['parent'] or '根目录'} 收集到 {gap['seen']}/{gap['expected']} 个子节点")
+        if len(coverage['incomplete_parents']) > 5:
+            self.logger.warning(f"⚠️ 另有 {len(coverage['incomplete_parents']) - 5} 个父节点覆盖不完整")
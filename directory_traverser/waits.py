@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+事件驱动等待模块
+向页面注入MutationObserver和URL/标题变化监听，页面真正发生变化后立即返回，
+替代遍历循环中的固定time.sleep
+"""
+
+import time
+from typing import Optional, Dict
+
+
+# 安装变化监听（幂等）：目录树、文档区、导航（URL/标题）分别计数
+CHANGE_WATCH_INSTALL_JS = r"""
+if (!window.__kbWatch) {
+    const w = {tree: 0, doc: 0, nav: 0, last: performance.now(), url: location.href, title: document.title};
+    const bump = (kind) => { w[kind] += 1; w.last = performance.now(); };
+    const checkNav = () => {
+        if (location.href !== w.url || document.title !== w.title) {
+            w.url = location.href;
+            w.title = document.title;
+            bump('nav');
+        }
+    };
+    const observer = new MutationObserver((mutations) => {
+        for (const mutation of mutations) {
+            const target = mutation.target.nodeType === 1 ? mutation.target : mutation.target.parentElement;
+            if (!target || !target.closest) { continue; }
+            if (target.closest('[class*="workspace-tree"], [role="tree"]')) { bump('tree'); } else { bump('doc'); }
+        }
+        checkNav();
+    });
+    observer.observe(document.documentElement, {
+        childList: true, subtree: true, characterData: true,
+        attributes: true, attributeFilter: ['aria-expanded']
+    });
+    window.addEventListener('popstate', checkNav);
+    ['pushState', 'replaceState'].forEach((fn) => {
+        const original = history[fn];
+        history[fn] = function () {
+            const result = original.apply(this, arguments);
+            checkNav();
+            return result;
+        };
+    });
+    window.__kbWatch = w;
+}
+return {tree: window.__kbWatch.tree, doc: window.__kbWatch.doc, nav: window.__kbWatch.nav};
+"""
+
+# 等待变化：指定范围的计数超过基线且进入静默期后返回，超过上限则超时返回
+WAIT_FOR_CHANGE_JS = r"""
+const since = arguments[0];
+const scope = arguments[1];
+const timeoutMs = arguments[2];
+const quietMs = arguments[3];
+const settleCapMs = arguments[4];
+const done = arguments[arguments.length - 1];
+const start = performance.now();
+let firstChange = null;
+
+const changed = (w) => {
+    if (!since) { return true; }
+    if (scope === 'any') { return w.tree + w.doc + w.nav > since.tree + since.doc + since.nav; }
+    return w[scope] > since[scope];
+};
+
+(function poll() {
+    const w = window.__kbWatch;
+    const now = performance.now();
+    if (!w) {
+        // 文档已整体替换（整页导航），视为发生变化
+        done({changed: true, reloaded: true, elapsed: now - start});
+        return;
+    }
+    if (changed(w)) {
+        if (firstChange === null) { firstChange = now; }
+        if (now - w.last >= quietMs || now - firstChange >= settleCapMs) {
+            done({changed: true, elapsed: now - start});
+            return;
+        }
+    }
+    if (now - start >= timeoutMs) {
+        done({changed: false, elapsed: now - start});
+        return;
+    }
+    setTimeout(poll, 50);
+})();
+"""
+
+
+class WaitMixin:
+    """事件驱动等待功能混入类"""
+    
+    def init_wait_stats(self):
+        """初始化等待相关统计"""
+        self.stats.update({
+            "event_waits": 0,
+            "event_wait_timeouts": 0,
+            "event_wait_time": 0,
+            "idle_time_saved": 0
+        })
+    
+    def event_waits_enabled(self) -> bool:
+        """检查是否启用事件驱动等待"""
+        return getattr(self, 'use_event_waits', False) and self.driver is not None
+    
+    def arm_change_watch(self) -> Optional[Dict]:
+        """在操作前调用：安装监听并返回当前变化计数作为基线"""
+        if not self.event_waits_enabled():
+            return None
+        
+        try:
+            if not getattr(self, '_script_timeout_configured', False):
+                self.driver.set_script_timeout(self.wait_ceiling + 5)
+                self._script_timeout_configured = True
+            return self.driver.execute_script(CHANGE_WATCH_INSTALL_JS)
+        except Exception as e:
+            self.logger.debug(f"安装页面变化监听失败: {e}")
+            return None
+    
+    def wait_for_change(self, since: Optional[Dict], fallback_delay: float, scope: str = 'any',
+                        timeout: float = None) -> float:
+        """等待页面在指定范围（tree/doc/nav/any）发生变化，返回实际等待秒数
+        
+        未启用或监听不可用时退回固定等待fallback_delay秒
+        """
+        if since is None or not self.event_waits_enabled():
+            time.sleep(fallback_delay)
+            return fallback_delay
+        
+        return self._run_wait_script(since, scope, timeout, fallback_delay)
+    
+    def wait_for_settle(self, fallback_delay: float, timeout: float = None) -> float:
+        """等待页面进入静默期（不要求发生新变化），返回实际等待秒数"""
+        if not self.event_waits_enabled() or self.arm_change_watch() is None:
+            time.sleep(fallback_delay)
+            return fallback_delay
+        
+        return self._run_wait_script(None, 'any', timeout, fallback_delay)
+    
+    def _run_wait_script(self, since: Optional[Dict], scope: str, timeout: Optional[float],
+                         fallback_delay: float) -> float:
+        """执行注入的等待脚本并记录统计"""
+        ceiling = timeout if timeout is not None else self.wait_ceiling
+        start_time = time.time()
+        
+        try:
+            result = self.driver.execute_async_script(
+                WAIT_FOR_CHANGE_JS,
+                since,
+                scope,
+                int(ceiling * 1000),
+                int(self.settle_quiet_ms),
+                int(self.settle_cap_ms)
+            ) or {}
+        except Exception as e:
+            # 脚本执行期间发生整页跳转等情况，视为等待结束
+            self.logger.debug(f"等待页面变化脚本失败: {e}")
+            result = {}
+        
+        waited = time.time() - start_time
+        self.stats["event_waits"] = self.stats.get("event_waits", 0) + 1
+        self.stats["event_wait_time"] = self.stats.get("event_wait_time", 0) + waited
+        self.stats["idle_time_saved"] = self.stats.get("idle_time_saved", 0) + max(fallback_delay - waited, 0)
+        
+        if result.get('changed') is False:
+            self.stats["event_wait_timeouts"] = self.stats.get("event_wait_timeouts", 0) + 1
+            self.logger.debug(f"等待页面变化超时 ({scope}, {ceiling:.1f}秒)")
+        
+        return waited
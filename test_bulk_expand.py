@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+批量展开测试脚本
+验证一次注入脚本展开目录树：参数传递（层级/节点预算）、结果转换和失败回退
+"""
+
+import sys
+import os
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.discovery import DiscoveryMixin, BULK_EXPAND_JS
+
+
+class FakeLogger:
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+
+
+class FakeDriver:
+    """记录脚本调用并返回预设结果的驱动"""
+    
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = []
+        self.script_timeouts = []
+    
+    def set_script_timeout(self, seconds):
+        self.script_timeouts.append(seconds)
+    
+    def execute_async_script(self, script, *args):
+        self.calls.append((script, args))
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class FakeTraverser(DiscoveryMixin):
+    def __init__(self, driver):
+        self.driver = driver
+        self.logger = FakeLogger()
+        self.stats = {}
+        self.bulk_expand_max_depth = None
+        self.bulk_expand_max_nodes = 2000
+        self.bulk_expand_level_timeout = 5
+        self.bulk_expand_timeout = 60
+        self.settle_quiet_ms = 300
+        self.wait_ceiling = 5.0
+        self.fresh_calls = 0
+    
+    def find_sidebar_items_fresh(self):
+        self.fresh_calls += 1
+        return []
+
+
+def make_node(key, name, depth, parent=None):
+    return {'key': key, 'name': name, 'depth': depth, 'parent': parent, 'visible': True, 'enabled': True,
+            'rect': {'x': 20, 'y': 100 * depth}, 'has_children': depth == 1, 'expanded': True}
+
+
+def test_bulk_expand_single_call():
+    """测试一次脚本调用返回完整目录树"""
+    print("🧪 测试1: 一次调用展开整棵树")
+    print("=" * 40)
+    
+    driver = FakeDriver({
+        'nodes': [make_node('token:a', '产品手册', 1), make_node('token:b', '安装指南', 2, 'token:a')],
+        'stats': {'expanded': 1, 'levels': 1, 'truncated': False}
+    })
+    traverser = FakeTraverser(driver)
+    items = traverser.expand_collapsed_items(max_depth=3, max_nodes=100)
+    
+    assert len(driver.calls) == 1
+    script, args = driver.calls[0]
+    assert script == BULK_EXPAND_JS
+    assert args[1] == 3 and args[2] == 100
+    assert [item['node_key'] for item in items] == ['token:a', 'token:b']
+    assert items[1]['parent_key'] == 'token:a'
+    assert traverser.stats['bulk_expand_clicks'] == 1
+    # 结束后恢复事件等待使用的脚本超时
+    assert driver.script_timeouts[-1] == traverser.wait_ceiling + 5
+    print("✅ 单次调用展开正确\n")
+
+
+def test_bulk_expand_fallback():
+    """测试脚本失败时回退到当前目录树"""
+    print("🧪 测试2: 失败回退")
+    print("=" * 40)
+    
+    traverser = FakeTraverser(FakeDriver(error=RuntimeError("script timeout")))
+    items = traverser.expand_collapsed_items()
+    
+    assert items == []
+    assert traverser.fresh_calls == 1
+    assert traverser.driver.calls[0][1][1] == 0  # 不限层级时传0
+    print("✅ 失败时回退到当前目录树\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 批量展开测试")
+    print("=" * 50)
+    
+    test_bulk_expand_single_call()
+    test_bulk_expand_fallback()
+
+if __name__ == "__main__":
+    main()
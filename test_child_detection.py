@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+结构化子节点判断测试脚本
+验证按嵌套关系/层级拆分子节点、叶子节点跳过扫描和扫描节省计数
+"""
+
+import sys
+import os
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.discovery import DiscoveryMixin
+
+
+class FakeSidebar(DiscoveryMixin):
+    """用固定快照代替浏览器的侧边栏"""
+    
+    def __init__(self, snapshots):
+        self.snapshots = list(snapshots)
+        self.scans = 0
+        self.expanded_keys = []
+        self.stats = {}
+    
+    def find_sidebar_items_from_snapshot(self):
+        self.scans += 1
+        return self.snapshots.pop(0) if len(self.snapshots) > 1 else self.snapshots[0]
+    
+    def expand_sidebar_node(self, item, fresh=False):
+        self.expanded_keys.append(item['node_key'])
+        return True
+
+
+def make_item(key, name, depth, parent_key=None, has_children=None, expanded=None):
+    return {'node_key': key, 'name': name, 'depth': depth, 'parent_key': parent_key,
+            'has_children': has_children, 'expanded': expanded}
+
+
+def test_split_by_nesting():
+    """测试嵌套关系优先于层级（层级推断错误时仍能得到正确子节点）"""
+    print("🧪 测试1: 按嵌套关系拆分子节点")
+    print("=" * 40)
+    
+    items = [
+        make_item('token:a', '产品手册', 1, None, True, True),
+        make_item('token:b', '安装指南', 2, 'token:a'),
+        make_item('token:c', '常见问题', 3, 'token:a'),  # 层级计算偏差，但嵌套关系正确
+        make_item('token:d', '运维手册', 1, None),
+    ]
+    parent, children = FakeSidebar([items]).split_child_items(items, 'token:a')
+    
+    assert parent['name'] == '产品手册'
+    assert [child['node_key'] for child in children] == ['token:b', 'token:c']
+    
+    # 没有嵌套信息时按层级拆分
+    flat = [{k: v for k, v in item.items() if k != 'parent_key'} for item in items]
+    _, children = FakeSidebar([flat]).split_child_items(flat, 'token:a')
+    assert [child['node_key'] for child in children] == ['token:b']
+    print("✅ 子节点拆分正确\n")
+
+
+def test_leaf_skips_scan():
+    """测试快照已确认的叶子节点不扫描侧边栏"""
+    print("🧪 测试2: 叶子节点跳过扫描")
+    print("=" * 40)
+    
+    sidebar = FakeSidebar([[]])
+    children = sidebar.find_child_items({'name': '安装指南', 'node_key': 'token:b', 'has_children': False})
+    
+    assert children == []
+    assert sidebar.scans == 0
+    assert sidebar.stats['child_detection_scans_saved'] == 1
+    print(f"统计: {sidebar.stats}")
+    print("✅ 叶子节点未产生扫描\n")
+
+
+def test_collapsed_parent_expands_once():
+    """测试折叠的父节点只展开一次并再扫描一次"""
+    print("🧪 测试3: 折叠节点展开")
+    print("=" * 40)
+    
+    collapsed = [make_item('token:a', '产品手册', 1, None, True, False)]
+    expanded = [
+        make_item('token:a', '产品手册', 1, None, True, True),
+        make_item('token:b', '安装指南', 2, 'token:a', False),
+    ]
+    sidebar = FakeSidebar([collapsed, expanded])
+    children = sidebar.find_child_items({'name': '产品手册', 'node_key': 'token:a', 'has_children': True})
+    
+    assert [child['node_key'] for child in children] == ['token:b']
+    assert sidebar.expanded_keys == ['token:a']
+    assert sidebar.scans == 2
+    
+    # 已展开的父节点一次快照即可得到子节点
+    sidebar = FakeSidebar([expanded])
+    children = sidebar.find_child_items({'name': '产品手册', 'node_key': 'token:a'})
+    assert len(children) == 1 and sidebar.scans == 1
+    assert sidebar.stats['child_detection_scans_saved'] == 1
+    print("✅ 展开和扫描次数正确\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 结构化子节点判断测试")
+    print("=" * 50)
+    
+    test_split_by_nesting()
+    test_leaf_skips_scan()
+    test_collapsed_parent_expands_once()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+下载目录布局测试脚本
+验证：CDP设置下载目录、标题转换为安全路径、同名文档按知识库路径归档互不覆盖、
+同一父节点下的同名文档追加token区分、标题转换后文件名相同的不同文档不互相覆盖
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.download_layout import (safe_path_segment, mirror_path, place_file, ArchiveOwners,
+                                                 create_staging_dir, set_browser_download_dir)
+from directory_traverser.download_mixin import DownloadMixin
+from directory_traverser.node_index import NodeIndex
+
+
+class FakeLogger:
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+
+
+class FakeDriver:
+    def __init__(self, supported=('Browser.setDownloadBehavior',)):
+        self.supported = supported
+        self.commands = []
+    
+    def execute_cdp_cmd(self, command, params):
+        if command not in self.supported:
+            raise Exception(f"'{command}' wasn't found")
+        self.commands.append((command, params))
+        return {}
+
+
+class FakeTraverser(DownloadMixin):
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.logger = FakeLogger()
+        self.driver = FakeDriver()
+        self.download_dir = os.path.join(output_dir, "Downloads")
+        self.download_root = None
+        self.use_download_staging = True
+        self.download_staging_dir = None
+        self.node_index = NodeIndex()
+        self.stats = {"download_successful": 0, "download_unconfirmed": 0}
+    
+    def get_state_store(self):
+        return None
+
+
+def test_safe_path_segment():
+    """测试标题中的路径分隔符和非法字符被替换"""
+    print("🧪 测试1: 安全路径片段")
+    print("=" * 40)
+    
+    assert safe_path_segment('Q3/Q4 计划: 草稿?') == 'Q3_Q4 计划_ 草稿_'
+    assert safe_path_segment('..') == '_'
+    assert safe_path_segment('  说明. ') == '说明'
+    path = mirror_path('/root', ['产品', '接口/规范'], '/tmp/staging/接口_规范 (1).docx')
+    assert path == os.path.join('/root', '产品', '接口_规范.docx')
+    print("✅ 标题转换为安全路径\n")
+
+
+def test_set_download_dir_over_cdp():
+    """测试优先使用浏览器级命令，不支持时回退页面级命令"""
+    print("🧪 测试2: CDP设置下载目录")
+    print("=" * 40)
+    
+    driver = FakeDriver()
+    assert set_browser_download_dir(driver, '/tmp/staging')
+    assert driver.commands[-1] == ('Browser.setDownloadBehavior', {'behavior': 'allow', 'downloadPath': '/tmp/staging'})
+    
+    old_driver = FakeDriver(supported=('Page.setDownloadBehavior',))
+    assert set_browser_download_dir(old_driver, None)
+    assert old_driver.commands[-1] == ('Page.setDownloadBehavior', {'behavior': 'default'})
+    
+    assert not set_browser_download_dir(FakeDriver(supported=()), '/tmp/staging')
+    print("✅ CDP命令正确\n")
+
+
+def test_same_name_documents_mirrored():
+    """测试不同文件夹下的同名文档和同一文件夹下的同名文档都归档到不同位置"""
+    print("🧪 测试3: 镜像知识库路径归档")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        traverser = FakeTraverser(output_dir)
+        index = traverser.node_index
+        index.upsert('token:A', '产品')
+        index.upsert('token:B', '运营')
+        index.upsert('token:A1', '规范', parent_key='token:A', token='A1')
+        index.upsert('token:B1', '规范', parent_key='token:B', token='B1')
+        index.upsert('token:B2', '规范', parent_key='token:B', token='B2')
+        
+        assert traverser.prepare_download_staging()
+        staging = traverser.download_staging_dir
+        assert staging.startswith(os.path.join(output_dir, "downloads", ".staging"))
+        assert traverser.driver.commands[0][1]['downloadPath'] == staging
+        
+        placed = []
+        for key in ('token:A1', 'token:B1', 'token:B2'):
+            staged = os.path.join(staging, '规范.docx')
+            with open(staged, 'w', encoding='utf-8') as f:
+                f.write(key)
+            record = {'status': 'success', 'name': '规范', 'url': None, 'latency': 1.0, 'size': 10,
+                      'file': staged, 'titles': traverser.download_titles(key, '规范')}
+            traverser.on_download_confirmed(record)
+            placed.append(os.path.relpath(record['file'], os.path.join(output_dir, "downloads")))
+        
+        print(f"归档位置: {placed}")
+        assert placed == [os.path.join('产品', '规范.docx'),
+                          os.path.join('运营', '规范_B1.docx'),
+                          os.path.join('运营', '规范_B2.docx')]
+        assert os.listdir(staging) == []
+        with open(os.path.join(output_dir, "downloads", '产品', '规范.docx'), encoding='utf-8') as f:
+            assert f.read() == 'token:A1'
+        print("✅ 同名文档互不覆盖，暂存目录已清空\n")
+
+
+def test_place_file_replaces_previous_download():
+    """测试同一文档重新下载时原子替换旧文件"""
+    print("🧪 测试4: 重新下载替换")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as root:
+        staging = create_staging_dir(root, 'run1')
+        destination = os.path.join(root, '产品', '规范.docx')
+        for content in ('旧版本', '新版本'):
+            source = os.path.join(staging, '规范.docx')
+            with open(source, 'w', encoding='utf-8') as f:
+                f.write(content)
+            place_file(source, destination)
+        with open(destination, encoding='utf-8') as f:
+            assert f.read() == '新版本'
+        print("✅ 旧文件已被替换\n")
+
+
+def test_sanitized_name_collision():
+    """测试 "a/b" 与 "a:b" 都转换为 a_b 时互不覆盖，各自重新下载时替换自己的文件（跨运行保持）"""
+    print("🧪 测试5: 转换后同名的不同文档")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        traverser = FakeTraverser(output_dir)
+        index = traverser.node_index
+        index.upsert('token:P', '产品')
+        index.upsert('token:AAAA1111', 'a/b', parent_key='token:P', token='AAAA1111')
+        index.upsert('token:BBBB2222', 'a:b', parent_key='token:P', token='BBBB2222')
+        assert traverser.prepare_download_staging()
+        staging = traverser.download_staging_dir
+        
+        def download(key, title, content):
+            staged = os.path.join(staging, 'a_b.docx')
+            with open(staged, 'w', encoding='utf-8') as f:
+                f.write(content)
+            record = {'status': 'success', 'name': title, 'url': None, 'latency': 1.0, 'size': 10,
+                      'file': staged, 'node_key': key, 'titles': traverser.download_titles(key, title)}
+            traverser.on_download_confirmed(record)
+            return os.path.relpath(record['file'], os.path.join(output_dir, "downloads"))
+        
+        first = download('token:AAAA1111', 'a/b', '斜杠版本1')
+        second = download('token:BBBB2222', 'a:b', '冒号版本1')
+        print(f"归档位置: {first}, {second}")
+        assert first == os.path.join('产品', 'a_b.docx')
+        assert second == os.path.join('产品', 'a_b_BBBB2222.docx')
+        
+        # 下次运行重新下载：各自替换自己的文件
+        traverser.archive_owners = None
+        assert download('token:BBBB2222', 'a:b', '冒号版本2') == second
+        assert download('token:AAAA1111', 'a/b', '斜杠版本2') == first
+        folder = os.path.join(output_dir, "downloads", '产品')
+        assert sorted(os.listdir(folder)) == ['a_b.docx', 'a_b_BBBB2222.docx']
+        with open(os.path.join(folder, 'a_b.docx'), encoding='utf-8') as f:
+            assert f.read() == '斜杠版本2'
+        
+        # 节点索引中没有的文档按URL中的token区分
+        staged = os.path.join(staging, 'a_b.docx')
+        open(staged, 'w').close()
+        record = {'status': 'success', 'name': 'a?b', 'url': 'https://example.feishu.cn/wiki/DDDD4444xyz',
+                  'latency': 1.0, 'size': 0, 'file': staged, 'node_key': None, 'titles': ['产品', 'a?b']}
+        traverser.on_download_confirmed(record)
+        assert record['file'] == os.path.join(folder, 'a_b_DDDD4444.docx')
+        
+        # 归属未知的已有文件（例如手动放入）也不会被覆盖
+        owners = ArchiveOwners(os.path.join(output_dir, "downloads"))
+        manual = os.path.join(folder, '说明.docx')
+        open(manual, 'w').close()
+        source = os.path.join(staging, '说明.docx')
+        open(source, 'w').close()
+        assert owners.place(source, manual, 'token:CCCC3333') == os.path.join(folder, '说明_CCCC3333.docx')
+        
+        # 没有节点标识时使用空闲的文件名，不覆盖任何已有文件
+        for expected in ('说明_2.docx', '说明_3.docx'):
+            source = os.path.join(staging, '说明.docx')
+            with open(source, 'w', encoding='utf-8') as f:
+                f.write(expected)
+            assert owners.place(source, manual) == os.path.join(folder, expected)
+        with open(os.path.join(folder, '说明_CCCC3333.docx'), encoding='utf-8') as f:
+            assert f.read() == ''
+        assert all('说明_2' not in line for line in open(owners.owners_file, encoding='utf-8'))
+        print("✅ 不同文档互不覆盖\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 下载目录布局测试")
+    print("=" * 50)
+    
+    test_safe_path_segment()
+    test_set_download_dir_over_cdp()
+    test_same_name_documents_mirrored()
+    test_place_file_replaces_previous_download()
+    test_sanitized_name_collision()
+
+if __name__ == "__main__":
+    main()
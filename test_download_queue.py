@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+下载队列测试脚本
+验证：队列满时入队阻塞（背压）、重复文档不重复入队、下载标签页逐个处理（使用入队时确定的节点和标题路径）、
+队列持久化后中断的运行可恢复未完成的下载、下载标签页退出后遍历不会卡在满队列上
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.download_queue import DownloadQueue, DownloadQueueMixin
+from directory_traverser.download_mixin import DownloadMixin
+from directory_traverser.node_index import NodeIndex
+from directory_traverser.state_store import CrawlStateStore
+
+
+class FakeLogger:
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+    def error(self, message): print(message)
+
+
+class FakeTraverser(DownloadQueueMixin):
+    """只实现下载队列依赖的方法：打开URL和导出流程各耗时download_time秒"""
+    
+    def __init__(self, output_dir, download_time=0.0):
+        self.output_dir = output_dir
+        self.logger = FakeLogger()
+        self.download_queue_size = 2
+        self.download_batch_size = 1
+        self.download_queue = None
+        self.stats = {"download_skipped": 0, "download_failed": 0}
+        self.download_time = download_time
+        self.downloaded = []
+    
+    def get_state_store(self):
+        return None
+    
+    def download_titles(self, node_key, item_name):
+        return [item_name]
+    
+    def should_download_document(self, url, doc_type=None):
+        return '/wiki/' in url
+    
+    def wait_with_respect(self):
+        return 0
+    
+    def navigate_to_url(self, url, item_name=""):
+        return True
+    
+    def wait_for_settle(self, fallback_delay=2):
+        pass
+    
+    def attempt_download_current_document(self, indent="", item_name="", doc_type=None, node_key=None, titles=None):
+        time.sleep(self.download_time)
+        self.downloaded.append(item_name)
+        return True
+
+
+class FakeTracker:
+    def __init__(self):
+        self.expected = []
+    
+    def expect(self, name, url=None, node_key=None, titles=None):
+        self.expected.append((name, node_key, titles))
+    
+    def unconfirmed(self):
+        return len(self.expected)
+    
+    def wait_for_capacity(self, max_unconfirmed):
+        return 0.0
+
+
+class FakeSession:
+    def download(self, doc_type=None):
+        return True
+
+
+class FakeDriver:
+    current_url = None
+
+
+class FakeDownloadWorker(DownloadQueueMixin, DownloadMixin):
+    """下载标签页：使用真实的下载流程记账，节点索引为空（并行遍历时节点在其他标签页中发现）"""
+    
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.logger = FakeLogger()
+        self.driver = FakeDriver()
+        self.enable_download = True
+        self.download_batch_size = 1
+        self.download_max_unconfirmed = 3
+        self.node_index = NodeIndex()
+        self.tracker = FakeTracker()
+        self.stats = {"download_skipped": 0, "download_failed": 0, "download_attempted": 0, "download_requested": 0,
+                      "download_total_time": 0, "download_blocked_time": 0}
+    
+    def is_download_enabled(self):
+        return True
+    
+    def get_state_store(self):
+        return None
+    
+    def get_download_tracker(self):
+        return self.tracker
+    
+    def get_download_session(self):
+        return FakeSession()
+    
+    def wait_with_respect(self):
+        return 0
+    
+    def navigate_to_url(self, url, item_name=""):
+        self.driver.current_url = url
+        return True
+    
+    def wait_for_settle(self, fallback_delay=2):
+        pass
+
+
+def entry(name):
+    return {'key': f"token:{name}", 'name': name, 'url': f"https://example.feishu.cn/wiki/{name}"}
+
+
+def test_backpressure_and_dedupe():
+    """测试队列满时入队阻塞，领取完成后放行；重复文档不入队"""
+    print("🧪 测试1: 背压与去重")
+    print("=" * 40)
+    
+    queue = DownloadQueue(maxsize=2)
+    assert queue.put(entry('A')) is not None
+    assert queue.put(entry('A')) is None  # 已在队列中
+    assert queue.put(entry('B')) is not None
+    assert queue.put(entry('C'), timeout=0.1) is None  # 队列满
+    
+    claimed = queue.claim()
+    threading.Timer(0.2, queue.complete, (claimed['key'],)).start()
+    blocked = queue.put(entry('C'))
+    print(f"队列满时阻塞 {blocked:.2f}秒")
+    assert blocked >= 0.15
+    assert [item['name'] for item in queue.to_dict()['entries']] == ['B', 'C']
+    print("✅ 背压生效，重复文档被跳过\n")
+
+
+def test_pipeline_overlaps_traversal():
+    """测试遍历入队后立即继续，下载标签页在后台逐个导出"""
+    print("🧪 测试2: 流水线下载")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        traverser = FakeTraverser(output_dir, download_time=0.1)
+        traverser.download_queue = DownloadQueue(maxsize=2)
+        thread = threading.Thread(target=traverser.run_download_worker, daemon=True)
+        thread.start()
+        
+        start_time = time.time()
+        for name in ['A', 'B']:
+            assert traverser.enqueue_download("", name, f"https://example.feishu.cn/wiki/{name}", node_key=f"token:{name}")
+        assert not traverser.enqueue_download("", "首页", "https://example.feishu.cn/drive/home")
+        enqueue_time = time.time() - start_time
+        print(f"入队耗时 {enqueue_time:.2f}秒")
+        assert enqueue_time < 0.1
+        
+        traverser.download_queue.close()
+        thread.join(timeout=5)
+        assert traverser.downloaded == ['A', 'B']
+        assert traverser.stats['download_queued'] == 2 and traverser.stats['download_skipped'] == 1
+        assert traverser.load_download_queue().to_dict()['entries'] == []
+        print("✅ 下载标签页处理完队列，持久化队列已清空\n")
+
+
+def test_resume_pending_downloads():
+    """测试中断时保存的队列（含下载中的条目）在下次运行恢复"""
+    print("🧪 测试3: 恢复未完成的下载")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        traverser = FakeTraverser(output_dir)
+        traverser.download_queue = DownloadQueue(maxsize=3)
+        for name in ['A', 'B', 'C']:
+            traverser.download_queue.put(entry(name))
+        traverser.download_queue.claim()  # A下载中，运行中断
+        traverser.save_download_queue()
+        assert os.path.exists(traverser.get_download_queue_file())
+        
+        restored = FakeTraverser(output_dir)
+        restored.download_queue = restored.load_download_queue()
+        restored.download_queue.close()
+        restored.run_download_worker()
+        print(f"恢复后下载: {restored.downloaded}")
+        assert restored.downloaded == ['A', 'B', 'C']
+        print("✅ 无需重新遍历即可继续下载\n")
+
+
+def test_store_queue_committed():
+    """测试启用状态库时保存的队列立即提交，不等下一个批量事务"""
+    print("🧪 测试4: 状态库中的队列立即提交")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        db_file = os.path.join(output_dir, 'crawl_state.db')
+        store = CrawlStateStore(db_file, batch_size=1000)
+        traverser = FakeTraverser(output_dir)
+        traverser.get_state_store = lambda: store
+        traverser.download_queue = DownloadQueue(maxsize=3)
+        traverser.download_queue.put(entry('A'))
+        traverser.save_download_queue()
+        
+        # 模拟崩溃：另一个连接只能读到已提交的数据
+        other = CrawlStateStore(db_file)
+        saved = other.load_meta('download_queue')
+        print(f"另一连接读到: {saved}")
+        assert saved and 'token:A' in saved
+        other.close()
+        store.close()
+        print("✅ 队列已提交\n")
+
+
+def test_dead_worker_falls_back_inline():
+    """测试下载标签页已退出且队列已满时，入队不阻塞，改为遍历中直接下载"""
+    print("🧪 测试5: 下载标签页退出")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        traverser = FakeTraverser(output_dir)
+        traverser.download_queue = DownloadQueue(maxsize=1)
+        traverser.download_queue.put(entry('A'))
+        traverser.download_pipeline = True
+        traverser.download_thread = threading.Thread(target=lambda: None)
+        traverser.download_thread.start()
+        traverser.download_thread.join()
+        
+        start_time = time.time()
+        assert traverser.enqueue_download("", 'B', "https://example.feishu.cn/wiki/B", node_key="token:B")
+        elapsed = time.time() - start_time
+        print(f"耗时 {elapsed:.2f}秒, 直接下载: {traverser.downloaded}")
+        assert elapsed < 0.5
+        assert traverser.downloaded == ['B'] and not traverser.download_pipeline
+        assert [item['name'] for item in traverser.download_queue.to_dict()['entries']] == ['A']
+        print("✅ 未卡在满队列上，队列中的文档留待下次运行\n")
+
+
+def test_worker_uses_enqueued_titles():
+    """测试下载标签页的节点索引中没有该节点时，仍按入队时的节点标识和标题路径归档"""
+    print("🧪 测试6: 使用入队时的标题路径")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        worker = FakeDownloadWorker(output_dir)
+        worker.download_queue = DownloadQueue(maxsize=3)
+        worker.download_queue.put({'key': 'token:B1', 'node_key': 'token:B1', 'name': '规范',
+                                   'url': 'https://example.feishu.cn/wiki/B1', 'titles': ['运营', '规范']})
+        worker.download_queue.close()
+        worker.run_download_worker()
+        
+        print(f"登记的下载: {worker.tracker.expected}")
+        assert worker.tracker.expected == [('规范', 'token:B1', ['运营', '规范'])]
+        print("✅ 未回退为只有文档标题的路径\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 下载队列测试")
+    print("=" * 50)
+    
+    test_backpressure_and_dedupe()
+    test_pipeline_overlaps_traversal()
+    test_resume_pending_downloads()
+    test_store_queue_committed()
+    test_dead_worker_falls_back_inline()
+    test_worker_uses_enqueued_titles()
+
+if __name__ == "__main__":
+    main()
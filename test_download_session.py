@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+下载会话测试脚本
+验证会话复用：窗口尺寸只读取一次、学习到的定位器在后续文档直接命中、按文档类型走菜单分支和失败复位
+"""
+
+import sys
+import os
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from selenium.common.exceptions import NoSuchElementException
+
+import directory_traverser.download_session as download_session
+from directory_traverser.download_session import (DownloadSession, DEFAULT_LOCATORS, MENU_BRANCH_JS,
+                                                  DESCRIBE_ELEMENT_JS, text_xpath)
+
+
+class FakeLogger:
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+
+
+class FakeElement:
+    def __init__(self, page, name, locators, text='', on_click=None):
+        self.page = page
+        self.name = name
+        self.locators = set(locators)
+        self.text = text
+        self.on_click = on_click
+    
+    def is_displayed(self):
+        return self.name in self.page.visible
+    
+    def is_enabled(self):
+        return True
+    
+    def click(self):
+        self.page.clicks.append(self.name)
+        if self.on_click:
+            self.on_click()
+
+
+class FakePage:
+    """模拟三个点菜单 -> 分支菜单 -> 格式选项 -> 导出确认的页面"""
+    
+    def __init__(self, branch):
+        self.branch = branch
+        self.visible = {'more'}
+        self.clicks = []
+        self.exports = 0
+        self.window_size_calls = 0
+        menu_text = '下载为' if branch == 'download_as' else '导出'
+        self.elements = {
+            'more': FakeElement(self, 'more', [DEFAULT_LOCATORS['more_menu'][1]],
+                                on_click=lambda: self.visible.add('menu')),
+            'menu': FakeElement(self, 'menu', [DEFAULT_LOCATORS[f'menu_{branch}'][1]], text=menu_text),
+            'word': FakeElement(self, 'word', [text_xpath('Word 文档')], text='Word 文档',
+                                on_click=lambda: self.visible.update({'comments', 'confirm_export'})),
+            'excel': FakeElement(self, 'excel', [DEFAULT_LOCATORS['option_excel'][1]], text='Excel/CSV 文件',
+                                 on_click=lambda: self.visible.add('confirm_download')),
+            'comments': FakeElement(self, 'comments', [DEFAULT_LOCATORS['comments_option'][1]]),
+            'confirm_export': FakeElement(self, 'confirm_export', [DEFAULT_LOCATORS['confirm_export'][1]],
+                                          on_click=self.finish),
+            'confirm_download': FakeElement(self, 'confirm_download', [DEFAULT_LOCATORS['confirm_download'][1]],
+                                            on_click=self.finish),
+        }
+    
+    def finish(self):
+        self.exports += 1
+        self.visible = {'more'}
+    
+    def hover(self, element):
+        if element.name == 'menu':
+            self.visible.add('word' if self.branch == 'download_as' else 'excel')
+
+
+class FakeDriver:
+    def __init__(self, page):
+        self.page = page
+    
+    def get_window_size(self):
+        self.page.window_size_calls += 1
+        return {'width': 1440, 'height': 900}
+    
+    def find_element(self, by, value):
+        for element in self.page.elements.values():
+            if value in element.locators and element.is_displayed():
+                return element
+        raise NoSuchElementException(value)
+    
+    def execute_script(self, script, *args):
+        if script == MENU_BRANCH_JS:
+            if 'menu' not in self.page.visible:
+                return None
+            return {'branch': self.page.branch, 'element': self.page.elements['menu'], 'text': self.page.elements['menu'].text}
+        if script == DESCRIBE_ELEMENT_JS:
+            element = args[0]
+            return {'data_selector': None, 'aria_label': None, 'tag': 'span', 'text': element.text}
+        if script == "arguments[0].click();":
+            args[0].click()
+        if script == "document.body.click();":
+            self.page.visible = {'more'}
+        return None
+
+
+class FakeActionChains:
+    def __init__(self, driver):
+        self.driver = driver
+        self.target = None
+    
+    def move_to_element(self, element):
+        self.target = element
+        return self
+    
+    def perform(self):
+        self.driver.page.hover(self.target)
+
+
+class FakeDownloader:
+    """兜底的完整查找（模拟FastFeishuDownloader的find_*方法）"""
+    
+    def __init__(self, page):
+        self.page = page
+        self.lookups = 0
+    
+    def find_three_dots_button(self):
+        self.lookups += 1
+        return self.page.elements['more']
+    
+    def find_word_option(self):
+        self.lookups += 1
+        return self.page.elements['word'] if 'word' in self.page.visible else None
+    
+    def find_excel_option(self):
+        self.lookups += 1
+        return None
+    
+    def find_and_click_export_content_comments(self):
+        self.lookups += 1
+        return False
+    
+    def click_export_button_smart(self):
+        self.lookups += 1
+        return False
+
+
+download_session.ActionChains = FakeActionChains
+
+
+def make_session(branch):
+    page = FakePage(branch)
+    driver = FakeDriver(page)
+    downloader = FakeDownloader(page)
+    return page, downloader, DownloadSession(driver, FakeLogger(), downloader, step_timeout=0.05)
+
+
+def test_session_reuses_learned_locators():
+    """测试首次下载学习Word选项定位器，后续文档全程命中"""
+    print("🧪 测试1: 定位器学习与复用")
+    print("=" * 40)
+    
+    page, downloader, session = make_session('download_as')
+    assert session.download('docx') is True
+    assert downloader.lookups == 1  # 只有Word选项需要完整查找
+    assert session.locators['option_word'] == ('xpath', text_xpath('Word 文档'))
+    
+    for _ in range(3):
+        assert session.download('docx') is True
+    
+    stats = session.snapshot()
+    print(f"会话统计: {stats}")
+    assert page.exports == 4
+    assert downloader.lookups == 1
+    assert stats['warm_downloads'] == 3
+    assert page.window_size_calls == 1
+    print("✅ 后续文档直接命中已学习的定位器\n")
+
+
+def test_branch_detection_for_unknown_type():
+    """测试文档类型未知时一次脚本检测分支（Excel流程）"""
+    print("🧪 测试2: 未知类型检测分支")
+    print("=" * 40)
+    
+    page, downloader, session = make_session('export')
+    assert session.download(None) is True
+    assert page.exports == 1
+    assert page.clicks[-1] == 'confirm_download'
+    assert downloader.lookups == 0
+    print("✅ Excel分支流程正确\n")
+
+
+def test_failure_resets_state():
+    """测试流程失败时关闭菜单并回到空闲状态"""
+    print("🧪 测试3: 失败复位")
+    print("=" * 40)
+    
+    page, downloader, session = make_session('export')
+    page.elements['excel'].locators = set()  # 格式选项无法定位
+    assert session.download('sheet') is False
+    assert page.visible == {'more'}
+    assert session.state == 'idle'
+    assert session.snapshot()['downloads'] == 0
+    print("✅ 失败后已复位\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 下载会话测试")
+    print("=" * 50)
+    
+    test_session_reuses_learned_locators()
+    test_branch_detection_for_unknown_type()
+    test_failure_resets_state()
+
+if __name__ == "__main__":
+    main()
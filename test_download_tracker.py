@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+下载完成跟踪测试脚本
+验证：未完成文件(.crdownload)不计入、按文件名匹配请求文档（完全一致优先，无关文件不归属）、
+统计延迟和大小、未确认下载达到上限时才阻塞、超时记为未确认
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.download_tracker import DownloadTracker, file_match_key, title_match_key
+
+
+class FakeLogger:
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+
+
+def write_download(directory, name, size, delay=0.0):
+    """模拟浏览器下载：先写 .crdownload，完成后改名"""
+    partial = os.path.join(directory, name + '.crdownload')
+    with open(partial, 'wb') as f:
+        f.write(b'x' * size)
+    time.sleep(delay)
+    os.rename(partial, os.path.join(directory, name))
+
+
+def make_tracker(directory, completed, polling=False, timeout=30):
+    tracker = DownloadTracker(directory, FakeLogger(), on_complete=completed.append, poll_interval=0.05,
+                              timeout=timeout, use_inotify=not polling)
+    assert tracker.start()
+    return tracker
+
+
+def test_match_keys():
+    """测试文件名与文档标题的匹配键"""
+    print("🧪 测试1: 匹配键")
+    print("=" * 40)
+    
+    assert file_match_key('产品 手册 (1).docx') == title_match_key('产品手册')
+    assert file_match_key('Q3/数据.xlsx'.replace('/', '_')).startswith(title_match_key('Q3'))
+    print("✅ 去掉扩展名、重复序号和空白后匹配\n")
+
+
+def test_match_priority():
+    """测试完全一致的名称优先于前缀匹配，名称对不上的文件不归属任何请求"""
+    print("🧪 测试2: 匹配优先级")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        tracker = DownloadTracker(directory, FakeLogger())
+        advanced = tracker.expect('FAQ进阶')
+        basic = tracker.expect('FAQ')
+        candidates = [advanced, basic]
+        
+        assert tracker.match_ticket('FAQ.docx', candidates) is basic
+        assert tracker.match_ticket('FAQ进阶 (1).docx', candidates) is advanced
+        assert tracker.match_ticket('FA.docx', candidates) is None  # 两个请求都是前缀匹配，无法区分
+        
+        # 导出时标题被截断：只有一个请求前缀匹配时归属
+        spec = tracker.expect('产品需求文档模板')
+        assert tracker.match_ticket('产品需求.docx', candidates + [spec]) is spec
+        
+        # 只有一个待确认下载时，无关文件也不归属
+        assert tracker.match_ticket('会议纪要.pdf', [basic]) is None
+        assert tracker.match_ticket('.docx', [basic]) is None
+        print("✅ 完全一致优先，无关文件不归属\n")
+
+
+def check_matching(polling: bool):
+    mode = '轮询' if polling else 'inotify'
+    with tempfile.TemporaryDirectory() as directory:
+        open(os.path.join(directory, '旧文件.docx'), 'w').close()  # 启动前已有的文件不计入
+        completed = []
+        tracker = make_tracker(directory, completed, polling=polling)
+        
+        tracker.expect('产品手册', 'https://example.feishu.cn/wiki/A')
+        tracker.expect('数据表', 'https://example.feishu.cn/wiki/B')
+        write_download(directory, '无关文件.pdf', 512)
+        write_download(directory, '数据表.xlsx', 2048, delay=0.1)
+        write_download(directory, '产品手册.docx', 4096)
+        assert tracker.wait_all(timeout=5)
+        tracker.stop()
+        
+        by_url = {record['url']: record for record in completed}
+        print(f"{mode}完成记录: {[(r['name'], r['size'], r['latency']) for r in completed]}")
+        assert by_url['https://example.feishu.cn/wiki/A']['file'].endswith('产品手册.docx')
+        assert by_url['https://example.feishu.cn/wiki/B']['size'] == 2048
+        snapshot = tracker.snapshot()
+        assert snapshot['confirmed'] == 2 and snapshot['total_bytes'] == 6144
+        assert snapshot['unmatched_files'] == 1
+        print(f"✅ {mode}模式按文件名匹配（{snapshot['mode']}）\n")
+
+
+def test_polling_matching():
+    """测试轮询模式：.crdownload改名后按文件名匹配"""
+    print("🧪 测试3: 轮询模式匹配")
+    print("=" * 40)
+    check_matching(polling=True)
+
+
+def test_inotify_matching():
+    """测试inotify模式（仅Linux）"""
+    print("🧪 测试4: inotify模式匹配")
+    print("=" * 40)
+    if not sys.platform.startswith('linux'):
+        print("⏭️ 非Linux平台，跳过\n")
+        return
+    check_matching(polling=False)
+
+
+def test_capacity_blocking_and_timeout():
+    """测试未确认下载达到上限时阻塞，文件落盘后放行；超时记为未确认"""
+    print("🧪 测试5: 未确认上限与超时")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        completed = []
+        tracker = make_tracker(directory, completed, timeout=30)
+        tracker.expect('文档一')
+        assert tracker.wait_for_capacity(2) < 0.05  # 未达上限不阻塞
+        
+        tracker.expect('文档二')
+        writer = threading.Timer(0.3, write_download, (directory, '文档一.docx', 100))
+        writer.start()
+        blocked = tracker.wait_for_capacity(2)
+        writer.join()
+        print(f"阻塞 {blocked:.2f}秒")
+        assert blocked >= 0.25 and tracker.unconfirmed() == 1
+        
+        tracker.timeout = 0.2
+        time.sleep(0.5)
+        tracker.stop()
+        assert [record['status'] for record in completed] == ['success', 'unconfirmed']
+        assert tracker.snapshot()['unconfirmed'] == 1
+        print("✅ 达到上限时等待落盘，超时记为未确认\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 下载完成跟踪测试")
+    print("=" * 50)
+    
+    test_match_keys()
+    test_match_priority()
+    test_polling_matching()
+    test_inotify_matching()
+    test_capacity_blocking_and_timeout()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+批量导出测试脚本
+验证：一批文档连续发起导出、服务端导出耗时相互重叠、状态表经过 已请求 -> 已就绪 -> 已下载，
+超时未出现文件的文档记为失败，对应标签页在结束后关闭，批次出错时本批文档记为失败且下载标签页继续运行
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.download_queue import DownloadQueue, DownloadQueueMixin
+from directory_traverser.download_tracker import DownloadTracker
+from directory_traverser.export_batch import BatchExportMixin
+
+
+class FakeLogger:
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+    def error(self, message): print(message)
+
+
+class FakeSwitch:
+    def __init__(self, driver):
+        self.driver = driver
+    
+    def new_window(self, kind):
+        self.driver.counter += 1
+        handle = f"tab-{self.driver.counter}"
+        self.driver.handles.append(handle)
+        self.driver.current_window_handle = handle
+    
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+
+class FakeDriver:
+    def __init__(self):
+        self.counter = 0
+        self.handles = ['home']
+        self.current_window_handle = 'home'
+        self.current_url = None
+        self.switch_to = FakeSwitch(self)
+    
+    def close(self):
+        self.handles.remove(self.current_window_handle)
+
+
+class FakeSession:
+    """发起导出后，服务端在export_seconds秒后生成文件（先出现.crdownload再改名）"""
+    
+    def __init__(self, driver, directory, export_seconds, missing=()):
+        self.driver = driver
+        self.directory = directory
+        self.export_seconds = export_seconds
+        self.missing = set(missing)
+    
+    def download(self, doc_type=None):
+        name = self.driver.current_url.rsplit('/', 1)[-1]
+        if name not in self.missing:
+            threading.Timer(self.export_seconds, self.deliver, (name,)).start()
+        return True
+    
+    def deliver(self, name):
+        partial = os.path.join(self.directory, f"{name}.docx.crdownload")
+        with open(partial, 'wb') as f:
+            f.write(b'x' * 1024)
+        time.sleep(0.2)
+        os.rename(partial, os.path.join(self.directory, f"{name}.docx"))
+
+
+class FakeTraverser(DownloadQueueMixin, BatchExportMixin):
+    def __init__(self, output_dir, download_dir, export_seconds, missing=()):
+        self.output_dir = output_dir
+        self.logger = FakeLogger()
+        self.driver = FakeDriver()
+        self.download_batch_size = 3
+        self.download_queue_size = 10
+        self.export_jobs = None
+        self.session = FakeSession(self.driver, download_dir, export_seconds, missing)
+        self.tracker = DownloadTracker(download_dir, self.logger, poll_interval=0.05, timeout=2)
+        self.tracker.start()
+        self.stats = {"download_skipped": 0, "download_failed": 0, "download_attempted": 0,
+                      "download_requested": 0, "download_total_time": 0}
+        self.downloads = []
+    
+    def get_state_store(self):
+        return None
+    
+    def get_download_tracker(self):
+        return self.tracker
+    
+    def get_download_session(self):
+        return self.session
+    
+    def download_titles(self, node_key, item_name):
+        return [item_name]
+    
+    def should_download_document(self, url, doc_type=None):
+        return '/wiki/' in url
+    
+    def wait_with_respect(self):
+        return 0
+    
+    def navigate_to_url(self, url, item_name=""):
+        self.driver.current_url = url
+        return True
+    
+    def wait_for_settle(self, fallback_delay=2):
+        pass
+    
+    def store_download(self, item_name, url, status, duration, file=None, size=None):
+        self.downloads.append((item_name, status))
+
+
+def make_queue(names):
+    queue = DownloadQueue(maxsize=10)
+    for name in names:
+        queue.put({'key': f"token:{name}", 'name': name, 'url': f"https://example.feishu.cn/wiki/{name}"})
+    queue.close()
+    return queue
+
+
+def test_batch_overlaps_export_latency():
+    """测试3个各需0.5秒生成的导出在一批内重叠完成"""
+    print("🧪 测试1: 批量导出重叠服务端耗时")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir, tempfile.TemporaryDirectory() as download_dir:
+        traverser = FakeTraverser(output_dir, download_dir, export_seconds=0.5)
+        traverser.download_queue = make_queue(['甲', '乙', '丙'])
+        
+        start_time = time.time()
+        traverser.run_download_worker()
+        elapsed = time.time() - start_time
+        traverser.tracker.stop()
+        
+        counts = traverser.export_jobs.counts()
+        print(f"耗时 {elapsed:.2f}秒, 状态: {counts}")
+        assert elapsed < 1.5  # 逐个等待至少需要 3 x 0.7 秒
+        assert counts['downloaded'] == 3
+        job = traverser.export_jobs.jobs['token:甲']
+        assert job['ready_at'] and job['file'].endswith('甲.docx') and job['size'] == 1024
+        assert traverser.driver.handles == ['home']
+        print("✅ 一批导出同时进行，标签页已关闭\n")
+
+
+def test_missing_file_marked_failed():
+    """测试超时未出现文件的文档记为失败，其余文档不受影响"""
+    print("🧪 测试2: 超时记为失败")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir, tempfile.TemporaryDirectory() as download_dir:
+        traverser = FakeTraverser(output_dir, download_dir, export_seconds=0.2, missing=['乙'])
+        traverser.download_queue = make_queue(['甲', '乙'])
+        traverser.run_download_worker()
+        traverser.tracker.stop()
+        
+        jobs = traverser.export_jobs.jobs
+        print(f"状态: { {key: job['status'] for key, job in jobs.items()} }")
+        assert jobs['token:甲']['status'] == 'downloaded'
+        assert jobs['token:乙']['status'] == 'failed'
+        assert traverser.driver.handles == ['home']
+        print("✅ 失败文档已记录，标签页已关闭\n")
+
+
+def test_batch_error_releases_entries():
+    """测试收集时出错：本批文档记为失败、释放队列容量、标签页关闭，下一批照常处理"""
+    print("🧪 测试3: 批次出错")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir, tempfile.TemporaryDirectory() as download_dir:
+        traverser = FakeTraverser(output_dir, download_dir, export_seconds=0.1)
+        traverser.download_batch_size = 2
+        traverser.download_queue = make_queue(['甲', '乙', '丙'])
+        
+        wait_for = traverser.tracker.wait_for
+        calls = []
+        
+        def failing_wait_for(ticket_ids, timeout):
+            calls.append(ticket_ids)
+            if len(calls) == 1:
+                raise RuntimeError("浏览器会话断开")
+            return wait_for(ticket_ids, timeout)
+        
+        traverser.tracker.wait_for = failing_wait_for
+        traverser.run_download_worker()
+        traverser.tracker.stop()
+        
+        jobs = traverser.export_jobs.jobs
+        print(f"状态: { {key: job['status'] for key, job in jobs.items()} }")
+        assert jobs['token:甲']['status'] == 'failed' and jobs['token:乙']['status'] == 'failed'
+        assert jobs['token:丙']['status'] == 'downloaded'
+        assert len(traverser.download_queue) == 0
+        assert traverser.driver.handles == ['home']
+        print("✅ 出错的批次已释放，下载标签页继续运行\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 批量导出测试")
+    print("=" * 50)
+    
+    test_batch_overlaps_export_latency()
+    test_missing_file_marked_failed()
+    test_batch_error_releases_entries()
+
+if __name__ == "__main__":
+    main()
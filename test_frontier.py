@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+遍历边界测试脚本
+验证深度优先/广度优先/优先级顺序、父子节点原子移交、多标签页领取和序列化恢复
+"""
+
+import sys
+import os
+import json
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.frontier import TraversalFrontier, STRATEGY_BFS, STRATEGY_SHALLOWEST, STRATEGY_RECENTLY_UPDATED
+
+def make_task(key, name, path, parent_key=None, updated_at=None):
+    return {'node_key': key, 'name': name, 'url': None, 'path': path, 'level': len(path) - 1,
+            'parent_key': parent_key, 'origin_url': 'https://example.feishu.cn/wiki/space/1',
+            'updated_at': updated_at}
+
+def drain(frontier, children=None):
+    """模拟遍历：依次领取任务，按children压入子节点，返回处理顺序"""
+    children = children or {}
+    order = []
+    task = frontier.claim()
+    while task is not None:
+        order.append(task['name'])
+        kids = children.get(task['name'], [])
+        if kids:
+            frontier.push(task['node_key'], [make_task(f"token:{kid}", kid, task['path'] + [j], task['node_key'])
+                                             for j, kid in enumerate(kids, 1)])
+        else:
+            frontier.complete(task['node_key'])
+        task = frontier.claim()
+    return order
+
+TREE = {'A': ['A1', 'A2'], 'A1': ['A1a'], 'B': ['B1']}
+
+def test_depth_first_order():
+    """测试子节点压入后优先处理，父节点同时移出"""
+    print("🧪 测试1: 深度优先顺序")
+    print("=" * 40)
+    
+    frontier = TraversalFrontier()
+    frontier.push(None, [make_task('token:A', '新人园地', [1]), make_task('token:B', '产品手册', [2])])
+    assert frontier.peek()['node_key'] == 'token:A'
+    
+    frontier.push('token:A', [make_task('token:A1', '新人需知', [1, 1], 'token:A')])
+    assert len(frontier) == 2  # A已移交给子层
+    assert frontier.peek()['node_key'] == 'token:A1'
+    
+    frontier.complete('token:A1')
+    assert frontier.peek()['node_key'] == 'token:B'
+    frontier.complete('token:B')
+    assert frontier.peek() is None and frontier.is_empty()
+    
+    frontier = TraversalFrontier()
+    frontier.push(None, [make_task('token:A', 'A', [1]), make_task('token:B', 'B', [2])])
+    order = drain(frontier, TREE)
+    print(f"深度优先顺序: {order}")
+    assert order == ['A', 'A1', 'A1a', 'A2', 'B', 'B1']
+    print("✅ 深度优先顺序正确\n")
+
+def test_other_strategies():
+    """测试广度优先和优先级顺序"""
+    print("🧪 测试2: 广度优先与优先级")
+    print("=" * 40)
+    
+    frontier = TraversalFrontier(strategy=STRATEGY_BFS)
+    frontier.push(None, [make_task('token:A', 'A', [1]), make_task('token:B', 'B', [2])])
+    order = drain(frontier, TREE)
+    print(f"广度优先顺序: {order}")
+    assert order == ['A', 'B', 'A1', 'A2', 'B1', 'A1a']
+    
+    frontier = TraversalFrontier(strategy=STRATEGY_SHALLOWEST)
+    frontier.push(None, [make_task('token:A', 'A', [1]), make_task('token:B', 'B', [2])])
+    assert drain(frontier, TREE) == ['A', 'B', 'A1', 'A2', 'B1', 'A1a']
+    
+    frontier = TraversalFrontier(strategy=STRATEGY_RECENTLY_UPDATED)
+    frontier.push(None, [
+        make_task('token:A', 'A', [1], updated_at='2025-08-01T10:00:00'),
+        make_task('token:B', 'B', [2], updated_at='2025-08-12T10:00:00'),
+        make_task('token:C', 'C', [3])
+    ])
+    assert drain(frontier) == ['B', 'A', 'C']
+    print("✅ 广度优先与优先级顺序正确\n")
+
+def test_claims_and_cycles():
+    """测试多标签页领取互斥，以及重复出现的节点不会再次进入边界"""
+    print("🧪 测试3: 领取与去环")
+    print("=" * 40)
+    
+    frontier = TraversalFrontier()
+    frontier.push(None, [make_task('token:A', 'A', [1]), make_task('token:B', 'B', [2])])
+    first, second = frontier.claim(), frontier.claim()
+    assert {first['name'], second['name']} == {'A', 'B'}
+    assert frontier.claim() is None and not frontier.is_empty()
+    
+    # 快捷方式指回已在边界中的节点
+    added = frontier.push('token:A', [make_task('token:B', 'B', [1, 1], 'token:A')])
+    assert added == []
+    frontier.release('token:B')
+    assert frontier.claim()['name'] == 'B'
+    frontier.complete('token:B')
+    assert frontier.is_empty()
+    print("✅ 领取与去环正确\n")
+
+def test_serialization():
+    """测试边界保存后恢复到同一位置"""
+    print("🧪 测试4: 序列化恢复")
+    print("=" * 40)
+    
+    frontier = TraversalFrontier()
+    frontier.push(None, [make_task('token:A', '新人园地', [1]), make_task('token:B', '产品手册', [2])])
+    frontier.push('token:A', [make_task('token:A1', '新人需知', [1, 1], 'token:A'),
+                              make_task('token:A2', '通关宝典', [1, 2], 'token:A')])
+    frontier.complete('token:A1')
+    
+    data = json.dumps(frontier.to_dict(), ensure_ascii=False)
+    restored = TraversalFrontier.from_dict(json.loads(data))
+    print(f"恢复后待处理: {len(restored)} 个")
+    assert len(restored) == 2
+    assert restored.peek()['node_key'] == 'token:A2'
+    restored.complete('token:A2')
+    assert restored.peek()['node_key'] == 'token:B'
+    print("✅ 序列化恢复正确\n")
+
+def main():
+    """主函数"""
+    print("🚀 遍历边界测试")
+    print("=" * 50)
+    
+    test_depth_first_order()
+    test_other_strategies()
+    test_claims_and_cycles()
+    test_serialization()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+增量遍历测试脚本
+验证变化类型判断、状态库基线、未变化叶子文档跳过和墓碑标记
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.incremental import (IncrementalMixin, classify_change, CHANGE_NEW, CHANGE_MOVED,
+                                             CHANGE_MODIFIED, CHANGE_UNCHANGED)
+from directory_traverser.frontier import TraversalFrontier
+from directory_traverser.node_index import NodeIndex
+from directory_traverser.state_store import CrawlStateStore
+
+
+class FakeLogger:
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+
+
+class FakeTraverser(IncrementalMixin):
+    def __init__(self, store, baseline):
+        self.store = store
+        self.logger = FakeLogger()
+        self.stats = {}
+        self.node_index = NodeIndex()
+        self.access_delay = (2, 5)
+        self.enable_download = True
+        self.max_traversal_depth = None
+        self.traversal_visited = set()
+        self.incremental_active = True
+        self.incremental_baseline = baseline
+        self.incremental_unexplored = set()
+    
+    def get_state_store(self):
+        return self.store
+
+
+def visit(key, name, parent, modified_time, seq_path):
+    return {'node_key': key, 'index': seq_path, 'directory_item': name, 'url': f"https://example.feishu.cn/wiki/{key}",
+            'title': name, 'level': 1, 'timestamp': '2024-03-01 10:00:00', 'response_time': 1.5,
+            'parent_key': parent, 'modified_time': modified_time}
+
+
+def build_store(tmp_dir):
+    """上次运行：根目录 A 下有 B、C，D 在 C 下"""
+    store = CrawlStateStore(os.path.join(tmp_dir, 'crawl_state.db'))
+    store.record_visit(visit('token:A', '产品手册', None, '2024-03-01 09:00:00', '1'))
+    store.record_visit(visit('token:B', '安装指南', 'token:A', '2024-03-01 09:00:00', '1-1'))
+    store.record_visit(visit('token:C', '常见问题', 'token:A', '2024-02-01 09:00:00', '1-2'))
+    store.record_visit(visit('token:D', '旧版说明', 'token:C', '2024-01-01 09:00:00', '1-2-1'))
+    store.record_download('安装指南', 'https://example.feishu.cn/wiki/token:B', 'success', 8.0, '2024-03-01 10:00:00', 'token:B')
+    store.commit()
+    return store
+
+
+def test_classify_change():
+    """测试变化类型判断"""
+    print("🧪 测试1: 变化类型判断")
+    print("=" * 40)
+    
+    previous = {'title': '安装指南', 'parent': 'token:A', 'modified_time': '2024-03-01 09:00:00'}
+    assert classify_change(None, '安装指南', 'token:A', '2024-03-01 09:00:00') == CHANGE_NEW
+    assert classify_change(previous, '安装指南', 'token:X', '2024-03-01 09:00:00') == CHANGE_MOVED
+    assert classify_change(previous, '安装指南（新）', 'token:A', '2024-03-01 09:00:00') == CHANGE_MOVED
+    assert classify_change(previous, '安装指南', 'token:A', '2024-03-02 09:00:00') == CHANGE_MODIFIED
+    assert classify_change(previous, '安装指南', 'token:A', None) == CHANGE_MODIFIED  # 无法比较时按修改处理
+    assert classify_change(previous, '安装指南', 'token:A', '2024-03-01 09:00:00') == CHANGE_UNCHANGED
+    # 根目录与文件夹之间的移动（基线中根节点的父节点为None）
+    root_previous = dict(previous, parent=None)
+    assert classify_change(root_previous, '安装指南', 'token:A', '2024-03-01 09:00:00') == CHANGE_MOVED
+    assert classify_change(previous, '安装指南', None, '2024-03-01 09:00:00') == CHANGE_MOVED
+    assert classify_change(root_previous, '安装指南', None, '2024-03-01 09:00:00') == CHANGE_UNCHANGED
+    print("✅ 变化类型判断正确\n")
+
+
+def test_baseline_and_skips():
+    """测试状态库基线、未打开跳过和打开后跳过"""
+    print("🧪 测试2: 基线与跳过")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = build_store(tmp_dir)
+        baseline = store.node_baseline()
+        assert baseline['token:B']['parent'] == 'token:A'
+        assert baseline['token:B']['download_duration'] == 8.0
+        
+        traverser = FakeTraverser(store, baseline)
+        
+        # 目录树接口给出修改时间且未变化的叶子文档：不打开
+        task = {'node_key': 'token:B', 'name': '安装指南', 'parent_key': 'token:A', 'has_children': False,
+                'updated_at': '2024-03-01 09:00:00'}
+        assert traverser.skip_unchanged_leaf(task) is True
+        # 可能有子节点的节点必须打开
+        assert traverser.skip_unchanged_leaf(dict(task, node_key='token:C', has_children=None)) is False
+        
+        # 打开后按页面修改时间判断
+        page_info = {'node_key': 'token:C', 'modified_time': '2024-03-05 12:00:00'}
+        assert traverser.should_record_incremental({'name': '常见问题', 'parent_key': 'token:A'}, page_info) is True
+        assert page_info['change'] == CHANGE_MODIFIED
+        page_info = {'node_key': 'token:A', 'modified_time': '2024-03-01 09:00:00'}
+        assert traverser.should_record_incremental({'name': '产品手册', 'parent_key': None}, page_info) is False
+        
+        summary = traverser.get_incremental_summary()
+        print(f"增量摘要: {summary}")
+        assert summary['recorded'] == 1 and summary['skipped_unchanged'] == 2 and summary['skipped_unopened'] == 1
+        assert summary['time_saved_seconds'] == 1.5 + 3.5 + 8.0
+        store.close()
+    print("✅ 未变化文档已跳过\n")
+
+
+def test_tombstones():
+    """测试消失的节点标记为墓碑，打开失败节点的后代不误标"""
+    print("🧪 测试3: 墓碑标记")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = build_store(tmp_dir)
+        traverser = FakeTraverser(store, store.node_baseline())
+        
+        # 本次目录树中只出现 A 和 C（B 已删除），C 打开失败，其子节点 D 未能探索
+        frontier = TraversalFrontier()
+        frontier.push(None, [{'node_key': 'token:A', 'name': '产品手册', 'path': [1], 'level': 0}])
+        frontier.push('token:A', [{'node_key': 'token:C', 'name': '常见问题', 'path': [1, 2], 'level': 1}])
+        frontier.complete('token:C')
+        traverser.mark_unexplored('token:C')
+        
+        assert traverser.finish_incremental_run(frontier) == 1
+        assert [row['key'] for row in store.tombstones()] == ['token:B']
+        assert 'token:B' not in store.node_baseline()
+        
+        # 再次访问到的节点恢复为正常节点
+        store.record_visit(visit('token:B', '安装指南', 'token:A', '2024-03-09 09:00:00', '1-1'))
+        store.commit()
+        assert store.tombstones() == []
+        store.close()
+    print("✅ 墓碑标记正确\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 增量遍历测试")
+    print("=" * 50)
+    
+    test_classify_change()
+    test_baseline_and_skips()
+    test_tombstones()
+
+if __name__ == "__main__":
+    main()
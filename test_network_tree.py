@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+网络目录树捕获测试脚本
+验证目录树接口响应解析、性能日志读取和写入节点索引，未捕获到根节点时不自动刷新页面
+"""
+
+import sys
+import os
+import json
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.network_tree import NetworkTreeCapture, parse_tree_payload
+from directory_traverser.node_index import NodeIndex
+from directory_traverser.discovery import DiscoveryMixin
+
+
+TREE_RESPONSE = {
+    'code': 0,
+    'data': {
+        'tree': {
+            'nodes': {
+                'wikcnChild2': {'wiki_token': 'wikcnChild2', 'title': '常见问题', 'obj_type': 22, 'has_child': False,
+                                'parent_wiki_token': 'wikcnRoot'},
+                'wikcnRoot': {'wiki_token': 'wikcnRoot', 'title': '产品手册', 'obj_type': 22, 'has_child': True,
+                              'parent_wiki_token': ''},
+                'wikcnChild1': {'wiki_token': 'wikcnChild1', 'title': '安装指南', 'obj_type': 16, 'has_child': False,
+                                'parent_wiki_token': 'wikcnRoot'},
+            },
+            'child_map': {'wikcnRoot': ['wikcnChild1', 'wikcnChild2']}
+        }
+    }
+}
+
+
+def performance_entry(method, params):
+    return {'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+
+class FakeDriver:
+    """按性能日志格式返回网络事件的驱动"""
+    
+    def __init__(self, entries, bodies):
+        self.entries = entries
+        self.bodies = bodies
+        self.cdp_calls = []
+    
+    def execute_cdp_cmd(self, cmd, params):
+        self.cdp_calls.append(cmd)
+        if cmd == 'Network.getResponseBody':
+            return {'body': json.dumps(self.bodies[params['requestId']]), 'base64Encoded': False}
+        return {}
+    
+    def get_log(self, log_type):
+        entries, self.entries = self.entries, []
+        return entries
+
+
+def test_parse_tree_payload():
+    """测试解析节点、父子关系和兄弟顺序"""
+    print("🧪 测试1: 解析目录树响应")
+    print("=" * 40)
+    
+    nodes = parse_tree_payload(TREE_RESPONSE, base_url='https://example.feishu.cn')
+    by_token = {node['token']: node for node in nodes}
+    
+    assert len(nodes) == 3
+    assert by_token['wikcnRoot']['parent'] is None
+    assert by_token['wikcnChild2']['parent'] == 'wikcnRoot'
+    assert by_token['wikcnRoot']['has_children'] is True
+    assert by_token['wikcnChild1']['url'] == 'https://example.feishu.cn/wiki/wikcnChild1'
+    # 兄弟顺序取自child_map
+    children = [node['token'] for node in nodes if node['parent'] == 'wikcnRoot']
+    assert children == ['wikcnChild1', 'wikcnChild2']
+    print("✅ 响应解析正确\n")
+
+
+def test_capture_feeds_node_index():
+    """测试从性能日志捕获响应并写入节点索引"""
+    print("🧪 测试2: 捕获响应写入节点索引")
+    print("=" * 40)
+    
+    tree_url = 'https://example.feishu.cn/space/api/wiki/v2/tree/get_info/?space_id=1'
+    driver = FakeDriver([performance_entry('Network.responseReceived', {'requestId': '0', 'response': {'url': tree_url}})],
+                        {'1': TREE_RESPONSE})
+    capture = NetworkTreeCapture(driver)
+    assert capture.start() is True  # 开启时丢弃积压日志
+    
+    driver.entries = [
+        performance_entry('Network.responseReceived', {'requestId': '1', 'response': {'url': tree_url}}),
+        performance_entry('Network.responseReceived', {'requestId': '2', 'response': {'url': 'https://example.feishu.cn/other'}}),
+        performance_entry('Network.loadingFinished', {'requestId': '1'}),
+        performance_entry('Network.loadingFinished', {'requestId': '2'}),
+    ]
+    nodes = capture.poll()
+    
+    assert len(nodes) == 3
+    assert driver.cdp_calls.count('Network.getResponseBody') == 1  # 只读取目录树接口的响应体
+    
+    index = NodeIndex()
+    index.ingest_network_nodes(nodes)
+    assert [child['title'] for child in index.children('token:wikcnRoot')] == ['安装指南', '常见问题']
+    assert index.get('token:wikcnChild2')['depth'] == 2
+    assert index.get('token:wikcnChild1')['has_children'] is False
+    print(f"捕获统计: {capture.snapshot()}")
+    print("✅ 节点索引已建立父子关系\n")
+
+
+class FakeLogger:
+    def __init__(self):
+        self.warnings = []
+    
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    
+    def warning(self, message):
+        print(message)
+        self.warnings.append(message)
+
+
+class RefreshDriver(FakeDriver):
+    """记录刷新次数，刷新后才出现目录树响应"""
+    
+    def __init__(self):
+        super().__init__([], {'1': TREE_RESPONSE})
+        self.refreshes = 0
+    
+    def refresh(self):
+        self.refreshes += 1
+        tree_url = 'https://example.feishu.cn/space/api/wiki/v2/tree/get_info/?space_id=1'
+        self.entries = [performance_entry('Network.responseReceived', {'requestId': '1', 'response': {'url': tree_url}}),
+                        performance_entry('Network.loadingFinished', {'requestId': '1'})]
+
+
+class FakeTraverser(DiscoveryMixin):
+    def __init__(self, allow_refresh):
+        self.driver = RefreshDriver()
+        self.logger = FakeLogger()
+        self.discovery_backend = 'network'
+        self.network_tree = None
+        self.network_tree_url_patterns = None
+        self.network_tree_allow_refresh = allow_refresh
+        self.node_index = NodeIndex()
+    
+    def wait_for_settle(self, fallback_delay=2):
+        pass
+
+
+def test_root_items_without_refresh():
+    """测试页面在开启捕获前已加载时不自动刷新页面，回退DOM并提示；显式开启时才刷新"""
+    print("🧪 测试3: 未捕获到根节点")
+    print("=" * 40)
+    
+    traverser = FakeTraverser(allow_refresh=False)
+    assert traverser.network_root_items() == []
+    assert traverser.driver.refreshes == 0
+    assert any('重新加载页面' in message for message in traverser.logger.warnings)
+    
+    traverser = FakeTraverser(allow_refresh=True)
+    assert [item['name'] for item in traverser.network_root_items()] == ['产品手册']
+    assert traverser.driver.refreshes == 1
+    print("✅ 默认不刷新页面\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 网络目录树捕获测试")
+    print("=" * 50)
+    
+    test_parse_tree_payload()
+    test_capture_feeds_node_index()
+    test_root_items_without_refresh()
+
+if __name__ == "__main__":
+    main()
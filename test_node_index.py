@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+节点索引测试脚本
+验证稳定节点标识、同名节点区分和标题规范化
+"""
+
+import sys
+import os
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.node_index import NodeIndex, normalize_title, extract_wiki_token
+
+def test_normalize_title():
+    """测试标题规范化（零宽字符、站点后缀）"""
+    print("🧪 测试1: 标题规范化")
+    print("=" * 40)
+    
+    raw_title = "‌⁤‍﻿新人园地-通关宝典​⁢ - 飞书云文档"
+    normalized = normalize_title(raw_title, strip_site_suffix=True)
+    print(f"规范化结果: {normalized}")
+    
+    assert normalized == "新人园地-通关宝典"
+    assert normalize_title("  新人需知​ ") == "新人需知"
+    print("✅ 标题规范化正确\n")
+
+def test_duplicate_child_names():
+    """测试不同父目录下的同名子节点不会冲突"""
+    print("🧪 测试2: 同名子节点区分")
+    print("=" * 40)
+    
+    index = NodeIndex()
+    snapshot = [
+        {'node_key': 'path:产品手册', 'name': '产品手册', 'depth': 1},
+        {'node_key': 'path:产品手册/FAQ', 'name': 'FAQ', 'depth': 2},
+        {'node_key': 'path:运维手册', 'name': '运维手册', 'depth': 1},
+        {'node_key': 'path:运维手册/FAQ', 'name': 'FAQ', 'depth': 2},
+    ]
+    index.ingest_snapshot(snapshot)
+    
+    print(f"索引节点数: {len(index)}")
+    assert len(index) == 4
+    assert [child['key'] for child in index.children('path:产品手册')] == ['path:产品手册/FAQ']
+    assert [child['key'] for child in index.children('path:运维手册')] == ['path:运维手册/FAQ']
+    assert index.path_titles('path:运维手册/FAQ') == ['运维手册', 'FAQ']
+    print("✅ 同名子节点各自独立\n")
+
+def test_token_lookup():
+    """测试按token的O(1)查找"""
+    print("🧪 测试3: token查找")
+    print("=" * 40)
+    
+    url = "https://zh3vobp856.feishu.cn/wiki/JPGPwwEBIirtlqkNF9gcIqYtn1f"
+    token = extract_wiki_token(url)
+    assert token == "JPGPwwEBIirtlqkNF9gcIqYtn1f"
+    
+    index = NodeIndex()
+    key = NodeIndex.make_key(token=token)
+    index.upsert(key, "新人园地-通关宝典", url=url)
+    index.mark_visited(key)
+    
+    node = index.get_by_token(token)
+    assert node is not None and node['key'] == key
+    assert index.is_visited(key)
+    assert NodeIndex.make_key(title="FAQ", parent_key="path:运维手册") == "path:运维手册/FAQ"
+    print("✅ token查找正确\n")
+
+def main():
+    """主函数"""
+    print("🚀 节点索引测试")
+    print("=" * 50)
+    
+    test_normalize_title()
+    test_duplicate_child_names()
+    test_token_lookup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+页面元数据提取测试脚本
+验证一次注入脚本的结果转换、修改时间解析、状态库元数据列和按文档类型跳过下载
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.extraction import ExtractionMixin, PAGE_METADATA_JS, parse_modified_time
+from directory_traverser.download_mixin import DownloadMixin
+from directory_traverser.state_store import CrawlStateStore
+
+
+class FakeLogger:
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+    def error(self, message): print(message)
+
+
+class FakeDriver:
+    """返回预设元数据的驱动，记录脚本调用次数"""
+    
+    def __init__(self, metadata):
+        self.metadata = metadata
+        self.scripts = []
+        self.current_url = metadata.get('url')
+    
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        return self.metadata
+
+
+class FakeTraverser(ExtractionMixin, DownloadMixin):
+    def __init__(self, driver):
+        self.driver = driver
+        self.logger = FakeLogger()
+        self.stats = {"download_skipped": 0}
+        self.enable_download = True
+
+
+def test_parse_modified_time():
+    """测试各种修改时间文本的解析"""
+    print("🧪 测试1: 修改时间解析")
+    print("=" * 40)
+    
+    now = datetime(2024, 3, 15, 10, 30)
+    cases = {
+        '最近修改: 2023年12月1日 09:05': '2023-12-01 09:05:00',
+        '更新于 2024-02-29': '2024-02-29 00:00:00',
+        '3月10日 18:20 修改': '2024-03-10 18:20:00',
+        '12月20日 修改': '2023-12-20 00:00:00',  # 不带年份且晚于当前时间，取去年
+        '今天 08:15 修改': '2024-03-15 08:15:00',
+        '昨天 23:59': '2024-03-14 23:59:00',
+        '5分钟前修改': '2024-03-15 10:25:00',
+        '2 hours ago': '2024-03-15 08:30:00',
+        '刚刚': '2024-03-15 10:30:00',
+    }
+    for text, expected in cases.items():
+        assert parse_modified_time(text, now) == expected, (text, parse_modified_time(text, now))
+    assert parse_modified_time(None, now) is None
+    assert parse_modified_time('未知', now) is None
+    print("✅ 修改时间解析正确\n")
+
+
+def test_extract_page_info_single_script():
+    """测试一次脚本调用得到全部元数据，加载耗时取自性能计时"""
+    print("🧪 测试2: 一次脚本提取元数据")
+    print("=" * 40)
+    
+    driver = FakeDriver({
+        'url': 'https://example.feishu.cn/wiki/wikcnAbc123',
+        'title': '安装指南',
+        'wiki_token': 'wikcnAbc123',
+        'doc_type': 'docx',
+        'owner': '张三',
+        'modified_text': '2024年3月1日 12:00',
+        'word_count': 1520,
+        'timing': {'mode': 'soft', 'requests': 12, 'ttfb_ms': 85.25, 'load_ms': 1234.56}
+    })
+    traverser = FakeTraverser(driver)
+    page_info = traverser.extract_page_info()
+    
+    assert driver.scripts == [PAGE_METADATA_JS]
+    assert page_info['wiki_token'] == 'wikcnAbc123'
+    assert page_info['doc_type'] == 'docx'
+    assert page_info['modified_time'] == '2024-03-01 12:00:00'
+    assert page_info['word_count'] == 1520
+    assert page_info['response_time'] == 1.23
+    assert page_info['load_timing']['load_ms'] == 1234.6
+    assert traverser.stats['doc_types'] == {'docx': 1}
+    
+    # 标题为空时不是有效内容页
+    assert FakeTraverser(FakeDriver({'url': 'https://example.feishu.cn/wiki/x', 'title': ''})).extract_page_info() is None
+    print("✅ 元数据提取正确\n")
+
+
+def test_state_store_metadata_columns():
+    """测试访问记录保存元数据，旧状态库自动补齐列"""
+    print("🧪 测试3: 状态库元数据列")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, 'crawl_state.db')
+        conn = sqlite3.connect(db_file)
+        conn.execute("""CREATE TABLE visits (seq INTEGER PRIMARY KEY AUTOINCREMENT, node_key TEXT, path_index TEXT,
+                        name TEXT, url TEXT, title TEXT, level INTEGER, timestamp TEXT, response_time REAL, worker_id INTEGER)""")
+        conn.commit()
+        conn.close()
+        
+        store = CrawlStateStore(db_file)
+        store.record_visit({'node_key': 'token:a', 'index': '1', 'directory_item': '安装指南', 'url': 'u', 'title': 't',
+                            'level': 1, 'timestamp': 'now', 'response_time': 1.2, 'doc_type': 'sheet',
+                            'owner': '张三', 'modified_time': '2024-03-01 12:00:00', 'word_count': 10})
+        store.commit()
+        
+        visit = store.visits()[0]
+        assert visit['doc_type'] == 'sheet' and visit['modified_time'] == '2024-03-01 12:00:00'
+        assert store.doc_type_counts() == {'sheet': 1}
+        store.close()
+    print("✅ 元数据列已保存\n")
+
+
+def test_download_routing_by_doc_type():
+    """测试不支持导出的文档类型直接跳过下载"""
+    print("🧪 测试4: 按文档类型跳过下载")
+    print("=" * 40)
+    
+    traverser = FakeTraverser(FakeDriver({'url': 'https://example.feishu.cn/wiki/wikcnAbc123'}))
+    traverser.is_download_enabled = lambda: True
+    
+    assert traverser.should_download_document(traverser.driver.current_url, 'docx') is True
+    assert traverser.should_download_document(traverser.driver.current_url, None) is True
+    assert traverser.attempt_download_current_document("  ", "思维导图", 'mindnote') is False
+    assert traverser.stats['download_skipped'] == 1
+    print("✅ 不支持的类型未打开下载菜单\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 页面元数据提取测试")
+    print("=" * 50)
+    
+    test_parse_modified_time()
+    test_extract_page_info_single_script()
+    test_state_store_metadata_columns()
+    test_download_routing_by_doc_type()
+
+if __name__ == "__main__":
+    main()
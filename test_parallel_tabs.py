@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+多标签页并行遍历测试脚本（不需要浏览器）
+验证：工作者通过 self.__class__ 创建并共享同一个遍历边界、每个节点只处理一次、
+边界清空后工作者退出并关闭标签页、检查点间隔不随标签页数量拉长
+"""
+
+import sys
+import time
+import threading
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.frontier import TraversalFrontier
+from directory_traverser.node_index import NodeIndex
+from directory_traverser.parallel import ParallelTraversalMixin
+
+
+class FakeLogger:
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+    def error(self, message): print(message)
+
+
+class FakeSwitch:
+    def new_window(self, kind):
+        pass
+
+
+class FakeDriver:
+    def __init__(self):
+        self.switch_to = FakeSwitch()
+        self.closed = False
+        self.quit_called = False
+    
+    def close(self):
+        self.closed = True
+    
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeTraverser(ParallelTraversalMixin):
+    """只实现并行遍历依赖的方法：处理一个节点耗时task_seconds秒，按TREE压入子节点"""
+    
+    created = []
+    
+    def __init__(self, output_dir=None, enable_download=False):
+        self.output_dir = output_dir
+        self.enable_download = enable_download
+        self.logger = FakeLogger()
+        for attr in self.WORKER_CONFIG_ATTRS:
+            setattr(self, attr, None)
+        self.worker_id = 0
+        self.parallel_tabs = 3
+        self.parallel_checkpoint_interval = 0.1
+        self.task_seconds = 0.05
+        self.rate_limiter = None
+        self.record_sink = None
+        self.state_store = None
+        self.node_index = NodeIndex()
+        self.access_log = []
+        self.failed_items = []
+        self.permission_denied_items = []
+        self.stats = {}
+        self.checkpoints = []
+        FakeTraverser.created.append(self)
+    
+    def get_rate_limiter(self):
+        return None
+    
+    def get_record_sink(self):
+        return None
+    
+    def get_state_store(self):
+        return None
+    
+    def is_download_enabled(self):
+        return False
+    
+    def setup_driver(self):
+        self.driver = FakeDriver()
+        return True
+    
+    def checkpoint_records(self):
+        self.checkpoints.append(time.time())
+    
+    def process_frontier_task(self, task):
+        time.sleep(self.task_seconds)
+        self.access_log.append({'name': task['name'], 'tab': self.worker_id})
+        self.stats['successful_access'] = self.stats.get('successful_access', 0) + 1
+        children = TREE.get(task['name'], [])
+        if children:
+            self.traversal_frontier.push(task['node_key'], [make_task(child, task['path'] + [i], task['node_key'])
+                                                            for i, child in enumerate(children, 1)])
+        else:
+            self.traversal_frontier.complete(task['node_key'])
+
+
+TREE = {
+    '产品': ['产品-1', '产品-2', '产品-3'],
+    '运营': ['运营-1', '运营-2', '运营-3'],
+    '技术': ['技术-1', '技术-2', '技术-3'],
+    '产品-1': ['产品-1-1', '产品-1-2']
+}
+
+
+def make_task(name, path, parent_key=None):
+    return {'node_key': f"token:{name}", 'name': name, 'url': None, 'path': path, 'level': len(path) - 1,
+            'parent_key': parent_key, 'origin_url': None}
+
+
+def run_parallel():
+    FakeTraverser.created = []
+    traverser = FakeTraverser(output_dir='/tmp')
+    frontier = TraversalFrontier()
+    frontier.push(None, [make_task(name, [i]) for i, name in enumerate(['产品', '运营', '技术'], 1)])
+    start_time = time.time()
+    traverser.parallel_traverse(frontier)
+    return traverser, frontier, time.time() - start_time
+
+
+def test_shared_frontier_and_shutdown():
+    """测试工作者共享遍历边界、每个节点只处理一次、结束后关闭标签页"""
+    print("🧪 测试1: 共享遍历边界与工作者退出")
+    print("=" * 40)
+    
+    traverser, frontier, elapsed = run_parallel()
+    workers = FakeTraverser.created[1:]
+    names = [record['name'] for record in traverser.access_log]
+    expected = ['产品', '运营', '技术'] + [child for children in TREE.values() for child in children]
+    print(f"耗时 {elapsed:.2f}秒, 处理 {len(names)} 个节点, 各标签页: {traverser.stats['per_tab']}")
+    
+    assert sorted(names) == sorted(expected)  # 每个节点恰好一次
+    assert frontier.is_empty()
+    assert len(workers) == 3 and all(type(worker) is FakeTraverser for worker in workers)
+    assert all(worker.traversal_frontier is frontier for worker in workers)
+    assert all(worker.traversal_visited is traverser.traversal_visited for worker in workers)
+    assert sum(1 for worker in workers if worker.access_log) >= 2  # 多个标签页都领取到了节点
+    assert all(worker.driver.closed and worker.driver.quit_called for worker in workers)
+    assert not any(thread.name.startswith('tab-worker-') for thread in threading.enumerate())
+    assert traverser.stats['successful_access'] == len(expected)
+    print("✅ 节点不重复，工作者已退出并关闭标签页\n")
+
+
+def test_checkpoint_interval():
+    """测试检查点按设定间隔保存，不随标签页数量拉长为 N x 间隔"""
+    print("🧪 测试2: 检查点间隔")
+    print("=" * 40)
+    
+    traverser, frontier, elapsed = run_parallel()
+    checkpoints = traverser.checkpoints
+    gaps = [later - earlier for earlier, later in zip(checkpoints, checkpoints[1:])]
+    print(f"耗时 {elapsed:.2f}秒, 检查点 {len(checkpoints)} 次, 最大间隔 {max(gaps):.2f}秒")
+    assert max(gaps) < 1.5 * traverser.parallel_checkpoint_interval  # 逐个等待时可达 3 x 0.1 秒
+    print("✅ 检查点间隔正确\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 多标签页并行遍历测试")
+    print("=" * 50)
+    
+    test_shared_frontier_and_shutdown()
+    test_checkpoint_interval()
+
+if __name__ == "__main__":
+    main()
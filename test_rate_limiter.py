@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+自适应限速器测试脚本
+使用模拟时钟验证令牌桶间隔、有效工作抵扣和AIMD调速，以及遍历器按当前配置延迟创建限速器
+"""
+
+import sys
+import os
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.rate_limiter import AdaptiveRateLimiter
+from directory_traverser.navigation import NavigationMixin
+
+class FakeClock:
+    """模拟时钟，sleep只推进时间"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.now += seconds
+
+class FakeTraverser(NavigationMixin):
+    def __init__(self):
+        self.access_delay = (2, 5)
+        self.use_adaptive_rate_limit = True
+        self.rate_limiter = None
+
+def make_limiter(**kwargs):
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter((2, 4), clock=clock, sleep=clock.sleep, **kwargs)
+    return limiter, clock
+
+def test_work_covers_delay():
+    """测试间隔从上一次请求开始计算，有效工作时间会抵扣等待"""
+    print("🧪 测试1: 有效工作抵扣等待")
+    print("=" * 40)
+    
+    limiter, clock = make_limiter()
+    interval = limiter.current_interval()
+    print(f"初始间隔: {interval:.2f} 秒")
+    assert abs(interval - 3.0) < 1e-9
+    
+    first = limiter.acquire()
+    assert first['waited'] == 0.0 and first['covered'] == 0.0  # 首次请求之前没有工作可抵扣
+    
+    # 请求本身耗时2秒，只需再等1秒
+    clock.now += 2.0
+    result = limiter.acquire()
+    print(f"第二次等待: {result['waited']:.2f} 秒, 覆盖: {result['covered']:.2f} 秒")
+    assert abs(result['waited'] - 1.0) < 1e-9
+    assert abs(result['covered'] - 2.0) < 1e-9
+    
+    # 请求耗时超过间隔，无需等待
+    clock.now += 5.0
+    assert limiter.acquire()['waited'] == 0.0
+    print("✅ 有效工作抵扣正确\n")
+
+def test_aimd_adjustment():
+    """测试正常结果加性提速、权限错误/超时/慢加载乘性降速"""
+    print("🧪 测试2: AIMD调速")
+    print("=" * 40)
+    
+    limiter, clock = make_limiter(increase_step=0.05)
+    base_rate = limiter.current_rate()
+    
+    limiter.acquire()
+    clock.now += 1.0
+    assert limiter.record_outcome(AdaptiveRateLimiter.OUTCOME_OK) == AdaptiveRateLimiter.OUTCOME_OK
+    assert abs(limiter.current_rate() - (base_rate + 0.05)) < 1e-9
+    
+    # 速率不超过access_delay下限
+    for _ in range(50):
+        limiter.record_outcome(AdaptiveRateLimiter.OUTCOME_OK, latency=1.0)
+    assert abs(limiter.current_interval() - 2.0) < 1e-9
+    
+    limiter.record_outcome(AdaptiveRateLimiter.OUTCOME_PERMISSION)
+    assert abs(limiter.current_interval() - 4.0) < 1e-9
+    
+    # 慢加载视为降速信号
+    assert limiter.record_outcome(AdaptiveRateLimiter.OUTCOME_OK, latency=20.0) == AdaptiveRateLimiter.OUTCOME_SLOW
+    assert abs(limiter.current_interval() - 8.0) < 1e-9
+    
+    # 降速不超过上限的4倍
+    for _ in range(10):
+        limiter.record_outcome(AdaptiveRateLimiter.OUTCOME_TIMEOUT)
+    assert abs(limiter.current_interval() - 16.0) < 1e-9
+    
+    # 普通失败不调速
+    limiter.record_outcome(AdaptiveRateLimiter.OUTCOME_FAILURE)
+    assert abs(limiter.current_interval() - 16.0) < 1e-9
+    
+    snapshot = limiter.snapshot()
+    print(f"统计: {snapshot}")
+    assert snapshot['outcomes'][AdaptiveRateLimiter.OUTCOME_TIMEOUT] == 10
+    print("✅ AIMD调速正确\n")
+
+def test_concurrent_reservations():
+    """测试多个调用方连续获取时依次排队"""
+    print("🧪 测试3: 共享限速排队")
+    print("=" * 40)
+    
+    limiter, clock = make_limiter()
+    waits = []
+    for _ in range(3):
+        start = clock.now
+        limiter.acquire()
+        waits.append(clock.now - start)
+    
+    print(f"等待序列: {waits}")
+    assert waits[0] == 0.0
+    assert abs(waits[1] - 3.0) < 1e-9 and abs(waits[2] - 3.0) < 1e-9
+    assert abs(limiter.snapshot()['average_spacing_seconds'] - 3.0) < 1e-9
+    print("✅ 请求间隔保持一致\n")
+
+def test_traverser_creates_limiter_lazily():
+    """测试遍历器在首次请求时才按当前access_delay创建限速器（构造后修改的配置生效）"""
+    print("🧪 测试4: 延迟创建限速器")
+    print("=" * 40)
+    
+    traverser = FakeTraverser()
+    traverser.access_delay = (1, 1)
+    limiter = traverser.get_rate_limiter()
+    print(f"目标间隔: {limiter.current_interval():.2f} 秒")
+    assert abs(limiter.current_interval() - 1.0) < 1e-9
+    assert traverser.get_rate_limiter() is limiter
+    
+    traverser = FakeTraverser()
+    traverser.use_adaptive_rate_limit = False
+    assert traverser.get_rate_limiter() is None
+    print("✅ 使用修改后的访问间隔\n")
+
+def main():
+    """主函数"""
+    print("🚀 自适应限速器测试")
+    print("=" * 50)
+    
+    test_work_covers_delay()
+    test_aimd_adjustment()
+    test_concurrent_reservations()
+    test_traverser_creates_limiter_lazily()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+CSV记录写入器测试脚本
+验证批量刷新、残缺末行修复、清空重写、刷新中途中断不重复也不丢失行和断点指针只指向已落盘的记录
+"""
+
+import sys
+import os
+import csv
+import tempfile
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.record_sink import CsvRecordSink, RECORD_CSV_HEADER, read_last_csv_row
+from directory_traverser.reporting import ReportingMixin
+from directory_traverser.resume_handler import ResumeHandlerMixin
+
+class FakeLogger:
+    def info(self, message): pass
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+
+class FakeTraverser(ReportingMixin, ResumeHandlerMixin):
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.logger = FakeLogger()
+        self.record_sink = CsvRecordSink(os.path.join(output_dir, "directory_traverse_log.csv"),
+                                         flush_every=100, flush_interval=3600)
+        self.state_store = None
+    
+    def get_state_store(self):
+        return None
+
+def read_rows(csv_file):
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+def test_buffered_flush():
+    """测试达到条数阈值才刷新，检查点后全部落盘"""
+    print("🧪 测试1: 批量刷新")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = os.path.join(temp_dir, "directory_traverse_log.csv")
+        sink = CsvRecordSink(csv_file, flush_every=3, flush_interval=3600)
+        sink.open()
+        
+        sink.write_row(['1', '新人园地', 'https://example.feishu.cn/wiki/a', '', '', '成功', 'token:a'])
+        sink.write_row(['1-1', '新人需知', 'https://example.feishu.cn/wiki/b', '', '', '成功', 'token:b'])
+        assert len(read_rows(csv_file)) == 1  # 只有表头
+        
+        sink.write_row(['2', '产品手册', 'https://example.feishu.cn/wiki/c', '', '', '成功', 'token:c'])
+        assert len(read_rows(csv_file)) == 4
+        
+        sink.write_row(['3', '运维\n手册', 'https://example.feishu.cn/wiki/d', '', '', '成功', 'token:d'])
+        sink.close()
+        rows = read_rows(csv_file)
+        print(f"写入行数: {len(rows)}, 统计: {sink.snapshot()}")
+        assert rows[0] == RECORD_CSV_HEADER
+        assert rows[-1][1] == '运维 手册'
+        print("✅ 批量刷新正确\n")
+
+def test_torn_tail_repair():
+    """测试崩溃留下的半行在重新打开时被截掉"""
+    print("🧪 测试2: 残缺末行修复")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = os.path.join(temp_dir, "directory_traverse_log.csv")
+        sink = CsvRecordSink(csv_file, flush_every=1)
+        sink.write_row(['1', '新人园地', 'https://example.feishu.cn/wiki/a', '', '', '成功', 'token:a'])
+        sink.close()
+        
+        # 模拟写到一半崩溃
+        with open(csv_file, 'a', encoding='utf-8') as f:
+            f.write('1-1,新人需知,https://exam')
+        
+        sink = CsvRecordSink(csv_file, flush_every=1)
+        sink.open()
+        print(f"截掉字节数: {sink.repaired_bytes}")
+        assert sink.repaired_bytes > 0
+        sink.write_row(['1-1', '新人需知', 'https://example.feishu.cn/wiki/b', '', '', '成功', 'token:b'])
+        sink.close()
+        
+        rows = read_rows(csv_file)
+        assert [row[0] for row in rows] == ['序号', '1', '1-1']
+        print("✅ 残缺末行已修复\n")
+
+def test_reset():
+    """测试清空后只保留表头"""
+    print("🧪 测试3: 清空重写")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = os.path.join(temp_dir, "directory_traverse_log.csv")
+        sink = CsvRecordSink(csv_file, flush_every=1)
+        sink.write_row(['1', '新人园地', '', '', '', '成功', 'token:a'])
+        sink.reset()
+        sink.write_row(['1', '产品手册', '', '', '', '成功', 'token:c'])
+        sink.close()
+        
+        rows = read_rows(csv_file)
+        assert len(rows) == 2 and rows[1][1] == '产品手册'
+        print("✅ 清空重写正确\n")
+
+def test_read_last_row():
+    """测试从文件末尾向前读取最后一条完整记录"""
+    print("🧪 测试4: 末行反向读取")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = os.path.join(temp_dir, "directory_traverse_log.csv")
+        sink = CsvRecordSink(csv_file, flush_every=1)
+        sink.open()
+        assert read_last_csv_row(csv_file) is None  # 只有表头
+        
+        for i in range(1, 200):
+            sink.write_row([str(i), f"文档{i}", '', '', '', '成功', f"token:{i}"])
+        sink.close()
+        
+        # 末尾的半行被忽略，小块读取也能跨块拼出完整行
+        with open(csv_file, 'a', encoding='utf-8') as f:
+            f.write('200,文档')
+        last_row = read_last_csv_row(csv_file, block_size=16)
+        print(f"最后一行: {last_row}")
+        assert last_row[0] == '199' and last_row[6] == 'token:199'
+        print("✅ 末行反向读取正确\n")
+
+def test_interrupt_during_flush():
+    """测试刷新写入后、返回前收到SIGINT（处理器调用close()）时不重复写入同一批行"""
+    print("🧪 测试5: 刷新中途中断")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_file = os.path.join(temp_dir, "directory_traverse_log.csv")
+        sink = CsvRecordSink(csv_file, flush_every=3, flush_interval=3600)
+        sink.open()
+        write_inflight = sink._write_inflight
+        
+        def interrupted_write():
+            write_inflight()
+            sink._write_inflight = write_inflight
+            sink.close()  # SIGINT处理器
+            raise KeyboardInterrupt
+        
+        sink._write_inflight = interrupted_write
+        sink.write_row(['1', '新人园地', '', '', '', '成功', 'token:a'])
+        sink.write_row(['2', '产品手册', '', '', '', '成功', 'token:c'])
+        try:
+            sink.write_row(['3', '运维手册', '', '', '', '成功', 'token:d'])
+        except KeyboardInterrupt:
+            pass
+        
+        rows = read_rows(csv_file)
+        print(f"文件中的行: {[row[0] for row in rows]}")
+        assert [row[0] for row in rows] == ['序号', '1', '2', '3']
+        print("✅ 中断时没有重复写入\n")
+
+def test_interrupt_before_write():
+    """测试行已移出缓冲、尚未写入（或只写了一部分）时收到SIGINT，处理器的close()写完这批行"""
+    print("🧪 测试6: 写入前中断")
+    print("=" * 40)
+    
+    for written_before_interrupt in (0, 10):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_file = os.path.join(temp_dir, "directory_traverse_log.csv")
+            sink = CsvRecordSink(csv_file, flush_every=3, flush_interval=3600)
+            sink.open()
+            write_inflight = sink._write_inflight
+            
+            def interrupted_write():
+                # 模拟os.write只写了一部分字节后收到SIGINT
+                sink.inflight = sink.inflight[os.write(sink.fd, sink.inflight[:written_before_interrupt]):]
+                sink._write_inflight = write_inflight
+                sink.close()  # SIGINT处理器
+                raise KeyboardInterrupt
+            
+            sink._write_inflight = interrupted_write
+            sink.write_row(['1', '新人园地', '', '', '', '成功', 'token:a'])
+            sink.write_row(['2', '产品手册', '', '', '', '成功', 'token:c'])
+            try:
+                sink.write_row(['3', '运维手册', '', '', '', '成功', 'token:d'])
+            except KeyboardInterrupt:
+                pass
+            
+            rows = read_rows(csv_file)
+            print(f"中断前写入 {written_before_interrupt} 字节, 文件中的行: {[row[0] for row in rows]}")
+            assert rows[1:] == [['1', '新人园地', '', '', '', '成功', 'token:a'],
+                                ['2', '产品手册', '', '', '', '成功', 'token:c'],
+                                ['3', '运维手册', '', '', '', '成功', 'token:d']]
+            assert sink.last_flushed_row[6] == 'token:d'
+    print("✅ 中断时没有丢失行\n")
+
+def test_pointer_follows_checkpoint():
+    """测试断点指针只在检查点落盘后前进，缓冲中的记录不计入已访问"""
+    print("🧪 测试7: 断点指针")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        traverser = FakeTraverser(temp_dir)
+        traverser.save_single_record_to_csv({'index': '1', 'directory_item': '新人园地', 'node_key': 'token:a'})
+        traverser.checkpoint_records()
+        traverser.save_single_record_to_csv({'index': '2', 'directory_item': '产品手册', 'node_key': 'token:c'})
+        
+        # 第二条仍在缓冲中时崩溃：指针停在第一条，恢复时第二条会重新遍历
+        pointer = traverser.read_resume_pointer()
+        visited = set()
+        traverser.populate_visited_keys_from_csv(visited)
+        print(f"指针: {pointer}, 已访问: {visited}")
+        assert pointer['index'] == '1' and pointer['node_key'] == 'token:a'
+        assert visited == {'token:a'}
+        
+        traverser.checkpoint_records()
+        assert traverser.read_resume_pointer()['node_key'] == 'token:c'
+        traverser.record_sink.close()
+        print("✅ 断点指针只指向已落盘的记录\n")
+
+def main():
+    """主函数"""
+    print("🚀 CSV记录写入器测试")
+    print("=" * 50)
+    
+    test_buffered_flush()
+    test_torn_tail_repair()
+    test_reset()
+    test_read_last_row()
+    test_interrupt_during_flush()
+    test_interrupt_before_write()
+    test_pointer_follows_checkpoint()
+
+if __name__ == "__main__":
+    main()
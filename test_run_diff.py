@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+运行差异测试脚本
+验证按稳定标识识别新增/删除/重命名/移动/更换父节点、CSV与状态库快照读取和大规模差异耗时
+"""
+
+import sys
+import os
+import csv
+import time
+import tempfile
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.run_diff import diff_snapshots, diff_runs, build_snapshot, main as diff_main
+from directory_traverser.record_sink import RECORD_CSV_HEADER
+from directory_traverser.state_store import CrawlStateStore
+
+
+BASE_URL = "https://example.feishu.cn/wiki"
+
+
+def write_csv(csv_file, rows):
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(RECORD_CSV_HEADER)
+        for path_index, name, token in rows:
+            writer.writerow([path_index, name, f"{BASE_URL}/{token}", '2024-03-01 10:00:00', 1.0, '成功', f"token:{token}"])
+
+
+OLD_ROWS = [
+    ('1', '产品手册', 'tA'),
+    ('1-1', '安装指南', 'tB'),
+    ('1-2', '常见问题', 'tC'),
+    ('1-2-1', '旧版说明', 'tD'),
+    ('2', '开发文档', 'tE'),
+    ('2-1', '接口说明', 'tF'),
+]
+
+NEW_ROWS = [
+    ('1', '产品手册', 'tA'),
+    ('1-1', '安装指南（2024版）', 'tB'),  # 重命名
+    ('1-2', '常见问题', 'tC'),
+    ('1-2-1', '接口说明', 'tF'),  # 从开发文档移到常见问题下
+    ('2', '开发者文档', 'tE'),  # 重命名，子节点路径随之变化
+    ('2-1', '更新日志', 'tG'),  # 新增
+]
+
+
+def test_csv_diff():
+    """测试CSV快照的差异分类"""
+    print("🧪 测试1: CSV快照差异")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        old_csv = os.path.join(tmp_dir, 'old.csv')
+        new_csv = os.path.join(tmp_dir, 'new.csv')
+        write_csv(old_csv, OLD_ROWS)
+        write_csv(new_csv, NEW_ROWS)
+        
+        diff = diff_runs(old_csv, new_csv)
+        print(f"差异摘要: {diff['summary']}")
+        
+        assert [record['id'] for record in diff['added']] == ['token:tG']
+        assert [record['id'] for record in diff['removed']] == ['token:tD']
+        assert sorted(item['id'] for item in diff['renamed']) == ['token:tB', 'token:tE']
+        assert [item['id'] for item in diff['reparented']] == ['token:tF']
+        assert diff['reparented'][0]['new']['parent'] == 'token:tC'
+        assert diff['summary']['unchanged'] == 2  # tA, tC
+        assert sorted(record['id'] for record in diff['download']) == ['token:tB', 'token:tE', 'token:tF', 'token:tG']
+        
+        # 命令行输出JSON文件
+        output = os.path.join(tmp_dir, 'diff.json')
+        assert diff_main([old_csv, new_csv, '-o', output]) == 0
+        assert os.path.exists(output)
+    print("✅ CSV差异分类正确\n")
+
+
+def test_moved_under_renamed_ancestor():
+    """测试父节点未变、祖先路径变化时归为移动"""
+    print("🧪 测试2: 祖先变化导致的移动")
+    print("=" * 40)
+    
+    old = build_snapshot([
+        {'path_index': '1', 'name': '手册', 'url': f"{BASE_URL}/tA", 'node_key': 'token:tA'},
+        {'path_index': '1-1', 'name': '第一章', 'url': f"{BASE_URL}/tB", 'node_key': 'token:tB'},
+        {'path_index': '1-1-1', 'name': '小节', 'url': f"{BASE_URL}/tC", 'node_key': 'token:tC'},
+    ])
+    new = build_snapshot([
+        {'path_index': '1', 'name': '手册', 'url': f"{BASE_URL}/tA", 'node_key': 'token:tA'},
+        {'path_index': '1-1', 'name': '第1章', 'url': f"{BASE_URL}/tB", 'node_key': 'token:tB'},
+        {'path_index': '1-1-1', 'name': '小节', 'url': f"{BASE_URL}/tC", 'node_key': 'token:tC'},
+    ])
+    diff = diff_snapshots(old, new)
+    assert [item['id'] for item in diff['renamed']] == ['token:tB']
+    assert [item['id'] for item in diff['moved']] == ['token:tC']
+    print("✅ 祖先重命名后子节点归为移动\n")
+
+
+def test_store_snapshot():
+    """测试状态库快照：父节点取自节点表，墓碑节点视为删除"""
+    print("🧪 测试3: 状态库快照")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        old_db = os.path.join(tmp_dir, 'old.db')
+        new_db = os.path.join(tmp_dir, 'new.db')
+        for db_file, rows in ((old_db, OLD_ROWS), (new_db, NEW_ROWS)):
+            store = CrawlStateStore(db_file)
+            path_to_key = {}
+            for path_index, name, token in rows:
+                parent = path_to_key.get(path_index.rsplit('-', 1)[0]) if '-' in path_index else None
+                store.record_visit({'node_key': f"token:{token}", 'index': path_index, 'directory_item': name,
+                                    'url': f"{BASE_URL}/{token}", 'level': path_index.count('-') + 1, 'parent_key': parent})
+                path_to_key[path_index] = f"token:{token}"
+            if db_file == new_db:
+                store.mark_tombstones(['token:tC'], '2024-03-08 10:00:00')
+            store.close()
+        
+        diff = diff_runs(old_db, new_db)
+        print(f"差异摘要: {diff['summary']}")
+        assert sorted(record['id'] for record in diff['removed']) == ['token:tC', 'token:tD']
+        assert [record['id'] for record in diff['added']] == ['token:tG']
+    print("✅ 状态库快照差异正确\n")
+
+
+def test_large_diff_speed():
+    """测试10万节点的差异在数秒内完成"""
+    print("🧪 测试4: 大规模差异耗时")
+    print("=" * 40)
+    
+    def rows(renamed_every=None):
+        result = []
+        for i in range(1000):
+            result.append({'path_index': f"{i}", 'name': f"目录{i}", 'url': f"{BASE_URL}/d{i}", 'node_key': f"token:d{i}"})
+            for j in range(99):
+                name = f"文档{i}-{j}" + ("-新" if renamed_every and j % renamed_every == 0 else "")
+                result.append({'path_index': f"{i}-{j}", 'name': name, 'url': f"{BASE_URL}/n{i}x{j}",
+                               'node_key': f"token:n{i}x{j}"})
+        return result
+    
+    old, new = build_snapshot(rows()), build_snapshot(rows(renamed_every=10))
+    start_time = time.time()
+    diff = diff_snapshots(old, new)
+    elapsed = time.time() - start_time
+    
+    print(f"节点数: {len(new)}, 耗时: {elapsed:.2f}秒")
+    assert len(new) == 100000
+    assert diff['summary']['renamed'] == 10000
+    assert elapsed < 10
+    print("✅ 大规模差异耗时正常\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 运行差异测试")
+    print("=" * 50)
+    
+    test_csv_diff()
+    test_moved_under_renamed_ancestor()
+    test_store_snapshot()
+    test_large_diff_speed()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+选择器缓存测试脚本（不需要浏览器）
+验证获胜选择器的学习、命中后只查询缓存选择器、未命中时回退完整列表并重新学习、按知识空间区分作用域，
+以及命中/未命中只在内存中计数，获胜选择器变化时立即保存，其余在检查点时保存
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.selector_cache import SelectorCacheMixin
+from directory_traverser.discovery import DiscoveryMixin
+
+
+class FakeLogger:
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+
+
+class FakeDriver:
+    current_url = 'https://example.feishu.cn/wiki/space/7000001'
+
+
+class FakeTraverser(SelectorCacheMixin, DiscoveryMixin):
+    """选择器 -> 目录项名称列表，模拟每个选择器在页面上匹配到的目录项"""
+    
+    def __init__(self, output_dir, matches):
+        self.output_dir = output_dir
+        self.logger = FakeLogger()
+        self.driver = FakeDriver()
+        self.selector_cache = None
+        self.matches = matches
+        self.collected = []
+        self.saves = 0
+    
+    def collect_sidebar_items_by_selector(self, selector):
+        self.collected.append(selector)
+        names = self.matches.get(selector, [])
+        return [{'name': name, 'href': f"javascript:void(0)#{name}"} for name in names], len(names)
+    
+    def save_selector_cache(self):
+        self.saves += 1
+        super().save_selector_cache()
+
+
+def read_cache(output_dir):
+    with open(os.path.join(output_dir, "selector_cache.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_hit_miss_relearn():
+    """测试学习获胜选择器、命中时只执行一个选择器、未命中时回退完整列表并重新学习"""
+    print("🧪 测试1: 命中、未命中与重新学习")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        tree = '[class*="tree-view-node"]'
+        links = '.sidebar a[href]'
+        traverser = FakeTraverser(output_dir, {tree: ['产品手册', '运维手册'], links: ['产品手册']})
+        
+        # 首次：执行完整列表，贡献唯一项最多的选择器获胜
+        assert len(traverser.find_sidebar_items()) == 2
+        assert len(traverser.collected) == len(traverser.SIDEBAR_SELECTORS)
+        assert traverser.get_cached_selector() == tree
+        
+        # 命中：只执行缓存的选择器
+        traverser.collected = []
+        assert len(traverser.find_sidebar_items()) == 2
+        assert traverser.collected == [tree]
+        
+        # 页面改版后缓存选择器不再匹配：记一次未命中，回退完整列表并学习新的选择器
+        traverser.matches = {links: ['产品手册', '运维手册', '常见问题']}
+        traverser.collected = []
+        assert len(traverser.find_sidebar_items()) == 3
+        assert traverser.collected[0] == tree and len(traverser.collected) == 1 + len(traverser.SIDEBAR_SELECTORS)
+        assert traverser.get_cached_selector() == links
+        
+        # 重新加载后使用磁盘上的缓存；其他知识空间不共用
+        traverser.flush_selector_cache()
+        entry = read_cache(output_dir)[traverser.get_selector_cache_scope()]
+        print(f"缓存条目: {entry}")
+        assert entry['selector'] == links and entry['misses'] == 1 and entry['hits'] == 0
+        reloaded = FakeTraverser(output_dir, traverser.matches)
+        assert reloaded.get_cached_selector() == links
+        reloaded.driver = type('OtherSpace', (), {'current_url': 'https://example.feishu.cn/wiki/space/7000002'})()
+        assert reloaded.get_cached_selector() is None
+        print("✅ 命中、回退与重新学习正确\n")
+
+
+def test_counts_saved_at_checkpoint():
+    """测试命中计数不逐次写盘，检查点时一次保存"""
+    print("🧪 测试2: 命中计数延迟保存")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        traverser = FakeTraverser(output_dir, {'[class*="tree-view-node"]': ['产品手册', '运维手册']})
+        traverser.find_sidebar_items()
+        assert traverser.saves == 1  # 学习到新的获胜选择器时立即保存
+        
+        for _ in range(5):
+            traverser.find_sidebar_items()
+        assert traverser.saves == 1
+        assert read_cache(output_dir)[traverser.get_selector_cache_scope()]['hits'] == 0
+        
+        traverser.flush_selector_cache()
+        traverser.flush_selector_cache()  # 没有新的计数时不重复保存
+        print(f"保存次数: {traverser.saves}")
+        assert traverser.saves == 2
+        assert read_cache(output_dir)[traverser.get_selector_cache_scope()]['hits'] == 5
+        assert os.listdir(output_dir) == ['selector_cache.json']  # 临时文件已替换
+        print("✅ 命中计数在检查点时保存\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 选择器缓存测试")
+    print("=" * 50)
+    
+    test_hit_miss_relearn()
+    test_counts_saved_at_checkpoint()
+
+if __name__ == "__main__":
+    main()
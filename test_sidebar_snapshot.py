@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+目录树快照测试脚本（不需要浏览器）
+用node执行SIDEBAR_SNAPSHOT_JS（模拟目录树DOM），验证一次脚本返回的节点标识、层级、父子关系和展开状态，
+以及snapshot_nodes_to_items过滤/写入节点索引、resolve_item_element按节点标识延迟解析元素
+"""
+
+import sys
+import json
+import shutil
+import subprocess
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.discovery import DiscoveryMixin, SIDEBAR_SNAPSHOT_JS
+from directory_traverser.node_index import NodeIndex, css_attr_selector
+
+# 只支持快照脚本用到的选择器：标签、.类名、[属性]、[属性="值"]、[属性*="值"]、逗号分组和 :scope >
+DOM_HARNESS = r"""
+function matchSimple(el, selector) {
+    const m = selector.match(/^([a-z]*)((?:\.[\w-]+|\[[^\]]+\])*)$/);
+    if (!m) { throw new Error('unsupported selector: ' + selector); }
+    if (m[1] && el.tag !== m[1]) { return false; }
+    return (m[2].match(/\.[\w-]+|\[[^\]]+\]/g) || []).every((token) => {
+        if (token[0] === '.') { return (el.getAttribute('class') || '').split(/\s+/).includes(token.slice(1)); }
+        const attr = token.slice(1, -1).match(/^([\w-]+)(?:(\*?=)"([^"]*)")?$/);
+        const value = el.getAttribute(attr[1]);
+        if (!attr[2] || value === null) { return value !== null; }
+        return attr[2] === '=' ? value === attr[3] : value.includes(attr[3]);
+    });
+}
+
+class Element {
+    constructor(spec, parent) {
+        this.tag = spec.tag || 'div';
+        this.attrs = Object.assign({}, spec.attrs || {});
+        this.text = spec.text || '';
+        this.hidden = !!spec.hidden;
+        this.parentElement = parent;
+        this.children = (spec.children || []).map((child) => new Element(child, this));
+    }
+    get innerText() { return this.text + this.children.map((child) => child.innerText).join(''); }
+    get textContent() { return this.innerText; }
+    get href() { return this.getAttribute('href'); }
+    get className() { return this.getAttribute('class') || ''; }
+    getAttribute(name) { return name in this.attrs ? String(this.attrs[name]) : null; }
+    hasAttribute(name) { return name in this.attrs; }
+    setAttribute(name, value) { this.attrs[name] = String(value); }
+    getBoundingClientRect() {
+        return this.hidden ? {left: 0, top: 0, width: 0, height: 0} : {left: 12, top: 40, width: 180, height: 24};
+    }
+    matches(selector) { return selector.split(',').some((part) => matchSimple(this, part.trim())); }
+    closest(selector) {
+        for (let el = this; el; el = el.parentElement) { if (el.matches(selector)) { return el; } }
+        return null;
+    }
+    descendants() { return this.children.flatMap((child) => [child, ...child.descendants()]); }
+    querySelectorAll(selector) {
+        const parts = selector.split(',').map((part) => part.trim());
+        return this.descendants().filter((el) => parts.some((part) => part.startsWith(':scope > ')
+            ? el.parentElement === this && matchSimple(el, part.slice(':scope > '.length))
+            : matchSimple(el, part)));
+    }
+    querySelector(selector) { return this.querySelectorAll(selector)[0] || null; }
+}
+
+const document = new Element({children: JSON.parse(process.argv[1])}, null);
+const window = {getComputedStyle: (el) => ({visibility: el.hidden ? 'hidden' : 'visible', display: 'block'})};
+function snapshot() { %s }
+const nodes = snapshot('.workspace-tree-view-node-content');
+const keys = document.querySelectorAll('[data-kb-key]').map((el) => el.getAttribute('data-kb-key'));
+console.log(JSON.stringify({nodes: nodes, keys: keys}));
+"""
+
+
+def tree_row(level, title, attrs=None, children=None, link=None, hidden=False):
+    """目录树的一行：行容器（treeitem）> [链接 >] 标题节点，子节点位于行内的 role=group 容器中"""
+    content = {'tag': 'span', 'attrs': {'class': 'workspace-tree-view-node-content'}, 'text': title, 'hidden': hidden}
+    if link:
+        content = {'tag': 'a', 'attrs': {'href': link}, 'children': [content]}
+    row_children = [content]
+    if children:
+        row_children.append({'attrs': {'role': 'group'}, 'children': children})
+    row_attrs = {'role': 'treeitem', 'class': 'workspace-tree-view-node', 'aria-level': level}
+    row_attrs.update(attrs or {})
+    return {'attrs': row_attrs, 'children': row_children}
+
+
+TREE = [
+    tree_row(1, '产品​  手册', {'data-node-token': 'wikA', 'aria-expanded': 'true'}, children=[
+        tree_row(2, '安装指南', link='https://example.feishu.cn/wiki/wikB'),
+        tree_row(2, '常见问题', {'data-node-token': 'wikC', 'aria-expanded': 'false'}),
+    ]),
+    # 行自身没有展开标记，子节点行的标记不能算作它的
+    tree_row(1, '归档', children=[tree_row(2, '旧版', {'aria-expanded': 'false'})]),
+    tree_row(1, '归档'),
+    tree_row(1, '隐藏文档', hidden=True),
+]
+
+
+def run_snapshot(tree):
+    output = subprocess.run(['node', '-e', DOM_HARNESS % SIDEBAR_SNAPSHOT_JS, json.dumps(tree)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+class FakeLogger:
+    def info(self, message): pass
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+    def error(self, message): print(message)
+
+
+class FakeElement:
+    def __init__(self, name):
+        self.name = name
+    
+    def is_displayed(self):
+        return True
+    
+    def is_enabled(self):
+        return True
+
+
+class FakeDriver:
+    """按定位器返回元素；记录脚本查找和按文本查找的次数"""
+    
+    def __init__(self, elements):
+        self.elements = elements
+        self.queries = []
+        self.text_lookups = 0
+    
+    def execute_script(self, script, locator):
+        self.queries.append(locator)
+        return self.elements.get(locator)
+    
+    def find_elements(self, by, xpath):
+        self.text_lookups += 1
+        return [FakeElement('按文本找到')]
+
+
+class FakeTraverser(DiscoveryMixin):
+    def __init__(self, elements=None):
+        self.logger = FakeLogger()
+        self.driver = FakeDriver(elements or {})
+        self.node_index = NodeIndex()
+
+
+def test_snapshot_script():
+    """测试一次脚本返回全部节点：标识、层级、父子关系、展开状态和可见性"""
+    print("🧪 测试1: 目录树快照脚本")
+    print("=" * 40)
+    
+    result = run_snapshot(TREE)
+    nodes = {node['key']: node for node in result['nodes']}
+    for node in result['nodes']:
+        print(f"{node['key']}: 层级 {node['depth']}, 父节点 {node['parent']}, 展开 {node['expanded']}, "
+              f"有子节点 {node['has_children']}, 可见 {node['visible']}")
+    
+    assert [node['key'] for node in result['nodes']] == [
+        'token:wikA', 'token:wikB', 'token:wikC', 'path:归档', 'path:归档/旧版', 'path:归档#2', 'path:隐藏文档']
+    assert nodes['token:wikA']['name'] == '产品 手册'  # 零宽字符去除、空白合并
+    assert nodes['token:wikA']['expanded'] is True and nodes['token:wikA']['has_children'] is True
+    assert nodes['token:wikB']['parent'] == 'token:wikA' and nodes['token:wikB']['depth'] == 2
+    assert nodes['token:wikB']['href'] == 'https://example.feishu.cn/wiki/wikB'
+    assert nodes['token:wikB']['has_children'] is None  # 没有展开按钮，无法判断
+    assert nodes['token:wikC']['expanded'] is False and nodes['token:wikC']['has_children'] is True
+    assert nodes['path:归档']['parent'] is None and nodes['path:归档']['depth'] == 1
+    assert nodes['token:wikA']['href'] is None  # 不取子节点行中的链接
+    assert nodes['path:归档']['expanded'] is None and nodes['path:归档']['has_children'] is True
+    assert nodes['path:归档/旧版']['parent'] == 'path:归档' and nodes['path:归档/旧版']['expanded'] is False
+    assert nodes['path:隐藏文档']['visible'] is False
+    assert result['keys'] == list(nodes)  # 每个节点都写入了data-kb-key，供延迟解析元素
+    print("✅ 快照字段正确\n")
+
+
+def test_snapshot_to_items_and_resolve():
+    """测试快照转换为目录项并写入节点索引，点击前按节点标识解析元素，找不到时按文本查找"""
+    print("🧪 测试2: 目录项转换与元素延迟解析")
+    print("=" * 40)
+    
+    nodes = run_snapshot(TREE)['nodes']
+    install_guide = FakeElement('安装指南')
+    traverser = FakeTraverser({css_attr_selector('data-kb-key', 'token:wikB'): install_guide})
+    items = traverser.snapshot_nodes_to_items(nodes)
+    
+    print(f"目录项: {[item['name'] for item in items]}")
+    assert [item['node_key'] for item in items] == ['token:wikA', 'token:wikB', 'token:wikC', 'path:归档', 'path:归档/旧版',
+                                                    'path:归档#2']
+    assert all(item['element'] is None for item in items)  # 元素句柄延迟到点击前解析
+    assert [child['key'] for child in traverser.node_index.children('token:wikA')] == ['token:wikB', 'token:wikC']
+    assert traverser.node_index.get_by_token('wikB')['url'] == 'https://example.feishu.cn/wiki/wikB'
+    
+    item = items[1]
+    assert traverser.resolve_item_element(item) is install_guide
+    assert traverser.driver.queries == ['[data-kb-key="token:wikB"]']
+    assert traverser.resolve_item_element(item) is install_guide  # 已解析的元素直接复用
+    assert len(traverser.driver.queries) == 1
+    
+    # 节点已不在DOM中（例如目录树重新渲染）时按标题查找
+    assert traverser.resolve_item_element(items[5]).name == '按文本找到'
+    assert traverser.driver.queries[-1] == '[data-kb-key="path:归档#2"]'
+    assert traverser.driver.text_lookups == 1
+    print("✅ 元素按节点标识延迟解析\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 目录树快照测试")
+    print("=" * 50)
+    
+    if not shutil.which('node'):
+        print("⚠️ 未安装node，跳过")
+        return
+    test_snapshot_script()
+    test_snapshot_to_items_and_resolve()
+
+if __name__ == "__main__":
+    main()
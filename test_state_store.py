@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+遍历状态库测试脚本
+验证访问记录、断点位置查询、已访问集合和失败项
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.state_store import CrawlStateStore, FAILURE_FAILED, FAILURE_PERMISSION
+
+def make_page(index, name, token, level):
+    return {
+        'index': index,
+        'directory_item': name,
+        'url': f"https://example.feishu.cn/wiki/{token}",
+        'title': name,
+        'timestamp': '2025-08-13 10:24:00',
+        'response_time': 1.2,
+        'level': level,
+        'node_key': f"token:{token}"
+    }
+
+def test_resume_queries():
+    """测试断点位置、路径映射和已访问集合"""
+    print("🧪 测试1: 断点续传查询")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = CrawlStateStore(os.path.join(temp_dir, "crawl_state.db"), batch_size=2)
+        store.record_visit(make_page('1', '新人园地', 'AAA', 1))
+        store.record_visit(make_page('1-1', '新人需知', 'BBB', 2))
+        store.record_visit(make_page('2', '产品手册', 'CCC', 1))
+        
+        last_visit = store.last_visit()
+        print(f"最后访问: {last_visit['path_index']} - {last_visit['name']}")
+        assert (last_visit['path_index'], last_visit['name']) == ('2', '产品手册')
+        assert store.path_name_mapping() == {'1': '新人园地', '1-1': '新人需知', '2': '产品手册'}
+        assert store.visited_keys() == {'token:AAA', 'token:BBB', 'token:CCC'}
+        assert store.get_visit_by_path('1-1')['url'].endswith('/BBB')
+        assert store.level_counts() == {1: 2, 2: 1}
+        store.close()
+        
+        # 重新打开后状态仍在
+        store = CrawlStateStore(os.path.join(temp_dir, "crawl_state.db"))
+        assert store.visit_count() == 3 and store.is_visited('token:BBB')
+        store.close()
+        print("✅ 断点续传查询正确\n")
+
+def test_failures():
+    """测试失败项记录和清空"""
+    print("🧪 测试2: 失败项")
+    print("=" * 40)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = CrawlStateStore(os.path.join(temp_dir, "crawl_state.db"))
+        store.record_visit(make_page('1', '新人园地', 'AAA', 1))
+        store.record_failure(FAILURE_FAILED, {'name': '运维手册', 'level': 1, 'reason': '打开失败'})
+        store.record_failure(FAILURE_PERMISSION, {'name': '财务', 'href': 'https://example.feishu.cn/wiki/DDD',
+                                                  'status': 'no-permission'})
+        
+        assert store.failure_count(FAILURE_FAILED) == 1
+        assert store.failures(FAILURE_PERMISSION)[0]['status'] == 'no-permission'
+        
+        store.reset()
+        assert store.visit_count() == 0
+        store.close()
+        print("✅ 失败项正确\n")
+
+def main():
+    """主函数"""
+    print("🚀 遍历状态库测试")
+    print("=" * 50)
+    
+    test_resume_queries()
+    test_failures()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+URL直达导航测试脚本（不需要浏览器）
+验证navigate_to_url打开URL后等待文档就绪（超时降速但继续处理、打开失败返回False），
+以及open_item/open_subtree_task在URL直达模式和点击模式下的选择与回退顺序
+"""
+
+import sys
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.navigation import NavigationMixin, DOCUMENT_READY_JS
+from directory_traverser.parallel import ParallelTraversalMixin
+from directory_traverser.node_index import NodeIndex
+from directory_traverser.rate_limiter import AdaptiveRateLimiter
+
+
+class FakeLogger:
+    def __init__(self):
+        self.warnings = []
+    
+    def info(self, message): pass
+    def debug(self, message): pass
+    def error(self, message): print(message)
+    
+    def warning(self, message):
+        print(message)
+        self.warnings.append(message)
+
+
+class FakeDriver:
+    """记录打开的URL；ready为文档就绪脚本的返回值"""
+    
+    def __init__(self, ready=True, fail=False):
+        self.ready = ready
+        self.fail = fail
+        self.opened = []
+    
+    def get(self, url):
+        if self.fail:
+            raise RuntimeError('net::ERR_CONNECTION_RESET')
+        self.opened.append(url)
+    
+    def execute_script(self, script):
+        assert script == DOCUMENT_READY_JS
+        return self.ready
+
+
+class FakeRateLimiter:
+    def __init__(self):
+        self.outcomes = []
+    
+    def record_outcome(self, outcome):
+        self.outcomes.append(outcome)
+
+
+class FakeTraverser(NavigationMixin, ParallelTraversalMixin):
+    """侧边栏为固定的目录项列表；记录点击和展开"""
+    
+    def __init__(self, navigation_mode='url', sidebar=None, driver=None):
+        self.driver = driver or FakeDriver()
+        self.logger = FakeLogger()
+        self.navigation_mode = navigation_mode
+        self.url_ready_timeout = 0.2
+        self.rate_limiter = FakeRateLimiter()
+        self.node_index = NodeIndex()
+        self.sidebar = sidebar or []
+        self.stats = {}
+        self.actions = []
+    
+    def find_sidebar_items_fresh(self):
+        self.actions.append('scan')
+        return list(self.sidebar)
+    
+    def resolve_item_element(self, item):
+        return item.get('element')
+    
+    def click_element_safe(self, element, item_name):
+        self.actions.append(f"click:{item_name}")
+        return True
+    
+    def expand_sidebar_node(self, item, fresh=False):
+        self.actions.append(f"expand:{item['node_key']}")
+        return True
+
+
+def make_task(name, url=None, origin_url=None, parent_key=None):
+    return {'node_key': f"token:{name}", 'name': name, 'url': url, 'origin_url': origin_url, 'parent_key': parent_key}
+
+
+def test_navigate_to_url():
+    """测试URL直达：就绪后返回、就绪超时时反馈限速器并继续、打开失败返回False"""
+    print("🧪 测试1: URL直达与就绪等待")
+    print("=" * 40)
+    
+    traverser = FakeTraverser()
+    assert traverser.navigate_to_url('https://example.feishu.cn/wiki/wikA', '产品手册') is True
+    assert traverser.driver.opened == ['https://example.feishu.cn/wiki/wikA']
+    assert traverser.stats['url_navigations'] == 1 and traverser.rate_limiter.outcomes == []
+    
+    slow = FakeTraverser(driver=FakeDriver(ready=False))
+    assert slow.navigate_to_url('https://example.feishu.cn/wiki/wikB', '大表格') is True
+    assert slow.rate_limiter.outcomes == [AdaptiveRateLimiter.OUTCOME_TIMEOUT]
+    assert any('大表格' in message for message in slow.logger.warnings)
+    
+    broken = FakeTraverser(driver=FakeDriver(fail=True))
+    assert broken.navigate_to_url('https://example.feishu.cn/wiki/wikC', '断网') is False
+    assert 'url_navigations' not in broken.stats
+    print("✅ URL直达正确\n")
+
+
+def test_open_item_modes():
+    """测试open_item：URL直达模式按快照或节点索引中的URL打开，有未展开的子节点时再展开；点击模式点击侧边栏"""
+    print("🧪 测试2: 打开目录项")
+    print("=" * 40)
+    
+    traverser = FakeTraverser()
+    traverser.node_index.upsert('token:wikF', '运营', url='https://example.feishu.cn/wiki/wikF', token='wikF')
+    folder = {'name': '运营', 'node_key': 'token:wikF', 'url': None, 'has_children': True, 'expanded': False,
+              'element': 'el'}
+    assert traverser.open_item(folder) is True
+    assert traverser.driver.opened == ['https://example.feishu.cn/wiki/wikF']
+    assert traverser.actions == ['expand:token:wikF']
+    
+    # URL未知时即使在URL直达模式也点击侧边栏
+    unknown = {'name': '草稿', 'node_key': 'path:草稿', 'url': None, 'element': 'el'}
+    assert traverser.open_item(unknown) is True
+    assert traverser.actions[-1] == 'click:草稿' and len(traverser.driver.opened) == 1
+    
+    clicking = FakeTraverser(navigation_mode='click')
+    assert clicking.open_item(dict(folder, url='https://example.feishu.cn/wiki/wikF')) is True
+    assert clicking.actions == ['click:运营'] and clicking.driver.opened == []
+    print("✅ 打开方式选择正确\n")
+
+
+def test_open_subtree_task():
+    """测试边界节点的打开顺序：URL直达 -> 侧边栏点击 -> 已知URL -> 回到来源页 -> 展开父节点"""
+    print("🧪 测试3: 打开边界节点")
+    print("=" * 40)
+    
+    url = 'https://example.feishu.cn/wiki/wikA'
+    origin = 'https://example.feishu.cn/wiki/wikP'
+    
+    direct = FakeTraverser()
+    assert direct.open_subtree_task(make_task('A', url=url)) is True
+    assert direct.driver.opened == [url] and direct.actions == []  # 不扫描侧边栏
+    
+    sidebar = [{'node_key': 'token:A', 'name': 'A', 'element': 'el'}]
+    in_sidebar = FakeTraverser(sidebar=sidebar)
+    assert in_sidebar.open_subtree_task(make_task('A')) is True
+    assert in_sidebar.actions == ['scan', 'click:A']
+    
+    hidden = FakeTraverser(navigation_mode='click')
+    assert hidden.open_subtree_task(make_task('A', url=url)) is True
+    assert hidden.actions == ['scan'] and hidden.driver.opened == [url]
+    
+    missing = FakeTraverser(navigation_mode='click')
+    assert missing.open_subtree_task(make_task('A', origin_url=origin, parent_key='token:P')) is False
+    print(f"未找到时的操作: {missing.actions}, 打开的URL: {missing.driver.opened}")
+    assert missing.actions == ['scan', 'scan', 'expand:token:P', 'scan']
+    assert missing.driver.opened == [origin]
+    assert any('侧边栏中未找到节点' in message for message in missing.logger.warnings)
+    print("✅ 回退顺序正确\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 URL直达导航测试")
+    print("=" * 50)
+    
+    test_navigate_to_url()
+    test_open_item_modes()
+    test_open_subtree_task()
+
+if __name__ == "__main__":
+    main()
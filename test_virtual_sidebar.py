@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+虚拟列表目录树测试脚本
+验证分页滚动收集的完整性、脚本次数、覆盖率核对和子树收集
+"""
+
+import sys
+import os
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser.discovery import DiscoveryMixin
+from directory_traverser.virtual_sidebar import VirtualSidebarMixin, sidebar_coverage
+from directory_traverser.node_index import NodeIndex
+
+
+ROW_HEIGHT = 20
+CLIENT_HEIGHT = 200
+OVERSCAN = 40
+
+
+def build_tree(roots=30, children=3):
+    """扁平渲染的目录树：每个根节点下有若干子节点（aria-level/aria-setsize）"""
+    rows = []
+    for i in range(roots):
+        rows.append({'name': f"手册{i:03d}", 'token': f"root{i}", 'depth': 1, 'setsize': roots})
+        for j in range(children):
+            rows.append({'name': f"文档{i:03d}-{j}", 'token': None, 'depth': 2, 'setsize': children})
+    return rows
+
+
+class FakeVirtualDriver:
+    """只渲染可视区域（加上下缓冲）内节点的虚拟列表"""
+    
+    def __init__(self, rows, hide_rows=()):
+        self.rows = rows
+        self.hide_rows = set(hide_rows)
+        self.scroll_top = 0
+        self.scripts = 0
+    
+    def execute_async_script(self, script, selector, target_top, quiet_ms):
+        self.scripts += 1
+        scroll_height = len(self.rows) * ROW_HEIGHT
+        if target_top is not None:
+            self.scroll_top = max(0, min(target_top, scroll_height - CLIENT_HEIGHT))
+        
+        nodes = []
+        for index, row in enumerate(self.rows):
+            offset = index * ROW_HEIGHT
+            if index in self.hide_rows:
+                continue
+            if self.scroll_top - OVERSCAN <= offset < self.scroll_top + CLIENT_HEIGHT + OVERSCAN:
+                nodes.append(dict(row, offset=offset, visible=True, enabled=True, key=f"local{index}",
+                                  rect={'x': 20, 'y': offset - self.scroll_top, 'height': ROW_HEIGHT}))
+        return {
+            'scrollable': True,
+            'nodes': nodes,
+            'scroll_top': self.scroll_top,
+            'client_height': CLIENT_HEIGHT,
+            'scroll_height': scroll_height,
+            'rendered_height': len(nodes) * ROW_HEIGHT
+        }
+
+
+class FakeLogger:
+    def info(self, message): print(message)
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+
+
+class FakeTraverser(VirtualSidebarMixin, DiscoveryMixin):
+    def __init__(self, driver):
+        self.driver = driver
+        self.logger = FakeLogger()
+        self.stats = {}
+        self.node_index = NodeIndex()
+        self.scroll_collect_sidebar = True
+        self.sidebar_virtualized = None
+        self.sidebar_scroll_quiet_ms = 150
+        self.sidebar_offsets = {}
+        self.sidebar_coverage = None
+
+
+def test_collect_all_rows():
+    """测试分页收集到全部节点，脚本次数为 节点数/每页节点数 量级"""
+    print("🧪 测试1: 分页收集完整性")
+    print("=" * 40)
+    
+    rows = build_tree()
+    driver = FakeVirtualDriver(rows)
+    traverser = FakeTraverser(driver)
+    items = traverser.find_sidebar_items_from_snapshot()
+    
+    print(f"节点数: {len(items)}, 脚本次数: {driver.scripts}")
+    assert traverser.sidebar_virtualized is True
+    assert len(items) == len(rows)
+    assert len({item['node_key'] for item in items}) == len(rows)
+    # 每页约10行，120个节点不应超过 120/10 + 固定开销 次脚本
+    assert driver.scripts <= len(rows) * ROW_HEIGHT // CLIENT_HEIGHT + 5
+    # 跨页的子节点仍指向正确的父节点
+    child = next(item for item in items if item['name'] == '文档029-2')
+    assert child['parent_key'] == 'token:root29'
+    assert child['node_key'] == 'path:手册029/文档029-2'
+    assert traverser.sidebar_coverage['incomplete_parents'] == []
+    print("✅ 分页收集完整\n")
+
+
+def test_coverage_reports_gaps():
+    """测试覆盖率核对能发现缺失的子节点"""
+    print("🧪 测试2: 覆盖率缺口")
+    print("=" * 40)
+    
+    nodes = [
+        {'key': 'token:a', 'parent': None, 'setsize': 1},
+        {'key': 'path:a/x', 'parent': 'token:a', 'setsize': 3},
+        {'key': 'path:a/y', 'parent': 'token:a', 'setsize': 3},
+    ]
+    coverage = sidebar_coverage(nodes)
+    assert coverage['nodes_expected'] == 4
+    assert coverage['incomplete_parents'] == [{'parent': 'token:a', 'seen': 2, 'expected': 3}]
+    print("✅ 覆盖率缺口已报告\n")
+
+
+def test_subtree_collection():
+    """测试只收集指定节点的子树"""
+    print("🧪 测试3: 子树收集")
+    print("=" * 40)
+    
+    driver = FakeVirtualDriver(build_tree())
+    traverser = FakeTraverser(driver)
+    traverser.find_sidebar_items_from_snapshot()
+    full_scripts = driver.scripts
+    
+    driver.scripts = 0
+    items = traverser.find_subtree_items('token:root20')
+    _, children = traverser.split_child_items(items, 'token:root20')
+    
+    print(f"完整收集脚本: {full_scripts}, 子树收集脚本: {driver.scripts}")
+    assert [child['name'] for child in children] == ['文档020-0', '文档020-1', '文档020-2']
+    assert driver.scripts < full_scripts
+    print("✅ 子树收集正确\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 虚拟列表目录树测试")
+    print("=" * 50)
+    
+    test_collect_all_rows()
+    test_coverage_reports_gaps()
+    test_subtree_collection()
+
+if __name__ == "__main__":
+    main()
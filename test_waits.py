@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+事件驱动等待测试脚本（不需要浏览器）
+验证未启用或监听不可用时退回固定等待、页面变化后立即返回、超时计数，
+以及用node执行WAIT_FOR_CHANGE_JS（模拟window.__kbWatch）的变化/超时/整页跳转判断
+"""
+
+import sys
+import json
+import shutil
+import subprocess
+sys.path.insert(0, '/Users/abc/PycharmProjects/knowledge')
+
+from directory_traverser import waits
+from directory_traverser.waits import WaitMixin, WAIT_FOR_CHANGE_JS
+
+WAIT_HARNESS = r"""
+const page = JSON.parse(process.argv[1]);
+const window = {};
+if (page.watch) {
+    window.__kbWatch = Object.assign({}, page.watch, {last: performance.now() - page.watch.quiet_for});
+}
+function wait() { %s }
+wait(page.since, page.scope, page.timeout_ms, 100, 1000, (result) => console.log(JSON.stringify(result)));
+"""
+
+
+def run_wait_script(since, watch, scope='any', timeout_ms=300):
+    page = json.dumps({'since': since, 'watch': watch, 'scope': scope, 'timeout_ms': timeout_ms})
+    output = subprocess.run(['node', '-e', WAIT_HARNESS % WAIT_FOR_CHANGE_JS, page],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+class FakeLogger:
+    def info(self, message): pass
+    def debug(self, message): pass
+    def warning(self, message): print(message)
+
+
+class FakeDriver:
+    """记录注入的脚本参数；wait_result为异常时模拟脚本执行失败"""
+    
+    def __init__(self, wait_result=None, install_error=None):
+        self.wait_result = wait_result
+        self.install_error = install_error
+        self.wait_calls = []
+    
+    def set_script_timeout(self, seconds):
+        pass
+    
+    def execute_script(self, script):
+        if self.install_error:
+            raise self.install_error
+        return {'tree': 1, 'doc': 2, 'nav': 0}
+    
+    def execute_async_script(self, script, *args):
+        self.wait_calls.append(args)
+        if isinstance(self.wait_result, Exception):
+            raise self.wait_result
+        return self.wait_result
+
+
+class FakeTraverser(WaitMixin):
+    def __init__(self, driver, use_event_waits=True):
+        self.driver = driver
+        self.logger = FakeLogger()
+        self.use_event_waits = use_event_waits
+        self.wait_ceiling = 10
+        self.settle_quiet_ms = 300
+        self.settle_cap_ms = 3000
+        self.stats = {}
+        self.init_wait_stats()
+
+
+def record_sleeps():
+    """把waits模块中的time.sleep替换为只记录时长"""
+    sleeps = []
+    waits.time.sleep = sleeps.append
+    return sleeps
+
+
+def test_fallback_to_fixed_delay():
+    """测试未启用、没有基线或监听安装失败时退回固定等待"""
+    print("🧪 测试1: 退回固定等待")
+    print("=" * 40)
+    
+    real_sleep = waits.time.sleep
+    try:
+        sleeps = record_sleeps()
+        disabled = FakeTraverser(FakeDriver({'changed': True}), use_event_waits=False)
+        assert disabled.arm_change_watch() is None
+        assert disabled.wait_for_change(None, 2) == 2
+        assert disabled.wait_for_settle(1.5) == 1.5
+        
+        broken = FakeTraverser(FakeDriver({'changed': True}, install_error=RuntimeError('no script')))
+        assert broken.arm_change_watch() is None
+        assert broken.wait_for_change(broken.arm_change_watch(), 3) == 3
+        assert broken.wait_for_settle(0.5) == 0.5
+        
+        print(f"固定等待: {sleeps}")
+        assert sleeps == [2, 1.5, 3, 0.5]
+        assert not disabled.driver.wait_calls and not broken.driver.wait_calls
+        assert disabled.stats["event_waits"] == 0 and broken.stats["event_waits"] == 0
+    finally:
+        waits.time.sleep = real_sleep
+    print("✅ 不可用时按固定时长等待\n")
+
+
+def test_event_wait_and_timeout():
+    """测试启用时注入等待脚本：变化后返回，超时计数，脚本失败（整页跳转）视为等待结束"""
+    print("🧪 测试2: 事件驱动等待")
+    print("=" * 40)
+    
+    real_sleep = waits.time.sleep
+    try:
+        sleeps = record_sleeps()
+        traverser = FakeTraverser(FakeDriver({'changed': True, 'elapsed': 120}))
+        since = traverser.arm_change_watch()
+        assert since == {'tree': 1, 'doc': 2, 'nav': 0}
+        waited = traverser.wait_for_change(since, fallback_delay=2, scope='tree')
+        assert waited < 2
+        assert traverser.driver.wait_calls == [(since, 'tree', 10000, 300, 3000)]
+        
+        traverser.wait_for_change(since, fallback_delay=2, timeout=1.5)
+        assert traverser.driver.wait_calls[-1][2] == 1500  # 单次调用的上限覆盖wait_ceiling
+        
+        traverser.wait_for_settle(fallback_delay=3)
+        assert traverser.driver.wait_calls[-1][:2] == (None, 'any')  # 静默等待不要求新变化
+        assert traverser.stats["event_wait_timeouts"] == 0
+        
+        traverser.driver.wait_result = {'changed': False}
+        traverser.wait_for_change(since, fallback_delay=2)
+        assert traverser.stats["event_wait_timeouts"] == 1
+        
+        traverser.driver.wait_result = RuntimeError('script timeout')
+        traverser.wait_for_change(since, fallback_delay=2)
+        assert traverser.stats["event_wait_timeouts"] == 1
+        
+        print(f"等待统计: {traverser.stats}")
+        assert traverser.stats["event_waits"] == 5
+        assert traverser.stats["idle_time_saved"] > 0
+        assert sleeps == []
+    finally:
+        waits.time.sleep = real_sleep
+    print("✅ 事件驱动等待统计正确\n")
+
+
+def test_wait_script():
+    """测试等待脚本：变化并静默后返回、无变化时超时、监听丢失（整页跳转）立即返回"""
+    print("🧪 测试3: 等待脚本")
+    print("=" * 40)
+    
+    since = {'tree': 1, 'doc': 2, 'nav': 0}
+    changed = run_wait_script(since, {'tree': 2, 'doc': 2, 'nav': 0, 'quiet_for': 500}, scope='tree')
+    unchanged = run_wait_script(since, {'tree': 1, 'doc': 5, 'nav': 0, 'quiet_for': 500}, scope='tree')
+    reloaded = run_wait_script(since, None)
+    settled = run_wait_script(None, {'tree': 1, 'doc': 2, 'nav': 0, 'quiet_for': 500})
+    print(f"变化: {changed}, 其他区域变化: {unchanged}, 整页跳转: {reloaded}, 静默: {settled}")
+    
+    assert changed['changed'] is True and changed['elapsed'] < 300
+    assert unchanged['changed'] is False and unchanged['elapsed'] >= 300  # 文档区变化不满足目录树范围
+    assert reloaded['changed'] is True and reloaded['reloaded'] is True
+    assert settled['changed'] is True and settled['elapsed'] < 300
+    print("✅ 等待脚本判断正确\n")
+
+
+def main():
+    """主函数"""
+    print("🚀 事件驱动等待测试")
+    print("=" * 50)
+    
+    test_fallback_to_fixed_delay()
+    test_event_wait_and_timeout()
+    if not shutil.which('node'):
+        print("⚠️ 未安装node，跳过等待脚本测试")
+        return
+    test_wait_script()
+
+if __name__ == "__main__":
+    main()
@@ -55,6 +55,7 @@ class FastFeishuDownloader:
         self.driver = None
         self.wait = None
         self.window_size = None  # 缓存窗口大小
+        self.output_dir = "/Users/abc/PycharmProjects/knowledge_base/.venv/output"  # 下载目录（遍历器会改为本次运行的暂存目录）
         self.max_retries = 3  # 最大重试次数
         self.retry_delay = 10  # 重试等待时间（秒）
     
@@ -437,7 +438,7 @@ class FastFeishuDownloader:
         print(f"📄 文档: {doc_title[:50]}...")
         
         # 确保output目录存在
-        output_dir = "/Users/abc/PycharmProjects/knowledge_base/.venv/output"
+        output_dir = self.output_dir
         os.makedirs(output_dir, exist_ok=True)
         
         # 滚动到顶部